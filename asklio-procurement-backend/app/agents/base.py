@@ -1,8 +1,7 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar
-from contextlib import contextmanager
-import signal, uuid
+from typing import Generic, Optional, TypeVar
+import time, uuid
 from pydantic import BaseModel
 
 I = TypeVar("I", bound=BaseModel)
@@ -10,15 +9,34 @@ O = TypeVar("O", bound=BaseModel)
 
 class AgentError(RuntimeError): ...
 
-@contextmanager
-def deadline(seconds: float):
-    def _timeout(_signum, _frame): raise AgentTimeout("agent timed out")
-    old = signal.signal(signal.SIGALRM, _timeout)
-    try:
-        signal.alarm(int(seconds))
-        yield
-    finally:
-        signal.alarm(0); signal.signal(signal.SIGALRM, old)
+class AgentTimeout(AgentError): ...
+
+class Budget:
+    """
+    Wall-clock budget for one agent run.
+    Based on a monotonic deadline (no signals), so it works in worker threads and
+    in async code alike; pass `remaining()` as the client timeout of each stage.
+    `Budget(None)` never expires.
+    """
+    def __init__(self, seconds: Optional[float]):
+        self._deadline = None if seconds is None else time.monotonic() + max(0.0, seconds)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (>= 0), or None if unlimited."""
+        if self._deadline is None:
+            return None
+        return max(0.0, self._deadline - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0.0
+
+    def timeout(self, stage: str) -> Optional[float]:
+        """Client timeout for the next stage; raises AgentTimeout if nothing is left."""
+        if self.expired:
+            raise AgentTimeout(f"time budget exhausted before {stage}")
+        return self.remaining()
 
 class Agent(Generic[I, O], ABC):
     """Single-skill agent: I -> O (typed)."""
@@ -26,8 +44,8 @@ class Agent(Generic[I, O], ABC):
     version: str = "1.0"
 
     @abstractmethod
-    def run(self, payload: I) -> O: ...
+    def run(self, payload: I, *, budget: Optional[Budget] = None) -> O: ...
 
     @staticmethod
     def new_trace_id() -> str:
-        return str(uuid.uuid4())
\ No newline at end of file
+        return str(uuid.uuid4())
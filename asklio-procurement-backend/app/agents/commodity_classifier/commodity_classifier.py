@@ -1,21 +1,68 @@
 from __future__ import annotations
 import logging
-from typing import List, Dict, Optional
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
 from .interface import AbstractCommodityClassifier
 from .contracts import (
     CommodityClassifyIn,
     CommodityClassifyOut,
+    CommodityGroupRef,
     CONTRACT_VERSION,
 )
+from .group_index import CommodityGroupEmbeddingIndex
 from app.ai.base import AIClient
-from app.agents.base import AgentError
+from app.agents.base import AgentError, AgentTimeout, Budget
+from app.agents.instrumentation import stage
 from app.agents.commodity_classifier.prompt_templates import build_scoring_messages, build_rerank_messages
+from app.core import metrics
+from app.utils.concurrency import submit_in_context
 from app.weaviate import operations as wx
 from app.weaviate.text_formatter import build_request_embedding_text
 from app.agents.commodity_classifier.internal_types import _FinalCandidate, _FinalDecision, _LLMScoring, _ScoreItem
 
 logger = logging.getLogger(__name__)
 
+_DECISIONS = metrics.counter(
+    "classifier_decisions_total", "Commodity classifications by deciding stage"
+)
+_KNN_OUTCOMES = metrics.counter(
+    "classifier_knn_total", "Nearest-neighbour vote outcomes (hit = LLM skipped)"
+)
+_CANDIDATE_MODE = metrics.counter(
+    "classifier_candidates_total", "Scoring calls by candidate list mode (pruned | full)"
+)
+_CANDIDATE_COUNT = metrics.histogram(
+    "classifier_candidate_groups", "Commodity groups sent to the scoring prompt",
+    buckets=(1, 3, 5, 8, 12, 16, 24, 32, 50, 100),
+)
+_PRUNE_AUDIT = metrics.counter(
+    "classifier_prune_audit_total", "Sampled pruned-vs-full scoring comparisons by agreement"
+)
+_RERANK = metrics.counter(
+    "classifier_rerank_total", "Re-rank stage outcomes (skipped | reranked | failed | no_examples)"
+)
+_RUN_SECONDS = metrics.histogram(
+    "classifier_run_seconds", "End-to-end classifier latency by route"
+)
+
+# Neighbour labels that may vote: a manager's choice or an LLM decision. Labels
+# from the vote itself, the heuristic, the fallback or a reused duplicate would
+# let the classifier reinforce its own guesses.
+_VOTING_LABEL_SOURCES = frozenset({"manual", "scoring", "rerank"})
+
+
+@lru_cache(maxsize=1)
+def _audit_pool() -> ThreadPoolExecutor:
+    """Runs sampled pruning audits off the request path."""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="prune-audit")
+
+
+metrics.track_executor("classifier_prune_audit", lambda: _audit_pool() if _audit_pool.cache_info().currsize else None)
+
 # ---------- Small utilities ----------
 def _normalize_text(s: Optional[str]) -> str:
     if not s:
@@ -23,30 +70,90 @@ def _normalize_text(s: Optional[str]) -> str:
     return " ".join(s.strip().split())
 
 
+def _hit_similarity(hit: Dict) -> Optional[float]:
+    """Cosine similarity of a Weaviate hit (distance = 1 - cos for COSINE indexes)."""
+    distance = hit.get("distance")
+    if distance is not None:
+        return 1.0 - float(distance)
+    certainty = hit.get("certainty")
+    if certainty is not None:
+        return 2.0 * float(certainty) - 1.0
+    return None
+
+
+def _hit_group_id(hit: Dict) -> Optional[int]:
+    try:
+        return int(hit.get("commodityGroup"))
+    except (TypeError, ValueError):
+        return None
+
+
 # ---------- Implementation ----------
 class LLMCommodityClassifier(AbstractCommodityClassifier):
     """
     Minimal, deterministic flow:
-      1) Normalize inputs.
-      2) Ask LLM to return scores for provided commodity group ids.
-      3) Retrieve examples for the top 3 groups using embeddings.
-      4) Ask LLM to return scores based on this past data
+      1) Normalize inputs and embed the request once.
+      2) Optional (knn_enabled): nearest-neighbour vote over manually or
+         LLM-labelled history; if the top-k neighbours clearly agree, return
+         that group without any LLM call.
+      3) Ask LLM to return scores for the candidate groups (in "pruned" mode only
+         the groups whose label embedding is closest to the request are sent).
+      4) If the first-pass scores are decisive (large margin or high top score),
+         stop here; otherwise retrieve examples for the top 3 groups.
+      5) Ask LLM to return scores based on this past data
+    The whole run shares one time budget (timeout_seconds unless the caller
+    passes one); once it is spent, optional stages are skipped, and a scoring
+    call that can't complete raises AgentTimeout.
     """
 
     def __init__(
         self,
         ai_client: AIClient,
         *,
+        scoring_client: Optional[AIClient] = None,
         temperature: float = 0.1,
         max_output_tokens: int = 2000,
         top_n_alternatives: int = 3,
+        knn_enabled: bool = False,
+        knn_top_k: int = 5,
+        knn_min_similarity: float = 0.90,
+        knn_min_votes: int = 3,
+        knn_vote_share: float = 0.80,
+        knn_max_confidence: float = 0.95,
+        group_index: Optional[CommodityGroupEmbeddingIndex] = None,
+        candidate_mode: str = "full",
+        prune_top_k: int = 12,
+        prune_min_similarity: float = 0.20,
+        prune_audit_rate: float = 0.0,
+        rerank_skip_margin: float = 0.5,
+        rerank_skip_top_score: float = 0.9,
+        timeout_seconds: Optional[float] = None,
     ):
         self._ai = ai_client
+        # First-pass scoring may use a hedged client (latency-critical, small prompt)
+        self._scoring_ai = scoring_client or ai_client
         self._temperature = temperature
         self._max_tokens = max_output_tokens
         self._top_n_alts = top_n_alternatives
+        self._knn_enabled = knn_enabled
+        self._knn_top_k = knn_top_k
+        self._knn_min_similarity = knn_min_similarity
+        self._knn_min_votes = knn_min_votes
+        self._knn_vote_share = knn_vote_share
+        self._knn_max_confidence = knn_max_confidence
+        self._group_index = group_index
+        self._candidate_mode = candidate_mode
+        self._prune_top_k = prune_top_k
+        self._prune_min_similarity = prune_min_similarity
+        self._prune_audit_rate = prune_audit_rate
+        self._rerank_skip_margin = rerank_skip_margin
+        self._rerank_skip_top_score = rerank_skip_top_score
+        self._timeout_seconds = timeout_seconds
+
+    def run(self, inp: CommodityClassifyIn, *, budget: Optional[Budget] = None) -> CommodityClassifyOut:
+        started = time.perf_counter()
+        budget = budget or Budget(self._timeout_seconds)
 
-    def run(self, inp: CommodityClassifyIn) -> CommodityClassifyOut:
         # Guard: must have candidate groups
         if not inp.available_commodity_groups:
             raise AgentError("No valid commodity groups provided.")
@@ -60,80 +167,91 @@ class LLMCommodityClassifier(AbstractCommodityClassifier):
         groups = inp.available_commodity_groups
         groups_by_id = {g.id: g for g in groups}
 
-        # 2) Build messages (centralized in prompt_templates)
-        messages = build_scoring_messages(
+        # One embedding for the query (shared by the vote and the retrieval step)
+        query_text = build_request_embedding_text(
             title=title,
             vendor_name=vendor,
             vat_id=vat,
             order_lines_text=lines,
-            groups=groups,
         )
 
-        # 3) Structured LLM call
-        try:
-            parsed, _meta = self._ai.complete_pydantic(
-                messages=messages,
-                response_model=_LLMScoring,
-                model="gpt-4.1-2025-04-14"
+        query_vec = inp.embedding
+        if query_vec is None and not budget.expired:
+            try:
+                with stage(self.name, "embed", inp.trace_id):
+                    query_vec = self._ai.embed(query_text, timeout=budget.timeout("embed"))
+            except Exception as e:
+                logger.exception("Embedding failed; skipping retrieval: %s", e)
+                query_vec = None
+
+        # 2) Nearest-neighbour short-circuit
+        if self._knn_enabled and query_vec is not None and not budget.expired:
+            with stage(self.name, "knn", inp.trace_id):
+                vote = self._knn_vote(query_vec, groups_by_id, budget)
+            _KNN_OUTCOMES.inc(outcome="hit" if vote else "miss")
+            if vote is not None:
+                chosen_id, prob = vote
+                return self._out(inp, chosen_id, prob, "knn", route="knn", started=started)
+        else:
+            _KNN_OUTCOMES.inc(outcome="skipped")
+
+        # 3) Candidate selection (pruned by label similarity, or the full list)
+        candidates_in = self._candidate_groups(query_vec, groups, budget)
+        pruned = len(candidates_in) < len(groups)
+        _CANDIDATE_MODE.inc(mode="pruned" if pruned else "full")
+        _CANDIDATE_COUNT.observe(len(candidates_in))
+
+        # 4) Structured LLM scoring call
+        with stage(self.name, "scoring", inp.trace_id):
+            sorted_scores = self._score(title, vendor, vat, lines, candidates_in, budget)
+
+        if pruned and self._prune_audit_rate > 0 and random.random() < self._prune_audit_rate:
+            # In the background: a second full-list scoring call would double this request's latency
+            submit_in_context(
+                _audit_pool(), self._audit_pruning,
+                title, vendor, vat, lines, groups, sorted_scores[0].id, inp.trace_id,
             )
-            llm_result: _LLMScoring = parsed
-        except Exception as e:
-            # Surface a consistent agent error up the stack
-            raise AgentError(f"AI model error during scoring of commodity groups: {e}")
 
-        # Sanity: filter to known ids only, clamp scores
-        known_scores = [
-            _ScoreItem(id=s.id, score=max(0.0, min(1.0, s.score)))
-            for s in llm_result.scores
-            if s.id in groups_by_id
-        ]
-        if not known_scores:
-            raise AgentError("LLM returned no valid scores for provided commodity groups.")
+        # 5) Confidence gate: decisive first-pass scores don't need the re-rank call
+        if self._is_decisive(sorted_scores):
+            _RERANK.inc(path="skipped")
+            top = sorted_scores[0]
+            return self._out(inp, top.id, top.score, "scoring", route="rerank_skipped", started=started)
 
-        # 4) Embedding step: Use examples to get more reliable result
-        sorted_scores = sorted(known_scores, key=lambda x: x.score, reverse=True)
+        # 6) Retrieval step: Use examples to get more reliable result
         TOP_CAND = min(3, len(sorted_scores))
         top_ids: List[int] = [s.id for s in sorted_scores[:TOP_CAND]]
 
-        # One embedding for the query
-        query_text = build_request_embedding_text(
-            title=title,
-            vendor_name=vendor,
-            vat_id=vat,
-            order_lines_text=lines,
-        )
-
-        try:
-            query_vec = self._ai.embed(query_text)
-        except Exception as e:
-            logger.exception("Embedding failed; skipping retrieval: %s", e)
-            query_vec = None
-
         # Gather evidence for each top candidate
         evidence_map: Dict[int, List[str]] = {}
         all_have_examples = True
 
-        if query_vec is None:
+        if query_vec is None or budget.expired:
             all_have_examples = False
         else:
-            for gid in top_ids:
-                try:
-                    hits = wx.search_similar(
-                        vector=query_vec, 
-                        top_k=2, 
-                        commodity_group_id=str(gid)
-                    )
-                except Exception as e:
-                    logger.exception("Weaviate search failed for gid=%s: %s", gid, e)
-                    hits = []
-                examples = [
-                    h.get("embeddedRequestContext", "")
-                    for h in hits
-                    if h.get("embeddedRequestContext")
-                ]
-                evidence_map[gid] = examples
-                if len(examples) == 0:
-                    all_have_examples = False
+            with stage(self.name, "retrieve", inp.trace_id):
+                for gid in top_ids:
+                    if budget.expired:
+                        all_have_examples = False
+                        break
+                    try:
+                        hits = wx.search_similar(
+                            vector=query_vec,
+                            top_k=2,
+                            commodity_group_id=str(gid),
+                            timeout=budget.remaining(),
+                        )
+                    except Exception as e:
+                        logger.exception("Weaviate search failed for gid=%s: %s", gid, e)
+                        hits = []
+                    examples = [
+                        h.get("embeddedRequestContext", "")
+                        for h in hits
+                        if h.get("embeddedRequestContext")
+                    ]
+                    evidence_map[gid] = examples
+                    if len(examples) == 0:
+                        all_have_examples = False
 
         # If ANY of the top candidates lacks examples, skip the retrieval re-rank completely
         if not all_have_examples:
@@ -148,36 +266,214 @@ class LLMCommodityClassifier(AbstractCommodityClassifier):
                     id=gid,
                     label=g.label,
                     category=g.category,
+                    prior_score=next(s.score for s in sorted_scores if s.id == gid),
                     examples=evidence_map.get(gid, [])[:2],
                 ))
 
             messages = build_rerank_messages(title, vendor, vat, lines, candidates)
+            route = "reranked"
 
             try:
-                final_decision, _meta = self._ai.complete_pydantic(
-                    messages=messages,
-                    response_model=_FinalDecision,
-                    model="gpt-4.1-2025-04-14"
-                )
+                with stage(self.name, "rerank", inp.trace_id):
+                    final_decision, _meta = self._ai.complete_pydantic(
+                        messages=messages,
+                        response_model=_FinalDecision,
+                        model="gpt-4.1-2025-04-14",
+                        timeout=budget.timeout("rerank"),
+                    )
+                _RERANK.inc(path="reranked")
                 llm_decision: _FinalDecision = final_decision
                 chosen_id = llm_decision.chosen_id
                 prob = llm_decision.probability
+                path = "rerank"
                 # Safety: if the model picked an id that isn't in our top_ids, fall back
                 if chosen_id not in {c.id for c in candidates}:
                     chosen_id = top_ids[0]
                     prob = next(s.score for s in sorted_scores if s.id == chosen_id)
+                    path = "scoring"
             except Exception as e:
                 logger.exception("Re-rank failed; falling back to first-pass: %s", e)
+                _RERANK.inc(path="failed")
+                route = "rerank_failed"
                 chosen_id = top_ids[0]
                 prob = next(s.score for s in sorted_scores if s.id == chosen_id)
+                path = "scoring"
         else:
             # No retrieval step: first-pass winner
+            _RERANK.inc(path="no_examples")
+            route = "no_examples"
             chosen_id = top_ids[0]
             prob = next(s.score for s in sorted_scores if s.id == chosen_id)
+            path = "scoring"
+
+        return self._out(inp, chosen_id, prob, path, route=route, started=started)
+
+    def _is_decisive(self, sorted_scores: List[_ScoreItem]) -> bool:
+        """First pass is decisive if the top score, or its margin over the runner-up, passes a threshold."""
+        top = sorted_scores[0].score
+        runner_up = sorted_scores[1].score if len(sorted_scores) > 1 else 0.0
+        return top >= self._rerank_skip_top_score or (top - runner_up) >= self._rerank_skip_margin
+
+    def _score(
+        self,
+        title: str,
+        vendor: str,
+        vat: str,
+        lines: List[str],
+        groups: List[CommodityGroupRef],
+        budget: Budget,
+    ) -> List[_ScoreItem]:
+        """Score the given groups with the LLM; returns known ids, clamped, best first."""
+        # Build messages (centralized in prompt_templates)
+        messages = build_scoring_messages(
+            title=title,
+            vendor_name=vendor,
+            vat_id=vat,
+            order_lines_text=lines,
+            groups=groups,
+        )
 
+        timeout = budget.timeout("scoring")
+        try:
+            parsed, _meta = self._scoring_ai.complete_pydantic(
+                messages=messages,
+                response_model=_LLMScoring,
+                model="gpt-4.1-2025-04-14",
+                timeout=timeout,
+            )
+            llm_result: _LLMScoring = parsed
+        except Exception as e:
+            if budget.expired:
+                raise AgentTimeout(f"Scoring of commodity groups timed out: {e}")
+            # Surface a consistent agent error up the stack
+            raise AgentError(f"AI model error during scoring of commodity groups: {e}")
+
+        # Sanity: filter to known ids only, clamp scores
+        group_ids = {g.id for g in groups}
+        known_scores = [
+            _ScoreItem(id=s.id, score=max(0.0, min(1.0, s.score)))
+            for s in llm_result.scores
+            if s.id in group_ids
+        ]
+        if not known_scores:
+            raise AgentError("LLM returned no valid scores for provided commodity groups.")
+        return sorted(known_scores, key=lambda x: x.score, reverse=True)
+
+    def _candidate_groups(
+        self,
+        query_vec: Optional[List[float]],
+        groups: List[CommodityGroupRef],
+        budget: Budget,
+    ) -> List[CommodityGroupRef]:
+        """
+        In "pruned" mode, keep the prune_top_k groups closest to the request.
+        Safety floor: if even the best group is less similar than
+        prune_min_similarity (unusual request, uninformative embedding) or the
+        index is unavailable, fall back to the full list. Embedding groups
+        missing from the index counts against the run's budget.
+        """
+        if (
+            self._candidate_mode != "pruned"
+            or self._group_index is None
+            or query_vec is None
+            or len(groups) <= self._prune_top_k
+            or budget.expired
+        ):
+            return groups
+        try:
+            ranked = self._group_index.rank(query_vec, groups, timeout=budget.remaining())
+        except Exception as e:
+            logger.exception("Commodity group ranking failed; scoring full list: %s", e)
+            return groups
+        if not ranked or ranked[0][1] < self._prune_min_similarity:
+            return groups
+        return [g for g, _sim in ranked[: self._prune_top_k]]
+
+    def _audit_pruning(
+        self,
+        title: str,
+        vendor: str,
+        vat: str,
+        lines: List[str],
+        groups: List[CommodityGroupRef],
+        pruned_top_id: int,
+        trace_id: Optional[str],
+    ) -> None:
+        """Re-score a sample against the full list to measure pruning accuracy (runs on _audit_pool)."""
+        try:
+            with stage(self.name, "prune_audit", trace_id):
+                full_top_id = self._score(title, vendor, vat, lines, groups, Budget(self._timeout_seconds))[0].id
+        except Exception as e:
+            logger.warning("Full-list audit scoring failed: %s", e)
+            return
+        agree = full_top_id == pruned_top_id
+        _PRUNE_AUDIT.inc(agree=str(agree).lower())
+        if not agree:
+            logger.info("Pruned scoring picked CG %s, full list picked CG %s", pruned_top_id, full_top_id)
+
+    def _out(
+        self,
+        inp: CommodityClassifyIn,
+        chosen_id: int,
+        prob: float,
+        path: str,
+        *,
+        route: str,
+        started: float,
+    ) -> CommodityClassifyOut:
+        _DECISIONS.inc(path=path)
+        _RUN_SECONDS.observe(time.perf_counter() - started, route=route)
         return CommodityClassifyOut(
             suggested_commodity_group_id=chosen_id,
             confidence=prob,
+            decision_path=path,
             trace_id=inp.trace_id,
             contract_version=CONTRACT_VERSION,
-        )
\ No newline at end of file
+        )
+
+    def _knn_vote(
+        self, query_vec: List[float], groups_by_id: Dict, budget: Budget
+    ) -> Optional[Tuple[int, float]]:
+        """
+        Similarity-weighted vote among the nearest labelled requests (all groups).
+        Only labels from a manager or an LLM stage count (_VOTING_LABEL_SOURCES);
+        objects indexed without a label source don't vote.
+        Returns (group_id, confidence) when enough close neighbours agree, else None.
+
+        Confidence = winner's weighted vote share x mean similarity of its voters,
+        capped at knn_max_confidence. It is a heuristic agreement score, not a
+        calibrated probability, and not on the scale of the LLM's confidence.
+        """
+        try:
+            hits = wx.search_similar(vector=query_vec, top_k=self._knn_top_k, timeout=budget.remaining())
+        except Exception as e:
+            logger.exception("Weaviate neighbour search failed; skipping vote: %s", e)
+            return None
+
+        weights: Dict[int, float] = defaultdict(float)
+        votes: Dict[int, int] = defaultdict(int)
+        for h in hits:
+            sim = _hit_similarity(h)
+            gid = _hit_group_id(h)
+            if sim is None or gid not in groups_by_id or sim < self._knn_min_similarity:
+                continue
+            if h.get("labelSource") not in _VOTING_LABEL_SOURCES:
+                continue
+            weights[gid] += sim
+            votes[gid] += 1
+
+        if not weights:
+            return None
+
+        winner = max(weights, key=weights.get)
+        share = weights[winner] / sum(weights.values())
+        if votes[winner] < self._knn_min_votes or share < self._knn_vote_share:
+            return None
+
+        mean_sim = weights[winner] / votes[winner]
+        confidence = min(self._knn_max_confidence, max(0.0, share * mean_sim))
+        logger.info(
+            "Neighbour vote picked CG %s (votes=%d, share=%.2f, mean_sim=%.3f)",
+            winner, votes[winner], share, mean_sim,
+        )
+        return winner, confidence
\ No newline at end of file
@@ -23,6 +23,8 @@ class CommodityClassifyIn(BaseModel):
     vat_id: Optional[str] = None
     order_lines_text: List[str] = Field(default_factory=list)
     available_commodity_groups: List[CommodityGroupRef] = Field(default_factory=list)
+    # Optional precomputed embedding of the request text (saves the agent's own embed call)
+    embedding: Optional[List[float]] = None
     # Trace & versioning
     trace_id: Optional[str] = None
     contract_version: str = CONTRACT_VERSION
@@ -33,8 +35,10 @@ class CommodityClassifyOut(BaseModel):
     Output of the classifier.
     - suggested_commodity_group_id may be None if the agent abstains.
     - confidence is 0..1 for the chosen CG.
+    - decision_path names the stage that made the choice (knn | scoring | rerank).
     """
     suggested_commodity_group_id: Optional[int]
     confidence: float = Field(ge=0.0, le=1.0, default=0.0)
+    decision_path: Optional[str] = None
     trace_id: Optional[str] = None
     contract_version: str = CONTRACT_VERSION
\ No newline at end of file
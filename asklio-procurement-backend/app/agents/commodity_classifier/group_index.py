@@ -0,0 +1,76 @@
+from __future__ import annotations
+import logging
+import math
+import threading
+from operator import mul
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.ai.base import AIClient
+from .contracts import CommodityGroupRef
+
+logger = logging.getLogger(__name__)
+
+
+def _group_text(g: CommodityGroupRef) -> str:
+    """Same 'Category — Label' rendering the scoring prompt uses."""
+    return f"{g.category or ''} — {g.label}".strip(" —")
+
+
+def _unit(vec: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+    return [x / norm for x in vec]
+
+
+class CommodityGroupEmbeddingIndex:
+    """
+    Cache of commodity-group embeddings for candidate pruning.
+    - Vectors are stored unit-normalized, so ranking is a plain dot product.
+    - Entries are keyed by id and re-embedded whenever a group's rendered text
+      changes, so catalog edits are picked up on the next refresh/rank call.
+    """
+
+    def __init__(self, ai_client: AIClient):
+        self._ai = ai_client
+        self._entries: Dict[int, Tuple[str, List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def refresh(self, groups: Sequence[CommodityGroupRef], *, timeout: Optional[float] = None) -> int:
+        """Embed new or changed groups in one batch call (client `timeout` in seconds). Returns #embedded."""
+        with self._lock:
+            stale = [
+                g for g in groups
+                if self._entries.get(g.id, (None,))[0] != _group_text(g)
+            ]
+        if not stale:
+            return 0
+
+        texts = [_group_text(g) for g in stale]
+        vectors = self._ai.embed_batch(texts, timeout=timeout)
+        with self._lock:
+            for g, text, vec in zip(stale, texts, vectors):
+                self._entries[g.id] = (text, _unit(vec))
+        logger.info("Embedded %d commodity groups for candidate pruning.", len(stale))
+        return len(stale)
+
+    def rank(
+        self,
+        query_vec: Sequence[float],
+        groups: Sequence[CommodityGroupRef],
+        *,
+        timeout: Optional[float] = None,
+    ) -> List[Tuple[CommodityGroupRef, float]]:
+        """
+        Return groups ordered by cosine similarity to the request embedding.
+        Groups not embedded yet are embedded first, bounded by `timeout`.
+        """
+        self.refresh(groups, timeout=timeout)
+        q = _unit(query_vec)
+        with self._lock:
+            entries = dict(self._entries)
+        scored = [
+            (g, sum(map(mul, q, entries[g.id][1])))
+            for g in groups
+            if g.id in entries
+        ]
+        scored.sort(key=lambda t: t[1], reverse=True)
+        return scored
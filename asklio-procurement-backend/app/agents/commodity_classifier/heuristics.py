@@ -0,0 +1,40 @@
+from __future__ import annotations
+import re
+from typing import Iterable, List, Optional, Set, Tuple
+
+from .contracts import CommodityGroupRef
+
+_TOKEN = re.compile(r"[a-z0-9äöüß]+")
+_PREFIX = 6  # crude stemming: "licenses"/"license", "marketing"/"market"
+_MAX_CONFIDENCE = 0.5  # provisional guesses never look confident in the UI
+
+
+def _tokens(text: str) -> Set[str]:
+    return {t[:_PREFIX] for t in _TOKEN.findall(text.lower()) if len(t) > 2}
+
+
+def guess_commodity_group(
+    *,
+    title: str,
+    vendor_name: str,
+    order_lines_text: Iterable[str],
+    groups: List[CommodityGroupRef],
+) -> Tuple[Optional[int], float]:
+    """
+    Cheap, local provisional classification (no AI calls): the group whose
+    label/category tokens overlap most with the request text.
+    Returns (group id, confidence); falls back to the first group with 0.0.
+    """
+    if not groups:
+        return None, 0.0
+
+    request_tokens = _tokens(" ".join([title or "", vendor_name or "", *order_lines_text]))
+    best_id, best_score = groups[0].id, 0.0
+    for g in groups:
+        group_tokens = _tokens(f"{g.category or ''} {g.label}")
+        if not group_tokens:
+            continue
+        score = len(request_tokens & group_tokens) / len(group_tokens)
+        if score > best_score:
+            best_id, best_score = g.id, score
+    return best_id, round(best_score * _MAX_CONFIDENCE, 3)
@@ -15,6 +15,7 @@ class _FinalCandidate(BaseModel):
     id: int
     label: str
     category: Optional[str]
+    prior_score: float = 0.0  # first-pass score, shown to the re-rank prompt
     examples: List[str] = Field(default_factory=list)
 
 class _FinalDecision(BaseModel):
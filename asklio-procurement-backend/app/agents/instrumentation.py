@@ -0,0 +1,236 @@
+"""
+Per-stage accounting for agent runs: tokens, cost, wall time and outcome.
+
+Agents wrap each step in `stage(agent, name, trace_id)`. Any AI call made
+inside the block (in this thread or a context-propagating executor) reports
+its `usage` via `record_usage`, so embeddings are attributed too even though
+`embed()` returns no metadata.
+
+Results go to three places:
+- cumulative metrics (counters/histograms in app.core.metrics),
+- per-(agent, stage, model) stats with a rolling latency window,
+- a bounded per-trace log for looking up a single request by trace_id.
+"""
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from app.agents.base import AgentTimeout
+from app.core import metrics, tracing
+
+_STAGE_SECONDS = metrics.histogram("agent_stage_seconds", "Agent stage wall time by agent, stage and outcome")
+_STAGE_CALLS = metrics.counter("agent_stage_total", "Agent stage executions by agent, stage and outcome")
+_TOKENS = metrics.counter("agent_tokens_total", "AI tokens by agent, stage, model and kind (input | output | cached)")
+_COST = metrics.counter("agent_cost_usd_total", "Estimated AI spend in USD by agent, stage and model")
+
+# USD per 1M tokens: (input, cached input, output). Matched by model-name prefix.
+_PRICES_PER_MTOK: Tuple[Tuple[str, Tuple[float, float, float]], ...] = (
+    ("gpt-4.1-mini", (0.40, 0.10, 1.60)),
+    ("gpt-4.1", (2.00, 0.50, 8.00)),
+    ("gpt-5-mini", (0.25, 0.025, 2.00)),
+    ("gpt-5", (1.25, 0.125, 10.00)),
+    ("text-embedding-3-large", (0.13, 0.13, 0.0)),
+    ("text-embedding-3-small", (0.02, 0.02, 0.0)),
+)
+
+_MAX_TRACES = 1000
+_LATENCY_WINDOW = 500
+
+
+def estimate_cost_usd(model: str, input_tokens: int, output_tokens: int, cached_tokens: int = 0) -> float:
+    for prefix, (p_in, p_cached, p_out) in _PRICES_PER_MTOK:
+        if model.startswith(prefix):
+            uncached = max(0, input_tokens - cached_tokens)
+            return (uncached * p_in + cached_tokens * p_cached + output_tokens * p_out) / 1_000_000
+    return 0.0
+
+
+@dataclass
+class StageRecord:
+    trace_id: str
+    agent: str
+    stage: str
+    started_at: float  # epoch seconds
+    model: Optional[str] = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    cost_usd: float = 0.0
+    ai_calls: int = 0
+    seconds: float = 0.0
+    outcome: str = "ok"  # ok | error | timeout | skipped
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class _StageStats:
+    calls: int = 0
+    outcomes: Dict[str, int] = field(default_factory=dict)
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    cost_usd: float = 0.0
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=_LATENCY_WINDOW))
+
+
+_current: contextvars.ContextVar[Optional[StageRecord]] = contextvars.ContextVar("agent_stage", default=None)
+_usage_sink: contextvars.ContextVar[Optional[List[Tuple[str, Dict[str, Any]]]]] = contextvars.ContextVar(
+    "agent_usage_sink", default=None
+)
+_lock = threading.Lock()
+_traces: "OrderedDict[str, List[StageRecord]]" = OrderedDict()
+_stats: Dict[Tuple[str, str, str], _StageStats] = {}
+
+
+def _usage_value(usage: Any, *names: str) -> int:
+    for name in names:
+        value = usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+        if value is not None:
+            return int(value)
+    return 0
+
+
+def record_usage(model: str, usage: Any) -> None:
+    """Attribute one AI call's usage to the current stage (no-op outside a stage)."""
+    record = _current.get()
+    sink = _usage_sink.get()
+    if usage is None or (record is None and sink is None):
+        return
+    input_tokens = _usage_value(usage, "input_tokens", "prompt_tokens")
+    output_tokens = _usage_value(usage, "output_tokens", "completion_tokens")
+    details = usage.get("input_tokens_details") if isinstance(usage, dict) else getattr(usage, "input_tokens_details", None)
+    cached_tokens = _usage_value(details, "cached_tokens") if details is not None else 0
+    if sink is not None:
+        sink.append((model, {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "input_tokens_details": {"cached_tokens": cached_tokens},
+        }))
+    if record is None:
+        return
+    cost = estimate_cost_usd(model, input_tokens, output_tokens, cached_tokens)
+
+    with _lock:
+        record.model = record.model or model
+        record.input_tokens += input_tokens
+        record.output_tokens += output_tokens
+        record.cached_tokens += cached_tokens
+        record.cost_usd += cost
+        record.ai_calls += 1
+
+    labels = {"agent": record.agent, "stage": record.stage, "model": model}
+    _TOKENS.inc(input_tokens, kind="input", **labels)
+    _TOKENS.inc(output_tokens, kind="output", **labels)
+    _TOKENS.inc(cached_tokens, kind="cached", **labels)
+    _COST.inc(cost, **labels)
+
+
+@contextmanager
+def capture_usage() -> Iterator[List[Tuple[str, Dict[str, Any]]]]:
+    """Collect (model, usage) of every AI call made in this context, e.g. to record them."""
+    sink: List[Tuple[str, Dict[str, Any]]] = []
+    token = _usage_sink.set(sink)
+    try:
+        yield sink
+    finally:
+        _usage_sink.reset(token)
+
+
+@contextmanager
+def stage(agent: str, name: str, trace_id: Optional[str]) -> Iterator[StageRecord]:
+    """
+    Time one agent stage and collect the usage of AI calls made inside it.
+    Exceptions propagate; their outcome is recorded as error/timeout. Set
+    `record.outcome = "skipped"` for stages that decided not to call out.
+    """
+    record = StageRecord(trace_id=trace_id or "-", agent=agent, stage=name, started_at=time.time())
+    token = _current.set(record)
+    started = time.perf_counter()
+    with tracing.span(f"agent.{agent}.{name}", **{"agent.trace_id": trace_id}) as sp:
+        try:
+            yield record
+        except AgentTimeout:
+            record.outcome = "timeout"
+            raise
+        except BaseException:
+            record.outcome = "error"
+            raise
+        finally:
+            _current.reset(token)
+            record.seconds = time.perf_counter() - started
+            _finish(record)
+            sp.set_attribute("agent.outcome", record.outcome)
+            sp.set_attribute("ai.model", record.model)
+            sp.set_attribute("ai.input_tokens", record.input_tokens)
+            sp.set_attribute("ai.output_tokens", record.output_tokens)
+            sp.set_attribute("ai.cost_usd", round(record.cost_usd, 6))
+
+
+def _finish(record: StageRecord) -> None:
+    _STAGE_SECONDS.observe(record.seconds, agent=record.agent, stage=record.stage, outcome=record.outcome)
+    _STAGE_CALLS.inc(agent=record.agent, stage=record.stage, outcome=record.outcome)
+    key = (record.agent, record.stage, record.model or "-")
+    with _lock:
+        stats = _stats.setdefault(key, _StageStats())
+        stats.calls += 1
+        stats.outcomes[record.outcome] = stats.outcomes.get(record.outcome, 0) + 1
+        stats.input_tokens += record.input_tokens
+        stats.output_tokens += record.output_tokens
+        stats.cached_tokens += record.cached_tokens
+        stats.cost_usd += record.cost_usd
+        stats.latencies.append(record.seconds)
+
+        if record.trace_id != "-":
+            _traces.setdefault(record.trace_id, []).append(record)
+            _traces.move_to_end(record.trace_id)
+            while len(_traces) > _MAX_TRACES:
+                _traces.popitem(last=False)
+
+
+# ---------- Queries (ops endpoint) ----------
+def _quantile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def stage_summary() -> List[Dict[str, Any]]:
+    """Aggregates per (agent, stage, model) since process start; latency quantiles over recent runs."""
+    with _lock:
+        items = [(key, stats, sorted(stats.latencies)) for key, stats in _stats.items()]
+    out = []
+    for (agent, stage_name, model), stats, ordered in sorted(items, key=lambda i: i[0]):
+        out.append({
+            "agent": agent,
+            "stage": stage_name,
+            "model": None if model == "-" else model,
+            "calls": stats.calls,
+            "outcomes": dict(stats.outcomes),
+            "inputTokens": stats.input_tokens,
+            "outputTokens": stats.output_tokens,
+            "cachedTokens": stats.cached_tokens,
+            "costUsd": round(stats.cost_usd, 6),
+            "latencyP50Seconds": round(_quantile(ordered, 0.50), 4),
+            "latencyP95Seconds": round(_quantile(ordered, 0.95), 4),
+        })
+    return out
+
+
+def trace_records(trace_id: str) -> List[Dict[str, Any]]:
+    with _lock:
+        return [r.to_dict() for r in _traces.get(trace_id, [])]
+
+
+def reset() -> None:
+    """Clear aggregates and traces (tests, ops)."""
+    with _lock:
+        _traces.clear()
+        _stats.clear()
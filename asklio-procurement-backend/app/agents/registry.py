@@ -1,8 +1,10 @@
 from dataclasses import dataclass
 from functools import lru_cache
-from app.ai.client import get_ai_client
+from app.ai.client import get_ai_client, get_scoring_ai_client
+from app.core.config import settings
 from app.agents.pdf_extractor.pdf_extractor import PDFTextExtractor
 from app.agents.commodity_classifier.commodity_classifier import LLMCommodityClassifier
+from app.agents.commodity_classifier.group_index import CommodityGroupEmbeddingIndex
 from app.agents.pdf_extractor.pdf_extractor import AbstractPDFExtractor
 from app.agents.commodity_classifier.interface import AbstractCommodityClassifier
 
@@ -10,10 +12,33 @@ from app.agents.commodity_classifier.interface import AbstractCommodityClassifie
 class AgentRegistry:
     commodity_classifier: AbstractCommodityClassifier
     pdf_extractor: AbstractPDFExtractor
+    commodity_group_index: CommodityGroupEmbeddingIndex
 
 @lru_cache(maxsize=1)
 def get_agent_registry() -> AgentRegistry:
+    group_index = CommodityGroupEmbeddingIndex(get_ai_client())
     return AgentRegistry(
-        commodity_classifier=LLMCommodityClassifier(ai_client=get_ai_client()),
-        pdf_extractor=PDFTextExtractor(ai_client=get_ai_client())
+        commodity_classifier=LLMCommodityClassifier(
+            ai_client=get_ai_client(),
+            scoring_client=get_scoring_ai_client(),
+            knn_enabled=settings.CLASSIFIER_KNN_ENABLED,
+            knn_top_k=settings.CLASSIFIER_KNN_TOP_K,
+            knn_min_similarity=settings.CLASSIFIER_KNN_MIN_SIMILARITY,
+            knn_min_votes=settings.CLASSIFIER_KNN_MIN_VOTES,
+            knn_vote_share=settings.CLASSIFIER_KNN_VOTE_SHARE,
+            knn_max_confidence=settings.CLASSIFIER_KNN_MAX_CONFIDENCE,
+            group_index=group_index,
+            candidate_mode=settings.CLASSIFIER_CANDIDATE_MODE,
+            prune_top_k=settings.CLASSIFIER_PRUNE_TOP_K,
+            prune_min_similarity=settings.CLASSIFIER_PRUNE_MIN_SIMILARITY,
+            prune_audit_rate=settings.CLASSIFIER_PRUNE_AUDIT_RATE,
+            rerank_skip_margin=settings.CLASSIFIER_RERANK_SKIP_MARGIN,
+            rerank_skip_top_score=settings.CLASSIFIER_RERANK_SKIP_TOP_SCORE,
+            timeout_seconds=settings.CLASSIFIER_TIMEOUT_SECONDS,
+        ),
+        pdf_extractor=PDFTextExtractor(
+            ai_client=get_ai_client(),
+            timeout_seconds=settings.PDF_EXTRACTION_TIMEOUT_SECONDS,
+        ),
+        commodity_group_index=group_index,
     )
\ No newline at end of file
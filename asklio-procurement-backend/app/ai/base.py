@@ -3,6 +3,10 @@ from typing import Any, Dict, Iterable, List, Tuple, Protocol, Type
 from pydantic import BaseModel
 
 class AIClient(Protocol):
+    """
+    `timeout` (seconds) bounds a single call; None means the client default.
+    Agents pass the remaining time of their Budget here.
+    """
     def complete_text(
         self,
         messages: List[Dict[str, Any]],
@@ -10,6 +14,7 @@ class AIClient(Protocol):
         temperature: float | None = None,
         max_output_tokens: int | None = None,
         model: str | None = None,
+        timeout: float | None = None,
     ) -> Tuple[str, Dict[str, Any]]:
         ...
 
@@ -21,8 +26,9 @@ class AIClient(Protocol):
         temperature: float | None = None,
         max_output_tokens: int | None = None,
         model: str | None = None,
+        timeout: float | None = None,
     ) -> Tuple[BaseModel, Dict[str, Any]]:
         ...
 
-    def embed(self, text: str) -> List[float]: ...
-    def embed_batch(self, texts: Iterable[str]) -> List[List[float]]: ...
\ No newline at end of file
+    def embed(self, text: str, *, timeout: float | None = None) -> List[float]: ...
+    def embed_batch(self, texts: Iterable[str], *, timeout: float | None = None) -> List[List[float]]: ...
\ No newline at end of file
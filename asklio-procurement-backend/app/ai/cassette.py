@@ -0,0 +1,289 @@
+"""
+Record/replay wrapper around an AIClient ("cassette").
+
+- record: every call goes to the wrapped client; request, response, usage
+  and latency are appended to the cassette file (the file starts empty).
+- replay: calls are served from the cassette, no client and no network
+  needed. A call that was never recorded raises CassetteMiss.
+- auto:   replay what is recorded, record the rest.
+
+Calls are keyed by a hash of the operation, model, call parameters,
+response model and the normalized messages (whitespace collapsed, inline
+file payloads replaced by their digest), so cosmetic prompt whitespace does
+not invalidate a cassette but any wording change does. Identical calls
+recorded several times are replayed in recording order.
+
+The file is JSON Lines, one call per line, gzip-compressed if the path ends
+in ".gz"; embeddings are stored as base64 float32. Recorded token usage is
+re-reported on replay so agent traces and cost metrics look the same, and
+with `replay_latency` the recorded latency is slept (honouring `timeout`).
+"""
+from __future__ import annotations
+
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from array import array
+from typing import IO, Any, Callable, Dict, Iterable, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from app.agents.instrumentation import capture_usage, record_usage
+from app.ai.base import AIClient
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_MODES = ("record", "replay", "auto")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class CassetteMiss(LookupError):
+    """Replay found no recording for a call."""
+
+
+# ---------- Normalization ----------
+def _digest(data: str) -> str:
+    return "sha256:" + hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def _normalize(value: Any, key: Optional[str] = None) -> Any:
+    if isinstance(value, dict):
+        return {k: _normalize(v, k) for k, v in sorted(value.items())}
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    if isinstance(value, str):
+        if key in ("file_data", "image_url") or len(value) > 100_000:
+            return _digest(value)
+        return _WHITESPACE.sub(" ", value).strip()
+    return value
+
+
+def request_key(op: str, payload: Dict[str, Any]) -> str:
+    blob = json.dumps({"op": op, **payload}, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:32]
+
+
+def _encode_vector(vector: List[float]) -> str:
+    return base64.b64encode(array("f", vector).tobytes()).decode("ascii")
+
+
+def _decode_vector(data: str) -> List[float]:
+    return array("f", base64.b64decode(data)).tolist()
+
+
+def _jsonable_meta(meta: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in meta.items() if k != "usage" and isinstance(v, (str, int, float, bool, type(None)))}
+
+
+# ---------- Storage ----------
+class Cassette:
+    """Append-only call log, indexed by request key."""
+
+    def __init__(self, path: str, *, truncate: bool = False) -> None:
+        self.path = path
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._fh: Optional[IO[str]] = None
+        if truncate:
+            self._open("w")
+        elif os.path.exists(path):
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            with self._reader() as fh:
+                for line in fh:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry["key"], []).append(entry)
+        except (EOFError, json.JSONDecodeError) as e:
+            # A recorder killed mid-write leaves a truncated tail; keep what is complete
+            logger.warning("Cassette %s has a truncated tail (%s); using %d calls", self.path, e, len(self))
+
+    def _reader(self) -> IO[str]:
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, "rt", encoding="utf-8")
+        return open(self.path, "r", encoding="utf-8")
+
+    def _open(self, mode: str) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self.path.endswith(".gz"):
+            self._fh = gzip.open(self.path, mode + "t", encoding="utf-8")
+        else:
+            self._fh = open(self.path, mode, encoding="utf-8")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(v) for v in self._entries.values())
+
+    def next(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                return None
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+            return entries[index % len(entries)]
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._entries.setdefault(entry["key"], []).append(entry)
+            if self._fh is None:
+                self._open("a")
+            self._fh.write(line + "\n")
+            self._fh.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+
+# ---------- Client ----------
+class CassetteAIClient(AIClient):
+    def __init__(
+        self,
+        inner: Optional[AIClient],
+        cassette: Cassette,
+        *,
+        mode: str = "replay",
+        replay_latency: bool = False,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if inner is None and mode != "replay":
+            raise ValueError(f"Cassette mode '{mode}' needs a client to record from.")
+        self.inner = inner
+        self.cassette = cassette
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self._sleep = sleep
+
+    # ----- core -----
+    def _call(
+        self,
+        op: str,
+        payload: Dict[str, Any],
+        live: Callable[[], Any],
+        encode: Callable[[Any], Dict[str, Any]],
+        timeout: Optional[float],
+    ) -> Tuple[Dict[str, Any], Optional[Any]]:
+        """Recorded entry for the call, plus the live result when it was just recorded."""
+        key = request_key(op, payload)
+        if self.mode != "record":
+            entry = self.cassette.next(key)
+            if entry is not None:
+                self._replay_effects(entry, timeout)
+                return entry, None
+            if self.mode == "replay":
+                raise CassetteMiss(
+                    f"No recording for {op} (key {key}) in {self.cassette.path}; "
+                    "record it with AI_CASSETTE_MODE=auto or record."
+                )
+
+        started = time.perf_counter()
+        with capture_usage() as usage:
+            result = live()
+        entry = {
+            "key": key,
+            "op": op,
+            "request": payload,
+            **encode(result),
+            "usage": [{"model": m, "usage": u} for m, u in usage],
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        self.cassette.append(entry)
+        return entry, result
+
+    def _replay_effects(self, entry: Dict[str, Any], timeout: Optional[float]) -> None:
+        if self.replay_latency:
+            seconds = entry.get("latency_ms", 0.0) / 1000
+            if timeout is not None and seconds > timeout:
+                self._sleep(timeout)
+                raise TimeoutError(f"recorded {entry['op']} took {seconds:.2f}s (timeout {timeout:.2f}s)")
+            self._sleep(seconds)
+        for u in entry.get("usage", ()):
+            record_usage(u["model"], u["usage"])
+
+    # ----- AIClient -----
+    def complete_text(
+        self,
+        messages: List[Dict[str, Any]],
+        *,
+        temperature: float | None = None,
+        max_output_tokens: int | None = None,
+        model: str | None = None,
+        timeout: float | None = None,
+    ) -> Tuple[str, Dict[str, Any]]:
+        payload = {
+            "model": model, "temperature": temperature, "max_output_tokens": max_output_tokens,
+            "messages": _normalize(messages),
+        }
+        entry, live = self._call(
+            "complete_text",
+            payload,
+            lambda: self.inner.complete_text(
+                messages, temperature=temperature, max_output_tokens=max_output_tokens, model=model, timeout=timeout
+            ),
+            lambda r: {"response": r[0], "meta": _jsonable_meta(r[1])},
+            timeout,
+        )
+        return live if live is not None else (entry["response"], dict(entry["meta"]))
+
+    def complete_pydantic(
+        self,
+        messages: List[Dict[str, Any]],
+        *,
+        response_model: Type[BaseModel],
+        temperature: float | None = None,
+        max_output_tokens: int | None = None,
+        model: str | None = None,
+        timeout: float | None = None,
+    ) -> Tuple[BaseModel, Dict[str, Any]]:
+        payload = {
+            "model": model, "temperature": temperature, "max_output_tokens": max_output_tokens,
+            "response_model": response_model.__name__, "messages": _normalize(messages),
+        }
+        entry, live = self._call(
+            "complete_pydantic",
+            payload,
+            lambda: self.inner.complete_pydantic(
+                messages, response_model=response_model, temperature=temperature,
+                max_output_tokens=max_output_tokens, model=model, timeout=timeout,
+            ),
+            lambda r: {"response": r[0].model_dump(mode="json"), "meta": _jsonable_meta(r[1])},
+            timeout,
+        )
+        if live is not None:
+            return live
+        return response_model.model_validate(entry["response"]), dict(entry["meta"])
+
+    def embed(self, text: str, *, timeout: float | None = None) -> List[float]:
+        return self.embed_batch([text], timeout=timeout)[0]
+
+    def embed_batch(self, texts: Iterable[str], *, timeout: float | None = None) -> List[List[float]]:
+        texts_list = list(texts)
+        if not texts_list:
+            return []
+        # Keyed as a whole batch: the same texts embedded one by one are different calls
+        payload = {"texts": [_normalize(t) for t in texts_list]}
+        entry, live = self._call(
+            "embed",
+            payload,
+            lambda: self.inner.embed_batch(texts_list, timeout=timeout),
+            lambda r: {"response": [_encode_vector(v) for v in r]},
+            timeout,
+        )
+        return live if live is not None else [_decode_vector(v) for v in entry["response"]]
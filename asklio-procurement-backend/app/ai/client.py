@@ -2,12 +2,33 @@ from functools import lru_cache
 from app.core.config import settings
 from app.ai.open_ai import OpenAIClient
 from app.ai.base import AIClient
+from app.ai.cassette import Cassette, CassetteAIClient
+from app.ai.fake import FakeAIClient, LatencyModel
+from app.ai.rate_limit import RateLimiter
+from app.ai.resilient import CircuitBreaker, ResilientAIClient
 
 DEFAULT_GEN_MODEL = "gpt-5-2025-08-07"
 DEFAULT_EMBED_MODEL = "text-embedding-3-large"
 
-@lru_cache(maxsize=1)
-def get_ai_client() -> AIClient:
+
+def _fake_provider() -> AIClient:
+    def latency(median_ms: float, seed: int) -> LatencyModel:
+        return LatencyModel(
+            median_ms,
+            distribution=settings.FAKE_AI_LATENCY_DISTRIBUTION,
+            sigma=settings.FAKE_AI_LATENCY_SIGMA,
+            seed=seed,
+        )
+
+    return FakeAIClient(
+        embed_latency=latency(settings.FAKE_AI_EMBED_LATENCY_MS, 1),
+        completion_latency=latency(settings.FAKE_AI_COMPLETION_LATENCY_MS, 2),
+        embedding_dims=settings.FAKE_AI_EMBEDDING_DIMS,
+        error_rate=settings.FAKE_AI_ERROR_RATE,
+    )
+
+
+def _openai_provider() -> AIClient:
     api_key = settings.OPENAI_API_KEY or ""
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY is not set")
@@ -17,4 +38,58 @@ def get_ai_client() -> AIClient:
         embed_model=DEFAULT_EMBED_MODEL,
         default_temperature=0.2,
         default_max_output_tokens=800,
-    )
\ No newline at end of file
+        default_timeout=settings.AI_REQUEST_TIMEOUT_SECONDS,
+        max_retries=0,  # retries are owned by the resilience layer
+        rate_limiter=RateLimiter(
+            default_rpm=settings.AI_RATE_LIMIT_DEFAULT_RPM,
+            default_tpm=settings.AI_RATE_LIMIT_DEFAULT_TPM,
+            max_wait=settings.AI_RATE_LIMIT_MAX_WAIT_SECONDS,
+            max_queue=settings.AI_RATE_LIMIT_MAX_QUEUE,
+        ) if settings.AI_RATE_LIMIT_ENABLED else None,
+    )
+
+
+def _provider() -> AIClient:
+    return _fake_provider() if settings.AI_PROVIDER == "fake" else _openai_provider()
+
+
+def _cassette_provider() -> AIClient:
+    mode = settings.AI_CASSETTE_MODE
+    return CassetteAIClient(
+        None if mode == "replay" else _provider(),  # replay needs no API key
+        Cassette(settings.AI_CASSETTE_PATH, truncate=mode == "record"),
+        mode=mode,
+        replay_latency=settings.AI_CASSETTE_REPLAY_LATENCY,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_ai_client() -> AIClient:
+    # The fake provider sits behind the same resilience layer, so load tests exercise it too
+    provider = _cassette_provider() if settings.AI_CASSETTE_MODE != "off" else _provider()
+    return ResilientAIClient(
+        provider,
+        retry_attempts=settings.AI_RETRY_ATTEMPTS,
+        retry_max_wait=settings.AI_RETRY_MAX_WAIT_SECONDS,
+        embed_timeout=settings.AI_EMBED_TIMEOUT_SECONDS,
+        completion_timeout=settings.AI_REQUEST_TIMEOUT_SECONDS,
+        breaker=CircuitBreaker(
+            failure_threshold=settings.AI_BREAKER_FAILURE_THRESHOLD,
+            reset_seconds=settings.AI_BREAKER_RESET_SECONDS,
+        ),
+        hedge_ops=("embed",) if settings.AI_HEDGE_ENABLED else (),
+        hedge_quantile=settings.AI_HEDGE_QUANTILE,
+        hedge_min_samples=settings.AI_HEDGE_MIN_SAMPLES,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_scoring_ai_client() -> AIClient:
+    """
+    Client for the classifier's latency-critical scoring call: same provider,
+    breaker and retry policy, plus hedging of structured completions.
+    """
+    client = get_ai_client()
+    if settings.AI_HEDGE_ENABLED and isinstance(client, ResilientAIClient):
+        return client.with_hedging("complete_pydantic")
+    return client
\ No newline at end of file
@@ -0,0 +1,62 @@
+"""
+Process-local LRU cache of text embeddings (EMBEDDING_CACHE_SIZE entries).
+
+Keyed by a hash of the exact text. Vectors are stored as float arrays
+(a 3072-dim embedding is ~24 KB instead of ~100 KB as a list of floats);
+failed calls are not cached.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List
+
+from app.ai.base import AIClient
+from app.core import metrics
+from app.core.config import settings
+
+_LOOKUPS = metrics.counter("embedding_cache_lookups_total", "Embedding cache lookups by result (hit | miss)")
+
+
+class EmbeddingCache:
+    def __init__(self, max_entries: int) -> None:
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[bytes, array]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def embed(self, client: AIClient, text: str, *, timeout: float | None = None) -> List[float]:
+        if self._max_entries <= 0:
+            return client.embed(text, timeout=timeout)
+        key = hashlib.sha256(text.encode("utf-8")).digest()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+        if cached is not None:
+            _LOOKUPS.inc(result="hit")
+            return cached.tolist()
+
+        _LOOKUPS.inc(result="miss")
+        vector = client.embed(text, timeout=timeout)
+        with self._lock:
+            self._entries[key] = array("d", vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return vector
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+@lru_cache(maxsize=1)
+def get_embedding_cache() -> EmbeddingCache:
+    return EmbeddingCache(settings.EMBEDDING_CACHE_SIZE)
@@ -0,0 +1,279 @@
+"""
+Offline AIClient for load tests and local runs (AI_PROVIDER=fake).
+
+- Latency per call is drawn from a fixed / uniform / lognormal distribution
+  around a median (separately for embeddings and completions), so the
+  threadpool, DB pool and resilience layer see realistic hold times.
+- Embeddings are hashed bag-of-words vectors: deterministic, unit-length, and
+  texts sharing words are close, so kNN voting and candidate pruning behave.
+- Structured outputs are deterministic for the same prompt: the classifier's
+  scoring / re-rank models pick candidates by word overlap with the request,
+  PDF extraction returns a consistent synthetic invoice. Other models get
+  type-based placeholder values.
+- `error_rate` injects provider 500s (retryable), and calls that would
+  outlast their `timeout` raise TimeoutError after waiting it out.
+"""
+from __future__ import annotations
+
+import hashlib
+import math
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type, get_args, get_origin
+
+import httpx
+import openai
+from pydantic import BaseModel
+
+from app.agents.instrumentation import record_usage
+from app.ai.base import AIClient
+from app.ai.rate_limit import estimate_embedding_tokens, estimate_tokens
+
+FAKE_CHAT_MODEL = "fake-chat"
+FAKE_EMBED_MODEL = "fake-embedding"
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+# ---------- Latency ----------
+class LatencyModel:
+    """Samples call latency in seconds around `median_ms`."""
+
+    def __init__(self, median_ms: float, *, distribution: str = "lognormal", sigma: float = 0.5, seed: int = 0):
+        if distribution not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+        self.median_ms = median_ms
+        self.distribution = distribution
+        self.sigma = sigma
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self._lock:
+            if self.distribution == "fixed":
+                ms = self.median_ms
+            elif self.distribution == "uniform":  # median ± sigma*median
+                ms = self.median_ms * self._rng.uniform(1 - self.sigma, 1 + self.sigma)
+            else:
+                ms = self.median_ms * math.exp(self._rng.gauss(0.0, self.sigma))
+        return max(0.0, ms) / 1000
+
+
+# ---------- Deterministic content ----------
+def _seed(*parts: Any) -> int:
+    digest = hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+@lru_cache(maxsize=50_000)
+def _token_vector(token: str, dims: int) -> Tuple[float, ...]:
+    rng = random.Random(_seed("tok", token))
+    return tuple(rng.uniform(-1.0, 1.0) for _ in range(dims))
+
+
+def fake_embedding(text: str, dims: int) -> List[float]:
+    """Unit-length sum of per-word pseudo-random vectors (shared words -> similar vectors)."""
+    acc = [0.0] * dims
+    for token in _WORD.findall(text.lower()):
+        for i, x in enumerate(_token_vector(token, dims)):
+            acc[i] += x
+    norm = math.sqrt(sum(x * x for x in acc))
+    if norm == 0:
+        rng = random.Random(_seed("empty", text))
+        acc = [rng.uniform(-1.0, 1.0) for _ in range(dims)]
+        norm = math.sqrt(sum(x * x for x in acc)) or 1.0
+    return [x / norm for x in acc]
+
+
+def _words(text: str) -> set:
+    return {w for w in _WORD.findall(text.lower()) if len(w) > 2}
+
+
+def _text_of(messages: List[Dict[str, Any]]) -> str:
+    parts: List[str] = []
+    for m in messages:
+        content = m.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            for part in content:
+                if isinstance(part, dict):
+                    parts.append(str(part.get("text") or part.get("file_data") or ""))
+    return "\n".join(parts)
+
+
+def _user_text(messages: List[Dict[str, Any]]) -> str:
+    return _text_of([m for m in messages if m.get("role") == "user"])
+
+
+def _overlap(request: str, candidate: str) -> float:
+    a, b = _words(request), _words(candidate)
+    return len(a & b) / len(b) if b else 0.0
+
+
+def _respond_scoring(model: Type[BaseModel], messages: List[Dict[str, Any]], rng: random.Random) -> BaseModel:
+    text = _user_text(messages)
+    request, _, catalog = text.partition("CANDIDATE COMMODITY GROUPS")
+    candidates = re.findall(r"^- \[(\d+)\] (.+)$", catalog, re.MULTILINE)
+    scored = sorted(((_overlap(request, label), int(cid)) for cid, label in candidates), reverse=True)
+    scores = [{"id": cid, "score": round(min(0.95, 0.3 + s), 3)} for s, cid in scored[:3] if s > 0]
+    if not scores and candidates:
+        scores = [{"id": int(rng.choice(candidates)[0]), "score": 0.35}]
+    return model.model_validate({"scores": scores, "rationale": "offline stand-in: word overlap"})
+
+
+def _respond_rerank(model: Type[BaseModel], messages: List[Dict[str, Any]], rng: random.Random) -> BaseModel:
+    text = _user_text(messages)
+    candidates = re.findall(r"ID: (\d+)\s*\nLABEL: .*\n.*\nPRIOR SCORE: ([\d.]+)", text)
+    if not candidates:
+        return _placeholder(model, rng)
+    prior, chosen = max((float(p), int(cid)) for cid, p in candidates)
+    return model.model_validate({"chosen_id": chosen, "probability": round(min(0.95, 0.5 + prior / 2), 3)})
+
+
+def _respond_pdf(model: Type[BaseModel], messages: List[Dict[str, Any]], rng: random.Random) -> BaseModel:
+    lines = []
+    for i in range(rng.randint(1, 4)):
+        quantity = rng.randint(1, 10)
+        unit_cents = rng.randint(10, 2000) * 100
+        lines.append({
+            "description": f"Item {i + 1}", "unit": "pcs", "quantity": quantity,
+            "unitPriceCents": unit_cents, "totalPriceCents": quantity * unit_cents,
+        })
+    net = sum(l["totalPriceCents"] for l in lines)
+    tax = round(net * 0.19)
+    return model.model_validate({
+        "isProcurementRequest": True,
+        "title": f"Offer {rng.randint(1000, 9999)}",
+        "vendorName": rng.choice(("ACME GmbH", "Office AG", "DataSoft SE")),
+        "vatNumber": f"DE{rng.randint(100000000, 999999999)}",
+        "totalPriceCents": net + tax,
+        "shippingCents": 0,
+        "taxCents": tax,
+        "totalDiscountCents": 0,
+        "orderLines": lines,
+    })
+
+
+def _placeholder_value(annotation: Any, rng: random.Random) -> Any:
+    origin = get_origin(annotation)
+    if origin is not None:
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        if origin in (list, List):
+            return []
+        if origin in (dict, Dict):
+            return {}
+        return _placeholder_value(args[0], rng) if args else None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _placeholder(annotation, rng)
+    if annotation is bool:
+        return True
+    if annotation is int:
+        return rng.randint(0, 100)
+    if annotation is float:
+        return round(rng.random(), 3)
+    if annotation is str:
+        return f"fake-{rng.randint(0, 9999)}"
+    return None
+
+
+def _placeholder(model: Type[BaseModel], rng: random.Random) -> BaseModel:
+    values = {
+        name: _placeholder_value(field.annotation, rng)
+        for name, field in model.model_fields.items()
+        if field.is_required()
+    }
+    return model.model_validate(values)
+
+
+_RESPONDERS: Dict[str, Callable[[Type[BaseModel], List[Dict[str, Any]], random.Random], BaseModel]] = {
+    "_LLMScoring": _respond_scoring,
+    "_FinalDecision": _respond_rerank,
+    "LLMExtractedProcurementData": _respond_pdf,
+}
+
+
+# ---------- Client ----------
+class FakeAIClient(AIClient):
+    def __init__(
+        self,
+        *,
+        embed_latency: LatencyModel,
+        completion_latency: LatencyModel,
+        embedding_dims: int = 256,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.embed_latency = embed_latency
+        self.completion_latency = completion_latency
+        self.embedding_dims = embedding_dims
+        self.error_rate = error_rate
+        self._errors = random.Random(seed)
+        self._errors_lock = threading.Lock()
+        self._sleep = sleep
+
+    def _wait(self, latency: LatencyModel, timeout: Optional[float], op: str) -> None:
+        seconds = latency.sample()
+        if timeout is not None and seconds > timeout:
+            self._sleep(timeout)
+            raise TimeoutError(f"fake {op} exceeded {timeout:.2f}s")
+        self._sleep(seconds)
+        with self._errors_lock:
+            failed = self.error_rate > 0 and self._errors.random() < self.error_rate
+        if failed:
+            request = httpx.Request("POST", f"https://fake.invalid/{op}")
+            raise openai.InternalServerError(
+                f"fake {op} failure", response=httpx.Response(500, request=request), body=None
+            )
+
+    @staticmethod
+    def _usage(input_tokens: int, output_tokens: int = 0) -> Dict[str, int]:
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens}
+
+    def complete_text(
+        self,
+        messages: List[Dict[str, Any]],
+        *,
+        temperature: float | None = None,
+        max_output_tokens: int | None = None,
+        model: str | None = None,
+        timeout: float | None = None,
+    ) -> Tuple[str, Dict[str, Any]]:
+        self._wait(self.completion_latency, timeout, "complete_text")
+        text = f"Offline completion {_seed('text', _text_of(messages)) % 10_000:04d}."
+        usage = self._usage(estimate_tokens(messages), len(text) // 4 + 1)
+        record_usage(model or FAKE_CHAT_MODEL, usage)
+        return text, {"id": "fake", "model": model or FAKE_CHAT_MODEL, "usage": usage}
+
+    def complete_pydantic(
+        self,
+        messages: List[Dict[str, Any]],
+        *,
+        response_model: Type[BaseModel],
+        temperature: float | None = None,
+        max_output_tokens: int | None = None,
+        model: str | None = None,
+        timeout: float | None = None,
+    ) -> Tuple[BaseModel, Dict[str, Any]]:
+        self._wait(self.completion_latency, timeout, "complete_pydantic")
+        rng = random.Random(_seed(response_model.__name__, _text_of(messages)))
+        responder = _RESPONDERS.get(response_model.__name__, lambda m, _msgs, r: _placeholder(m, r))
+        parsed = responder(response_model, messages, rng)
+        usage = self._usage(estimate_tokens(messages), 150)
+        record_usage(model or FAKE_CHAT_MODEL, usage)
+        return parsed, {"id": "fake", "model": model or FAKE_CHAT_MODEL, "usage": usage}
+
+    def embed(self, text: str, *, timeout: float | None = None) -> List[float]:
+        return self.embed_batch([text], timeout=timeout)[0]
+
+    def embed_batch(self, texts: Iterable[str], *, timeout: float | None = None) -> List[List[float]]:
+        texts_list = list(texts)
+        if not texts_list:
+            return []
+        self._wait(self.embed_latency, timeout, "embed")
+        record_usage(FAKE_EMBED_MODEL, self._usage(estimate_embedding_tokens(texts_list)))
+        return [fake_embedding(t, self.embedding_dims) for t in texts_list]
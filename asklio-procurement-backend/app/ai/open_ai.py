@@ -1,10 +1,13 @@
 from __future__ import annotations
 import logging
-from typing import Any, Dict, Iterable, List, Tuple, Type
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Type
 from pydantic import BaseModel
-from openai import OpenAI
+from openai import APIStatusError, OpenAI
 
 from app.ai.base import AIClient
+from app.ai.rate_limit import RateLimiter, estimate_embedding_tokens, estimate_tokens
+from app.agents.instrumentation import record_usage
 
 logger = logging.getLogger(__name__)
 
@@ -17,26 +20,37 @@ class OpenAIClient(AIClient):
         embed_model: str = "text-embedding-3-large",
         default_temperature: float = 0.2,
         default_max_output_tokens: int = 800,
+        default_timeout: float = 60.0,
+        max_retries: int = 2,
+        rate_limiter: Optional[RateLimiter] = None,
     ) -> None:
-        self.client = OpenAI(api_key=api_key)
+        # Bounded default: a hung call must not hold a worker thread forever
+        self.client = OpenAI(api_key=api_key, timeout=default_timeout, max_retries=max_retries)
         self.chat_model = chat_model
         self.embed_model = embed_model
         self.default_temperature = default_temperature
         self.default_max_output_tokens = default_max_output_tokens
+        self.rate_limiter = rate_limiter
 
     # ---------- PLAIN TEXT ----------
     def complete_text(
         self,
         messages: List[Dict[str, Any]],
         model: str | None = None,
+        timeout: float | None = None,
     ) -> Tuple[str, Dict[str, Any]]:
         model_to_use = model or self.chat_model
         # Using Responses API for simple text
-        resp = self.client.responses.create(
-            model=model_to_use,
-            input=messages,
-            reasoning=None if model else {"effort": "medium"},
-        )
+        estimate = estimate_tokens(messages, max_output_tokens=self.default_max_output_tokens)
+        with self._rate_limited(model_to_use, estimate, timeout) as slot:
+            raw = self.client.responses.with_raw_response.create(
+                model=model_to_use,
+                input=messages,
+                reasoning=None if model else {"effort": "medium"},
+                **self._timeout_kw(timeout),
+            )
+            resp = raw.parse()
+            self._observe(slot, raw.headers, resp, model_to_use)
         text = getattr(resp, "output_text", "") or ""
         meta = {"id": getattr(resp, "id", None), "model": getattr(resp, "model", self.chat_model)}
         return text, meta
@@ -48,17 +62,23 @@ class OpenAIClient(AIClient):
         *,
         response_model: Type[BaseModel],
         model: str | None = None,
+        timeout: float | None = None,
     ) -> Tuple[BaseModel, Dict[str, Any]]:
         """
         Use the new responses.parse API with Pydantic (SDK >= 1.40).
         """
         model_to_use = model or self.chat_model
-        response = self.client.responses.parse(
-            model=model_to_use,
-            input=messages,
-            reasoning=None if model else {"effort": "medium"},
-            text_format=response_model,
-        )
+        estimate = estimate_tokens(messages, max_output_tokens=self.default_max_output_tokens)
+        with self._rate_limited(model_to_use, estimate, timeout) as slot:
+            raw = self.client.responses.with_raw_response.parse(
+                model=model_to_use,
+                input=messages,
+                reasoning=None if model else {"effort": "medium"},
+                text_format=response_model,
+                **self._timeout_kw(timeout),
+            )
+            response = raw.parse()
+            self._observe(slot, raw.headers, response, model_to_use)
 
         # handle refusals explicitly
         if getattr(response, "refusal", None):
@@ -79,17 +99,52 @@ class OpenAIClient(AIClient):
         return parsed, meta
 
     # ---------- Embeddings ----------
-    def embed(self, text: str) -> List[float]:
-        out = self.client.embeddings.create(model=self.embed_model, input=text)
-        return out.data[0].embedding
+    def embed(self, text: str, *, timeout: float | None = None) -> List[float]:
+        return self._embed([text], text, timeout)[0]
 
-    def embed_batch(self, texts: Iterable[str]) -> List[List[float]]:
+    def embed_batch(self, texts: Iterable[str], *, timeout: float | None = None) -> List[List[float]]:
         texts_list = list(texts)
         if not texts_list:
             return []
-        out = self.client.embeddings.create(model=self.embed_model, input=texts_list)
+        return self._embed(texts_list, texts_list, timeout)
+
+    def _embed(self, texts: List[str], payload: Any, timeout: float | None) -> List[List[float]]:
+        with self._rate_limited(self.embed_model, estimate_embedding_tokens(texts), timeout) as slot:
+            raw = self.client.embeddings.with_raw_response.create(
+                model=self.embed_model, input=payload, **self._timeout_kw(timeout)
+            )
+            out = raw.parse()
+            self._observe(slot, raw.headers, out, self.embed_model)
         return [row.embedding for row in out.data]
 
+    # ---------- Rate limiting ----------
+    @contextmanager
+    def _rate_limited(self, model: str, estimated_tokens: int, timeout: float | None) -> Iterator[Any]:
+        """Reserve limiter capacity for one call (no-op without a limiter)."""
+        if self.rate_limiter is None:
+            yield None
+            return
+        with self.rate_limiter.reserve(model, estimated_tokens, timeout=timeout) as slot:
+            try:
+                yield slot
+            except APIStatusError as e:
+                # 429s carry the provider's current view of our limits too
+                slot.observe(headers=e.response.headers)
+                raise
+
+    @staticmethod
+    def _observe(slot: Any, headers: Any, response: Any, model: str) -> None:
+        """Feed usage to the per-stage accounting and headers/usage to the rate limiter."""
+        usage = getattr(response, "usage", None)
+        record_usage(model, usage)
+        if slot is not None:
+            slot.observe(headers=headers, used_tokens=getattr(usage, "total_tokens", None))
+
+    @staticmethod
+    def _timeout_kw(timeout: float | None) -> Dict[str, Any]:
+        # Omit when unset so the client-level default applies
+        return {} if timeout is None else {"timeout": timeout}
+
     def _t(self, t: float | None) -> float:
         return self.default_temperature if t is None else t
 
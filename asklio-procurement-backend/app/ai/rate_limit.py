@@ -0,0 +1,265 @@
+"""
+Client-side rate limiting for provider calls: requests/min and tokens/min per model.
+
+- Each model has two token buckets (RPM, TPM). Limits start from settings and
+  are replaced by the provider's `x-ratelimit-*` response headers, whose
+  `remaining-*` values also pull the buckets down to the server's view.
+- Callers reserve an *estimated* token count before the call
+  (`estimate_tokens`: ~4 chars/token for text, fixed costs for files/images,
+  plus the requested output tokens) and reconcile with the actual `usage`
+  afterwards.
+- Waiting is FIFO per model, so a large request is not starved by small ones.
+  If the expected wait exceeds the caller's allowance, or the queue is full,
+  `acquire` raises RateLimitExceeded immediately instead of parking a thread.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import logging
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Mapping, Optional
+
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+_HEADROOM_REQUESTS = metrics.gauge("ai_ratelimit_headroom_requests", "Requests available now, per model")
+_HEADROOM_TOKENS = metrics.gauge("ai_ratelimit_headroom_tokens", "Tokens available now, per model")
+_QUEUE_DEPTH = metrics.gauge("ai_ratelimit_queue_depth", "Callers waiting for rate-limit capacity, per model")
+_REJECTED = metrics.counter("ai_ratelimit_rejected_total", "Calls rejected early by the rate limiter, per model")
+_WAIT_SECONDS = metrics.histogram(
+    "ai_ratelimit_wait_seconds", "Time spent waiting for rate-limit capacity",
+    buckets=(0.0, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+_CHARS_PER_TOKEN = 4
+_MESSAGE_OVERHEAD_TOKENS = 4
+_IMAGE_TOKENS = 800  # high-detail image, typical tiling
+_PDF_PAGE_TOKENS = 1500  # text + page image, per page
+_PDF_PAGE = re.compile(rb"/Type\s*/Page[^s]")
+
+
+class RateLimitExceeded(RuntimeError):
+    """The call would wait longer than allowed for rate-limit capacity; not sent."""
+
+
+# ---------- Token estimation ----------
+def _pdf_pages(file_data: str) -> int:
+    b64 = file_data.split(",", 1)[-1]
+    try:
+        raw = base64.b64decode(b64, validate=False)
+    except (binascii.Error, ValueError):
+        return 1
+    return max(1, len(_PDF_PAGE.findall(raw)))
+
+
+def _content_tokens(content: Any) -> int:
+    if isinstance(content, str):
+        return len(content) // _CHARS_PER_TOKEN + 1
+    if isinstance(content, list):
+        total = 0
+        for part in content:
+            if not isinstance(part, dict):
+                total += _content_tokens(str(part))
+            elif part.get("type") == "input_file":
+                total += _pdf_pages(part.get("file_data") or "") * _PDF_PAGE_TOKENS
+            elif part.get("type") == "input_image":
+                total += _IMAGE_TOKENS
+            else:
+                total += _content_tokens(part.get("text") or "")
+        return total
+    return 0
+
+
+def estimate_tokens(messages: List[Dict[str, Any]], *, max_output_tokens: int = 0) -> int:
+    """Rough upper-bound token cost of a call (prompt + requested output)."""
+    prompt = sum(_content_tokens(m.get("content")) + _MESSAGE_OVERHEAD_TOKENS for m in messages)
+    return prompt + max(0, max_output_tokens)
+
+
+def estimate_embedding_tokens(texts: List[str]) -> int:
+    return sum(len(t) // _CHARS_PER_TOKEN + 1 for t in texts)
+
+
+# ---------- Buckets ----------
+class _Bucket:
+    """Token bucket refilled continuously at capacity/60 per second. Not locked (owner locks)."""
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self._updated = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / 60.0
+
+    def refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def seconds_until(self, amount: float) -> float:
+        deficit = amount - self.level
+        return 0.0 if deficit <= 0 else deficit / max(self.rate, 1e-9)
+
+
+class ModelLimiter:
+    def __init__(self, model: str, *, rpm: int, tpm: int, max_queue: int) -> None:
+        self.model = model
+        self._requests = _Bucket(rpm)
+        self._tokens = _Bucket(tpm)
+        self._max_queue = max_queue
+        self._queue: Deque[object] = deque()
+        self._queued_tokens = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, tokens: int, *, max_wait: float) -> int:
+        """
+        Reserve one request and `tokens` tokens, waiting FIFO for at most max_wait.
+        Returns the reserved token count (capped at the bucket size).
+        """
+        started = time.monotonic()
+        with self._cond:
+            tokens = int(min(tokens, self._tokens.capacity))
+            self._refill()
+            # Early reject: everyone ahead of us is served first
+            expected_wait = max(
+                self._requests.seconds_until(len(self._queue) + 1),
+                self._tokens.seconds_until(self._queued_tokens + tokens),
+            )
+            if len(self._queue) >= self._max_queue or expected_wait > max_wait:
+                _REJECTED.inc(model=self.model)
+                raise RateLimitExceeded(
+                    f"Rate limit for {self.model}: ~{expected_wait:.1f}s until capacity "
+                    f"({len(self._queue)} queued); try again later."
+                )
+
+            ticket = object()
+            self._queue.append(ticket)
+            self._queued_tokens += tokens
+            _QUEUE_DEPTH.set(len(self._queue), model=self.model)
+            try:
+                while True:
+                    self._refill()
+                    if self._queue[0] is ticket:
+                        wait_for = max(self._requests.seconds_until(1), self._tokens.seconds_until(tokens))
+                        if wait_for <= 0:
+                            break
+                    else:
+                        wait_for = 0.05
+                    remaining = started + max_wait - time.monotonic()
+                    if remaining <= 0:
+                        _REJECTED.inc(model=self.model)
+                        raise RateLimitExceeded(f"Rate limit for {self.model}: no capacity within {max_wait:.1f}s.")
+                    self._cond.wait(min(wait_for, remaining))
+                self._requests.level -= 1
+                self._tokens.level -= tokens
+            finally:
+                self._queue.remove(ticket)
+                self._queued_tokens -= tokens
+                _QUEUE_DEPTH.set(len(self._queue), model=self.model)
+                self._publish()
+                self._cond.notify_all()
+        _WAIT_SECONDS.observe(time.monotonic() - started)
+        return tokens
+
+    def reconcile(self, reserved: int, actual: Optional[int]) -> None:
+        """Correct the token bucket once the real usage is known (may go into debt)."""
+        if actual is None:
+            return
+        with self._cond:
+            self._tokens.level += reserved - actual
+            self._publish()
+            self._cond.notify_all()
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """Adopt the provider's limits and remaining capacity (authoritative)."""
+        with self._cond:
+            self._refill()
+            for bucket, kind in ((self._requests, "requests"), (self._tokens, "tokens")):
+                limit = _to_float(headers.get(f"x-ratelimit-limit-{kind}"))
+                remaining = _to_float(headers.get(f"x-ratelimit-remaining-{kind}"))
+                if limit:
+                    bucket.capacity = limit
+                if remaining is not None:
+                    bucket.level = min(bucket.level, remaining)
+                elif limit:
+                    bucket.level = min(bucket.level, limit)
+            self._publish()
+            self._cond.notify_all()
+
+    def headroom(self) -> Dict[str, float]:
+        with self._cond:
+            self._refill()
+            return {"requests": self._requests.level, "tokens": self._tokens.level}
+
+    def _refill(self) -> None:
+        self._requests.refill()
+        self._tokens.refill()
+
+    def _publish(self) -> None:
+        _HEADROOM_REQUESTS.set(max(0.0, self._requests.level), model=self.model)
+        _HEADROOM_TOKENS.set(max(0.0, self._tokens.level), model=self.model)
+
+
+def _to_float(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class RateLimiter:
+    """Shared per-model limiters; one instance per provider account/process."""
+
+    def __init__(self, *, default_rpm: int, default_tpm: int, max_wait: float, max_queue: int = 64) -> None:
+        self._default_rpm = default_rpm
+        self._default_tpm = default_tpm
+        self._max_wait = max_wait
+        self._max_queue = max_queue
+        self._models: Dict[str, ModelLimiter] = {}
+        self._lock = threading.Lock()
+
+    def for_model(self, model: str) -> ModelLimiter:
+        with self._lock:
+            limiter = self._models.get(model)
+            if limiter is None:
+                limiter = self._models[model] = ModelLimiter(
+                    model, rpm=self._default_rpm, tpm=self._default_tpm, max_queue=self._max_queue
+                )
+            return limiter
+
+    @contextmanager
+    def reserve(self, model: str, tokens: int, *, timeout: Optional[float] = None) -> Iterator["_Reservation"]:
+        """
+        Reserve capacity for one call; the caller records actual usage/headers
+        on the yielded reservation.
+        """
+        max_wait = self._max_wait if timeout is None else min(self._max_wait, timeout)
+        limiter = self.for_model(model)
+        reservation = _Reservation(limiter, limiter.acquire(tokens, max_wait=max_wait))
+        try:
+            yield reservation
+        finally:
+            limiter.reconcile(reservation.tokens, reservation.actual_tokens)
+
+
+class _Reservation:
+    def __init__(self, limiter: ModelLimiter, tokens: int) -> None:
+        self._limiter = limiter
+        self.tokens = tokens
+        self.actual_tokens: Optional[int] = None
+
+    def observe(self, headers: Optional[Mapping[str, str]] = None, used_tokens: Optional[int] = None) -> None:
+        if headers is not None:
+            self._limiter.update_from_headers(headers)
+        if used_tokens is not None:
+            self.actual_tokens = used_tokens
@@ -0,0 +1,320 @@
+"""
+Resilience layer around an AIClient: retries, circuit breaker and hedging.
+
+- Retries: jittered exponential backoff (tenacity) for transient errors only
+  (timeouts, connection errors, 408/409/429/5xx), bounded by the caller's
+  timeout so an agent budget is never overrun.
+- Per-operation timeouts: embeddings and completions get their own ceilings;
+  a smaller caller timeout always wins.
+- Circuit breaker: after N consecutive transient failures every call fails
+  fast with CircuitOpenError until a cool-down passes, then one probe call is
+  let through. Agents treat this like any other AI error (classifier falls
+  back to the first group without waiting out timeouts).
+- Hedging (opt-in per operation): if an attempt is still running after the
+  operation's observed p95 latency, a duplicate is sent and the first success
+  wins. The slower call is not cancelled, so hedging costs up to ~5% extra calls.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple, Type
+
+import httpx
+import openai
+from pydantic import BaseModel
+from tenacity import Retrying, retry_if_exception, stop_after_attempt, stop_after_delay, wait_random_exponential
+
+from app.ai.base import AIClient
+from app.ai.rate_limit import RateLimitExceeded
+from app.core import metrics, tracing
+from app.utils.concurrency import submit_in_context
+
+logger = logging.getLogger(__name__)
+
+_CALLS = metrics.counter("ai_calls_total", "AI client calls by operation and outcome")
+_RETRIES = metrics.counter("ai_retries_total", "Retried AI client attempts by operation")
+_HEDGES = metrics.counter("ai_hedges_total", "Hedged AI requests by operation and winner")
+_CALL_SECONDS = metrics.histogram("ai_call_seconds", "AI client call latency by operation (incl. retries)")
+_CIRCUIT_STATE = metrics.gauge("ai_circuit_open", "1 while the AI circuit breaker is open")
+
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the provider while the circuit breaker is open."""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Transient provider/network failures worth retrying (and counting towards the breaker)."""
+    if isinstance(exc, (openai.APITimeoutError, openai.APIConnectionError, TimeoutError, httpx.TransportError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code in _RETRYABLE_STATUS
+    return False
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open (one probe) -> closed."""
+
+    def __init__(self, *, failure_threshold: int = 5, reset_seconds: float = 30.0) -> None:
+        self._threshold = max(1, failure_threshold)
+        self._reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None
+
+    def before_call(self) -> bool:
+        """Raise while open; returns True if this call is the half-open probe."""
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            if time.monotonic() - self._opened_at < self._reset_seconds or self._probing:
+                raise CircuitOpenError("AI provider circuit is open")
+            self._probing = True  # half-open: let exactly one call through
+            return True
+
+    def release_probe(self) -> None:
+        """The probe ended without a provider answer (e.g. rate limited): let the next call probe."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("AI circuit closed after successful probe.")
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+        _CIRCUIT_STATE.set(0)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self._threshold:
+                if self._opened_at is None or self._probing:
+                    logger.warning("AI circuit opened after %d consecutive failures.", self._failures)
+                self._opened_at = time.monotonic()
+                self._probing = False
+        if self.is_open:
+            _CIRCUIT_STATE.set(1)
+
+
+class LatencyWindow:
+    """Rolling window of successful call latencies, for the hedging threshold."""
+
+    def __init__(self, size: int = 200) -> None:
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float, *, min_samples: int) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ResilientAIClient(AIClient):
+    def __init__(
+        self,
+        inner: AIClient,
+        *,
+        retry_attempts: int = 3,
+        retry_max_wait: float = 4.0,
+        embed_timeout: float = 10.0,
+        completion_timeout: float = 60.0,
+        breaker: Optional[CircuitBreaker] = None,
+        hedge_ops: Iterable[str] = (),
+        hedge_quantile: float = 0.95,
+        hedge_min_samples: int = 20,
+        hedge_min_delay: float = 0.1,
+        hedge_workers: int = 16,
+    ) -> None:
+        self._inner = inner
+        self._retry_attempts = max(1, retry_attempts)
+        self._retry_max_wait = retry_max_wait
+        self._op_timeouts = {
+            "embed": embed_timeout,
+            "embed_batch": embed_timeout,
+            "complete_text": completion_timeout,
+            "complete_pydantic": completion_timeout,
+        }
+        self._breaker = breaker or CircuitBreaker()
+        self._hedge_ops = frozenset(hedge_ops)
+        self._hedge_quantile = hedge_quantile
+        self._hedge_min_samples = hedge_min_samples
+        self._hedge_min_delay = hedge_min_delay
+        self._hedge_workers = hedge_workers
+        self._latencies: Dict[str, LatencyWindow] = {}
+        self._latencies_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        return self._breaker
+
+    def with_hedging(self, *ops: str) -> "ResilientAIClient":
+        """
+        A sibling client that also hedges `ops`; shares the inner client,
+        breaker, latency windows and hedge pool with this one.
+        """
+        sibling = object.__new__(ResilientAIClient)
+        sibling.__dict__.update(self.__dict__)
+        sibling._hedge_ops = self._hedge_ops | frozenset(ops)
+        self._pool()  # create once so both share it
+        sibling._executor = self._executor
+        return sibling
+
+    # ---------- AIClient ----------
+    def complete_text(self, messages: List[Dict[str, Any]], *, timeout: float | None = None, **kwargs) -> Tuple[str, Dict[str, Any]]:
+        return self._call(
+            "complete_text", kwargs.get("model"), timeout,
+            lambda t: self._inner.complete_text(messages, timeout=t, **kwargs),
+        )
+
+    def complete_pydantic(
+        self,
+        messages: List[Dict[str, Any]],
+        *,
+        response_model: Type[BaseModel],
+        timeout: float | None = None,
+        **kwargs,
+    ) -> Tuple[BaseModel, Dict[str, Any]]:
+        return self._call(
+            "complete_pydantic", kwargs.get("model"), timeout,
+            lambda t: self._inner.complete_pydantic(messages, response_model=response_model, timeout=t, **kwargs),
+        )
+
+    def embed(self, text: str, *, timeout: float | None = None) -> List[float]:
+        return self._call("embed", None, timeout, lambda t: self._inner.embed(text, timeout=t))
+
+    def embed_batch(self, texts: Iterable[str], *, timeout: float | None = None) -> List[List[float]]:
+        texts_list = list(texts)
+        return self._call("embed_batch", None, timeout, lambda t: self._inner.embed_batch(texts_list, timeout=t))
+
+    # ---------- internals ----------
+    def _call(self, op: str, model: Optional[str], timeout: Optional[float], fn: Callable[[float], Any]) -> Any:
+        op_timeout = self._op_timeouts[op]
+        total = op_timeout * self._retry_attempts
+        if timeout is not None:
+            total = min(total, timeout)
+        deadline = time.monotonic() + total
+        window = self._window(f"{op}:{model or 'default'}")
+        started = time.perf_counter()
+
+        attempts = 0
+
+        def attempt() -> Any:
+            nonlocal attempts
+            attempts += 1
+            probe = self._breaker.before_call()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                if probe:
+                    self._breaker.release_probe()
+                raise TimeoutError(f"AI {op} call exceeded its time budget")
+            attempt_timeout = min(op_timeout, remaining)
+            attempt_started = time.perf_counter()
+            try:
+                with tracing.span("ai.attempt", kind=tracing.SPAN_KIND_CLIENT, attempt=attempts):
+                    if op in self._hedge_ops:
+                        result = self._hedged(op, window, attempt_timeout, fn)
+                    else:
+                        result = fn(attempt_timeout)
+            except BaseException as e:
+                if is_retryable(e):
+                    self._breaker.record_failure()
+                elif not isinstance(e, (CircuitOpenError, RateLimitExceeded)):
+                    self._breaker.record_success()  # provider answered (e.g. 400); it's up
+                elif probe:
+                    self._breaker.release_probe()  # no answer either way; don't hold the half-open slot
+                raise
+            self._breaker.record_success()
+            window.add(time.perf_counter() - attempt_started)
+            return result
+
+        retrying = Retrying(
+            stop=stop_after_attempt(self._retry_attempts) | stop_after_delay(total),
+            wait=wait_random_exponential(multiplier=0.25, max=self._retry_max_wait),
+            retry=retry_if_exception(is_retryable),
+            before_sleep=lambda rs: _RETRIES.inc(op=op),
+            reraise=True,
+        )
+        try:
+            with tracing.span(f"ai.{op}", **{"ai.model": model or "default"}) as sp:
+                try:
+                    result = retrying(attempt)
+                finally:
+                    sp.set_attribute("ai.attempts", attempts)
+        except CircuitOpenError:
+            _CALLS.inc(op=op, outcome="circuit_open")
+            raise
+        except RateLimitExceeded:
+            _CALLS.inc(op=op, outcome="rate_limited")
+            raise
+        except Exception:
+            _CALLS.inc(op=op, outcome="error")
+            _CALL_SECONDS.observe(time.perf_counter() - started, op=op)
+            raise
+        _CALLS.inc(op=op, outcome="ok")
+        _CALL_SECONDS.observe(time.perf_counter() - started, op=op)
+        return result
+
+    def _hedged(self, op: str, window: LatencyWindow, timeout: float, fn: Callable[[float], Any]) -> Any:
+        """Run fn; if it's slower than the observed p95, race a duplicate against it."""
+        delay = window.quantile(self._hedge_quantile, min_samples=self._hedge_min_samples)
+        if delay is None or max(delay, self._hedge_min_delay) >= timeout:
+            return fn(timeout)
+        delay = max(delay, self._hedge_min_delay)
+
+        started = time.monotonic()
+        # Run in a copy of the caller's context so usage/trace attribution follows the call
+        primary = submit_in_context(self._pool(), fn, timeout)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        current = tracing.current_span()
+        if current is not None:
+            current.set_attribute("ai.hedged", True)
+        hedge = submit_in_context(self._pool(), fn, max(0.0, timeout - (time.monotonic() - started)))
+        pending: List[Future] = [primary, hedge]
+        error: Optional[BaseException] = None
+        while pending:
+            done, _ = wait(pending, timeout=max(0.0, timeout - (time.monotonic() - started)), return_when=FIRST_COMPLETED)
+            if not done:
+                raise TimeoutError(f"AI {op} call timed out")
+            for fut in done:
+                pending.remove(fut)
+                if fut.exception() is None:
+                    _HEDGES.inc(op=op, winner="primary" if fut is primary else "hedge")
+                    return fut.result()
+                error = fut.exception()
+        raise error  # both attempts failed
+
+    def _window(self, key: str) -> LatencyWindow:
+        with self._latencies_lock:
+            window = self._latencies.get(key)
+            if window is None:
+                window = self._latencies[key] = LatencyWindow()
+            return window
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._hedge_workers, thread_name_prefix="ai-hedge")
+            metrics.track_executor("ai_hedge", lambda: self._executor)
+        return self._executor
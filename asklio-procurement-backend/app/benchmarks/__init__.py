@@ -0,0 +1,8 @@
+"""
+Benchmarks for hot backend paths, run against a real SQL database.
+
+    python -m app.benchmarks.procurement --sizes 1000,10000 --out bench.json
+    python -m app.benchmarks.procurement --baseline bench.json --threshold 0.2
+
+Not part of the pytest run; see the individual modules for options.
+"""
@@ -0,0 +1,401 @@
+"""
+HTTP load generator for the procurement API.
+
+Drives a running app (or one it spawns with `--spawn`, using the offline
+AI_PROVIDER=fake / VECTOR_STORE=memory stand-ins) with concurrent virtual
+users. Each user logs in once, then loops over a weighted mix of scenarios
+with an optional think time:
+
+- list:   GET  /api/procurement
+- mine:   GET  /api/procurement/mine?limit=10
+- detail: GET  /api/procurement/{id}
+- create: POST /api/procurement (classification runs inline, so this is
+          where AI latency holds a threadpool thread and a DB connection)
+- update: PATCH /api/procurement/{id} as the manager (the version is read
+          first and counted as a detail request; lost races show up as 409s)
+- pdf:    POST /api/procurement/from-pdf with a generated invoice
+
+While it runs, /metrics is scraped every second and the peak of the
+saturation gauges (threadpool busy/waiting, DB pool checked out/overflow,
+requests in flight, event-loop lag, executor and rate-limit queues) is
+reported next to throughput, p50/p95/p99 and error rate per scenario. A
+p99 that climbs while `threadpool_waiting_tasks` or `db_pool_overflow`
+sits at its ceiling points at the saturated resource.
+
+    python -m app.benchmarks.load --spawn --users 50 --duration 60
+    python -m app.benchmarks.load --base-url http://localhost:8000 --users 20 --mix list=1,create=1
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+DEFAULT_MIX = "list=2,mine=3,detail=3,create=1,update=1,pdf=0"
+SATURATION_GAUGES = (
+    "threadpool_busy_threads", "threadpool_waiting_tasks", "threadpool_max_threads",
+    "db_pool_size", "db_pool_checked_out", "db_pool_overflow",
+    "http_requests_in_flight", "event_loop_lag_seconds",
+    "executor_queue_depth", "ai_ratelimit_queue_depth",
+)
+_SAMPLE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[^}]*\})?\s+(\S+)")
+_ITEMS = (
+    ("Laptop 14 inch business", "pcs", 120000), ("Monitor 27 inch", "pcs", 28000),
+    ("Software license annual", "seats", 4500), ("Office chair ergonomic", "pcs", 19000),
+    ("Printer toner black", "pcs", 6500), ("Consulting day senior", "days", 95000),
+)
+_VENDORS = ("ACME GmbH", "Office AG", "DataSoft SE", "Printers & Co KG")
+
+
+# ---------- Statistics ----------
+def percentile(values: Sequence[float], p: float) -> Optional[float]:
+    """Linear-interpolated percentile (p in 0..100); None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+@dataclass
+class Sample:
+    scenario: str
+    status: str  # HTTP status code, or the transport error's class name
+    seconds: float
+
+    @property
+    def ok(self) -> bool:
+        return self.status.isdigit() and 200 <= int(self.status) < 300
+
+
+def summarize(samples: List[Sample], elapsed: float) -> Dict[str, Any]:
+    def stats(rows: List[Sample]) -> Dict[str, Any]:
+        latencies = [s.seconds * 1000 for s in rows]
+        errors = sum(1 for s in rows if not s.ok)
+        return {
+            "count": len(rows),
+            "rps": round(len(rows) / elapsed, 2) if elapsed else None,
+            "p50_ms": _round(percentile(latencies, 50)),
+            "p95_ms": _round(percentile(latencies, 95)),
+            "p99_ms": _round(percentile(latencies, 99)),
+            "max_ms": _round(max(latencies, default=None)),
+            "error_rate": round(errors / len(rows), 4) if rows else None,
+            "statuses": dict(Counter(s.status for s in rows)),
+        }
+
+    scenarios = sorted({s.scenario for s in samples})
+    return {
+        "overall": stats(samples),
+        "scenarios": {name: stats([s for s in samples if s.scenario == name]) for name in scenarios},
+    }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 1)
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in _SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}' (known: {', '.join(_SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    if not any(w > 0 for w in mix.values()):
+        raise ValueError("The scenario mix needs at least one positive weight.")
+    return mix
+
+
+# ---------- Saturation sampling ----------
+def parse_gauges(text: str, names: Sequence[str] = SATURATION_GAUGES) -> Dict[str, float]:
+    """Current values of the given metrics from Prometheus text, keyed 'name{labels}'."""
+    out = {}
+    for line in text.splitlines():
+        match = _SAMPLE.match(line)
+        if match and match.group(1) in names:
+            try:
+                out[match.group(1) + (match.group(2) or "")] = float(match.group(3))
+            except ValueError:
+                continue
+    return out
+
+
+async def _sample_saturation(client: httpx.AsyncClient, peaks: Dict[str, float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        try:
+            response = await client.get("/metrics", timeout=5)
+            if response.status_code == 200:
+                for key, value in parse_gauges(response.text).items():
+                    peaks[key] = max(peaks.get(key, value), value)
+        except httpx.HTTPError:
+            pass
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=1.0)
+        except asyncio.TimeoutError:
+            pass
+
+
+# ---------- Scenarios ----------
+@dataclass
+class _Context:
+    client: httpx.AsyncClient
+    requestor: Dict[str, str]
+    manager: Dict[str, str]
+    request_ids: List[str]
+    rng: random.Random
+    pdfs: List[bytes] = field(default_factory=list)
+
+
+async def _timed(ctx: _Context, scenario: str, send: Callable[[], Awaitable[httpx.Response]]) -> Tuple[Sample, Optional[httpx.Response]]:
+    started = time.perf_counter()
+    try:
+        response = await send()
+        status: str = str(response.status_code)
+    except httpx.HTTPError as e:
+        response, status = None, type(e).__name__
+    return Sample(scenario, status, time.perf_counter() - started), response
+
+
+async def _list(ctx: _Context) -> List[Sample]:
+    sample, _ = await _timed(ctx, "list", lambda: ctx.client.get("/api/procurement", headers=ctx.manager))
+    return [sample]
+
+
+async def _mine(ctx: _Context) -> List[Sample]:
+    sample, _ = await _timed(
+        ctx, "mine", lambda: ctx.client.get("/api/procurement/mine", params={"limit": 10}, headers=ctx.requestor)
+    )
+    return [sample]
+
+
+async def _detail(ctx: _Context) -> List[Sample]:
+    if not ctx.request_ids:
+        return await _list(ctx)
+    request_id = ctx.rng.choice(ctx.request_ids)
+    sample, _ = await _timed(ctx, "detail", lambda: ctx.client.get(f"/api/procurement/{request_id}", headers=ctx.manager))
+    return [sample]
+
+
+def _create_body(rng: random.Random) -> Dict[str, Any]:
+    lines = []
+    for _ in range(rng.randint(1, 4)):
+        description, unit, price = rng.choice(_ITEMS)
+        lines.append({"description": description, "unit": unit, "unitPriceCents": price, "quantity": rng.randint(1, 5)})
+    return {
+        "title": f"Load test: {lines[0]['description']}",
+        "vendorName": rng.choice(_VENDORS),
+        "vatID": f"DE{rng.randint(100000000, 999999999)}",
+        "orderLines": lines,
+    }
+
+
+async def _create(ctx: _Context) -> List[Sample]:
+    body = _create_body(ctx.rng)
+    sample, response = await _timed(ctx, "create", lambda: ctx.client.post("/api/procurement", json=body, headers=ctx.requestor))
+    if sample.ok and response is not None:
+        ctx.request_ids.append(response.json()["id"])
+    return [sample]
+
+
+async def _update(ctx: _Context) -> List[Sample]:
+    if not ctx.request_ids:
+        return await _list(ctx)
+    request_id = ctx.rng.choice(ctx.request_ids)
+    read, response = await _timed(ctx, "detail", lambda: ctx.client.get(f"/api/procurement/{request_id}", headers=ctx.manager))
+    if not read.ok or response is None:
+        return [read]
+    body = {"version": response.json()["version"], "status": ctx.rng.choice(("Open", "InProgress", "Closed"))}
+    sample, _ = await _timed(
+        ctx, "update", lambda: ctx.client.patch(f"/api/procurement/{request_id}", json=body, headers=ctx.manager)
+    )
+    return [read, sample]
+
+
+async def _pdf(ctx: _Context) -> List[Sample]:
+    data = ctx.rng.choice(ctx.pdfs)
+    files = {"file": ("invoice.pdf", data, "application/pdf")}
+    sample, _ = await _timed(
+        ctx, "pdf", lambda: ctx.client.post("/api/procurement/from-pdf", files=files, headers=ctx.requestor)
+    )
+    return [sample]
+
+
+_SCENARIOS: Dict[str, Callable[[_Context], Awaitable[List[Sample]]]] = {
+    "list": _list, "mine": _mine, "detail": _detail, "create": _create, "update": _update, "pdf": _pdf,
+}
+
+
+# ---------- Driver ----------
+async def _login(client: httpx.AsyncClient, username: str, password: str, api_key: Optional[str]) -> Dict[str, str]:
+    headers = {"X-Client-Key": api_key} if api_key else {}
+    response = await client.post("/api/auth/login", json={"username": username, "password": password}, headers=headers)
+    response.raise_for_status()
+    return {**headers, "Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def _virtual_user(ctx: _Context, mix: Dict[str, float], start_at: float, deadline: float,
+                        think_s: float, samples: List[Sample]) -> None:
+    await asyncio.sleep(max(0.0, start_at - time.perf_counter()))
+    names, weights = zip(*mix.items())
+    while time.perf_counter() < deadline:
+        scenario = ctx.rng.choices(names, weights)[0]
+        samples.extend(await _SCENARIOS[scenario](ctx))
+        if think_s:
+            await asyncio.sleep(ctx.rng.expovariate(1 / think_s))
+
+
+async def run_load(
+    base_url: str,
+    *,
+    users: int = 20,
+    duration: float = 30.0,
+    ramp: float = 5.0,
+    think_ms: float = 0.0,
+    mix: Optional[Dict[str, float]] = None,
+    username: str = "randy.requestor",
+    manager: str = "peter.procurement",
+    password: str = "test123",
+    api_key: Optional[str] = None,
+    seed: int = 1,
+) -> Dict[str, Any]:
+    mix = mix or parse_mix(DEFAULT_MIX)
+    mix = {name: w for name, w in mix.items() if w > 0}
+    limits = httpx.Limits(max_connections=users + 2, max_keepalive_connections=users + 2)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        requestor = await _login(client, username, password, api_key)
+        manager_headers = await _login(client, manager, password, api_key)
+        listed = await client.get("/api/procurement", headers=manager_headers)
+        listed.raise_for_status()
+        request_ids = [r["id"] for r in listed.json()]
+        pdfs: List[bytes] = []
+        if "pdf" in mix:
+            from app.benchmarks.pdf_corpus import generate
+
+            pdfs = [d.data for d in generate(per_kind=3, seed=seed) if d.kind == "digital"]
+
+        samples: List[Sample] = []
+        peaks: Dict[str, float] = {}
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(_sample_saturation(client, peaks, stop))
+        started = time.perf_counter()
+        deadline = started + ramp + duration
+        # Shared id pool: ids created by one user become detail/update targets for all
+        tasks = [
+            _virtual_user(
+                _Context(client, requestor, manager_headers, request_ids, random.Random(seed * 1000 + i), pdfs),
+                mix, started + ramp * i / users, deadline, think_ms / 1000, samples,
+            )
+            for i in range(users)
+        ]
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await sampler
+
+    report = summarize(samples, elapsed)
+    report["config"] = {
+        "base_url": base_url, "users": users, "duration_s": duration, "ramp_s": ramp,
+        "think_ms": think_ms, "mix": mix, "elapsed_s": round(elapsed, 1),
+    }
+    report["saturation_peaks"] = dict(sorted(peaks.items()))
+    return report
+
+
+# ---------- Spawned server ----------
+def _spawn_server(port: int, workers: int, env_overrides: Dict[str, str]) -> subprocess.Popen:
+    env = {**os.environ, "AI_PROVIDER": "fake", "VECTOR_STORE": "memory", **env_overrides}
+    cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers),
+           "--log-level", "warning"]
+    return subprocess.Popen(cmd, env=env)
+
+
+def _wait_ready(base_url: str, process: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited during startup (code {process.returncode}).")
+        try:
+            if httpx.get(f"{base_url}/api/healthz", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server at {base_url} not ready after {timeout:.0f}s.")
+
+
+def _print(report: Dict[str, Any]) -> None:
+    print(f"{'scenario':<8} {'count':>7} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}  statuses")
+    rows = list(report["scenarios"].items()) + [("ALL", report["overall"])]
+    for name, s in rows:
+        err = "-" if s["error_rate"] is None else f"{s['error_rate']:.1%}"
+        print(f"{name:<8} {s['count']:>7} {s['rps'] or 0:>8.1f} {s['p50_ms'] or 0:>9.1f} {s['p95_ms'] or 0:>9.1f} "
+              f"{s['p99_ms'] or 0:>9.1f} {err:>7}  {s['statuses']}")
+    if report["saturation_peaks"]:
+        print("saturation peaks:")
+        for key, value in report["saturation_peaks"].items():
+            print(f"  {key:<60} {value:g}")
+    else:
+        print("saturation peaks: /metrics not reachable (METRICS_ENABLED=false?)")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=None, help="target app (default: http://localhost:8000)")
+    parser.add_argument("--spawn", action="store_true", help="start uvicorn with the offline stand-ins")
+    parser.add_argument("--port", type=int, default=8765, help="port for --spawn")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for --spawn")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra settings for --spawn, e.g. FAKE_AI_COMPLETION_LATENCY_MS=800")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds at full concurrency")
+    parser.add_argument("--ramp", type=float, default=5.0, help="seconds to start all users")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="mean think time between requests")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="scenario weights, e.g. list=2,create=1")
+    parser.add_argument("--username", default="randy.requestor")
+    parser.add_argument("--manager", default="peter.procurement")
+    parser.add_argument("--password", default="test123")
+    parser.add_argument("--api-key", default=os.environ.get("SHARED_CLIENT_API_KEY"), help="X-Client-Key value")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default=None, help="write the report as JSON")
+    args = parser.parse_args(argv)
+
+    process = None
+    base_url = (args.base_url or "http://localhost:8000").rstrip("/")
+    if args.spawn:
+        base_url = args.base_url or f"http://127.0.0.1:{args.port}"
+        process = _spawn_server(args.port, args.workers, dict(e.split("=", 1) for e in args.env))
+    try:
+        if process is not None:
+            _wait_ready(base_url, process)
+        report = asyncio.run(run_load(
+            base_url, users=args.users, duration=args.duration, ramp=args.ramp, think_ms=args.think_ms,
+            mix=parse_mix(args.mix), username=args.username, manager=args.manager, password=args.password,
+            api_key=args.api_key, seed=args.seed,
+        ))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+    _print(report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"results written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+Generated invoice PDFs with known ground truth, for the text-extraction benchmark.
+
+Kinds:
+- digital:      one page, plain text layer (the common vendor-invoice case)
+- multipage:    4-6 pages of order lines, totals on the last page
+- table_heavy:  ruled grid with many columns, text placed cell by cell
+- scanned_like: a digital invoice rasterized at low DPI; no text layer at all
+
+Every document records the VAT ID and the amounts (in cents) printed on it, so
+extraction quality can be scored as recall. Generation is deterministic for a
+given seed; `write_corpus` saves the files plus `truth.json` for inspection.
+"""
+from __future__ import annotations
+
+import json
+import os
+import random
+from dataclasses import asdict, dataclass, field
+from typing import List, Tuple
+
+import fitz
+
+KINDS = ("digital", "multipage", "table_heavy", "scanned_like")
+
+_VENDORS = (
+    ("Bürobedarf Schulz GmbH", "Hauptstraße 12, 10115 Berlin"),
+    ("DataSoft SE", "Leopoldstraße 250, 80807 München"),
+    ("Printers & Co KG", "Am Sandtorkai 41, 20457 Hamburg"),
+    ("Cloudy Hosting Ltd", "1 Silicon Way, Dublin 2"),
+    ("Möbelwerk Nord GmbH", "Industriestraße 7, 28199 Bremen"),
+)
+_ITEMS = (
+    ("Laptop 14\" business", "pcs"), ("Monitor 27\" IPS", "pcs"), ("Software license (annual)", "seats"),
+    ("Office chair ergonomic", "pcs"), ("Printer toner black", "pcs"), ("Consulting day senior", "days"),
+    ("Cloud storage", "TB"), ("Cleaning service", "hours"), ("Docking station USB-C", "pcs"),
+)
+_PAGE_W, _PAGE_H = fitz.paper_size("a4")
+_MARGIN = 50
+
+
+@dataclass
+class CorpusDoc:
+    name: str
+    kind: str
+    pages: int
+    vat_id: str
+    amounts_cents: List[int] = field(default_factory=list)
+    data: bytes = field(default=b"", repr=False)
+
+
+def _money(cents: int, german: bool) -> str:
+    whole, frac = divmod(cents, 100)
+    if german:
+        return f"{whole:,}".replace(",", ".") + f",{frac:02d} EUR"
+    return f"EUR {whole:,}.{frac:02d}"
+
+
+def _order_lines(rng: random.Random, n: int) -> List[Tuple[str, str, int, int, int]]:
+    lines = []
+    for _ in range(n):
+        description, unit = rng.choice(_ITEMS)
+        quantity = rng.randint(1, 25)
+        unit_cents = rng.randint(5, 2500) * 100 + rng.choice((0, 50, 99))
+        lines.append((description, unit, quantity, unit_cents, quantity * unit_cents))
+    return lines
+
+
+class _Writer:
+    """Top-to-bottom text writer that starts a new page when one is full."""
+
+    def __init__(self, doc: fitz.Document, fontsize: float = 10) -> None:
+        self.doc = doc
+        self.fontsize = fontsize
+        self.page = doc.new_page(width=_PAGE_W, height=_PAGE_H)
+        self.y = _MARGIN
+
+    def line(self, text: str, *, x: float = _MARGIN, bold: bool = False, advance: bool = True) -> None:
+        if self.y > _PAGE_H - _MARGIN:
+            self.page = self.doc.new_page(width=_PAGE_W, height=_PAGE_H)
+            self.y = _MARGIN
+        self.page.insert_text((x, self.y), text, fontsize=self.fontsize, fontname="hebo" if bold else "helv")
+        if advance:
+            self.y += self.fontsize * 1.5
+
+
+def _header(w: _Writer, vendor: Tuple[str, str], vat_id: str, number: str) -> None:
+    w.line(vendor[0], bold=True)
+    w.line(vendor[1])
+    w.line(f"VAT ID: {vat_id}")
+    w.y += 10
+    w.line(f"INVOICE {number}", bold=True)
+    w.line("Bill to: Example Buyer AG, Procurement, Musterweg 1, 60311 Frankfurt")
+    w.y += 10
+
+
+def _totals(w: _Writer, net: int, german: bool) -> List[int]:
+    vat = round(net * 0.19)
+    gross = net + vat
+    w.y += 10
+    w.line(f"Net total: {_money(net, german)}", x=330)
+    w.line(f"VAT 19%: {_money(vat, german)}", x=330)
+    w.line(f"Total due: {_money(gross, german)}", x=330, bold=True)
+    w.line("Payment terms: 30 days net. Thank you for your business.")
+    return [net, vat, gross]
+
+
+def _text_invoice(rng: random.Random, n_lines: int) -> Tuple[bytes, str, List[int], int]:
+    vendor = rng.choice(_VENDORS)
+    vat_id = f"DE{rng.randint(100000000, 999999999)}"
+    german = rng.random() < 0.5
+    lines = _order_lines(rng, n_lines)
+    doc = fitz.open()
+    w = _Writer(doc)
+    _header(w, vendor, vat_id, f"{rng.randint(2024000, 2024999)}")
+    amounts: List[int] = []
+    for pos, (description, unit, quantity, unit_cents, total) in enumerate(lines, start=1):
+        w.line(
+            f"{pos}. {description} - {quantity} {unit} x {_money(unit_cents, german)} = {_money(total, german)}"
+        )
+        amounts += [unit_cents, total]
+    amounts += _totals(w, sum(l[4] for l in lines), german)
+    data, pages = doc.tobytes(garbage=3, deflate=True), doc.page_count
+    doc.close()
+    return data, vat_id, amounts, pages
+
+
+def _table_invoice(rng: random.Random, n_rows: int) -> Tuple[bytes, str, List[int], int]:
+    vendor = rng.choice(_VENDORS)
+    vat_id = f"DE{rng.randint(100000000, 999999999)}"
+    german = rng.random() < 0.5
+    rows = _order_lines(rng, n_rows)
+    doc = fitz.open()
+    w = _Writer(doc, fontsize=8)
+    _header(w, vendor, vat_id, f"{rng.randint(2024000, 2024999)}")
+    columns = (("Pos", 30), ("SKU", 55), ("Description", 150), ("Qty", 35), ("Unit", 40),
+               ("Unit price", 85), ("Disc.", 35), ("Line total", 85))
+    row_h = 16
+    amounts: List[int] = []
+
+    def draw_row(cells: List[str]) -> None:
+        if w.y + row_h > _PAGE_H - _MARGIN:
+            w.page = doc.new_page(width=_PAGE_W, height=_PAGE_H)
+            w.y = _MARGIN
+        x = _MARGIN
+        for (_, width), cell in zip(columns, cells):
+            w.page.draw_rect(fitz.Rect(x, w.y, x + width, w.y + row_h), color=(0, 0, 0), width=0.5)
+            w.page.insert_text((x + 2, w.y + 11), cell, fontsize=7, fontname="helv")
+            x += width
+        w.y += row_h
+
+    draw_row([c for c, _ in columns])
+    for pos, (description, unit, quantity, unit_cents, total) in enumerate(rows, start=1):
+        sku = f"{rng.choice('ABCDEFGH')}{rng.randint(1000, 9999)}"
+        draw_row([str(pos), sku, description[:28], str(quantity), unit, _money(unit_cents, german), "0%",
+                  _money(total, german)])
+        amounts += [unit_cents, total]
+    amounts += _totals(w, sum(r[4] for r in rows), german)
+    data, pages = doc.tobytes(garbage=3, deflate=True), doc.page_count
+    doc.close()
+    return data, vat_id, amounts, pages
+
+
+def _rasterize(data: bytes, dpi: int) -> bytes:
+    """Image-only copy of a PDF (what a scanner or 'print to image' produces)."""
+    src = fitz.open(stream=data, filetype="pdf")
+    out = fitz.open()
+    try:
+        for page in src:
+            pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+            target = out.new_page(width=page.rect.width, height=page.rect.height)
+            target.insert_image(target.rect, stream=pix.tobytes("png"))
+        return out.tobytes(garbage=3, deflate=True)
+    finally:
+        src.close()
+        out.close()
+
+
+def generate(per_kind: int = 5, seed: int = 7) -> List[CorpusDoc]:
+    rng = random.Random(seed)
+    docs: List[CorpusDoc] = []
+    for i in range(per_kind):
+        data, vat, amounts, pages = _text_invoice(rng, rng.randint(3, 8))
+        docs.append(CorpusDoc(f"digital-{i:02d}", "digital", pages, vat, amounts, data))
+
+        data, vat, amounts, pages = _text_invoice(rng, rng.randint(120, 200))
+        docs.append(CorpusDoc(f"multipage-{i:02d}", "multipage", pages, vat, amounts, data))
+
+        data, vat, amounts, pages = _table_invoice(rng, rng.randint(30, 60))
+        docs.append(CorpusDoc(f"table_heavy-{i:02d}", "table_heavy", pages, vat, amounts, data))
+
+        data, vat, amounts, pages = _text_invoice(rng, rng.randint(3, 8))
+        docs.append(CorpusDoc(f"scanned_like-{i:02d}", "scanned_like", pages, vat, amounts, _rasterize(data, 100)))
+    return docs
+
+
+def write_corpus(docs: List[CorpusDoc], directory: str) -> None:
+    os.makedirs(directory, exist_ok=True)
+    truth = []
+    for d in docs:
+        with open(os.path.join(directory, f"{d.name}.pdf"), "wb") as fh:
+            fh.write(d.data)
+        entry = asdict(d)
+        entry.pop("data")
+        truth.append(entry)
+    with open(os.path.join(directory, "truth.json"), "w", encoding="utf-8") as fh:
+        json.dump(truth, fh, indent=2)
@@ -0,0 +1,206 @@
+"""
+Speed, memory and quality benchmark of the local PDF text-extraction engines.
+
+Runs every engine in `text_extraction._ENGINES` over the generated corpus
+(app.benchmarks.pdf_corpus) and reports, per engine and document kind:
+- throughput in pages/s (best of `--repeat` passes per document),
+- peak RSS above the worker's baseline (each engine runs in its own spawned
+  process, so one engine's allocations do not hide another's),
+- VAT ID recall and amount recall against the printed ground truth,
+- extracted characters, which is what `MIN_USEFUL_CHARS` gates on.
+
+It closes with the engine order and `MIN_USEFUL_CHARS` the numbers support:
+engines ranked by recall on text-bearing PDFs, then speed; the threshold must
+sit between the most text any engine "finds" on scanned-like PDFs and the
+least it finds on a real text layer (kept if it already does).
+
+    python -m app.benchmarks.pdf_extraction --per-kind 5 --out pdf-bench.json
+    python -m app.benchmarks.pdf_extraction --write-corpus /tmp/pdf-corpus
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import re
+import resource
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.benchmarks.pdf_corpus import KINDS, CorpusDoc, generate, write_corpus
+
+_AMOUNT = re.compile(r"\d{1,3}(?:[.,]\d{3})*[.,]\d{2}(?!\d)")
+_TEXT_KINDS = tuple(k for k in KINDS if k != "scanned_like")
+
+
+# ---------- Scoring ----------
+def amounts_in(text: str) -> List[int]:
+    """All money-looking numbers in `text`, in cents ('1.234,56' and '1,234.56' alike)."""
+    out = []
+    for match in _AMOUNT.findall(text):
+        digits = re.sub(r"[.,]", "", match[:-3])
+        out.append(int(digits or "0") * 100 + int(match[-2:]))
+    return out
+
+
+def score(doc: CorpusDoc, text: str) -> Tuple[bool, int]:
+    """(VAT ID found, number of expected amounts found)."""
+    vat_found = doc.vat_id in re.sub(r"\s", "", text).upper()
+    remaining: Dict[int, int] = {}
+    for cents in amounts_in(text):
+        remaining[cents] = remaining.get(cents, 0) + 1
+    hits = 0
+    for cents in doc.amounts_cents:
+        if remaining.get(cents):
+            remaining[cents] -= 1
+            hits += 1
+    return vat_found, hits
+
+
+# ---------- Engine worker (runs in a child process) ----------
+def _peak_rss_kb() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # bytes on macOS, KiB on Linux
+
+
+def _run_engine(engine: str, docs: List[CorpusDoc], repeat: int) -> Dict[str, Any]:
+    from app.agents.pdf_extractor import text_extraction
+
+    extract = dict(text_extraction._ENGINES)[engine]
+    baseline_kb = _peak_rss_kb()
+    rows = []
+    for doc in docs:
+        best, text, error = float("inf"), "", None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            try:
+                text = extract(doc.data)
+            except Exception as e:  # engines may choke on odd PDFs; that is a result too
+                error, text = f"{type(e).__name__}: {e}", ""
+            best = min(best, time.perf_counter() - started)
+        vat_found, amount_hits = score(doc, text)
+        rows.append({
+            "doc": doc.name, "kind": doc.kind, "pages": doc.pages, "seconds": best, "chars": len(text),
+            "vat_found": vat_found, "amount_hits": amount_hits, "amounts": len(doc.amounts_cents), "error": error,
+        })
+    return {"engine": engine, "peak_rss_mb": round((_peak_rss_kb() - baseline_kb) / 1024, 1), "docs": rows}
+
+
+def _run_isolated(engine: str, docs: List[CorpusDoc], repeat: int) -> Dict[str, Any]:
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        return pool.apply(_run_engine, (engine, docs, repeat))
+
+
+# ---------- Aggregation ----------
+def _aggregate(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    pages = sum(r["pages"] for r in rows)
+    seconds = sum(r["seconds"] for r in rows)
+    amounts = sum(r["amounts"] for r in rows)
+    return {
+        "docs": len(rows),
+        "pages": pages,
+        "pages_per_s": round(pages / seconds, 1) if seconds else None,
+        "vat_recall": round(sum(r["vat_found"] for r in rows) / len(rows), 3),
+        "amount_recall": round(sum(r["amount_hits"] for r in rows) / amounts, 3) if amounts else None,
+        "chars_min": min(r["chars"] for r in rows),
+        "chars_median": int(statistics.median(r["chars"] for r in rows)),
+        "errors": sum(1 for r in rows if r["error"]),
+    }
+
+
+def recommend(engines: List[Dict[str, Any]], current_threshold: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Engine order and MIN_USEFUL_CHARS supported by the measurements. A current
+    threshold that already separates scanned from text PDFs is kept.
+    """
+    def text_rows(e):
+        return [r for r in e["docs"] if r["kind"] in _TEXT_KINDS]
+
+    ranked = []
+    for e in engines:
+        agg = _aggregate(text_rows(e))
+        quality = ((agg["vat_recall"] or 0) + (agg["amount_recall"] or 0)) / 2
+        ranked.append((round(quality, 2), agg["pages_per_s"] or 0.0, e["engine"]))
+    ranked.sort(reverse=True)
+
+    # Accurate engines only: an engine that misses text should not lower the bar
+    good = [e for e in engines if (_aggregate(text_rows(e))["amount_recall"] or 0) >= 0.95] or engines
+    text_min = min(r["chars"] for e in good for r in text_rows(e))
+    scanned_max = max((r["chars"] for e in engines for r in e["docs"] if r["kind"] == "scanned_like"), default=0)
+    threshold = None
+    if current_threshold is not None and scanned_max < current_threshold <= text_min:
+        threshold = current_threshold
+    elif text_min > scanned_max:
+        threshold = max(scanned_max + 1, (scanned_max + text_min) // 2 // 10 * 10)
+    return {
+        "engine_order": [name for _, _, name in ranked],
+        "min_useful_chars": threshold,
+        "text_chars_min": text_min,
+        "scanned_chars_max": scanned_max,
+    }
+
+
+def run(per_kind: int = 5, repeat: int = 3, seed: int = 7, engines: Optional[List[str]] = None) -> Dict[str, Any]:
+    from app.agents.pdf_extractor import text_extraction
+
+    docs = generate(per_kind, seed)
+    names = engines or [name for name, _ in text_extraction._ENGINES]
+    results = []
+    for name in names:
+        raw = _run_isolated(name, docs, repeat)
+        by_kind = {k: _aggregate([r for r in raw["docs"] if r["kind"] == k]) for k in KINDS}
+        results.append({**raw, "overall": _aggregate(raw["docs"]), "by_kind": by_kind})
+    return {
+        "corpus": {"per_kind": per_kind, "seed": seed, "docs": len(docs), "pages": sum(d.pages for d in docs)},
+        "current": {
+            "engine_order": [name for name, _ in text_extraction._ENGINES],
+            "min_useful_chars": text_extraction.MIN_USEFUL_CHARS,
+        },
+        "engines": results,
+        "recommendation": recommend(results, text_extraction.MIN_USEFUL_CHARS),
+    }
+
+
+def _print(report: Dict[str, Any]) -> None:
+    header = f"{'engine':<11} {'kind':<13} {'pages/s':>9} {'VAT':>6} {'amounts':>8} {'chars min':>10} {'errors':>7}"
+    print(header)
+    for e in report["engines"]:
+        for kind, agg in list(e["by_kind"].items()) + [("ALL", e["overall"])]:
+            amount = "-" if agg["amount_recall"] is None else f"{agg['amount_recall']:.3f}"
+            print(f"{e['engine']:<11} {kind:<13} {agg['pages_per_s'] or 0:>9.1f} {agg['vat_recall']:>6.2f} "
+                  f"{amount:>8} {agg['chars_min']:>10} {agg['errors']:>7}")
+        print(f"{e['engine']:<11} peak RSS +{e['peak_rss_mb']} MB")
+    rec, cur = report["recommendation"], report["current"]
+    print(f"engine order:      current {cur['engine_order']} -> recommended {rec['engine_order']}")
+    print(f"MIN_USEFUL_CHARS: current {cur['min_useful_chars']} -> recommended {rec['min_useful_chars']} "
+          f"(scanned max {rec['scanned_chars_max']}, text min {rec['text_chars_min']})")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--per-kind", type=int, default=5, help="documents per corpus kind")
+    parser.add_argument("--repeat", type=int, default=3, help="passes per document (best time counts)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--engine", action="append", dest="engines", help="only these engines")
+    parser.add_argument("--out", default=None, help="write the full report (per document) as JSON")
+    parser.add_argument("--write-corpus", default=None, metavar="DIR", help="save the PDFs + truth.json and exit")
+    args = parser.parse_args(argv)
+
+    if args.write_corpus:
+        write_corpus(generate(args.per_kind, args.seed), args.write_corpus)
+        print(f"corpus written to {args.write_corpus}")
+        return 0
+    report = run(args.per_kind, args.repeat, args.seed, args.engines)
+    _print(report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"results written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
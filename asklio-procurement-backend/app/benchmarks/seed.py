@@ -0,0 +1,141 @@
+"""
+Deterministic bulk seeding of procurement data for benchmarks.
+
+Uses Core executemany inserts in chunks, so 100k requests (with their order
+lines and audit rows) load in seconds on SQLite and Postgres alike. The same
+`seed` value always produces the same rows.
+"""
+from __future__ import annotations
+
+import json
+import random
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+
+import app.models  # noqa: F401  (registers tables)
+from app.db.base import Base
+from app.models import CommodityGroup, Department, OrderLine, ProcurementRequest, Role, User, UserRole
+from app.models.enums import RequestStatus
+from app.models.procurement_request_update import ProcurementRequestUpdate
+from app.models.search_document import SearchDocument
+from app.services.search_index import document_text
+
+_CHUNK = 5000
+_COMMODITY_GROUPS = Path(__file__).resolve().parents[1] / "db" / "data" / "commodity_groups.json"
+_VENDORS = ("ACME GmbH", "Office AG", "Cloudy Ltd", "Printers & Co", "Bürobedarf KG", "DataSoft SE")
+_ITEMS = (
+    ("Laptop", "pcs", 120000), ("Monitor 27\"", "pcs", 28000), ("Software license", "seats", 4500),
+    ("Office chair", "pcs", 19000), ("Printer toner", "pcs", 6500), ("Consulting day", "days", 95000),
+    ("Cloud storage", "TB", 2300), ("Cleaning service", "hours", 3500),
+)
+
+
+@dataclass
+class SeedInfo:
+    requests: int
+    manager_id: int
+    busiest_user_id: int
+    commodity_group_ids: List[int]
+    request_ids: List[str]  # a random sample for point lookups / updates
+
+
+def _chunks(rows: List[Dict[str, Any]]) -> Iterable[List[Dict[str, Any]]]:
+    for i in range(0, len(rows), _CHUNK):
+        yield rows[i:i + _CHUNK]
+
+
+def _insert(conn, model, rows: List[Dict[str, Any]]) -> None:
+    for chunk in _chunks(rows):
+        conn.execute(insert(model), chunk)
+
+
+def seed(
+    engine: Engine,
+    n_requests: int,
+    *,
+    n_users: int = 50,
+    lines_per_request: int = 3,
+    audit_share: float = 0.2,
+    sample_size: int = 200,
+    seed: int = 42,
+) -> SeedInfo:
+    """Drop and recreate all tables, then insert `n_requests` requests."""
+    rng = random.Random(seed)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    groups = json.loads(_COMMODITY_GROUPS.read_text(encoding="utf-8"))
+    group_ids = [g["id"] for g in groups]
+    departments = [{"id": i + 1, "name": name} for i, name in enumerate(("IT", "HR", "Finance", "Facility", "Sales"))]
+    users = [
+        {
+            "id": i, "firstname": f"User{i}", "lastname": "Bench", "username": f"bench{i}",
+            "hashedPassword": "-", "departmentID": departments[i % len(departments)]["id"],
+        }
+        for i in range(1, n_users + 1)
+    ]
+    # Skewed ownership: user 2 owns ~20% of all requests (the "busy requester")
+    owners = [2] * 2 + list(range(1, n_users + 1))
+
+    started = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    requests, lines, updates, documents, ids = [], [], [], [], []
+    for i in range(n_requests):
+        request_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        ids.append(request_id)
+        total = 0
+        first_line = len(lines)
+        for _ in range(lines_per_request):
+            description, unit, price = rng.choice(_ITEMS)
+            quantity = rng.randint(1, 10)
+            total += price * quantity
+            lines.append({
+                "id": str(uuid.UUID(int=rng.getrandbits(128))), "requestID": request_id,
+                "description": description, "unit": unit, "unitPriceCents": price,
+                "quantity": quantity, "totalPriceCents": price * quantity,
+            })
+        status = rng.choice(list(RequestStatus))
+        vendor = rng.choice(_VENDORS)
+        vat_id = f"DE{rng.randint(100000000, 999999999)}"
+        documents.append({"requestID": request_id, "document": document_text(
+            title=f"Benchmark request {i}", vendor_name=vendor, vat_id=vat_id,
+            descriptions=[line["description"] for line in lines[first_line:]],
+        )})
+        requests.append({
+            "id": request_id, "title": f"Benchmark request {i}", "vendorName": vendor,
+            "vatID": vat_id, "commodityGroupID": rng.choice(group_ids),
+            "commodityGroupConfidence": round(rng.random(), 3), "commodityGroupSource": "knn",
+            "totalCosts": total, "status": status, "createdByUserID": rng.choice(owners),
+            "shippingCents": 0, "taxCents": 0, "discountCents": 0,
+            "created_at": started + timedelta(seconds=i), "version": 1,
+        })
+        if rng.random() < audit_share:
+            updates.append({
+                "id": str(uuid.UUID(int=rng.getrandbits(128))), "requestID": request_id, "updatedByUserID": 1,
+                "oldStatus": RequestStatus.OPEN, "newStatus": status,
+                "updated_at": started + timedelta(seconds=i, minutes=5),
+            })
+
+    with engine.begin() as conn:
+        _insert(conn, Department, departments)
+        _insert(conn, Role, [{"id": 1, "name": "Manager"}, {"id": 2, "name": "Requestor"}])
+        _insert(conn, CommodityGroup, groups)
+        _insert(conn, User, users)
+        _insert(conn, UserRole, [{"user_id": 1, "role_id": 1}] + [{"user_id": u["id"], "role_id": 2} for u in users])
+        _insert(conn, ProcurementRequest, requests)
+        _insert(conn, OrderLine, lines)
+        _insert(conn, ProcurementRequestUpdate, updates)
+        _insert(conn, SearchDocument, documents)
+
+    return SeedInfo(
+        requests=n_requests,
+        manager_id=1,
+        busiest_user_id=2,
+        commodity_group_ids=group_ids,
+        request_ids=rng.sample(ids, min(sample_size, len(ids))),
+    )
@@ -0,0 +1,132 @@
+"""
+Per-row cost of turning service results into a JSON response body.
+
+Compares, for list (lite) and detail DTOs:
+- fastapi:    what a route with `response_model` does with returned DTOs
+              (fastapi.routing.serialize_response: dump, validate again,
+              dump to JSON-compatible Python; then JSONResponse.render)
+- preencoded: app.core.json_response.encode (one pydantic-core dump_json)
+
+plus the shared mapping step (ORM row -> DTO, app.services.mappers), so the
+end-to-end per-row cost before and after is mapping + serialization. Rows come
+from a seeded temporary SQLite database and are loaded once (untimed). For
+sync routes FastAPI also moves the re-validation to the threadpool; that hop
+is not included here.
+
+    python -m app.benchmarks.serialization --sizes 100,1000,10000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.benchmarks.seed import seed
+from app.core.json_response import encode
+from app.models.procurement_request import ProcurementRequest
+from app.schemas.procurement import ProcurementRequestLiteOut, ProcurementRequestOut
+from app.services import mappers
+from app.services import procurement_service as svc
+
+
+def _median_ms(fn: Callable[[], Any], repeat: int) -> float:
+    fn()  # warm-up (adapter/validator construction, caches)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def _fastapi_body(loop: asyncio.AbstractEventLoop, field, content: Any) -> bytes:
+    serialized = loop.run_until_complete(serialize_response(field=field, response_content=content, is_coroutine=True))
+    return JSONResponse(serialized).body
+
+
+def _measure(label: str, rows: List[Any], to_dto: Callable[[Any], Any], response_type: Any,
+             loop: asyncio.AbstractEventLoop, repeat: int) -> Dict[str, Any]:
+    field = create_model_field(name=f"Response_{label}", type_=response_type, mode="serialization")
+    dtos = [to_dto(r) for r in rows]
+    if json.loads(_fastapi_body(loop, field, dtos)) != json.loads(encode(dtos, response_type)):
+        raise AssertionError(f"{label}: pre-encoded body differs from FastAPI's")
+
+    mapping = _median_ms(lambda: [to_dto(r) for r in rows], repeat)
+    fastapi_ms = _median_ms(lambda: _fastapi_body(loop, field, dtos), repeat)
+    preencoded_ms = _median_ms(lambda: encode(dtos, response_type), repeat)
+
+    def per_row_us(ms: float) -> float:
+        return round(ms * 1000 / len(rows), 2)
+
+    return {
+        "case": label,
+        "rows": len(rows),
+        "mapping_us_per_row": per_row_us(mapping),
+        "fastapi_us_per_row": per_row_us(fastapi_ms),
+        "preencoded_us_per_row": per_row_us(preencoded_ms),
+        "before_us_per_row": per_row_us(mapping + fastapi_ms),
+        "after_us_per_row": per_row_us(mapping + preencoded_ms),
+        "speedup": round((mapping + fastapi_ms) / (mapping + preencoded_ms), 2),
+    }
+
+
+def run(sizes: List[int], repeat: int = 7, log: Callable[[str], None] = lambda _msg: None) -> Dict[str, Any]:
+    results = []
+    loop = asyncio.new_event_loop()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        try:
+            for size in sizes:
+                info = seed(engine, size)
+                with Session(engine) as db:
+                    rows = svc._base_query_with_common_joins(db).order_by(ProcurementRequest.created_at.desc()).all()
+                    details = [
+                        (svc._load_request_with_details(db, rid), svc._load_audit_trail(db, rid))
+                        for rid in info.request_ids[:min(size, 100)]
+                    ]
+                    for result in (
+                        _measure("lite", rows, mappers.to_lite_out, List[ProcurementRequestLiteOut], loop, repeat),
+                        _measure("detail", details, lambda d: mappers.to_detail_out(*d), List[ProcurementRequestOut],
+                                 loop, repeat),
+                    ):
+                        results.append(result)
+                        log(f"{result['case']:<7} rows={result['rows']:<7} mapping {result['mapping_us_per_row']:>7.2f}"
+                            f"  fastapi {result['fastapi_us_per_row']:>7.2f}  preencoded "
+                            f"{result['preencoded_us_per_row']:>6.2f}  us/row  -> end-to-end "
+                            f"{result['before_us_per_row']:.2f} -> {result['after_us_per_row']:.2f} us/row "
+                            f"(x{result['speedup']})")
+        finally:
+            engine.dispose()
+            loop.close()
+    return {"results": results}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,1000,10000", help="comma-separated request counts")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--out", default=None, help="write results JSON here")
+    args = parser.parse_args(argv)
+
+    report = run([int(s) for s in args.sizes.split(",") if s.strip()], args.repeat, log=print)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"results written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
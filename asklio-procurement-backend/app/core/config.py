@@ -1,6 +1,19 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import Literal
 
+def async_driver_uri(uri: str) -> str:
+    """Same database URL with the asyncio driver SQLAlchemy should use for it."""
+    for sync_prefix, async_prefix in (
+        ("postgresql://", "postgresql+psycopg://"),
+        ("postgresql+psycopg2://", "postgresql+psycopg://"),
+        ("sqlite://", "sqlite+aiosqlite://"),
+        ("sqlite+pysqlite://", "sqlite+aiosqlite://"),
+    ):
+        if uri.startswith(sync_prefix):
+            return async_prefix + uri[len(sync_prefix):]
+    return uri  # postgresql+psycopg picks its async variant in create_async_engine
+
+
 class Settings(BaseSettings):
     APP_NAME: str = "askLio Procurement API"
     API_PREFIX: str = "/api"
@@ -13,6 +26,17 @@ class Settings(BaseSettings):
     POSTGRES_PORT: int = 5432
     SQLALCHEMY_DATABASE_URI: str | None = None
 
+    # --- Database pool / read routing ---
+    # Sizing applies per engine and per worker process (primary, replica, and their async twins)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0  # wait for a free connection before failing the request
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # -1 keeps connections forever
+    DB_STATEMENT_TIMEOUT_MS: int = 0  # Postgres statement_timeout per connection; 0 disables
+    # Optional read replica: GET/HEAD requests use it unless the user wrote recently
+    DB_REPLICA_URI: str | None = None
+    DB_READ_YOUR_WRITES_SECONDS: float = 5.0  # keep a user's reads on the primary this long after a write
+
     # --- Weaviate ---
     WEAVIATE_HTTP_HOST: str = "weaviate"
     WEAVIATE_HTTP_PORT: int = 8080
@@ -24,9 +48,137 @@ class Settings(BaseSettings):
     # --- Auth ---
     SECRET_KEY: str = "dev-secret"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    # Token for GET /procurement/events?token=... (EventSource can't send an Authorization header);
+    # only checked when the stream connects, a reconnect needs a fresh one
+    EVENTS_TOKEN_EXPIRE_MINUTES: int = 2
     
     OPENAI_API_KEY: str | None = None
     SHARED_CLIENT_API_KEY: str | None = None
+    AI_REQUEST_TIMEOUT_SECONDS: float = 60.0  # per completion attempt, when no agent budget applies
+    AI_EMBED_TIMEOUT_SECONDS: float = 10.0  # per embedding attempt
+    AI_RETRY_ATTEMPTS: int = 3  # transient errors only (timeouts, 429, 5xx)
+    AI_RETRY_MAX_WAIT_SECONDS: float = 4.0
+    AI_BREAKER_FAILURE_THRESHOLD: int = 5  # consecutive transient failures
+    AI_BREAKER_RESET_SECONDS: float = 30.0
+    # Hedging of latency-critical calls (embed, classifier scoring) after the observed p95
+    AI_HEDGE_ENABLED: bool = True
+    AI_HEDGE_QUANTILE: float = 0.95
+    AI_HEDGE_MIN_SAMPLES: int = 20
+    # Client-side rate limiting per model; defaults apply until the provider's
+    # x-ratelimit-* headers arrive
+    AI_RATE_LIMIT_ENABLED: bool = True
+    AI_RATE_LIMIT_DEFAULT_RPM: int = 500
+    AI_RATE_LIMIT_DEFAULT_TPM: int = 200_000
+    AI_RATE_LIMIT_MAX_WAIT_SECONDS: float = 10.0  # longer expected waits are rejected up front
+    AI_RATE_LIMIT_MAX_QUEUE: int = 64  # waiting callers per model
+
+    # --- Agent time budgets (whole run; each stage gets the remaining time) ---
+    CLASSIFIER_TIMEOUT_SECONDS: float = 20.0
+    PDF_EXTRACTION_TIMEOUT_SECONDS: float = 90.0
+
+    # --- Commodity classifier ---
+    # Nearest-neighbour vote: answer from manually or LLM-labelled history without an LLM call.
+    # Off until validated against manager overrides (classifier_overrides_total, path=knn). Its
+    # confidence (vote share x mean similarity) is a heuristic score, not on the LLM's scale.
+    CLASSIFIER_KNN_ENABLED: bool = False
+    CLASSIFIER_KNN_TOP_K: int = 5
+    CLASSIFIER_KNN_MIN_SIMILARITY: float = 0.90  # cosine similarity per neighbour
+    CLASSIFIER_KNN_MIN_VOTES: int = 3  # agreeing neighbours required
+    CLASSIFIER_KNN_VOTE_SHARE: float = 0.80  # similarity-weighted share of the winner
+    CLASSIFIER_KNN_MAX_CONFIDENCE: float = 0.95
+    # Candidate pruning: send only the groups closest to the request to the scoring prompt.
+    # Off until the audit (classifier_prune_audit_total, agree=true|false) shows no accuracy loss.
+    CLASSIFIER_CANDIDATE_MODE: Literal["full", "pruned"] = "full"
+    CLASSIFIER_PRUNE_TOP_K: int = 12
+    CLASSIFIER_PRUNE_MIN_SIMILARITY: float = 0.20  # below this, score the full list
+    CLASSIFIER_PRUNE_AUDIT_RATE: float = 0.05  # share of pruned requests re-scored on the full list, in the background
+    # Re-rank gate: skip the second LLM call when the first pass is decisive (set > 1 to always re-rank)
+    CLASSIFIER_RERANK_SKIP_MARGIN: float = 0.50  # top score minus runner-up
+    CLASSIFIER_RERANK_SKIP_TOP_SCORE: float = 0.90
+
+    # sync: classify before POST /procurement returns.
+    # deferred: persist with a heuristic provisional group, classify in a background worker.
+    CLASSIFICATION_MODE: Literal["sync", "deferred"] = "sync"
+    CLASSIFICATION_WORKERS: int = 4
+
+    # --- Duplicate submissions (checked before classification) ---
+    # reuse: store it, but copy the earlier request's classification instead of running the pipeline;
+    # reject: 409 referencing the earlier request (client may retry with allowDuplicate=true) --
+    # asklio-portal has no confirm-and-retry for that yet, so repeat orders would fail from the UI
+    DUPLICATE_CHECK_MODE: Literal["off", "reject", "reuse"] = "reuse"
+    DUPLICATE_WINDOW_DAYS: int = 30  # only earlier requests created within this window count
+    # Also treat the nearest indexed request as a duplicate if it has the same VAT id and at least
+    # this cosine similarity (0 = exact fingerprint only; costs an embedding in deferred mode)
+    DUPLICATE_VECTOR_MIN_SIMILARITY: float = 0.0
+
+    # --- Bulk import ---
+    BULK_CREATE_MAX_ITEMS: int = 500
+    BULK_CLASSIFY_CONCURRENCY: int = 8  # parallel classifier runs per bulk request
+
+    # --- API responses ---
+    # preencoded: routes serialize their DTOs to JSON once (app.core.json_response);
+    # fastapi: return the DTOs and let response_model validate and serialize them again
+    RESPONSE_SERIALIZATION: Literal["fastapi", "preencoded"] = "preencoded"
+
+    # --- List views ---
+    # projection: select only the list columns with explicit joins and map rows to DTOs;
+    # orm: load full entities with joinedload and map those (kept for A/B comparison)
+    LIST_QUERY_MODE: Literal["orm", "projection"] = "projection"
+
+    # --- Export (GET /procurement/export) ---
+    EXPORT_BATCH_ROWS: int = 2000  # rows per server-side cursor fetch; one response chunk each
+
+    # --- Similar requests ---
+    # Request-text embeddings kept per process (LRU, 0 = off), so a draft checked via
+    # POST /procurement/similar and then submitted is embedded once
+    EMBEDDING_CACHE_SIZE: int = 256
+
+    # --- Search ---
+    # Rank only the N most recent matches of a query (0 = all). Ranking reads every candidate,
+    # so broad queries ("laptop") would otherwise cost time proportional to the whole table
+    SEARCH_RANK_WINDOW: int = 2000
+
+    # --- Metrics ---
+    METRICS_ENABLED: bool = True  # GET /metrics (Prometheus text format) + HTTP middleware
+    # Shared directory for per-worker snapshots when running several uvicorn workers;
+    # wipe it on deploy (exited workers' counters are kept for aggregation)
+    METRICS_MULTIPROC_DIR: str | None = None
+    METRICS_FLUSH_SECONDS: float = 5.0
+
+    # --- Tracing ---
+    # none: spans are not recorded; file: OTLP/JSON lines; otlp: POST to an OTLP/HTTP collector
+    TRACING_EXPORTER: Literal["none", "file", "otlp"] = "none"
+    TRACING_FILE_PATH: str = "traces.jsonl"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACING_SAMPLE_RATE: float = 1.0  # share of new (root) traces recorded
+
+    # --- SQL query tracking ---
+    # Per-request statement counts (X-DB-Query-Count header) and N+1 warnings in the log
+    SQL_QUERY_TRACKING_ENABLED: bool = False
+    SQL_QUERY_WARN_COUNT: int = 20
+    SQL_QUERY_WARN_MS: float = 250.0
+    SQL_QUERY_REPEAT_THRESHOLD: int = 5  # same statement this often in one request = likely N+1
+
+    # --- Offline stand-ins (load tests, local runs without keys/containers) ---
+    AI_PROVIDER: Literal["openai", "fake"] = "openai"  # fake: app.ai.fake.FakeAIClient
+    VECTOR_STORE: Literal["weaviate", "memory"] = "weaviate"  # memory: in-process, lost on restart
+    FAKE_AI_LATENCY_DISTRIBUTION: Literal["fixed", "uniform", "lognormal"] = "lognormal"
+    FAKE_AI_EMBED_LATENCY_MS: float = 150.0  # median
+    FAKE_AI_COMPLETION_LATENCY_MS: float = 2500.0  # median
+    FAKE_AI_LATENCY_SIGMA: float = 0.5  # lognormal shape / uniform relative spread
+    FAKE_AI_ERROR_RATE: float = 0.0  # share of calls failing with a retryable 500
+    FAKE_AI_EMBEDDING_DIMS: int = 256
+
+    # --- AI record/replay (app.ai.cassette) ---
+    AI_CASSETTE_MODE: Literal["off", "record", "replay", "auto"] = "off"
+    AI_CASSETTE_PATH: str = "ai-cassette.jsonl"  # ".gz" suffix: gzip; one recording process at a time
+    AI_CASSETTE_REPLAY_LATENCY: bool = False  # sleep the recorded latency on replay
+
+    # --- Async DB path ---
+    # Serve /procurement from the async service (AsyncSession; psycopg async / aiosqlite).
+    # The sync routers and service stay in place while the migration is in progress.
+    DB_ASYNC_ROUTES: bool = False
+    ASYNC_BLOCKING_CALL_THREADS: int = 64  # threads for AI / Weaviate calls made by async routes
 
     # --- Environment / boot flags ---
     ENV: Literal["local", "dev", "prod"] = "local"
@@ -43,6 +195,15 @@ class Settings(BaseSettings):
             f"@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
         )
 
+    @property
+    def async_database_uri(self) -> str:
+        """`database_uri` with an asyncio driver (psycopg async for Postgres, aiosqlite for SQLite)."""
+        return async_driver_uri(self.database_uri)
+
+    @property
+    def async_replica_uri(self) -> str | None:
+        return async_driver_uri(self.DB_REPLICA_URI) if self.DB_REPLICA_URI else None
+
     @property
     def should_seed(self) -> bool:
         # Default: seed only in local unless explicitly overridden
@@ -0,0 +1,91 @@
+"""
+ASGI middleware recording per-route latency and status counts.
+
+Routes are labelled by their template (`/api/procurement/{request_id}`), not
+the raw path, so label cardinality stays bounded. It also samples the anyio
+threadpool that runs sync endpoints, which is where requests queue up when
+blocking handlers saturate it. `start_loop_lag_monitor` reports how late the
+event loop wakes up, i.e. blocking work done on the loop itself.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+import anyio.to_thread
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics
+
+_LATENCY = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by method and route template",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+_REQUESTS = metrics.counter("http_requests_total", "HTTP requests by method, route template and status")
+_IN_FLIGHT = metrics.gauge("http_requests_in_flight", "HTTP requests being processed")
+_THREADPOOL_BUSY = metrics.gauge("threadpool_busy_threads", "Threads in use by the sync-endpoint threadpool")
+_THREADPOOL_WAITING = metrics.gauge("threadpool_waiting_tasks", "Tasks queued for a sync-endpoint thread")
+_THREADPOOL_SIZE = metrics.gauge("threadpool_max_threads", "Size limit of the sync-endpoint threadpool")
+_LOOP_LAG = metrics.gauge("event_loop_lag_seconds", "Worst event-loop wake-up delay over the last second")
+
+_lag_task: Optional[asyncio.Task] = None
+
+
+def _sample_threadpool() -> None:
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    _THREADPOOL_BUSY.set(limiter.borrowed_tokens)
+    _THREADPOOL_WAITING.set(limiter.statistics().tasks_waiting)
+    _THREADPOOL_SIZE.set(limiter.total_tokens)
+
+
+async def _monitor_loop_lag(interval: float) -> None:
+    recent: Deque[Tuple[float, float]] = deque()
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        now = time.perf_counter()
+        recent.append((now, max(0.0, now - started - interval)))
+        while recent[0][0] < now - 1.0:
+            recent.popleft()
+        _LOOP_LAG.set(max(lag for _, lag in recent))
+
+
+def start_loop_lag_monitor(interval: float = 0.1) -> None:
+    """Start sampling event-loop lag; call from startup, on the loop thread."""
+    global _lag_task
+    if _lag_task is None or _lag_task.done():
+        _lag_task = asyncio.get_running_loop().create_task(_monitor_loop_lag(interval))
+
+
+class HTTPMetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        _IN_FLIGHT.inc()
+        _sample_threadpool()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _IN_FLIGHT.dec()
+            _sample_threadpool()
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            _LATENCY.observe(time.perf_counter() - started, method=method, route=template)
+            _REQUESTS.inc(method=method, route=template, status=status_code)
@@ -0,0 +1,68 @@
+"""
+ASGI middleware counting the SQL statements each HTTP request runs.
+
+Adds `X-DB-Query-Count` / `X-DB-Time-Ms` response headers and logs a warning
+for requests over SQL_QUERY_WARN_COUNT / SQL_QUERY_WARN_MS, or that execute
+one statement SQL_QUERY_REPEAT_THRESHOLD times or more (a likely N+1: a lazy
+relationship loaded per row). Headers reflect the queries run before the
+response started; the log line covers the whole request.
+"""
+from __future__ import annotations
+
+import logging
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics
+from app.db.query_counter import track_queries
+
+logger = logging.getLogger(__name__)
+
+_QUERIES = metrics.histogram(
+    "http_request_db_queries", "SQL statements per HTTP request by route template",
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250),
+)
+_N_PLUS_ONE = metrics.counter("http_request_n_plus_one_total", "Requests with repeated identical SQL statements, by route")
+
+
+class QueryCountMiddleware:
+    def __init__(self, app: ASGIApp, *, warn_count: int, warn_ms: float, repeat_threshold: int) -> None:
+        self.app = app
+        self.warn_count = warn_count
+        self.warn_ms = warn_ms
+        self.repeat_threshold = repeat_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers["X-DB-Query-Count"] = str(stats.count)
+                    headers["X-DB-Time-Ms"] = f"{stats.seconds * 1000:.1f}"
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                self._report(scope, stats)
+
+    def _report(self, scope: Scope, stats) -> None:
+        template = getattr(scope.get("route"), "path", None) or "unmatched"
+        method = scope.get("method", "")
+        _QUERIES.observe(stats.count, method=method, route=template)
+        repeated = stats.repeated(self.repeat_threshold)
+        if repeated:
+            _N_PLUS_ONE.inc(method=method, route=template)
+        elapsed_ms = stats.seconds * 1000
+        if not repeated and stats.count < self.warn_count and elapsed_ms < self.warn_ms:
+            return
+        logger.warning(
+            "%s %s ran %d SQL statements (%.1f ms)%s",
+            method, template, stats.count, elapsed_ms,
+            "".join(f"\n  possible N+1: {n}x {sql}" for sql, n in repeated),
+        )
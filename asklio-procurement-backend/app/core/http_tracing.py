@@ -0,0 +1,54 @@
+"""
+ASGI middleware opening a server span per HTTP request.
+
+Continues an incoming W3C `traceparent` and echoes the request's own
+`traceparent` in the response, so a client (or a log line) can be matched to
+the exported trace.
+"""
+from __future__ import annotations
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import tracing
+
+
+class TracingMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        parent = tracing.parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1") or None)
+        method = scope.get("method", "")
+        sp = tracing.start_span(
+            f"{method} {scope.get('path', '')}",
+            kind=tracing.SPAN_KIND_SERVER,
+            parent=parent,
+            **{"http.request.method": method, "url.path": scope.get("path", "")},
+        )
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                sp.set_attribute("http.response.status_code", message["status"])
+                if message["status"] >= 500:
+                    sp.status_error = True
+                MutableHeaders(scope=message).append("traceparent", tracing.traceparent(sp))
+            await send(message)
+
+        try:
+            with tracing.activate(sp):
+                await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            sp.set_error(e)
+            raise
+        finally:
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                sp.name = f"{method} {route}"
+                sp.set_attribute("http.route", route)
+            sp.end()
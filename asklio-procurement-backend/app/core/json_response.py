@@ -0,0 +1,47 @@
+"""
+Pre-encoded JSON responses for routes that return service DTOs.
+
+With `response_model`, FastAPI handles a returned DTO by dumping it to a dict,
+validating that dict against the model again, dumping the result to
+JSON-compatible Python and finally running json.dumps. The services already
+build validated DTOs (app.services.mappers), so `json_response` serializes
+them once, straight to bytes with pydantic-core, and returns a Response,
+which FastAPI passes through untouched. Routes keep their `response_model`
+for the OpenAPI schema.
+
+RESPONSE_SERIALIZATION=fastapi returns the DTOs unchanged (the old path).
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from app.core.config import settings
+
+
+class PreEncodedJSONResponse(Response):
+    """JSON response whose body is already encoded."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return content
+
+
+@lru_cache(maxsize=64)
+def _adapter(response_type: Any) -> TypeAdapter:
+    return TypeAdapter(response_type)
+
+
+def encode(content: Any, response_type: Any) -> bytes:
+    """`content` as JSON bytes, serialized as `response_type` (same output as FastAPI's)."""
+    return _adapter(response_type).dump_json(content, by_alias=True)
+
+
+def json_response(content: Any, response_type: Any, status_code: int = 200) -> Any:
+    if settings.RESPONSE_SERIALIZATION != "preencoded":
+        return content
+    return PreEncodedJSONResponse(encode(content, response_type), status_code=status_code)
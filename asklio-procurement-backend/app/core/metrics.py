@@ -0,0 +1,224 @@
+"""
+Lightweight in-process metrics: counters, gauges and histograms.
+
+Metrics are registered once (get-or-create by name) and updated with label
+keyword arguments, e.g.:
+
+    DECISIONS = counter("classifier_decisions_total", "Classifier decisions by path")
+    DECISIONS.inc(path="knn")
+
+Updates take a short per-metric lock, so they are safe to call from request
+threads and background workers.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class _Metric:
+    kind: str = "untyped"
+
+    def __init__(self, name: str, help: str = "") -> None:
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set."""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str = "") -> None:
+        super().__init__(name, help)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0.0)
+
+    def samples(self) -> Dict[LabelKey, float]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Gauge(_Metric):
+    """Point-in-time value per label set."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str = "") -> None:
+        super().__init__(name, help)
+        self._values: Dict[LabelKey, float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0.0)
+
+    def samples(self) -> Dict[LabelKey, float]:
+        with self._lock:
+            return dict(self._values)
+
+
+class _HistogramState:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, n_buckets: int) -> None:
+        self.counts: List[int] = [0] * (n_buckets + 1)  # last slot = +Inf
+        self.sum: float = 0.0
+        self.count: int = 0
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram (Prometheus semantics) per label set."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str = "", buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, help)
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        self._states: Dict[LabelKey, _HistogramState] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = _HistogramState(len(self.buckets))
+            state.counts[idx] += 1
+            state.sum += value
+            state.count += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the wall time of the wrapped block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            state = self._states.get(_label_key(labels))
+            return state.count if state else 0
+
+    def samples(self) -> Dict[LabelKey, Tuple[List[int], float, int]]:
+        with self._lock:
+            return {k: (list(s.counts), s.sum, s.count) for k, s in self._states.items()}
+
+
+class MetricsRegistry:
+    """Process-wide, get-or-create registry of named metrics."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help: str, **kwargs) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(name)
+            if existing is not None:
+                if not isinstance(existing, cls):
+                    raise ValueError(f"Metric {name!r} already registered as {existing.kind}")
+                return existing
+            metric = cls(name, help, **kwargs)
+            self._metrics[name] = metric
+            return metric
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        return self._get_or_create(Counter, name, help)  # type: ignore[return-value]
+
+    def gauge(self, name: str, help: str = "") -> Gauge:
+        return self._get_or_create(Gauge, name, help)  # type: ignore[return-value]
+
+    def histogram(self, name: str, help: str = "", buckets: Optional[Sequence[float]] = None) -> Histogram:
+        return self._get_or_create(
+            Histogram, name, help, buckets=tuple(buckets or DEFAULT_BUCKETS)
+        )  # type: ignore[return-value]
+
+    def register_collector(self, fn: Callable[[], None]) -> None:
+        """
+        Register a callback that refreshes gauges right before collection
+        (pool sizes, queue depths): cheaper than updating them on every change.
+        """
+        with self._lock:
+            self._collectors.append(fn)
+
+    def collect(self) -> List[_Metric]:
+        with self._lock:
+            collectors = list(self._collectors)
+        for fn in collectors:
+            try:
+                fn()
+            except Exception:
+                logger.exception("Metrics collector %r failed", fn)
+        with self._lock:
+            return list(self._metrics.values())
+
+
+REGISTRY = MetricsRegistry()
+
+
+def counter(name: str, help: str = "") -> Counter:
+    return REGISTRY.counter(name, help)
+
+
+def gauge(name: str, help: str = "") -> Gauge:
+    return REGISTRY.gauge(name, help)
+
+
+def histogram(name: str, help: str = "", buckets: Optional[Sequence[float]] = None) -> Histogram:
+    return REGISTRY.histogram(name, help, buckets)
+
+
+def register_collector(fn: Callable[[], None]) -> None:
+    REGISTRY.register_collector(fn)
+
+
+_EXECUTOR_QUEUE = gauge("executor_queue_depth", "Tasks waiting in a background executor, by executor")
+_EXECUTOR_THREADS = gauge("executor_threads", "Threads started by a background executor, by executor")
+
+
+def track_executor(name: str, get_executor: Callable[[], Optional[object]]) -> None:
+    """Report queue depth/threads of a ThreadPoolExecutor (looked up lazily; may be None)."""
+    def _collect() -> None:
+        executor = get_executor()
+        queue = getattr(executor, "_work_queue", None)
+        _EXECUTOR_QUEUE.set(queue.qsize() if queue is not None else 0, executor=name)
+        _EXECUTOR_THREADS.set(len(getattr(executor, "_threads", ()) or ()), executor=name)
+
+    register_collector(_collect)
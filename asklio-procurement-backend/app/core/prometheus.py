@@ -0,0 +1,203 @@
+"""
+Prometheus text exposition for app.core.metrics, with multiprocess aggregation.
+
+Single process: `render()` formats the live registry.
+
+Several uvicorn workers (METRICS_MULTIPROC_DIR set): every worker writes a
+JSON snapshot of its registry to `<dir>/metrics-<pid>.json` every
+METRICS_FLUSH_SECONDS (and right before it serves /metrics). The worker that
+answers the scrape merges all snapshots:
+- counters and histograms are summed, including those of exited workers, so
+  totals never go backwards when a worker restarts;
+- gauges get a `pid` label and are dropped once their worker is gone.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.metrics import REGISTRY, Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_writer: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+
+# ---------- Snapshots ----------
+def snapshot() -> Dict[str, Any]:
+    """JSON-serializable view of the registry for this process."""
+    out: List[Dict[str, Any]] = []
+    for metric in REGISTRY.collect():
+        entry: Dict[str, Any] = {"name": metric.name, "kind": metric.kind, "help": metric.help}
+        if isinstance(metric, Histogram):
+            entry["buckets"] = list(metric.buckets)
+            entry["samples"] = [[list(map(list, k)), v] for k, v in metric.samples().items()]
+        elif isinstance(metric, (Counter, Gauge)):
+            entry["samples"] = [[list(map(list, k)), v] for k, v in metric.samples().items()]
+        else:
+            continue
+        out.append(entry)
+    return {"pid": os.getpid(), "metrics": out}
+
+
+def _snapshot_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"metrics-{pid}.json")
+
+
+def write_snapshot(directory: str) -> None:
+    """Atomically replace this process's snapshot file."""
+    os.makedirs(directory, exist_ok=True)
+    path = _snapshot_path(directory, os.getpid())
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(snapshot(), fh, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def read_snapshots(directory: str) -> List[Dict[str, Any]]:
+    snapshots = []
+    for name in sorted(os.listdir(directory)):
+        if not (name.startswith("metrics-") and name.endswith(".json")):
+            continue
+        try:
+            with open(os.path.join(directory, name), encoding="utf-8") as fh:
+                snap = json.load(fh)
+        except (OSError, ValueError) as e:
+            logger.warning("Skipping unreadable metrics snapshot %s: %s", name, e)
+            continue
+        snap["alive"] = _pid_alive(int(snap.get("pid", 0)))
+        snapshots.append(snap)
+    return snapshots
+
+
+def start_snapshot_writer(directory: str, interval: float) -> None:
+    """Background thread flushing this worker's snapshot; idempotent."""
+    global _writer
+    if _writer is not None:
+        return
+    _stop.clear()
+
+    def loop() -> None:
+        while not _stop.wait(interval):
+            try:
+                write_snapshot(directory)
+            except Exception:
+                logger.exception("Writing metrics snapshot failed")
+
+    _writer = threading.Thread(target=loop, name="metrics-writer", daemon=True)
+    _writer.start()
+
+
+def stop_snapshot_writer(directory: Optional[str]) -> None:
+    global _writer
+    _stop.set()
+    _writer = None
+    if directory:
+        try:
+            write_snapshot(directory)  # keep final counter values for aggregation
+        except Exception:
+            logger.exception("Final metrics snapshot failed")
+
+
+# ---------- Merge & render ----------
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _merge(snapshots: Iterable[Dict[str, Any]], tag_gauges_with_pid: bool) -> Dict[str, Dict[str, Any]]:
+    merged: Dict[str, Dict[str, Any]] = {}
+    for snap in snapshots:
+        for m in snap["metrics"]:
+            kind = m["kind"]
+            if kind == "gauge" and not snap.get("alive", True):
+                continue
+            target = merged.setdefault(
+                m["name"],
+                {"kind": kind, "help": m["help"], "buckets": m.get("buckets"), "samples": {}},
+            )
+            if target["kind"] != kind:
+                continue
+            for raw_labels, value in m["samples"]:
+                labels: Labels = tuple((k, v) for k, v in raw_labels)
+                if kind == "gauge":
+                    if tag_gauges_with_pid:
+                        labels = tuple(sorted(labels + (("pid", str(snap["pid"])),)))
+                    target["samples"][labels] = value
+                elif kind == "counter":
+                    target["samples"][labels] = target["samples"].get(labels, 0.0) + value
+                elif kind == "histogram":
+                    if target["buckets"] != m.get("buckets"):
+                        continue  # bucket layout changed between deploys
+                    counts, total, count = value
+                    prev = target["samples"].get(labels)
+                    if prev is None:
+                        target["samples"][labels] = [list(counts), total, count]
+                    else:
+                        prev[0] = [a + b for a, b in zip(prev[0], counts)]
+                        prev[1] += total
+                        prev[2] += count
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in items) + "}"
+
+
+def _fmt_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _render(merged: Dict[str, Dict[str, Any]]) -> str:
+    lines: List[str] = []
+    for name in sorted(merged):
+        m = merged[name]
+        lines.append(f"# HELP {name} {_escape(m['help'])}")
+        lines.append(f"# TYPE {name} {m['kind']}")
+        for labels, value in sorted(m["samples"].items()):
+            if m["kind"] == "histogram":
+                counts, total, count = value
+                cumulative = 0
+                for bound, n in zip(list(m["buckets"]) + [math.inf], counts):
+                    cumulative += n
+                    le = "+Inf" if math.isinf(bound) else _fmt_value(bound)
+                    lines.append(f"{name}_bucket{_fmt_labels(labels, ('le', le))} {cumulative}")
+                lines.append(f"{name}_sum{_fmt_labels(labels)} {_fmt_value(total)}")
+                lines.append(f"{name}_count{_fmt_labels(labels)} {count}")
+            else:
+                lines.append(f"{name}{_fmt_labels(labels)} {_fmt_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def render(multiproc_dir: Optional[str] = None) -> str:
+    """Exposition text for this process, or merged across workers if a directory is given."""
+    if not multiproc_dir:
+        return _render(_merge([snapshot()], tag_gauges_with_pid=False))
+    write_snapshot(multiproc_dir)
+    return _render(_merge(read_snapshots(multiproc_dir), tag_gauges_with_pid=True))
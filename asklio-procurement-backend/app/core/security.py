@@ -2,18 +2,23 @@ import jwt
 from datetime import datetime, timedelta, timezone
 from typing import Any, Optional, Annotated
 from typing import Annotated, Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from app.core.config import settings
-from app.db.session import get_db
+from app.db import routing
+from app.db.session import get_async_db, get_db
 from app.models.user import User
+from app.models.user_role import UserRole
 from passlib.context import CryptContext
 from fastapi import Header, HTTPException, status
 from app.core.config import settings
 
 
 ALGORITHM = "HS256"
+EVENTS_TOKEN_SCOPE = "events"  # tokens for the SSE stream only; rejected as API bearer tokens
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 bearer_scheme = HTTPBearer(auto_error=True)
 
@@ -45,6 +50,30 @@ def decode_token(token: str) -> dict[str, Any]:
     return jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
 
 
+def create_events_token(user_id: int) -> str:
+    """Short-lived token for the event stream, passed as ?token= (see require_events_token)."""
+    return create_access_token(
+        subject=str(user_id),
+        expires_minutes=settings.EVENTS_TOKEN_EXPIRE_MINUTES,
+        claims={"scope": EVENTS_TOKEN_SCOPE},
+    )
+
+
+def require_events_token(token: Annotated[str, Query()]) -> int:
+    """
+    Auth for GET /procurement/events. Browser EventSource can't send headers,
+    so the client gets a token from POST /procurement/events/token (bearer and
+    API key checked there) and opens the stream with ?token=. Returns the user id.
+    """
+    try:
+        payload = decode_token(token)
+        if payload.get("scope") != EVENTS_TOKEN_SCOPE:
+            raise ValueError("Not an events token")
+        return int(payload["sub"])
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -53,18 +82,20 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def _token_subject(request: Request) -> str:
+    # Decoded once per request, shared with DB session routing
+    sub = routing.request_subject(request)
+    if sub is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    return sub
+
+
 def get_current_user(
-    creds: Annotated[HTTPAuthorizationCredentials, Depends(bearer_scheme)],
+    request: Request,
+    _creds: Annotated[HTTPAuthorizationCredentials, Depends(bearer_scheme)],
     db: Annotated[Session, Depends(get_db)],
 ) -> User:
-    token = creds.credentials
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        sub = payload.get("sub")
-        if not sub:
-            raise ValueError("Missing sub")
-    except Exception:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    sub = _token_subject(request)
 
     user = db.query(User).filter(User.id == int(sub)).first()
     if not user:
@@ -72,6 +103,29 @@ def get_current_user(
     return user
 
 
+async def get_current_user_async(
+    request: Request,
+    _creds: Annotated[HTTPAuthorizationCredentials, Depends(bearer_scheme)],
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+) -> User:
+    """
+    get_current_user for async routes. Roles are loaded eagerly (no lazy loads
+    under asyncio), and the read transaction is ended so the connection goes
+    back to the pool before the route does any non-DB work.
+    """
+    sub = _token_subject(request)
+
+    user = await db.scalar(
+        select(User)
+        .options(selectinload(User.roles).selectinload(UserRole.role))
+        .where(User.id == int(sub))
+    )
+    await db.commit()
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    return user
+
+
 def require_api_key(x_client_key: str | None = Header(default=None, alias="X-Client-Key")):
     expected = settings.SHARED_CLIENT_API_KEY
     if not expected:  # if unset, allow (optional)
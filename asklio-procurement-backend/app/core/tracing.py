@@ -0,0 +1,326 @@
+"""
+Minimal span tracing with an OTLP/JSON exporter (no SaaS, no SDK dependency).
+
+    with tracing.span("weaviate.search_similar", top_k=5) as sp:
+        ...
+        sp.set_attribute("hits", len(hits))
+
+- The active span lives in a contextvar, so children nest automatically in
+  the same thread, in asyncio tasks and in anyio's threadpool (sync
+  endpoints). For our own executors use `app.utils.concurrency.submit_in_context`.
+- Trace ids are 32 hex chars (W3C / OTLP). Incoming `traceparent` headers are
+  honoured; `current_trace_id()` is what agents use as their `trace_id`, so the
+  per-stage accounting and the span timeline share one id.
+- Export (TRACING_EXPORTER): "file" appends one OTLP `ExportTraceServiceRequest`
+  JSON document per line to TRACING_FILE_PATH; "otlp" POSTs the same payload
+  to an OTLP/HTTP collector (`.../v1/traces`). Export happens on a background
+  thread in batches; if the queue is full, spans are dropped, never blocking
+  the request.
+"""
+from __future__ import annotations
+
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+_DROPPED = metrics.counter("tracing_spans_dropped_total", "Spans dropped because the export queue was full")
+_EXPORTED = metrics.counter("tracing_spans_exported_total", "Spans handed to the exporter, by outcome")
+
+_MAX_ATTR_LEN = 1000
+SPAN_KIND_INTERNAL, SPAN_KIND_SERVER, SPAN_KIND_CLIENT = 1, 2, 3
+
+
+class Span:
+    __slots__ = (
+        "trace_id", "span_id", "parent_span_id", "name", "kind", "start_ns", "end_ns",
+        "attributes", "status_error", "status_message", "recording",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        trace_id: str,
+        parent_span_id: Optional[str],
+        kind: int,
+        recording: bool,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.trace_id = trace_id
+        self.span_id = _new_id(8)
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {}) if recording else {}
+        self.status_error = False
+        self.status_message = ""
+        self.recording = recording
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if self.recording and value is not None:
+            self.attributes[key] = value
+
+    def set_error(self, exc: BaseException) -> None:
+        self.status_error = True
+        self.status_message = f"{type(exc).__name__}: {exc}"[:_MAX_ATTR_LEN]
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            if self.recording and _processor is not None:
+                _processor.submit(self)
+
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+_processor: Optional["_BatchProcessor"] = None
+_sample_rate = 1.0
+
+
+def _new_id(n_bytes: int) -> str:
+    return os.urandom(n_bytes).hex()
+
+
+def enabled() -> bool:
+    return _processor is not None
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current.get()
+    return span.trace_id if span else None
+
+
+def start_span(
+    name: str,
+    *,
+    kind: int = SPAN_KIND_INTERNAL,
+    parent: Optional[Tuple[str, str, bool]] = None,
+    **attributes: Any,
+) -> Span:
+    """
+    Create a span (child of the current one, or of `parent` = (trace_id,
+    span_id, sampled) from an incoming traceparent). Does not activate it;
+    call `end()` when done.
+    """
+    current = _current.get()
+    if parent is not None:
+        trace_id, parent_id, sampled = parent
+    elif current is not None:
+        trace_id, parent_id, sampled = current.trace_id, current.span_id, current.recording
+    else:
+        trace_id, parent_id = _new_id(16), None
+        sampled = enabled() and random.random() < _sample_rate
+    return Span(
+        name, trace_id=trace_id, parent_span_id=parent_id, kind=kind,
+        recording=sampled and enabled(), attributes=attributes,
+    )
+
+
+@contextmanager
+def span(name: str, *, kind: int = SPAN_KIND_INTERNAL, **attributes: Any) -> Iterator[Span]:
+    """Start a span, make it current for the block, record exceptions and end it."""
+    sp = start_span(name, kind=kind, **attributes)
+    token = _current.set(sp)
+    try:
+        yield sp
+    except BaseException as e:
+        sp.set_error(e)
+        raise
+    finally:
+        _current.reset(token)
+        sp.end()
+
+
+@contextmanager
+def activate(sp: Span) -> Iterator[Span]:
+    """Make an already started span current (e.g. the server span of a request)."""
+    token = _current.set(sp)
+    try:
+        yield sp
+    finally:
+        _current.reset(token)
+
+
+# ---------- W3C trace context ----------
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """'00-<32 hex>-<16 hex>-<flags>' -> (trace_id, span_id, sampled)."""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        sampled = bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32:
+        return None
+    return parts[1], parts[2], sampled
+
+
+def traceparent(sp: Span) -> str:
+    return f"00-{sp.trace_id}-{sp.span_id}-{'01' if sp.recording else '00'}"
+
+
+# ---------- OTLP/JSON encoding ----------
+def _any_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)[:_MAX_ATTR_LEN]}
+
+
+def _attributes(attrs: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": k, "value": _any_value(v)} for k, v in attrs.items()]
+
+
+def _encode_span(sp: Span) -> Dict[str, Any]:
+    out: Dict[str, Any] = {
+        "traceId": sp.trace_id,
+        "spanId": sp.span_id,
+        "name": sp.name,
+        "kind": sp.kind,
+        "startTimeUnixNano": str(sp.start_ns),
+        "endTimeUnixNano": str(sp.end_ns or sp.start_ns),
+        "attributes": _attributes(sp.attributes),
+        "status": {"code": 2, "message": sp.status_message} if sp.status_error else {"code": 1},
+    }
+    if sp.parent_span_id:
+        out["parentSpanId"] = sp.parent_span_id
+    return out
+
+
+def encode_batch(spans: List[Span], service_name: str) -> Dict[str, Any]:
+    """OTLP ExportTraceServiceRequest (JSON mapping)."""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _attributes({
+                "service.name": service_name,
+                "process.pid": os.getpid(),
+            })},
+            "scopeSpans": [{
+                "scope": {"name": "app.core.tracing"},
+                "spans": [_encode_span(s) for s in spans],
+            }],
+        }]
+    }
+
+
+# ---------- Export ----------
+class _BatchProcessor:
+    def __init__(
+        self,
+        *,
+        exporter: str,
+        service_name: str,
+        file_path: Optional[str],
+        endpoint: Optional[str],
+        max_queue: int = 10_000,
+        max_batch: int = 512,
+        interval: float = 1.0,
+    ) -> None:
+        self._exporter = exporter
+        self._service_name = service_name
+        self._file_path = file_path
+        self._endpoint = endpoint
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(maxsize=max_queue)
+        self._max_batch = max_batch
+        self._interval = interval
+        self._file_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, sp: Span) -> None:
+        try:
+            self._queue.put_nowait(sp)
+        except queue.Full:
+            _DROPPED.inc()
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _loop(self) -> None:
+        while True:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self._interval
+            stop = False
+            while len(batch) < self._max_batch:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            if batch:
+                self._export(batch)
+            if stop:
+                return
+
+    def _export(self, batch: List[Span]) -> None:
+        payload = encode_batch(batch, self._service_name)
+        try:
+            if self._exporter == "file":
+                line = json.dumps(payload, separators=(",", ":"))
+                with self._file_lock, open(self._file_path, "a", encoding="utf-8") as fh:
+                    fh.write(line + "\n")
+            elif self._exporter == "otlp":
+                import httpx
+
+                httpx.post(self._endpoint, json=payload, timeout=5.0).raise_for_status()
+            _EXPORTED.inc(len(batch), outcome="ok")
+        except Exception as e:
+            _EXPORTED.inc(len(batch), outcome="error")
+            logger.warning("Exporting %d spans failed: %s", len(batch), e)
+
+
+def configure(
+    *,
+    exporter: str,
+    service_name: str,
+    file_path: Optional[str] = None,
+    endpoint: Optional[str] = None,
+    sample_rate: float = 1.0,
+) -> None:
+    """Enable tracing for this process ("none" keeps spans non-recording)."""
+    global _processor, _sample_rate
+    shutdown()
+    _sample_rate = sample_rate
+    if exporter == "none":
+        return
+    _processor = _BatchProcessor(
+        exporter=exporter, service_name=service_name, file_path=file_path, endpoint=endpoint
+    )
+
+
+def shutdown() -> None:
+    """Flush pending spans and stop exporting."""
+    global _processor
+    processor, _processor = _processor, None
+    if processor is not None:
+        processor.shutdown()
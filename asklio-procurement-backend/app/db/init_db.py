@@ -351,6 +351,7 @@ def _index_seed_requests_in_weaviate(requests: list[ProcurementRequest]) -> int:
                 commodity_group=str(r.commodityGroupID) if r.commodityGroupID is not None else "",
                 embedded_request_context=text,
                 vector=vec,
+                label_source="manual",  # seeded examples are labelled by hand
             )
             inserted += 1
         except Exception as e:
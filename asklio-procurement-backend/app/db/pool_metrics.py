@@ -0,0 +1,52 @@
+"""
+Connection-pool metrics for SQLAlchemy engines.
+
+Checkouts and wait time are recorded as they happen; pool size, checked-out
+and overflow gauges are read from the pool only when metrics are collected.
+"""
+from __future__ import annotations
+
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core import metrics
+
+_CHECKOUTS = metrics.counter("db_pool_checkouts_total", "Connections checked out of the pool, by engine")
+_WAIT_SECONDS = metrics.histogram(
+    "db_pool_wait_seconds", "Time spent waiting for a pooled connection, by engine",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0),
+)
+_SIZE = metrics.gauge("db_pool_size", "Configured pool size, by engine")
+_CHECKED_OUT = metrics.gauge("db_pool_checked_out", "Connections currently checked out, by engine")
+_OVERFLOW = metrics.gauge("db_pool_overflow", "Connections open beyond pool_size, by engine")
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    pool = engine.pool
+
+    @event.listens_for(pool, "checkout")
+    def _on_checkout(dbapi_conn, conn_record, conn_proxy) -> None:
+        _CHECKOUTS.inc(engine=name)
+
+    # The wait happens inside the pool's _do_get (blocking queue get for QueuePool);
+    # no public event covers it, so time it at that seam.
+    do_get = pool._do_get
+
+    def _timed_do_get():
+        started = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            _WAIT_SECONDS.observe(time.perf_counter() - started, engine=name)
+
+    pool._do_get = _timed_do_get
+
+    def _collect() -> None:
+        for gauge, attr in ((_SIZE, "size"), (_CHECKED_OUT, "checkedout"), (_OVERFLOW, "overflow")):
+            fn = getattr(pool, attr, None)
+            if callable(fn):
+                gauge.set(fn(), engine=name)
+
+    metrics.register_collector(_collect)
@@ -0,0 +1,99 @@
+"""
+Per-scope SQL query counting and N+1 detection.
+
+`track_queries()` collects every statement executed (on any engine) while it
+is active in the current context, including sync endpoints running in
+anyio's threadpool, which inherit the request's context. Used by
+QueryCountMiddleware (per HTTP request) and by `assert_max_queries` in tests.
+
+"Repeated" statements are identical SQL texts (parameters differ), which is
+what a lazy relationship loaded inside a loop produces.
+"""
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from collections import Counter as _Counter
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_MAX_STATEMENT_LEN = 300  # for display; grouping uses the full text
+
+
+def _shorten(statement: str) -> str:
+    if len(statement) <= _MAX_STATEMENT_LEN:
+        return statement
+    return statement[:_MAX_STATEMENT_LEN] + "..."
+
+
+class QueryStats:
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: _Counter = _Counter()
+        self._lock = threading.Lock()
+
+    def add(self, statement: str, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+            self.statements[" ".join(statement.split())] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statements executed at least `threshold` times, most frequent first."""
+        with self._lock:
+            return [(_shorten(s), n) for s, n in self.statements.most_common() if n >= threshold]
+
+    def describe(self) -> str:
+        lines = [f"{self.count} queries, {self.seconds * 1000:.1f} ms"]
+        lines += [f"  {n}x {_shorten(s)}" for s, n in self.statements.most_common()]
+        return "\n".join(lines)
+
+
+_current: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar("query_stats", default=None)
+_installed = False
+
+
+def _before(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current.get() is not None:
+        conn.info.setdefault("_query_started", []).append(time.perf_counter())
+
+
+def _after(conn, cursor, statement, parameters, context, executemany) -> None:
+    stats = _current.get()
+    started = conn.info.get("_query_started")
+    if stats is not None and started:
+        stats.add(statement, time.perf_counter() - started.pop())
+
+
+def install() -> None:
+    """Register the engine listeners once; cheap when no scope is active."""
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before)
+    event.listen(Engine, "after_cursor_execute", _after)
+    _installed = True
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    install()
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_max_queries(n: int) -> Iterator[QueryStats]:
+    """Fail if the block runs more than `n` SQL statements (lists them on failure)."""
+    with track_queries() as stats:
+        yield stats
+    assert stats.count <= n, f"Expected at most {n} queries, got {stats.describe()}"
@@ -0,0 +1,54 @@
+"""One client span per SQL statement, for every engine (listeners on the Engine class)."""
+from __future__ import annotations
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core import tracing
+
+_MAX_STATEMENT_LEN = 500
+_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if not tracing.enabled():
+        return
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+    sp = tracing.start_span(
+        f"db.{operation.lower()}",
+        kind=tracing.SPAN_KIND_CLIENT,
+        **{
+            "db.system": conn.dialect.name,
+            "db.operation": operation,
+            "db.statement": statement[:_MAX_STATEMENT_LEN],
+            "db.executemany": bool(executemany),
+        },
+    )
+    conn.info.setdefault("_trace_spans", []).append(sp)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    spans = conn.info.get("_trace_spans")
+    if spans:
+        sp = spans.pop()
+        sp.set_attribute("db.rowcount", getattr(cursor, "rowcount", None))
+        sp.end()
+
+
+def _handle_error(exception_context) -> None:
+    conn = exception_context.connection
+    spans = conn.info.get("_trace_spans") if conn is not None else None
+    if spans:
+        sp = spans.pop()
+        sp.set_error(exception_context.original_exception)
+        sp.end()
+
+
+def instrument_sqlalchemy() -> None:
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    _installed = True
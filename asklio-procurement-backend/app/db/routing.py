@@ -0,0 +1,119 @@
+"""
+Read routing between the primary and the optional read replica (DB_REPLICA_URI).
+
+- GET/HEAD requests read from the replica; everything else uses the primary.
+- Read-your-writes: a session opened for an authenticated request carries the
+  token subject in `session.info` (decoded once per request, see
+  `request_subject`; get_current_user uses the same value). When such a session commits a write, the
+  user's reads stay on the primary for DB_READ_YOUR_WRITES_SECONDS, so a list
+  or detail view right after a create/update never shows replication lag.
+
+Stickiness is tracked per worker process. With several workers behind a
+balancer without session affinity, a follow-up read can land on a worker
+that has not seen the write; keep the window above the usual replica lag and
+route such setups with affinity on the bearer token.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, Optional
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import settings
+
+READ_METHODS = frozenset({"GET", "HEAD"})
+SUBJECT_KEY = "subject"
+_WROTE_KEY = "wrote"
+
+_ROUTED = metrics.counter("db_read_routing_total", "Request sessions by target engine and reason")
+
+_recent_writes: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def mark_write(subject: str) -> None:
+    now = time.monotonic()
+    with _lock:
+        _recent_writes[subject] = now + settings.DB_READ_YOUR_WRITES_SECONDS
+        if len(_recent_writes) > 10_000:
+            for key in [k for k, until in _recent_writes.items() if until <= now]:
+                del _recent_writes[key]
+
+
+def wrote_recently(subject: Optional[str]) -> bool:
+    if subject is None:
+        return False
+    with _lock:
+        until = _recent_writes.get(subject)
+    return until is not None and until > time.monotonic()
+
+
+def _bearer_subject(request: Request) -> Optional[str]:
+    scheme, _, token = (request.headers.get("authorization") or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    from app.core.security import EVENTS_TOKEN_SCOPE, decode_token  # security imports the session module
+
+    try:
+        payload = decode_token(token)
+    except Exception:
+        return None
+    sub = payload.get("sub")
+    if not sub or payload.get("scope") == EVENTS_TOKEN_SCOPE:
+        return None
+    return str(sub)
+
+
+def request_subject(request: Request) -> Optional[str]:
+    """
+    Subject (user id) of the request's bearer API token, or None if it is missing
+    or invalid. Verified once per request and kept on request.state; session
+    routing and get_current_user both read it (the latter turns None into a 401).
+    """
+    try:
+        return request.state.token_subject
+    except AttributeError:
+        request.state.token_subject = _bearer_subject(request)
+        return request.state.token_subject
+
+
+def use_replica(request: Request, subject: Optional[str], replica_configured: bool) -> bool:
+    if not replica_configured:
+        return False
+    if request.method not in READ_METHODS:
+        _ROUTED.inc(engine="primary", reason="write_method")
+        return False
+    if wrote_recently(subject):
+        _ROUTED.inc(engine="primary", reason="read_your_writes")
+        return False
+    _ROUTED.inc(engine="replica", reason="read")
+    return True
+
+
+# Any ORM flush or ORM-enabled DML (bulk insert/update) counts as a write; a
+# commit after a write starts the user's stickiness window.
+@event.listens_for(Session, "after_flush")
+def _after_flush(session: Session, _flush_context) -> None:
+    session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_orm_execute(state) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    if session.info.pop(_WROTE_KEY, False) and session.info.get(SUBJECT_KEY):
+        mark_write(session.info[SUBJECT_KEY])
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_WROTE_KEY, None)
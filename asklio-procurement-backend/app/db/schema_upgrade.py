@@ -0,0 +1,62 @@
+"""
+Adds model columns that are missing from existing tables.
+
+`Base.metadata.create_all` only creates missing tables; it never alters an
+existing one. Columns added to a model later (procurement_request.
+commodityGroupSource, classificationStatus, ...) would make every SELECT
+fail on a database created before them. This step runs at startup right
+after create_all and issues `ALTER TABLE ... ADD COLUMN` for each model
+column the live table lacks, so it is a no-op on an up-to-date schema.
+
+Only additive changes are handled. A NOT NULL column needs a server default
+(existing rows must get a value); renames, type changes and drops still need
+a manual migration.
+"""
+from __future__ import annotations
+
+import logging
+from typing import List, Optional
+
+from sqlalchemy import MetaData, inspect
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.sql.sqltypes import SchemaType
+
+logger = logging.getLogger(__name__)
+
+
+def add_missing_columns(bind: Engine, metadata: Optional[MetaData] = None) -> List[str]:
+    """ALTER existing tables to add missing model columns. Returns the added `table.column` names."""
+    if metadata is None:
+        from app.db.base import Base
+        metadata = Base.metadata
+
+    added: List[str] = []
+    with bind.begin() as conn:
+        inspector = inspect(conn)
+        existing = set(inspector.get_table_names())
+        for table in metadata.sorted_tables:
+            if table.name not in existing:
+                continue
+            present = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present:
+                    continue
+                _add_column(conn, table, column)
+                added.append(f"{table.name}.{column.name}")
+    for name in added:
+        logger.info("Added missing column %s.", name)
+    return added
+
+
+def _add_column(conn: Connection, table, column) -> None:
+    if not column.nullable and column.server_default is None:
+        raise RuntimeError(
+            f"Cannot add NOT NULL column {table.name}.{column.name} without a server default; "
+            "migrate it manually."
+        )
+    if isinstance(column.type, SchemaType):
+        column.type.create(conn, checkfirst=True)  # e.g. the Postgres ENUM type of a new enum column
+    preparer = conn.dialect.identifier_preparer
+    definition = CreateColumn(column).compile(dialect=conn.dialect)
+    conn.exec_driver_sql(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {definition}")
@@ -1,13 +1,134 @@
+from functools import lru_cache
+from typing import Any, AsyncIterator, Optional
+
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
+from app.db import routing
+from app.db.pool_metrics import instrument_engine
+
+
+def engine_options(uri: str, *, is_async: bool = False) -> dict[str, Any]:
+    """create_engine keyword arguments for `uri` from the DB_POOL_* / DB_STATEMENT_TIMEOUT_MS settings."""
+    url = make_url(uri)
+    options: dict[str, Any] = {"pool_pre_ping": True}
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return options  # one shared in-memory connection; nothing to size
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    )
+    if url.get_backend_name() == "sqlite" and is_async:
+        options["poolclass"] = AsyncAdaptedQueuePool  # aiosqlite would default to NullPool
+    if url.get_backend_name() == "postgresql" and settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        options["connect_args"] = {"options": f"-c statement_timeout={int(settings.DB_STATEMENT_TIMEOUT_MS)}"}
+    return options
+
 
-engine = create_engine(settings.database_uri, pool_pre_ping=True)
+engine = create_engine(settings.database_uri, **engine_options(settings.database_uri))
+instrument_engine(engine, "primary")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def get_db():
+# Optional read replica (DB_REPLICA_URI); see app.db.routing
+replica_engine = (
+    create_engine(settings.DB_REPLICA_URI, **engine_options(settings.DB_REPLICA_URI))
+    if settings.DB_REPLICA_URI else None
+)
+if replica_engine is not None:
+    instrument_engine(replica_engine, "replica")
+ReplicaSessionLocal = (
+    sessionmaker(autocommit=False, autoflush=False, bind=replica_engine) if replica_engine is not None else None
+)
+
+def get_db(request: Request):
+    """
+    Request session: the replica for GET/HEAD (unless the user just wrote),
+    otherwise the primary.
+    """
+    subject = routing.request_subject(request)
+    if routing.use_replica(request, subject, ReplicaSessionLocal is not None):
+        db = ReplicaSessionLocal()
+    else:
+        db = SessionLocal()
+    db.info[routing.SUBJECT_KEY] = subject
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_db_factory(request: Request) -> sessionmaker:
+    """
+    Session factory routed like `get_db`, for streaming responses: their body
+    is produced after the request's dependencies have been closed, so the
+    stream opens (and closes) its own session.
+    """
+    subject = routing.request_subject(request)
+    if routing.use_replica(request, subject, ReplicaSessionLocal is not None):
+        return ReplicaSessionLocal
+    return SessionLocal
+
+
+def get_primary_db(request: Request):
+    """Request session that always uses the primary (reads that must see the latest writes)."""
     db = SessionLocal()
+    db.info[routing.SUBJECT_KEY] = routing.request_subject(request)
     try:
         yield db
     finally:
         db.close()
+
+
+# ---------- Async (DB_ASYNC_ROUTES) ----------
+# Created on first use, so sync-only deployments need no asyncio driver.
+@lru_cache(maxsize=1)
+def get_async_engine() -> AsyncEngine:
+    uri = settings.async_database_uri
+    async_engine = create_async_engine(uri, **engine_options(uri, is_async=True))
+    instrument_engine(async_engine.sync_engine, "primary_async")
+    return async_engine
+
+
+@lru_cache(maxsize=1)
+def get_async_replica_engine() -> Optional[AsyncEngine]:
+    uri = settings.async_replica_uri
+    if not uri:
+        return None
+    async_engine = create_async_engine(uri, **engine_options(uri, is_async=True))
+    instrument_engine(async_engine.sync_engine, "replica_async")
+    return async_engine
+
+
+@lru_cache(maxsize=2)
+def get_async_sessionmaker(replica: bool = False) -> async_sessionmaker[AsyncSession]:
+    # expire_on_commit=False: services commit to hand the connection back early
+    # and keep using the loaded rows afterwards
+    bind = get_async_replica_engine() if replica else get_async_engine()
+    return async_sessionmaker(bind, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db(request: Request) -> AsyncIterator[AsyncSession]:
+    subject = routing.request_subject(request)
+    replica = routing.use_replica(request, subject, settings.DB_REPLICA_URI is not None)
+    async with get_async_sessionmaker(replica)() as db:
+        db.info[routing.SUBJECT_KEY] = subject
+        yield db
+
+
+def get_async_db_factory(request: Request) -> async_sessionmaker[AsyncSession]:
+    """Async twin of `get_db_factory`."""
+    subject = routing.request_subject(request)
+    return get_async_sessionmaker(routing.use_replica(request, subject, settings.DB_REPLICA_URI is not None))
+
+
+async def dispose_async_engine() -> None:
+    if get_async_engine.cache_info().currsize:
+        await get_async_engine().dispose()
+    if get_async_replica_engine.cache_info().currsize and get_async_replica_engine() is not None:
+        await get_async_replica_engine().dispose()
@@ -2,12 +2,23 @@ import logging, time
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.db.session import engine, SessionLocal
+from app.db.session import engine, SessionLocal, dispose_async_engine
 from app.db.base import Base
 from app.db.init_db import init_db
-from app.routers import health, auth, procurement, commodity_groups
+from app.db.schema_upgrade import add_missing_columns
+from app.routers import health, auth, procurement, procurement_async, commodity_groups, ops, metrics as metrics_router
+from app.core import prometheus
+from app.core.http_metrics import HTTPMetricsMiddleware, start_loop_lag_monitor
+from app.core import tracing
+from app.core.http_tracing import TracingMiddleware
+from app.core.http_queries import QueryCountMiddleware
+from app.db.query_tracing import instrument_sqlalchemy
 from app.weaviate.bootstrap import ensure_schema
 from app.weaviate.client import get_client
+from app.models.commodity_group import CommodityGroup
+from app.agents.registry import get_agent_registry
+from app.agents.commodity_classifier.contracts import CommodityGroupRef
+from app.services import classification_worker, duplicates, procurement_service_async, search_index, spend_rollups
 
 
 logging.basicConfig(level=logging.INFO)
@@ -22,10 +33,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+tracing.configure(
+    exporter=settings.TRACING_EXPORTER,
+    service_name=settings.APP_NAME,
+    file_path=settings.TRACING_FILE_PATH,
+    endpoint=settings.TRACING_OTLP_ENDPOINT,
+    sample_rate=settings.TRACING_SAMPLE_RATE,
+)
+instrument_sqlalchemy()
+app.add_middleware(TracingMiddleware)
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(HTTPMetricsMiddleware)
+    app.include_router(metrics_router.router)
+
+if settings.SQL_QUERY_TRACKING_ENABLED:
+    app.add_middleware(
+        QueryCountMiddleware,
+        warn_count=settings.SQL_QUERY_WARN_COUNT,
+        warn_ms=settings.SQL_QUERY_WARN_MS,
+        repeat_threshold=settings.SQL_QUERY_REPEAT_THRESHOLD,
+    )
+
 app.include_router(health.router, prefix=settings.API_PREFIX)
 app.include_router(auth.router, prefix=settings.API_PREFIX)
-app.include_router(procurement.router, prefix=settings.API_PREFIX)
+# before the request routers: their /{request_id} would otherwise match /events
+app.include_router(procurement.events_router, prefix=settings.API_PREFIX)
+app.include_router(
+    procurement_async.router if settings.DB_ASYNC_ROUTES else procurement.router,
+    prefix=settings.API_PREFIX,
+)
 app.include_router(commodity_groups.router, prefix=settings.API_PREFIX)
+app.include_router(ops.router, prefix=settings.API_PREFIX)
 
 def _wait_for_weaviate(max_tries: int = 20, delay_s: float = 0.75) -> None:
     for attempt in range(1, max_tries + 1):
@@ -39,14 +78,27 @@ def _wait_for_weaviate(max_tries: int = 20, delay_s: float = 0.75) -> None:
             time.sleep(delay_s)
     raise RuntimeError("Weaviate did not become ready in time")
 
+def _warm_commodity_group_index() -> None:
+    """Precompute commodity-group embeddings so the first classification doesn't pay for them."""
+    try:
+        with SessionLocal() as db:
+            rows = db.query(CommodityGroup).order_by(CommodityGroup.id.asc()).all()
+            refs = [CommodityGroupRef(id=int(cg.id), label=cg.name, category=cg.category) for cg in rows]
+        embedded = get_agent_registry().commodity_group_index.refresh(refs)
+        logging.info("Commodity group index warm (%d embedded).", embedded)
+    except Exception as e:
+        logging.warning("Could not warm commodity group index; will embed lazily: %s", e)
+
 @app.on_event("startup")
 def on_startup() -> None:
-    # 1) Create SQL tables
+    # 1) Create SQL tables, and columns added to existing tables since they were created
     Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine)
 
     # 2) Ensure Weaviate is ready and schema exists
-    _wait_for_weaviate()
-    ensure_schema()
+    if settings.VECTOR_STORE == "weaviate":
+        _wait_for_weaviate()
+        ensure_schema()
 
     # 3) Optionally seed database (and vector index)
     if settings.should_seed:
@@ -55,10 +107,44 @@ def on_startup() -> None:
             init_db(db)
     else:
         logging.info("Seeding disabled (ENV=%s).", settings.ENV)
+
+    # 4) Spend rollups, search index and duplicate fingerprints (built once from existing requests)
+    for derived in (spend_rollups, search_index, duplicates):
+        try:
+            with SessionLocal() as db:
+                derived.ensure_built(db)
+        except Exception as e:
+            logging.warning("Could not build %s: %s", derived.__name__.rsplit(".", 1)[-1], e)
+
+    # 5) Warm the commodity-group embedding cache used for candidate pruning (unused in "full" mode)
+    if settings.CLASSIFIER_CANDIDATE_MODE == "pruned":
+        _warm_commodity_group_index()
+
+    # 6) Pick up deferred classifications interrupted by a restart
+    try:
+        classification_worker.resume_pending()
+    except Exception as e:
+        logging.warning("Could not resume pending classifications: %s", e)
+
+    # 7) Per-worker metrics snapshots for multiprocess /metrics aggregation
+    if settings.METRICS_ENABLED and settings.METRICS_MULTIPROC_DIR:
+        prometheus.start_snapshot_writer(settings.METRICS_MULTIPROC_DIR, settings.METRICS_FLUSH_SECONDS)
+    if settings.METRICS_ENABLED:
+        start_loop_lag_monitor()
         
 @app.on_event("shutdown")
 def on_shutdown() -> None:
-    try:
-        get_client().close()
-    except Exception:
-        pass
\ No newline at end of file
+    if settings.METRICS_ENABLED and settings.METRICS_MULTIPROC_DIR:
+        prometheus.stop_snapshot_writer(settings.METRICS_MULTIPROC_DIR)
+    classification_worker.shutdown()
+    tracing.shutdown()
+    if settings.VECTOR_STORE == "weaviate":
+        try:
+            get_client().close()
+        except Exception:
+            pass
+
+@app.on_event("shutdown")
+async def on_shutdown_async() -> None:
+    procurement_service_async.shutdown()
+    await dispose_async_engine()
@@ -5,3 +5,6 @@ from .department import Department
 from .commodity_group import CommodityGroup
 from .procurement_request import ProcurementRequest
 from .order_line import OrderLine
+from .spend_rollup import SpendRollup
+from .search_document import SearchDocument
+from .request_fingerprint import RequestFingerprint
@@ -3,3 +3,7 @@ class RequestStatus(str, Enum):
     OPEN = "Open"
     IN_PROGRESS = "InProgress"
     CLOSED = "Closed"
+
+class ClassificationStatus(str, Enum):
+    PENDING = "Pending"      # provisional group, background classifier not finished yet
+    COMPLETED = "Completed"
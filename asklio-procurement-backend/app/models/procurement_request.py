@@ -1,7 +1,7 @@
 from sqlalchemy import Column, String, Integer, Enum, ForeignKey, DateTime, func, Float
 from sqlalchemy.orm import relationship
 from app.db.base import Base
-from app.models.enums import RequestStatus
+from app.models.enums import RequestStatus, ClassificationStatus
 
 class ProcurementRequest(Base):
     __tablename__ = "procurement_request"
@@ -11,6 +11,15 @@ class ProcurementRequest(Base):
     vatID = Column(String(32), nullable=False)
     commodityGroupID = Column(Integer, ForeignKey("commodity_group.id"))
     commodityGroupConfidence = Column(Float, nullable=True)
+    # classifier stage that picked the group (knn | scoring | rerank | fallback | heuristic | duplicate);
+    # kept on manual overrides
+    commodityGroupSource = Column(String(32), nullable=True)
+    classificationStatus = Column(
+        Enum(ClassificationStatus),
+        nullable=False,
+        default=ClassificationStatus.COMPLETED,
+        server_default=ClassificationStatus.COMPLETED.name,
+    )
     totalCosts = Column(Integer, nullable=False)  # cents
     status = Column(Enum(RequestStatus), nullable=False, default=RequestStatus.OPEN)
     
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Index, String
+from app.db.base import Base
+
+class RequestFingerprint(Base):
+    """
+    Content fingerprint of a request (normalized vendor, VAT id, total and
+    order lines), one row per request, written with the request
+    (app.services.duplicates). Looked up before classification to catch
+    resubmitted quotes.
+    """
+    __tablename__ = "procurement_request_fingerprint"
+
+    requestID = Column(String, ForeignKey("procurement_request.id"), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # sha256 hex
+    created_at = Column(DateTime(timezone=True), nullable=False)  # copy of the request's, for the window filter
+
+    __table_args__ = (
+        Index("ix_procurement_request_fingerprint_lookup", "fingerprint", "created_at"),
+    )
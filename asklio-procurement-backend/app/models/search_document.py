@@ -0,0 +1,64 @@
+from sqlalchemy import DDL, Column, ForeignKey, Index, Integer, String, Text, event, func, literal_column
+from sqlalchemy.dialects import postgresql  # noqa: F401  (registers to_tsvector & co. before use below)
+from app.db.base import Base
+
+# Text search configuration; queries must use the same expression for the index to apply
+TS_CONFIG = literal_column("'simple'::regconfig")
+
+class SearchDocument(Base):
+    """
+    Searchable text of a request (title, vendor, VAT id, order-line
+    descriptions), one row per request, written with the request
+    (app.services.search_index).
+
+    Indexes: Postgres full-text (simple config) and trigram GIN indexes on
+    `document`; SQLite an FTS5 table kept in sync by triggers.
+    """
+    __tablename__ = "procurement_search_document"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)  # stable rowid for SQLite FTS5
+    requestID = Column(String, ForeignKey("procurement_request.id"), unique=True, nullable=False)
+    document = Column(Text, nullable=False)
+
+    __table_args__ = (
+        Index(
+            "ix_procurement_search_document_tsv",
+            func.to_tsvector(TS_CONFIG, document),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_procurement_search_document_trgm",
+            document,
+            postgresql_using="gin",
+            postgresql_ops={"document": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
+
+event.listen(
+    SearchDocument.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+_SQLITE_FTS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS procurement_search_fts USING fts5("
+    "document, content='procurement_search_document', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS procurement_search_document_ai AFTER INSERT ON procurement_search_document BEGIN "
+    "INSERT INTO procurement_search_fts(rowid, document) VALUES (new.id, new.document); END",
+    "CREATE TRIGGER IF NOT EXISTS procurement_search_document_ad AFTER DELETE ON procurement_search_document BEGIN "
+    "INSERT INTO procurement_search_fts(procurement_search_fts, rowid, document) "
+    "VALUES ('delete', old.id, old.document); END",
+    "CREATE TRIGGER IF NOT EXISTS procurement_search_document_au AFTER UPDATE ON procurement_search_document BEGIN "
+    "INSERT INTO procurement_search_fts(procurement_search_fts, rowid, document) "
+    "VALUES ('delete', old.id, old.document); "
+    "INSERT INTO procurement_search_fts(rowid, document) VALUES (new.id, new.document); END",
+)
+for _statement in _SQLITE_FTS:
+    event.listen(SearchDocument.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(
+    SearchDocument.__table__,
+    "after_drop",
+    DDL("DROP TABLE IF EXISTS procurement_search_fts").execute_if(dialect="sqlite"),
+)
@@ -0,0 +1,21 @@
+from sqlalchemy import BigInteger, Column, Enum, Integer, String
+from app.db.base import Base
+from app.models.enums import RequestStatus
+
+class SpendRollup(Base):
+    """
+    Request count and total spend per (commodity group, requestor department,
+    vendor, status, creation month). Maintained incrementally by the
+    procurement services (app.services.spend_rollups); rebuildable from
+    procurement_request at any time.
+    """
+    __tablename__ = "procurement_spend_rollup"
+
+    commodityGroupID = Column(Integer, primary_key=True)  # 0: none
+    departmentID = Column(Integer, primary_key=True)  # requestor's department; 0: none
+    vendorName = Column(String(200), primary_key=True)
+    status = Column(Enum(RequestStatus), primary_key=True)
+    month = Column(String(7), primary_key=True)  # YYYY-MM, UTC
+
+    requestCount = Column(Integer, nullable=False, default=0)
+    totalCents = Column(BigInteger, nullable=False, default=0)
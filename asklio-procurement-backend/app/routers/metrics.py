@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Response
+from app.core.config import settings
+from app.core import prometheus
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def prometheus_metrics() -> Response:
+    """
+    Prometheus text exposition. With METRICS_MULTIPROC_DIR set, aggregates all
+    uvicorn workers of this instance.
+    """
+    return Response(
+        content=prometheus.render(settings.METRICS_MULTIPROC_DIR),
+        media_type=prometheus.CONTENT_TYPE,
+    )
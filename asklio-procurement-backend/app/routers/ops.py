@@ -0,0 +1,57 @@
+from typing import Any, Dict, List
+from fastapi import APIRouter, Depends, HTTPException, status
+from app.core.security import get_current_user, require_api_key
+from app.models.user import User
+from app.services.auth import ensure_manager
+from app.agents import instrumentation
+from app.schemas.ops import AgentStageSummaryOut, AgentStageRecordOut, AgentTraceOut
+
+router = APIRouter(
+    prefix="/ops",
+    tags=["ops"],
+    dependencies=[Depends(get_current_user), Depends(require_api_key)]
+)
+
+
+def _stage_record_out(r: Dict[str, Any]) -> AgentStageRecordOut:
+    return AgentStageRecordOut(
+        traceId=r["trace_id"],
+        agent=r["agent"],
+        stage=r["stage"],
+        startedAt=r["started_at"],
+        model=r["model"],
+        inputTokens=r["input_tokens"],
+        outputTokens=r["output_tokens"],
+        cachedTokens=r["cached_tokens"],
+        costUsd=r["cost_usd"],
+        aiCalls=r["ai_calls"],
+        seconds=r["seconds"],
+        outcome=r["outcome"],
+    )
+
+
+@router.get("/agents/stages", response_model=List[AgentStageSummaryOut])
+def agent_stage_summary(current_user: User = Depends(get_current_user)):
+    """
+    Token, cost and latency totals per agent stage and model since process start
+    (this worker only). Managers only.
+    """
+    ensure_manager(current_user)
+    return instrumentation.stage_summary()
+
+
+@router.get("/agents/traces/{trace_id}", response_model=AgentTraceOut)
+def agent_trace(trace_id: str, current_user: User = Depends(get_current_user)):
+    """
+    Stage-by-stage accounting of one agent run (recent traces only). Managers only.
+    """
+    ensure_manager(current_user)
+    records = instrumentation.trace_records(trace_id)
+    if not records:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trace not found")
+    return AgentTraceOut(
+        traceId=trace_id,
+        totalCostUsd=round(sum(r["cost_usd"] for r in records), 6),
+        totalSeconds=round(sum(r["seconds"] for r in records), 4),
+        stages=[_stage_record_out(r) for r in records],
+    )
@@ -1,18 +1,25 @@
-from typing import List, Optional
+from typing import List, Literal, Optional
 from fastapi import APIRouter, Depends, Query, status, UploadFile, File, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
-from app.core.security import get_current_user, require_api_key
+from app.db.session import get_db, get_db_factory
+from app.core.security import create_events_token, get_current_user, require_api_key, require_events_token
 from app.models.user import User
 from app.models.enums import RequestStatus
 
 from app.schemas.procurement import (
     ProcurementRequestLiteOut, ProcurementRequestOut,
     ProcurementRequestCreate, ProcurementRequestUpdateIn,
-    RequestDraftOut
+    RequestDraftOut, ProcurementRequestBulkCreate, ProcurementRequestBulkCreateOut,
+    ProcurementSearchOut, SimilarRequestOut,
 )
+from app.schemas.auth import Token
+from app.schemas.stats import SpendStatsOut
+from app.core.config import settings
+from app.core.json_response import json_response
 from app.services import procurement_service as svc
+from app.services import events, export
 
 
 MAX_PDF_SIZE_MB = 5
@@ -24,9 +31,13 @@ router = APIRouter(
     dependencies=[Depends(get_current_user), Depends(require_api_key)]
 )
 
+# GET /procurement/events authenticates with a query token instead of the
+# bearer header (EventSource can't set headers); mounted for sync and async routes
+events_router = APIRouter(prefix="/procurement", tags=["requests"])
+
 @router.get("", response_model=List[ProcurementRequestLiteOut])
 def list_requests(status: Optional[RequestStatus] = Query(default=None), db: Session = Depends(get_db)):
-    return svc.list_requests(db, status)
+    return json_response(svc.list_requests(db, status), List[ProcurementRequestLiteOut])
 
 @router.get("/mine", response_model=List[ProcurementRequestLiteOut])
 def list_my_requests(
@@ -35,15 +46,101 @@ def list_my_requests(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    return svc.list_my_requests(db, current_user, status, limit)
+    return json_response(svc.list_my_requests(db, current_user, status, limit), List[ProcurementRequestLiteOut])
+
+@router.get("/search", response_model=ProcurementSearchOut)
+def search_requests(
+    q: str = Query(min_length=2, max_length=200),
+    status: Optional[RequestStatus] = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0, le=10_000),
+    db: Session = Depends(get_db),
+):
+    return json_response(svc.search_requests(db, q, status, limit, offset), ProcurementSearchOut)
+
+MONTH_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+@router.get("/stats", response_model=SpendStatsOut)
+def spend_stats(
+    status: Optional[RequestStatus] = Query(default=None),
+    fromMonth: Optional[str] = Query(default=None, pattern=MONTH_PATTERN, description="YYYY-MM, inclusive"),
+    toMonth: Optional[str] = Query(default=None, pattern=MONTH_PATTERN, description="YYYY-MM, inclusive"),
+    vendorLimit: int = Query(default=20, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return json_response(
+        svc.get_spend_stats(
+            db, current_user,
+            status_filter=status, from_month=fromMonth, to_month=toMonth, vendor_limit=vendorLimit,
+        ),
+        SpendStatsOut,
+    )
+
+@router.post("/events/token", response_model=Token)
+def procurement_events_token(current_user: User = Depends(get_current_user)):
+    """Short-lived token for opening the event stream (`/events?token=...`)."""
+    return Token(access_token=create_events_token(current_user.id), expires_in=settings.EVENTS_TOKEN_EXPIRE_MINUTES)
+
+@events_router.get("/events")
+async def procurement_events(_user_id: int = Depends(require_events_token)):
+    """
+    Server-sent events stream. Emits `classification` events (lite request DTO)
+    when a deferred commodity classification completes. Takes the token from
+    POST /events/token as `?token=`; the token is only checked on connect.
+    """
+    return StreamingResponse(
+        events.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/export")
+def export_requests(
+    fmt: Literal["csv", "ndjson"] = Query(default="csv", alias="format"),
+    status: Optional[RequestStatus] = Query(default=None),
+    session_factory=Depends(get_db_factory),
+):
+    """Every request with its order lines (same filter as the list), streamed in constant memory."""
+    return StreamingResponse(
+        export.stream_export(session_factory, fmt, status),
+        media_type=export.MEDIA_TYPES[fmt],
+        headers=export.response_headers(fmt),
+    )
 
 @router.post("", response_model=ProcurementRequestLiteOut, status_code=status.HTTP_201_CREATED)
 def create_procurement_request(
     body: ProcurementRequestCreate,
+    allowDuplicate: bool = Query(default=False, description="Create even if an earlier request has the same content"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return json_response(
+        svc.create_request(db, body, current_user, allow_duplicate=allowDuplicate),
+        ProcurementRequestLiteOut,
+        status.HTTP_201_CREATED,
+    )
+
+@router.post("/bulk", response_model=ProcurementRequestBulkCreateOut)
+def create_procurement_requests_bulk(
+    body: ProcurementRequestBulkCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    return svc.create_request(db, body, current_user)
+    if len(body.items) > settings.BULK_CREATE_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.BULK_CREATE_MAX_ITEMS} requests per bulk import.",
+        )
+    return json_response(svc.create_requests_bulk(db, body.items, current_user), ProcurementRequestBulkCreateOut)
+
+@router.post("/similar", response_model=List[SimilarRequestOut])
+def find_similar_requests(
+    body: ProcurementRequestCreate,
+    limit: int = Query(default=10, ge=1, le=50),
+    db: Session = Depends(get_db),
+):
+    return json_response(svc.find_similar_requests(db, body, limit), List[SimilarRequestOut])
 
 @router.patch("/{request_id}", response_model=ProcurementRequestLiteOut)
 def update_procurement_request(
@@ -52,7 +149,15 @@ def update_procurement_request(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    return svc.update_request(db, request_id, body, current_user)
+    return json_response(svc.update_request(db, request_id, body, current_user), ProcurementRequestLiteOut)
+
+@router.get("/{request_id}/similar", response_model=List[SimilarRequestOut])
+def get_similar_requests(
+    request_id: str,
+    limit: int = Query(default=10, ge=1, le=50),
+    db: Session = Depends(get_db),
+):
+    return json_response(svc.get_similar_requests(db, request_id, limit), List[SimilarRequestOut])
 
 @router.get("/{request_id}", response_model=ProcurementRequestOut)
 def get_request_details(
@@ -60,13 +165,11 @@ def get_request_details(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    return svc.get_request_details(db, request_id, current_user)
+    return json_response(svc.get_request_details(db, request_id, current_user), ProcurementRequestOut)
 
 
-@router.post("/from-pdf", response_model=RequestDraftOut, status_code=status.HTTP_200_OK)
-async def extract_request_draft_from_pdf(
-    file: UploadFile = File(...),
-) -> RequestDraftOut:
+async def read_pdf_upload(file: UploadFile) -> tuple[bytes, str]:
+    """Validate an uploaded PDF and return (data, content type)."""
     # Basic file guard
     ct = (file.content_type or "").lower()
     if not ct.startswith("application/pdf"):
@@ -86,7 +189,14 @@ async def extract_request_draft_from_pdf(
             )
     except Exception as e:
         raise HTTPException(status_code=400, detail="Could not read uploaded file.")
-    
+    return data, ct
+
+
+@router.post("/from-pdf", response_model=RequestDraftOut, status_code=status.HTTP_200_OK)
+async def extract_request_draft_from_pdf(
+    file: UploadFile = File(...),
+) -> RequestDraftOut:
+    data, ct = await read_pdf_upload(file)
     result = svc.create_request_draft_from_pdf(
         data,
         filename=file.filename or "upload.pdf",
@@ -0,0 +1,170 @@
+"""
+Async twin of app.routers.procurement, mounted instead of it when
+DB_ASYNC_ROUTES is enabled. Same paths, schemas and responses; handlers run
+on the event loop with an AsyncSession (app.services.procurement_service_async).
+"""
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, Query, status, UploadFile, File, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import get_async_db, get_async_db_factory
+from app.core.security import create_events_token, get_current_user_async, require_api_key
+from app.models.user import User
+from app.models.enums import RequestStatus
+
+from app.schemas.procurement import (
+    ProcurementRequestLiteOut, ProcurementRequestOut,
+    ProcurementRequestCreate, ProcurementRequestUpdateIn,
+    RequestDraftOut, ProcurementRequestBulkCreate, ProcurementRequestBulkCreateOut,
+    ProcurementSearchOut, SimilarRequestOut,
+)
+from app.schemas.auth import Token
+from app.schemas.stats import SpendStatsOut
+from app.core.config import settings
+from app.core.json_response import json_response
+from app.routers.procurement import MONTH_PATTERN, read_pdf_upload
+from app.services import export
+from app.services import procurement_service_async as svc
+
+
+router = APIRouter(
+    prefix="/procurement",
+    tags=["requests"],
+    dependencies=[Depends(get_current_user_async), Depends(require_api_key)]
+)
+
+@router.get("", response_model=List[ProcurementRequestLiteOut])
+async def list_requests(status: Optional[RequestStatus] = Query(default=None), db: AsyncSession = Depends(get_async_db)):
+    return json_response(await svc.list_requests(db, status), List[ProcurementRequestLiteOut])
+
+@router.get("/mine", response_model=List[ProcurementRequestLiteOut])
+async def list_my_requests(
+    status: Optional[RequestStatus] = Query(default=None),
+    limit: int = Query(default=10, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    return json_response(
+        await svc.list_my_requests(db, current_user, status, limit), List[ProcurementRequestLiteOut]
+    )
+
+@router.get("/search", response_model=ProcurementSearchOut)
+async def search_requests(
+    q: str = Query(min_length=2, max_length=200),
+    status: Optional[RequestStatus] = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0, le=10_000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return json_response(await svc.search_requests(db, q, status, limit, offset), ProcurementSearchOut)
+
+@router.get("/stats", response_model=SpendStatsOut)
+async def spend_stats(
+    status: Optional[RequestStatus] = Query(default=None),
+    fromMonth: Optional[str] = Query(default=None, pattern=MONTH_PATTERN, description="YYYY-MM, inclusive"),
+    toMonth: Optional[str] = Query(default=None, pattern=MONTH_PATTERN, description="YYYY-MM, inclusive"),
+    vendorLimit: int = Query(default=20, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    return json_response(
+        await svc.get_spend_stats(
+            db, current_user,
+            status_filter=status, from_month=fromMonth, to_month=toMonth, vendor_limit=vendorLimit,
+        ),
+        SpendStatsOut,
+    )
+
+@router.post("/events/token", response_model=Token)
+async def procurement_events_token(current_user: User = Depends(get_current_user_async)):
+    return Token(access_token=create_events_token(current_user.id), expires_in=settings.EVENTS_TOKEN_EXPIRE_MINUTES)
+
+@router.get("/export")
+async def export_requests(
+    fmt: Literal["csv", "ndjson"] = Query(default="csv", alias="format"),
+    status: Optional[RequestStatus] = Query(default=None),
+    session_factory=Depends(get_async_db_factory),
+):
+    return StreamingResponse(
+        export.stream_export_async(session_factory, fmt, status),
+        media_type=export.MEDIA_TYPES[fmt],
+        headers=export.response_headers(fmt),
+    )
+
+@router.post("", response_model=ProcurementRequestLiteOut, status_code=status.HTTP_201_CREATED)
+async def create_procurement_request(
+    body: ProcurementRequestCreate,
+    allowDuplicate: bool = Query(default=False, description="Create even if an earlier request has the same content"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    return json_response(
+        await svc.create_request(db, body, current_user, allow_duplicate=allowDuplicate),
+        ProcurementRequestLiteOut,
+        status.HTTP_201_CREATED,
+    )
+
+@router.post("/bulk", response_model=ProcurementRequestBulkCreateOut)
+async def create_procurement_requests_bulk(
+    body: ProcurementRequestBulkCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    if len(body.items) > settings.BULK_CREATE_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.BULK_CREATE_MAX_ITEMS} requests per bulk import.",
+        )
+    return json_response(
+        await svc.create_requests_bulk(db, body.items, current_user), ProcurementRequestBulkCreateOut
+    )
+
+@router.post("/similar", response_model=List[SimilarRequestOut])
+async def find_similar_requests(
+    body: ProcurementRequestCreate,
+    limit: int = Query(default=10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return json_response(await svc.find_similar_requests(db, body, limit), List[SimilarRequestOut])
+
+@router.patch("/{request_id}", response_model=ProcurementRequestLiteOut)
+async def update_procurement_request(
+    request_id: str,
+    body: ProcurementRequestUpdateIn,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    return json_response(
+        await svc.update_request(db, request_id, body, current_user), ProcurementRequestLiteOut
+    )
+
+@router.get("/{request_id}/similar", response_model=List[SimilarRequestOut])
+async def get_similar_requests(
+    request_id: str,
+    limit: int = Query(default=10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return json_response(await svc.get_similar_requests(db, request_id, limit), List[SimilarRequestOut])
+
+@router.get("/{request_id}", response_model=ProcurementRequestOut)
+async def get_request_details(
+    request_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    return json_response(
+        await svc.get_request_details(db, request_id, current_user), ProcurementRequestOut
+    )
+
+
+@router.post("/from-pdf", response_model=RequestDraftOut, status_code=status.HTTP_200_OK)
+async def extract_request_draft_from_pdf(
+    file: UploadFile = File(...),
+) -> RequestDraftOut:
+    data, ct = await read_pdf_upload(file)
+    return await svc.create_request_draft_from_pdf(
+        data,
+        filename=file.filename or "upload.pdf",
+        content_type=ct or "application/pdf",
+    )
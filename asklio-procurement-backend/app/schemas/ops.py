@@ -0,0 +1,38 @@
+from typing import Dict, List, Optional
+from pydantic import BaseModel
+
+
+class AgentStageSummaryOut(BaseModel):
+    agent: str
+    stage: str
+    model: Optional[str] = None
+    calls: int
+    outcomes: Dict[str, int]
+    inputTokens: int
+    outputTokens: int
+    cachedTokens: int
+    costUsd: float
+    latencyP50Seconds: float
+    latencyP95Seconds: float
+
+
+class AgentStageRecordOut(BaseModel):
+    traceId: str
+    agent: str
+    stage: str
+    startedAt: float  # epoch seconds
+    model: Optional[str] = None
+    inputTokens: int
+    outputTokens: int
+    cachedTokens: int
+    costUsd: float
+    aiCalls: int
+    seconds: float
+    outcome: str
+
+
+class AgentTraceOut(BaseModel):
+    traceId: str
+    totalCostUsd: float
+    totalSeconds: float
+    stages: List[AgentStageRecordOut]
@@ -1,7 +1,7 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field, field_validator
 from app.schemas.commodity_group import CommodityGroupOut
-from app.models.enums import RequestStatus
+from app.models.enums import RequestStatus, ClassificationStatus
 
 # ---------- Inputs ----------
 class OrderLineIn(BaseModel):
@@ -26,6 +26,11 @@ class ProcurementRequestCreate(BaseModel):
     totalDiscountCents: Optional[int] = None
     orderLines: List[OrderLineIn]
 
+class ProcurementRequestBulkCreate(BaseModel):
+    # Raw items: each is validated as ProcurementRequestCreate individually,
+    # so one bad spreadsheet row doesn't reject the whole import.
+    items: List[Dict[str, Any]] = Field(min_length=1)
+
 class ProcurementRequestUpdateIn(BaseModel):
     version: int = Field(ge=1)
     status: Optional[RequestStatus] = None
@@ -37,6 +42,7 @@ class ProcurementRequestLiteOut(BaseModel):
     title: str
     commodityGroup: CommodityGroupOut
     commodityGroupConfidence: Optional[float] = None
+    classificationStatus: ClassificationStatus = ClassificationStatus.COMPLETED
     vendorName: str
     totalCostsCent: int
     requestorName: str
@@ -44,6 +50,28 @@ class ProcurementRequestLiteOut(BaseModel):
     status: RequestStatus
     createdAt: str
     
+class BulkCreateItemResult(BaseModel):
+    index: int
+    ok: bool
+    request: Optional[ProcurementRequestLiteOut] = None
+    error: Optional[str] = None
+
+class ProcurementRequestBulkCreateOut(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkCreateItemResult]
+
+class ProcurementSearchOut(BaseModel):
+    query: str
+    items: List[ProcurementRequestLiteOut]  # best match first
+    offset: int
+    limit: int
+    hasMore: bool
+
+class SimilarRequestOut(BaseModel):
+    similarity: float  # cosine similarity of the request embeddings
+    request: ProcurementRequestLiteOut
+
 class OrderLineOut(BaseModel):
     id: str
     description: str
@@ -66,6 +94,7 @@ class ProcurementRequestOut(BaseModel):
     title: str
     commodityGroup: CommodityGroupOut
     commodityGroupConfidence: Optional[float] = None
+    classificationStatus: ClassificationStatus = ClassificationStatus.COMPLETED
     vendorName: str
     vatNumber: str
     totalCostsCent: int
@@ -0,0 +1,19 @@
+from typing import List
+from pydantic import BaseModel
+
+
+class SpendBucketOut(BaseModel):
+    key: str  # commodity group / department id, vendor name, status or YYYY-MM
+    label: str
+    requestCount: int
+    totalCents: int
+
+
+class SpendStatsOut(BaseModel):
+    requestCount: int
+    totalCents: int
+    byCommodityGroup: List[SpendBucketOut]
+    byDepartment: List[SpendBucketOut]
+    byVendor: List[SpendBucketOut]  # top vendors by spend
+    byStatus: List[SpendBucketOut]
+    byMonth: List[SpendBucketOut]  # chronological
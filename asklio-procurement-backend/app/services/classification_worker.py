@@ -0,0 +1,75 @@
+"""
+Background worker for deferred commodity classification (CLASSIFICATION_MODE=deferred).
+
+Requests are persisted with a provisional group and classificationStatus=Pending;
+this worker runs the classifier on its own bounded thread pool (never on the
+request threadpool) and finalizes the row via
+procurement_service.complete_pending_classification.
+"""
+from __future__ import annotations
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from app.core import metrics, tracing
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.enums import ClassificationStatus
+from app.models.procurement_request import ProcurementRequest
+from app.utils.concurrency import submit_in_context
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.CLASSIFICATION_WORKERS),
+            thread_name_prefix="classify",
+        )
+    return _executor
+
+
+metrics.track_executor("classification", lambda: _executor)
+
+
+def _run(request_id: str) -> None:
+    # Imported lazily: the service module enqueues work here.
+    from app.services.procurement_service import complete_pending_classification
+
+    try:
+        with tracing.span("classification.deferred", request_id=request_id), SessionLocal() as db:
+            complete_pending_classification(db, request_id)
+    except Exception:
+        logger.exception("Deferred classification failed for request %s", request_id)
+
+
+def enqueue(request_id: str) -> None:
+    """Schedule classification of a pending request (traced as a child of the caller's span)."""
+    submit_in_context(_get_executor(), _run, request_id)
+
+
+def resume_pending() -> int:
+    """Re-enqueue requests left pending by a restart. Returns #enqueued."""
+    with SessionLocal() as db:
+        ids = [
+            rid for (rid,) in db.query(ProcurementRequest.id)
+            .filter(ProcurementRequest.classificationStatus == ClassificationStatus.PENDING)
+            .all()
+        ]
+    for rid in ids:
+        enqueue(rid)
+    if ids:
+        logger.info("Resumed %d pending classifications.", len(ids))
+    return len(ids)
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,237 @@
+"""
+Duplicate-submission detection for create_request.
+
+Every request gets a content fingerprint in procurement_request_fingerprint:
+sha256 over the normalized vendor name (case, accents, punctuation and legal
+form ignored), the normalized VAT id, the total in cents and a hash of the
+order lines (description, unit, unit price, quantity; in any order). The
+title is left out on purpose: a resubmitted quote often gets a new one.
+
+The lookup runs before classification, so a resubmission costs one indexed
+query instead of embedding + LLM calls. What happens next is up to
+DUPLICATE_CHECK_MODE (see procurement_service.create_request). In reject
+mode the fingerprint is checked again under `lock_statement` in the insert
+transaction, so two identical submissions at the same moment (a double
+click) cannot both pass the first check and both be created.
+
+    python -m app.services.duplicates rebuild
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import logging
+import re
+import sys
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.enums import ClassificationStatus
+from app.models.order_line import OrderLine
+from app.models.procurement_request import ProcurementRequest
+from app.models.request_fingerprint import RequestFingerprint
+
+logger = logging.getLogger(__name__)
+
+_INSERT_CHUNK = 2000
+_WORD = re.compile(r"[a-z0-9]+")
+_LEGAL_FORMS = frozenset({
+    "ag", "bv", "co", "corp", "ev", "gbr", "gmbh", "inc", "kg", "kgaa", "llc", "ltd", "mbh",
+    "nv", "ohg", "plc", "sa", "sarl", "se", "spa", "srl", "ug",
+})
+
+
+class Duplicate(NamedTuple):
+    request_id: str
+    match: str  # fingerprint | vector
+    commodity_group_id: Optional[int]
+    confidence: Optional[float]
+    source: Optional[str]
+    classified: bool  # False while the earlier request still awaits deferred classification
+
+
+# =========================
+# Fingerprint
+# =========================
+
+def _fold(text: Optional[str]) -> str:
+    """Lower-case ASCII words: 'Bürobedarf  K.G.' -> 'burobedarf k g'."""
+    ascii_text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii")
+    return " ".join(_WORD.findall(ascii_text.casefold()))
+
+
+def normalize_vendor(name: Optional[str]) -> str:
+    """'ACME  G.m.b.H. & Co. KG' -> 'acme' (dots dropped first, so abbreviations stay one word)."""
+    folded = _fold((name or "").replace(".", ""))
+    return " ".join(word for word in folded.split() if word not in _LEGAL_FORMS)
+
+
+def normalize_vat_id(vat_id: Optional[str]) -> str:
+    return re.sub(r"[^0-9A-Z]", "", (vat_id or "").upper())
+
+
+def _lines_hash(lines: Iterable[Any]) -> str:
+    """Order-independent hash of (description, unit, unit price, quantity) per line."""
+    rendered = sorted(
+        f"{_fold(line.description)}|{_fold(line.unit)}|{int(line.unitPriceCents)}|{float(line.quantity):g}"
+        for line in lines
+    )
+    return hashlib.sha256("\n".join(rendered).encode("utf-8")).hexdigest()
+
+
+def fingerprint(*, vendor_name: str, vat_id: Optional[str], total_cents: int, lines: Iterable[Any]) -> str:
+    key = "|".join(
+        (normalize_vendor(vendor_name), normalize_vat_id(vat_id), str(int(total_cents)), _lines_hash(lines))
+    )
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def fingerprint_values(request_id: str, value: str, created_at: datetime) -> Dict[str, Any]:
+    return {"requestID": request_id, "fingerprint": value, "created_at": created_at}
+
+
+# =========================
+# Lookup
+# =========================
+
+def window_start() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(days=settings.DUPLICATE_WINDOW_DAYS)
+
+
+def _candidate_select():
+    return select(
+        ProcurementRequest.id,
+        ProcurementRequest.vatID,
+        ProcurementRequest.commodityGroupID,
+        ProcurementRequest.commodityGroupConfidence,
+        ProcurementRequest.commodityGroupSource,
+        ProcurementRequest.classificationStatus,
+    )
+
+
+def fingerprint_statement(value: str, since: datetime):
+    """Newest request with this fingerprint created since `since` (served by the lookup index)."""
+    return (
+        _candidate_select()
+        .join(RequestFingerprint, RequestFingerprint.requestID == ProcurementRequest.id)
+        .where(RequestFingerprint.fingerprint == value, RequestFingerprint.created_at >= since)
+        .order_by(RequestFingerprint.created_at.desc())
+        .limit(1)
+    )
+
+
+def candidate_statement(request_id: str, since: datetime):
+    """A vector-search hit, if it was created since `since`."""
+    return _candidate_select().where(ProcurementRequest.id == request_id, ProcurementRequest.created_at >= since)
+
+
+def lock_statement(dialect_name: str, value: str):
+    """
+    Serializes creates with fingerprint `value` until the transaction ends.
+    Postgres: transaction-level advisory lock keyed by the fingerprint.
+    SQLite (no advisory locks): a no-op UPDATE takes the database write lock.
+    """
+    if dialect_name == "postgresql":
+        key = int.from_bytes(bytes.fromhex(value[:16]), "big", signed=True)
+        return select(func.pg_advisory_xact_lock(key))
+    if dialect_name == "sqlite":
+        return (
+            update(RequestFingerprint)
+            .where(RequestFingerprint.fingerprint == value)
+            .values(fingerprint=RequestFingerprint.fingerprint)
+            .execution_options(synchronize_session=False)
+        )
+    raise ValueError(f"Duplicate check locking is not available for dialect '{dialect_name}'")
+
+
+def to_duplicate(row, match: str, *, vat_id: Optional[str] = None) -> Optional[Duplicate]:
+    """Row of `fingerprint_statement` / `candidate_statement` -> Duplicate; vector hits must share the VAT id."""
+    if row is None:
+        return None
+    if vat_id is not None and normalize_vat_id(row.vatID) != normalize_vat_id(vat_id):
+        return None
+    return Duplicate(
+        request_id=row.id,
+        match=match,
+        commodity_group_id=row.commodityGroupID,
+        confidence=row.commodityGroupConfidence,
+        source=row.commodityGroupSource,
+        classified=row.classificationStatus == ClassificationStatus.COMPLETED,
+    )
+
+
+# =========================
+# Rebuild
+# =========================
+
+def _insert_fingerprints(db: Session, rows: List[Dict[str, Any]]) -> None:
+    for start in range(0, len(rows), _INSERT_CHUNK):
+        db.execute(insert(RequestFingerprint), rows[start:start + _INSERT_CHUNK])
+
+
+def rebuild(db: Session) -> int:
+    """Recompute every fingerprint from requests and order lines. Returns the request count."""
+    db.execute(delete(RequestFingerprint))
+    stream = db.execute(
+        select(
+            ProcurementRequest.id, ProcurementRequest.vendorName, ProcurementRequest.vatID,
+            ProcurementRequest.totalCosts, ProcurementRequest.created_at,
+            OrderLine.description, OrderLine.unit, OrderLine.unitPriceCents, OrderLine.quantity,
+        )
+        .outerjoin(OrderLine, OrderLine.requestID == ProcurementRequest.id)
+        .order_by(ProcurementRequest.id)
+        .execution_options(yield_per=5000)
+    )
+    rows: List[Dict[str, Any]] = []
+    count = 0
+    for request_id, group in groupby(stream, key=lambda row: row[0]):
+        lines = list(group)
+        first = lines[0]
+        value = fingerprint(
+            vendor_name=first.vendorName, vat_id=first.vatID, total_cents=first.totalCosts or 0,
+            lines=[line for line in lines if line.description is not None],
+        )
+        rows.append(fingerprint_values(request_id, value, first.created_at))
+        if len(rows) >= _INSERT_CHUNK:
+            _insert_fingerprints(db, rows)
+            count += len(rows)
+            rows = []
+    _insert_fingerprints(db, rows)
+    db.commit()
+    return count + len(rows)
+
+
+def ensure_built(db: Session) -> bool:
+    """Rebuild if there are requests but no fingerprints (first start, restored dump)."""
+    if db.scalar(select(RequestFingerprint.requestID).limit(1)) is not None:
+        return False
+    if db.scalar(select(ProcurementRequest.id).limit(1)) is None:
+        return False
+    logger.info("Request fingerprints empty; fingerprinted %d requests.", rebuild(db))
+    return True
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args(argv)
+
+    import app.models  # noqa: F401  (registers tables)
+    from app.db.base import Base
+    from app.db.session import SessionLocal, engine
+
+    logging.basicConfig(level=logging.INFO)
+    Base.metadata.create_all(bind=engine, tables=[RequestFingerprint.__table__])
+    with SessionLocal() as db:
+        print(f"fingerprinted {rebuild(db)} requests")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
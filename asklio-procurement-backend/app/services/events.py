@@ -0,0 +1,64 @@
+"""
+In-process event broker for server-sent events.
+
+Background workers (plain threads) publish; SSE handlers (event loop) subscribe.
+Delivery is best effort and per process: with several uvicorn workers a client
+only sees events produced by the worker it is connected to, so clients should
+still refresh the affected request when they (re)connect.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MAX_QUEUED = 100  # per subscriber; slow clients drop events rather than grow memory
+KEEPALIVE_SECONDS = 15.0
+
+_subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+_lock = threading.Lock()
+
+
+def _offer(queue: asyncio.Queue, event: Dict[str, Any]) -> None:
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        logger.warning("Dropping event for slow subscriber: %s", event.get("type"))
+
+
+def publish(event_type: str, payload: Dict[str, Any]) -> None:
+    """Thread-safe: deliver an event to every connected subscriber."""
+    event = {"type": event_type, "data": payload}
+    with _lock:
+        subscribers = list(_subscribers)
+    for loop, queue in subscribers:
+        try:
+            loop.call_soon_threadsafe(_offer, queue, event)
+        except RuntimeError:
+            # loop already closed; the subscriber will be removed on its side
+            pass
+
+
+async def stream() -> AsyncIterator[str]:
+    """Yield SSE-formatted messages until the client disconnects."""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=_MAX_QUEUED)
+    entry = (loop, queue)
+    with _lock:
+        _subscribers.append(entry)
+    try:
+        yield ": connected\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+    finally:
+        with _lock:
+            _subscribers.remove(entry)
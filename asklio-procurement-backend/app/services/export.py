@@ -0,0 +1,239 @@
+"""
+Streaming export of requests with their order lines (GET /procurement/export).
+
+One flat query (request x order line, list-view joins, same filters as the
+list endpoint) is read through a server-side cursor in batches of
+EXPORT_BATCH_ROWS (`yield_per`); every batch is encoded into one response
+chunk. Memory stays constant in the number of rows, and on Postgres each
+FETCH is its own statement, so DB_STATEMENT_TIMEOUT_MS bounds a batch, not
+the whole export.
+
+- csv: one line per order line, request columns repeated (requests without
+  lines get one line with empty line columns). Text cells starting with
+  = + - @ are prefixed with ' so spreadsheets do not evaluate them.
+- ndjson: one JSON object per request with its `orderLines`, same field
+  names as the detail DTO.
+
+The response outlives the request's dependencies, so the stream opens its
+own session from the factory it is given (app.db.session.get_db_factory).
+"""
+from __future__ import annotations
+
+import csv
+import io
+import logging
+from datetime import date
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional
+
+from pydantic_core import to_json
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import settings
+from app.models.commodity_group import CommodityGroup
+from app.models.department import Department
+from app.models.enums import RequestStatus
+from app.models.order_line import OrderLine
+from app.models.procurement_request import ProcurementRequest
+from app.models.user import User
+from app.services import procurement_common
+
+logger = logging.getLogger(__name__)
+
+_ROWS = metrics.counter("export_rows_total", "Exported order-line rows by format")
+
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+_REQUEST_COLUMNS = (
+    "id", "title", "vendorName", "vatNumber", "status", "commodityGroupID", "commodityGroupCategory",
+    "commodityGroupName", "requestorName", "requestorDepartment", "createdAt",
+    "totalCostsCent", "shippingCents", "taxCents", "totalDiscountCents",
+)
+_LINE_COLUMNS = ("id", "description", "unit", "unitPriceCents", "quantity", "totalPriceCents")
+CSV_HEADER = _REQUEST_COLUMNS + tuple(f"orderLine{c[0].upper()}{c[1:]}" for c in _LINE_COLUMNS)
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+_STATUS, _REQUESTOR, _DEPARTMENT, _CREATED_AT = (CSV_HEADER.index(c) for c in (
+    "status", "requestorName", "requestorDepartment", "createdAt"))
+_LINE_START = len(_REQUEST_COLUMNS)
+_TEXT_CELLS = tuple(CSV_HEADER.index(c) for c in (
+    "title", "vendorName", "vatNumber", "commodityGroupCategory", "commodityGroupName",
+    "requestorName", "requestorDepartment", "orderLineDescription", "orderLineUnit"))
+
+
+def response_headers(fmt: str) -> Dict[str, str]:
+    filename = f"procurement-requests-{date.today().isoformat()}.{fmt}"
+    return {"Content-Disposition": f'attachment; filename="{filename}"', "X-Accel-Buffering": "no"}
+
+
+def export_statement(status_filter: Optional[RequestStatus] = None):
+    """Request x order line rows, newest request first, lines of a request adjacent."""
+    stmt = (
+        procurement_common.list_view_joins(select(
+            ProcurementRequest.id,
+            ProcurementRequest.title,
+            ProcurementRequest.vendorName,
+            ProcurementRequest.vatID,
+            ProcurementRequest.status,
+            CommodityGroup.id.label("cg_id"),
+            CommodityGroup.category.label("cg_category"),
+            CommodityGroup.name.label("cg_name"),
+            (User.firstname + " " + User.lastname).label("requestor_name"),
+            Department.name.label("requestor_department"),
+            ProcurementRequest.created_at,
+            ProcurementRequest.totalCosts,
+            ProcurementRequest.shippingCents,
+            ProcurementRequest.taxCents,
+            ProcurementRequest.discountCents,
+            OrderLine.id.label("line_id"),
+            OrderLine.description,
+            OrderLine.unit,
+            OrderLine.unitPriceCents,
+            OrderLine.quantity,
+            OrderLine.totalPriceCents,
+        ))
+        .outerjoin(OrderLine, OrderLine.requestID == ProcurementRequest.id)
+        .order_by(ProcurementRequest.created_at.desc(), ProcurementRequest.id, OrderLine.id)
+    )
+    if status_filter:
+        stmt = stmt.where(ProcurementRequest.status == status_filter)
+    return stmt.execution_options(yield_per=settings.EXPORT_BATCH_ROWS)
+
+
+# =========================
+# Encoders (one response chunk per batch)
+# =========================
+
+class CsvEncoder:
+    def __init__(self) -> None:
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="\r\n")
+
+    def _take(self) -> bytes:
+        data = self._buffer.getvalue().encode("utf-8")
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+    @staticmethod
+    def _row(row) -> List[Any]:
+        # export_statement selects the columns in CSV_HEADER order; None is written as ""
+        values = list(row)
+        values[_STATUS] = values[_STATUS].value
+        values[_CREATED_AT] = values[_CREATED_AT].isoformat() if values[_CREATED_AT] else ""
+        values[_REQUESTOR] = values[_REQUESTOR] or "—"
+        values[_DEPARTMENT] = values[_DEPARTMENT] or "—"
+        for i in _TEXT_CELLS:
+            value = values[i]
+            if value and value.startswith(_FORMULA_PREFIXES):
+                values[i] = "'" + value
+        return values
+
+    def start(self) -> bytes:
+        self._buffer.write("\ufeff")  # BOM: spreadsheet apps then read the file as UTF-8
+        self._writer.writerow(CSV_HEADER)
+        return self._take()
+
+    def encode(self, rows: Iterable[Any]) -> bytes:
+        self._writer.writerows(map(self._row, rows))
+        return self._take()
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class NdjsonEncoder:
+    """Groups the adjacent rows of a request; the last request of a batch waits for the next one."""
+
+    def __init__(self) -> None:
+        self._current: Optional[Dict[str, Any]] = None
+
+    def start(self) -> bytes:
+        return b""
+
+    @staticmethod
+    def _request(row) -> Dict[str, Any]:
+        return {
+            "id": row.id,
+            "title": row.title,
+            "vendorName": row.vendorName,
+            "vatNumber": row.vatID,
+            "status": row.status.value,
+            "commodityGroup": {"id": row.cg_id, "category": row.cg_category, "name": row.cg_name},
+            "requestorName": row.requestor_name or "—",
+            "requestorDepartment": row.requestor_department or "—",
+            "createdAt": row.created_at.isoformat() if row.created_at else "",
+            "totalCostsCent": row.totalCosts,
+            "shippingCents": row.shippingCents,
+            "taxCents": row.taxCents,
+            "totalDiscountCents": row.discountCents,
+            "orderLines": [],
+        }
+
+    def encode(self, rows: Iterable[Any]) -> bytes:
+        out: List[bytes] = []
+        for row in rows:
+            if self._current is None or self._current["id"] != row.id:
+                if self._current is not None:
+                    out.append(to_json(self._current) + b"\n")
+                self._current = self._request(row)
+            if row.line_id is not None:
+                self._current["orderLines"].append(dict(zip(_LINE_COLUMNS, row[_LINE_START:])))
+        return b"".join(out)
+
+    def finish(self) -> bytes:
+        current, self._current = self._current, None
+        return to_json(current) + b"\n" if current is not None else b""
+
+
+ENCODERS: Dict[str, Callable[[], Any]] = {"csv": CsvEncoder, "ndjson": NdjsonEncoder}
+
+
+# =========================
+# Streams
+# =========================
+
+def stream_export(
+    session_factory: Callable[[], Session],
+    fmt: str,
+    status_filter: Optional[RequestStatus] = None,
+) -> Iterator[bytes]:
+    """Response body for StreamingResponse (iterated in the threadpool)."""
+    encoder = ENCODERS[fmt]()
+    yield encoder.start()
+    with session_factory() as db:
+        try:
+            result = db.execute(export_statement(status_filter))
+            for batch in result.partitions():
+                _ROWS.inc(len(batch), format=fmt)
+                chunk = encoder.encode(batch)
+                if chunk:
+                    yield chunk
+        except Exception:
+            # Headers are sent; the client sees a truncated body
+            logger.exception("Export (%s) failed mid-stream", fmt)
+            raise
+    yield encoder.finish()
+
+
+async def stream_export_async(
+    session_factory: Callable[[], AsyncSession],
+    fmt: str,
+    status_filter: Optional[RequestStatus] = None,
+) -> AsyncIterator[bytes]:
+    """Async twin of `stream_export` (AsyncSession.stream)."""
+    encoder = ENCODERS[fmt]()
+    yield encoder.start()
+    async with session_factory() as db:
+        try:
+            result = await db.stream(export_statement(status_filter))
+            async for batch in result.partitions():
+                _ROWS.inc(len(batch), format=fmt)
+                chunk = encoder.encode(batch)
+                if chunk:
+                    yield chunk
+        except Exception:
+            logger.exception("Export (%s) failed mid-stream", fmt)
+            raise
+    yield encoder.finish()
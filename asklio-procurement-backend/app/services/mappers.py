@@ -10,6 +10,7 @@ from app.schemas.commodity_group import CommodityGroupOut
 from app.models.procurement_request import ProcurementRequest
 from app.models.procurement_request_update import ProcurementRequestUpdate
 from app.models.order_line import OrderLine
+from app.models.enums import ClassificationStatus
 
 # ---------- Small helpers ----------
 
@@ -53,6 +54,7 @@ def to_lite_out(request: ProcurementRequest) -> ProcurementRequestLiteOut:
         title=request.title,
         commodityGroup=commodity_group_out,
         commodityGroupConfidence=request.commodityGroupConfidence,
+        classificationStatus=request.classificationStatus or ClassificationStatus.COMPLETED,
         vendorName=request.vendorName,
         totalCostsCent=request.totalCosts,
         requestorName=requestor_name,
@@ -62,6 +64,26 @@ def to_lite_out(request: ProcurementRequest) -> ProcurementRequestLiteOut:
     )
 
 
+def lite_out_from_row(row) -> ProcurementRequestLiteOut:
+    """
+    Map a row of the list-view column projection
+    (procurement_common.lite_list_select) to the same DTO as `to_lite_out`.
+    """
+    return ProcurementRequestLiteOut(
+        id=row.id,
+        title=row.title,
+        commodityGroup=CommodityGroupOut(id=row.cg_id, category=row.cg_category, name=row.cg_name),
+        commodityGroupConfidence=row.commodityGroupConfidence,
+        classificationStatus=row.classificationStatus or ClassificationStatus.COMPLETED,
+        vendorName=row.vendorName,
+        totalCostsCent=row.totalCosts,
+        requestorName=row.requestor_name or "—",
+        requestorDepartment=row.requestor_department or "—",
+        status=row.status,
+        createdAt=_iso_datetime(row.created_at),
+    )
+
+
 def _to_order_line_out(line: OrderLine) -> OrderLineOut:
     """Map an OrderLine ORM row to its DTO."""
     return OrderLineOut(
@@ -124,6 +146,7 @@ def to_detail_out(
         title=request.title,
         commodityGroup=commodity_group_out,
         commodityGroupConfidence=request.commodityGroupConfidence,
+        classificationStatus=request.classificationStatus or ClassificationStatus.COMPLETED,
         vendorName=request.vendorName,
         vatNumber=request.vatID,
         totalCostsCent=request.totalCosts,
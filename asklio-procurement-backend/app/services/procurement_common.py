@@ -0,0 +1,652 @@
+"""
+Building blocks shared by the sync (app.services.procurement_service) and the
+async (app.services.procurement_service_async) procurement service.
+
+Nothing here touches a session: order lines and totals, the embedding text,
+the classifier call and its fallback, the rows written on create and update,
+vector-store calls and the bulk-import helpers. Statements shared by both
+services (and the export) are built here; the services own executing them
+and the transactions around them. Blocking calls (AI client, agents,
+Weaviate) are plain functions; the async service runs them on its
+blocking-call pool.
+
+Tests patch the agent registry, AI client, embedding cache and vector store
+here.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional
+from uuid import uuid4
+
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy import select, update
+
+from app.agents.base import AgentError
+from app.agents.commodity_classifier.contracts import CommodityClassifyIn, CommodityGroupRef
+from app.agents.commodity_classifier.heuristics import guess_commodity_group
+from app.agents.registry import get_agent_registry
+from app.ai.client import get_ai_client
+from app.ai.embedding_cache import get_embedding_cache
+from app.core import metrics, tracing
+from app.core.config import settings
+from app.models.commodity_group import CommodityGroup
+from app.models.department import Department
+from app.models.enums import ClassificationStatus, RequestStatus
+from app.models.order_line import OrderLine
+from app.models.procurement_request import ProcurementRequest
+from app.models.procurement_request_update import ProcurementRequestUpdate
+from app.models.request_fingerprint import RequestFingerprint
+from app.models.search_document import SearchDocument
+from app.models.user import User
+from app.schemas.procurement import (
+    BulkCreateItemResult,
+    ProcurementRequestBulkCreateOut,
+    ProcurementRequestCreate,
+    ProcurementRequestLiteOut,
+    ProcurementRequestUpdateIn,
+    SimilarRequestOut,
+)
+from app.services import duplicates, search_index, spend_rollups
+from app.services.mappers import lite_out_from_row
+import app.weaviate.operations as wx
+from app.weaviate.text_formatter import build_request_embedding_text
+
+logger = logging.getLogger(__name__)
+
+CLASSIFIER_OVERRIDES = metrics.counter(
+    "classifier_overrides_total",
+    "Manager commodity-group changes on auto-classified requests, by deciding stage",
+)
+DUPLICATES = metrics.counter(
+    "duplicate_submissions_total",
+    "Likely duplicate requests caught at create time, by match (fingerprint | vector) and mode",
+)
+
+Classification = tuple[int, float, Optional[str]]  # (group id, confidence, deciding stage)
+
+
+# =========================
+# Request text & rows
+# =========================
+
+def order_line_text(line) -> str:
+    """One order line as rendered for the classifier and the embedding text."""
+    return f"{line.quantity} x {line.description} @ {line.unitPriceCents/100:.2f} per {line.unit}"
+
+
+def embedding_text(*, title: str, vendor_name: str, vat_id: Optional[str], order_lines) -> str:
+    return build_request_embedding_text(
+        title=title,
+        vendor_name=vendor_name,
+        vat_id=vat_id,
+        order_lines_text=[order_line_text(ol) for ol in order_lines],
+    )
+
+
+def body_embedding_text(body: ProcurementRequestCreate) -> str:
+    return embedding_text(
+        title=body.title, vendor_name=body.vendorName, vat_id=body.vatID, order_lines=body.orderLines
+    )
+
+
+def embed(text: str) -> list[float]:
+    """Embed a request text through the process-wide embedding cache."""
+    return get_embedding_cache().embed(get_ai_client(), text)
+
+
+def build_order_lines(body: ProcurementRequestCreate) -> tuple[list[OrderLine], int]:
+    """Build order line rows and return them with the summed line total in cents."""
+    order_line_rows: list[OrderLine] = []
+    total_price_cents: int = 0
+
+    for line in body.orderLines:
+        line_total_cents = line.unitPriceCents * line.quantity
+        total_price_cents += line_total_cents
+
+        order_line_rows.append(
+            OrderLine(
+                id=str(uuid4()),
+                description=line.description,
+                unitPriceCents=int(line.unitPriceCents),
+                quantity=line.quantity,
+                unit=line.unit,
+                totalPriceCents=int(line_total_cents),
+            )
+        )
+    return order_line_rows, total_price_cents
+
+
+def summary_total_cents(body: ProcurementRequestCreate, lines_total_cents: int) -> int:
+    shipping = int(body.shippingCents or 0)
+    tax = int(body.taxCents or 0)
+    discount = int(body.totalDiscountCents or 0)
+    return int(lines_total_cents + shipping + tax - discount)
+
+
+def build_request(
+    body: ProcurementRequestCreate,
+    user: User,
+    *,
+    order_lines: list[OrderLine],
+    total_cents: int,
+    fingerprint: str,
+    classification: Classification,
+    pending: bool,
+) -> tuple[ProcurementRequest, list[Any], spend_rollups.Deltas]:
+    """
+    The new request row, the rows written with it (fingerprint, search
+    document) and its spend-rollup deltas.
+    """
+    cg_id, conf, source = classification
+    new_request = ProcurementRequest(
+        id=str(uuid4()),
+        title=body.title,
+        vendorName=body.vendorName,
+        vatID=body.vatID,
+        commodityGroupID=cg_id,
+        commodityGroupConfidence=conf,
+        commodityGroupSource=source,
+        classificationStatus=ClassificationStatus.PENDING if pending else ClassificationStatus.COMPLETED,
+        totalCosts=total_cents,
+        shippingCents=int(body.shippingCents or 0),
+        taxCents=int(body.taxCents or 0),
+        discountCents=int(body.totalDiscountCents or 0),
+        createdByUserID=user.id,
+        created_at=datetime.now(timezone.utc),  # explicit: the spend rollup month must match the row
+        order_lines=order_lines,
+    )
+    companions = [
+        RequestFingerprint(**duplicates.fingerprint_values(new_request.id, fingerprint, new_request.created_at)),
+        SearchDocument(**search_index.document_values(new_request.id, body)),
+    ]
+    rollup: spend_rollups.Deltas = {}
+    spend_rollups.add_request(rollup, new_request, user.departmentID)
+    return new_request, companions, rollup
+
+
+def write_lock_statement(dialect_name: str, request_id: str):
+    """
+    Statement to run before loading a request for update, or None.
+    On Postgres the load itself locks the row (SELECT ... FOR UPDATE). SQLite
+    has no row locks; a no-op UPDATE takes its database write lock instead,
+    so no other writer commits until this transaction ends.
+    """
+    if dialect_name != "sqlite":
+        return None
+    return (
+        update(ProcurementRequest)
+        .where(ProcurementRequest.id == request_id)
+        .values(version=ProcurementRequest.version)
+        .execution_options(synchronize_session=False)
+    )
+
+
+class AppliedUpdate(NamedTuple):
+    audit: ProcurementRequestUpdate
+    rollup: spend_rollups.Deltas
+    regrouped: bool  # commodity group changed: the vector store needs the new group
+
+
+def apply_update(
+    procurement_request: ProcurementRequest,
+    body: ProcurementRequestUpdateIn,
+    user: User,
+) -> Optional[AppliedUpdate]:
+    """
+    Apply a manager's status / commodity-group change to a loaded request and
+    bump its version. Returns None if nothing changed; otherwise the audit
+    row and the rollup deltas, both computed from the row as loaded. The
+    caller must load it locked (`write_lock_statement`, FOR UPDATE) and
+    fresh: if the deferred-classification worker committed in between, the
+    deltas would move the amount out of a bucket it has already left.
+    """
+    previous_status = procurement_request.status
+    previous_cg_id = procurement_request.commodityGroupID
+    did_change = False
+
+    if body.status is not None and body.status != procurement_request.status:
+        procurement_request.status = body.status
+        did_change = True
+
+    regrouped = body.commodityGroupID is not None and body.commodityGroupID != previous_cg_id
+    if regrouped:
+        procurement_request.commodityGroupID = body.commodityGroupID
+        procurement_request.commodityGroupConfidence = None
+        # A manual choice settles any pending background classification
+        procurement_request.classificationStatus = ClassificationStatus.COMPLETED
+        did_change = True
+        if procurement_request.commodityGroupSource:
+            # Track how often each classifier stage gets corrected by a manager
+            CLASSIFIER_OVERRIDES.inc(path=procurement_request.commodityGroupSource)
+
+    if not did_change:
+        return None
+
+    # Audit row with the fields that actually changed
+    audit = ProcurementRequestUpdate(
+        id=str(uuid4()),
+        requestID=procurement_request.id,
+        updatedByUserID=user.id,
+        oldStatus=previous_status if body.status is not None else None,
+        newStatus=procurement_request.status if body.status is not None else None,
+        oldCommodityGroupID=previous_cg_id if body.commodityGroupID is not None else None,
+        newCommodityGroupID=procurement_request.commodityGroupID if body.commodityGroupID is not None else None,
+    )
+    # Move the request's amount between spend buckets
+    rollup: spend_rollups.Deltas = {}
+    spend_rollups.move_request(
+        rollup,
+        procurement_request,
+        procurement_request.created_by.departmentID if procurement_request.created_by else None,
+        old_status=previous_status,
+        old_commodity_group_id=previous_cg_id,
+    )
+    procurement_request.version = (procurement_request.version or 1) + 1
+    return AppliedUpdate(audit, rollup, regrouped)
+
+
+def check_version(procurement_request: ProcurementRequest, body: ProcurementRequestUpdateIn) -> None:
+    """Optimistic concurrency: 409 unless the client edited the current version."""
+    procurement_request.version = procurement_request.version or 1
+    if body.version != procurement_request.version:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Version mismatch. Current version is {procurement_request.version}",
+        )
+
+
+# =========================
+# List views
+# =========================
+
+def list_view_joins(stmt):
+    """Outer-join commodity group, requestor and department onto a ProcurementRequest select."""
+    return (
+        stmt.select_from(ProcurementRequest)
+        .outerjoin(CommodityGroup, ProcurementRequest.commodityGroupID == CommodityGroup.id)
+        .outerjoin(User, ProcurementRequest.createdByUserID == User.id)
+        .outerjoin(Department, User.departmentID == Department.id)
+    )
+
+
+def lite_list_select():
+    """
+    Column projection for list views: exactly the fields `lite_out_from_row`
+    needs, one flat row per request via explicit joins, without loading
+    ProcurementRequest / CommodityGroup / User / Department entities.
+    """
+    return list_view_joins(select(
+        ProcurementRequest.id,
+        ProcurementRequest.title,
+        ProcurementRequest.commodityGroupConfidence,
+        ProcurementRequest.classificationStatus,
+        ProcurementRequest.vendorName,
+        ProcurementRequest.totalCosts,
+        ProcurementRequest.status,
+        ProcurementRequest.created_at,
+        CommodityGroup.id.label("cg_id"),
+        CommodityGroup.category.label("cg_category"),
+        CommodityGroup.name.label("cg_name"),
+        (User.firstname + " " + User.lastname).label("requestor_name"),
+        Department.name.label("requestor_department"),
+    ))
+
+
+# =========================
+# Classification
+# =========================
+
+def commodity_group_refs(cg_rows: list[CommodityGroup]) -> list[CommodityGroupRef]:
+    return [CommodityGroupRef(id=int(cg.id), label=cg.name, category=cg.category) for cg in cg_rows]
+
+
+def classify(
+    *,
+    title: str,
+    vendor_name: str,
+    vat_id: Optional[str],
+    order_lines,
+    cg_refs: list[CommodityGroupRef],
+    embedding: Optional[list[float]] = None,
+) -> tuple[Optional[int], float, Optional[str]]:
+    """
+    Run the commodity classifier agent for one request (body or ORM order lines).
+    Returns (group id, confidence, deciding stage); group id is None if the agent abstained.
+    Raises AgentError on agent failure so callers can apply their fallback.
+    """
+    agent_input = CommodityClassifyIn(
+        title=title,
+        vendor_name=vendor_name,
+        vat_id=vat_id,
+        order_lines_text=[order_line_text(ol) for ol in order_lines],
+        available_commodity_groups=cg_refs,
+        embedding=embedding,
+        trace_id=tracing.current_trace_id() or str(uuid4()),
+    )
+    classifier = get_agent_registry().commodity_classifier
+    agent_result = classifier.run(agent_input)
+    return (
+        agent_result.suggested_commodity_group_id,
+        agent_result.confidence or 0.0,
+        getattr(agent_result, "decision_path", None),
+    )
+
+
+def classify_or_fallback(
+    body: ProcurementRequestCreate,
+    cg_rows: list[CommodityGroup],
+    cg_refs: list[CommodityGroupRef],
+    embedding: Optional[list[float]],
+) -> Classification:
+    """`classify` for a create body; abstention or agent failure -> first group, zero confidence."""
+    try:
+        cg_id, conf, source = classify(
+            title=body.title,
+            vendor_name=body.vendorName,
+            vat_id=body.vatID,
+            order_lines=body.orderLines,
+            cg_refs=cg_refs,
+            embedding=embedding,
+        )
+    except AgentError as e:
+        logger.exception("Commodity classifier failed; using fallback: %s", e)
+        cg_id = None
+    if cg_id is None:
+        if not cg_rows:
+            raise HTTPException(status_code=500, detail="No commodity groups available.")
+        cg_id, conf, source = int(cg_rows[0].id), 0.0, "fallback"
+    return cg_id, conf, source
+
+
+def provisional_group(body: ProcurementRequestCreate, cg_refs: list[CommodityGroupRef]) -> Classification:
+    """Deferred mode: cheap local guess now, the LLM pipeline runs after the response."""
+    cg_id, conf = guess_commodity_group(
+        title=body.title,
+        vendor_name=body.vendorName,
+        order_lines_text=[order_line_text(ol) for ol in body.orderLines],
+        groups=cg_refs,
+    )
+    if cg_id is None:
+        raise HTTPException(status_code=500, detail="No commodity groups available.")
+    return cg_id, conf, "heuristic"
+
+
+def duplicate_conflict(duplicate: duplicates.Duplicate, existing: ProcurementRequestLiteOut) -> HTTPException:
+    """409 for a rejected duplicate; the detail carries the earlier request."""
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={
+            "message": "This request looks like a duplicate of an existing one. "
+                       "Resubmit with allowDuplicate=true to create it anyway.",
+            "match": duplicate.match,
+            "duplicateOf": existing.model_dump(mode="json"),
+        },
+    )
+
+
+# =========================
+# Vector store (best effort unless noted)
+# =========================
+
+def index_request(
+    request_id: str,
+    commodity_group_id: Optional[int],
+    text: str,
+    embedding: Optional[list[float]],
+    label_source: Optional[str],
+) -> None:
+    """Best-effort Weaviate indexing; never fails the caller. `label_source` is the group's commodityGroupSource."""
+    try:
+        if embedding is None:
+            embedding = embed(text)
+        wx.add(
+            request_id=request_id,
+            commodity_group=str(commodity_group_id),
+            embedded_request_context=text,
+            vector=embedding,
+            label_source=label_source,
+        )
+    except Exception as e:
+        logger.exception("Weaviate index failed for request %s: %s", request_id, e)
+
+
+def regroup_vectors(request_id: str, commodity_group_id: int) -> None:
+    """Move a request's vectors to the group a manager chose; never fails the caller."""
+    try:
+        updated = wx.update_commodity_group(
+            request_id=request_id, new_commodity_group=str(commodity_group_id), label_source="manual"
+        )
+        logger.info(
+            "Weaviate: updated %d objects for request_id=%s to CG=%s",
+            updated, request_id, commodity_group_id
+        )
+    except Exception as e:
+        logger.exception(
+            "Weaviate update_commodity_group failed for request_id=%s -> %s: %s",
+            request_id, commodity_group_id, e
+        )
+
+
+def stored_vector(request_id: str) -> Optional[list[float]]:
+    """The request's vector from the vector store; None if missing or the lookup fails."""
+    try:
+        return wx.get_vector(request_id)
+    except Exception as e:
+        logger.warning("Stored vector lookup failed for request %s: %s", request_id, e)
+        return None
+
+
+def similar_hits(
+    text: Optional[str],
+    vector: Optional[list[float]],
+    limit: int,
+    exclude_id: Optional[str] = None,
+) -> List[tuple[str, float]]:
+    """
+    (request id, cosine similarity) of the nearest indexed requests, most
+    similar first, one entry per request. Embeds `text` if no vector is given.
+    Raises 503 if the search fails.
+    """
+    try:
+        if vector is None:
+            vector = embed(text)
+        hits = wx.search_similar(vector, top_k=limit + 1)
+    except Exception as e:
+        logger.warning("Similar-request search failed: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Similar-request search is unavailable.",
+        )
+
+    out: List[tuple[str, float]] = []
+    seen = {exclude_id}
+    for hit in hits:
+        request_id = hit.get("requestId")
+        if request_id in seen:
+            continue
+        seen.add(request_id)
+        distance = hit.get("distance")
+        # Cosine distance; certainty is (1 + cos) / 2
+        similarity = 1.0 - distance if distance is not None else 2.0 * (hit.get("certainty") or 0.5) - 1.0
+        out.append((request_id, round(similarity, 4)))
+    return out[:limit]
+
+
+def similar_out(hits: List[tuple[str, float]], rows) -> List[SimilarRequestOut]:
+    """Pair hits with their list-view rows, in hit order; unknown ids are dropped."""
+    by_id = {row.id: row for row in rows}
+    return [
+        SimilarRequestOut(similarity=similarity, request=lite_out_from_row(by_id[request_id]))
+        for request_id, similarity in hits
+        if request_id in by_id
+    ]
+
+
+def nearest_request_id(text: str) -> Optional[str]:
+    """Nearest indexed request if at least DUPLICATE_VECTOR_MIN_SIMILARITY similar."""
+    try:
+        hits = similar_hits(text, None, 1)
+    except HTTPException:
+        return None
+    if hits and hits[0][1] >= settings.DUPLICATE_VECTOR_MIN_SIMILARITY:
+        return hits[0][0]
+    return None
+
+
+# =========================
+# Bulk import
+# =========================
+
+def validation_message(e: ValidationError) -> str:
+    """Compact 'field: message; ...' summary of a pydantic validation error."""
+    return "; ".join(
+        f"{'.'.join(str(p) for p in err.get('loc', ())) or 'body'}: {err.get('msg', 'invalid')}"
+        for err in e.errors()
+    )
+
+
+def validate_bulk_items(
+    items: List[Dict[str, Any]],
+    results: Dict[int, BulkCreateItemResult],
+) -> List[tuple[int, ProcurementRequestCreate]]:
+    """Valid (index, body) pairs; invalid items are reported into `results`."""
+    valid: List[tuple[int, ProcurementRequestCreate]] = []
+    for index, raw in enumerate(items):
+        try:
+            valid.append((index, ProcurementRequestCreate.model_validate(raw)))
+        except ValidationError as e:
+            results[index] = BulkCreateItemResult(index=index, ok=False, error=validation_message(e))
+    return valid
+
+
+def bulk_row_values(
+    valid: List[tuple[int, ProcurementRequestCreate]],
+    outcomes: List[Any],
+    cg_rows: List[CommodityGroup],
+    user: User,
+    results: Dict[int, BulkCreateItemResult],
+) -> tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[tuple[int, str, int]]]:
+    """
+    Insert values for the classified bulk items. `outcomes[i]` is the
+    (group id, confidence, stage) of valid[i], or the exception it raised;
+    failed items are reported into `results`.
+    Returns (request rows, order line rows, [(batch position, request id, item index)]).
+    """
+    now = datetime.now(timezone.utc)
+    request_values: List[Dict[str, Any]] = []
+    line_values: List[Dict[str, Any]] = []
+    created: List[tuple[int, str, int]] = []
+    for i, (index, body) in enumerate(valid):
+        outcome = outcomes[i]
+        if isinstance(outcome, BaseException):
+            logger.error("Bulk item %d failed during classification: %s", index, outcome, exc_info=outcome)
+            results[index] = BulkCreateItemResult(index=index, ok=False, error="Classification failed.")
+            continue
+        cg_id, conf, source = outcome
+        if cg_id is None:
+            cg_id, conf, source = int(cg_rows[0].id), 0.0, "fallback"
+
+        request_id = str(uuid4())
+        order_line_rows, lines_total = build_order_lines(body)
+        request_values.append({
+            "id": request_id,
+            "title": body.title,
+            "vendorName": body.vendorName,
+            "vatID": body.vatID,
+            "commodityGroupID": cg_id,
+            "commodityGroupConfidence": conf,
+            "commodityGroupSource": source,
+            "totalCosts": summary_total_cents(body, lines_total),
+            "shippingCents": int(body.shippingCents or 0),
+            "taxCents": int(body.taxCents or 0),
+            "discountCents": int(body.totalDiscountCents or 0),
+            "status": RequestStatus.OPEN,
+            "createdByUserID": user.id,
+            "created_at": now,
+            "version": 1,
+        })
+        line_values.extend(
+            {
+                "id": ol.id,
+                "requestID": request_id,
+                "description": ol.description,
+                "unitPriceCents": ol.unitPriceCents,
+                "quantity": ol.quantity,
+                "unit": ol.unit,
+                "totalPriceCents": ol.totalPriceCents,
+            }
+            for ol in order_line_rows
+        )
+        created.append((i, request_id, index))
+    return request_values, line_values, created
+
+
+def bulk_index(
+    created: List[tuple[int, str, int]],
+    request_values: List[Dict[str, Any]],
+    texts: List[str],
+    embeddings: List[Optional[list[float]]],
+) -> None:
+    """Index all vectors in one Weaviate batch (best effort)."""
+    to_index = [
+        {
+            "request_id": request_id,
+            "commodity_group": str(values["commodityGroupID"]),
+            "embedded_request_context": texts[i],
+            "vector": embeddings[i],
+            "label_source": values["commodityGroupSource"],
+        }
+        for (i, request_id, _), values in zip(created, request_values)
+        if embeddings[i] is not None
+    ]
+    try:
+        if to_index:
+            wx.add_many(to_index)
+    except Exception as e:
+        logger.exception("Weaviate bulk index failed for %d requests: %s", len(to_index), e)
+
+
+def bulk_search_documents(
+    valid: List[tuple[int, ProcurementRequestCreate]],
+    created: List[tuple[int, str, int]],
+) -> List[Dict[str, Any]]:
+    return [search_index.document_values(request_id, valid[i][1]) for i, request_id, _ in created]
+
+
+def bulk_fingerprints(
+    valid: List[tuple[int, ProcurementRequestCreate]],
+    created: List[tuple[int, str, int]],
+    request_values: List[Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    """Fingerprint rows for the created bulk items (bulk imports are not checked for duplicates)."""
+    return [
+        duplicates.fingerprint_values(
+            request_id,
+            duplicates.fingerprint(
+                vendor_name=values["vendorName"], vat_id=values["vatID"],
+                total_cents=values["totalCosts"], lines=valid[i][1].orderLines,
+            ),
+            values["created_at"],
+        )
+        for (i, request_id, _), values in zip(created, request_values)
+    ]
+
+
+def bulk_rollup(request_values: List[Dict[str, Any]], user: User) -> spend_rollups.Deltas:
+    rollup: spend_rollups.Deltas = {}
+    for values in request_values:
+        spend_rollups.add_request(rollup, values, user.departmentID)
+    return rollup
+
+
+def bulk_out(results: Dict[int, BulkCreateItemResult]) -> ProcurementRequestBulkCreateOut:
+    ordered = [results[i] for i in sorted(results)]
+    n_created = sum(1 for r in ordered if r.ok)
+    return ProcurementRequestBulkCreateOut(
+        created=n_created,
+        failed=len(ordered) - n_created,
+        results=ordered,
+    )
@@ -1,43 +1,55 @@
 from __future__ import annotations
 
 import logging
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
 from uuid import uuid4
 
 from fastapi import HTTPException, status
+from sqlalchemy import insert, select, update
 from sqlalchemy.orm import Session, joinedload
 
 from app.models.procurement_request import ProcurementRequest
 from app.models.procurement_request_update import ProcurementRequestUpdate
 from app.models.order_line import OrderLine
 from app.models.commodity_group import CommodityGroup
-from app.models.enums import RequestStatus
+from app.models.search_document import SearchDocument
+from app.models.request_fingerprint import RequestFingerprint
+from app.models.enums import RequestStatus, ClassificationStatus
 from app.models.user import User
 
+from app.schemas.stats import SpendStatsOut
 from app.schemas.procurement import (
     ProcurementRequestCreate,
     ProcurementRequestUpdateIn,
     ProcurementRequestLiteOut,
     ProcurementRequestOut,
     RequestDraftOut,
-    OrderLineDraftOut
+    OrderLineDraftOut,
+    BulkCreateItemResult,
+    ProcurementRequestBulkCreateOut,
+    ProcurementSearchOut,
+    SimilarRequestOut,
 )
-from app.services.mappers import to_lite_out, to_detail_out
+from app.services.mappers import to_lite_out, to_detail_out, lite_out_from_row
 from app.services.auth import ensure_manager
+from app.services import classification_worker, duplicates, events, search_index, spend_rollups
+from app.services import procurement_common as common
 from app.agents.registry import get_agent_registry
-from app.ai.client import get_ai_client
+from app.core import tracing
+from app.core.config import settings
 
 # Agent contracts
-from app.agents.commodity_classifier.contracts import CommodityClassifyIn, CommodityGroupRef
+from app.agents.commodity_classifier.contracts import CommodityGroupRef
 from app.agents.pdf_extractor.contracts import PdfExtractorOut, PdfExtractorIn
 
-import app.weaviate.operations as wx
-from app.weaviate.text_formatter import build_request_embedding_text 
-from app.agents.base import AgentError
+from app.utils.concurrency import submit_in_context
+from app.agents.base import AgentError, AgentTimeout
 
 logger = logging.getLogger(__name__)
 
 
+
 # =========================
 # Internal Loaders (helpers)
 # =========================
@@ -57,6 +69,17 @@ def _base_query_with_common_joins(db: Session):
     )
 
 
+def _list_view_rows(db: Session, stmt_filter) -> List[ProcurementRequestLiteOut]:
+    """Run a list-view query (per LIST_QUERY_MODE) with `stmt_filter` applied and map it to lite DTOs."""
+    if settings.LIST_QUERY_MODE == "orm":
+        stmt = select(ProcurementRequest).options(
+            joinedload(ProcurementRequest.commodity_group),
+            joinedload(ProcurementRequest.created_by).joinedload(User.department),
+        )
+        return [to_lite_out(r) for r in db.scalars(stmt_filter(stmt)).all()]
+    return [lite_out_from_row(row) for row in db.execute(stmt_filter(common.lite_list_select())).all()]
+
+
 def _load_request_with_details(db: Session, request_id: str) -> ProcurementRequest | None:
     """
     Load a single ProcurementRequest and all details needed for the detail view:
@@ -105,12 +128,11 @@ def list_requests(
     """
     Return a list of requests (optionally filtered by status), newest first.
     """
-    query = _base_query_with_common_joins(db).order_by(ProcurementRequest.created_at.desc())
-    if status_filter:
-        query = query.filter(ProcurementRequest.status == status_filter)
+    def apply(stmt):
+        stmt = stmt.order_by(ProcurementRequest.created_at.desc())
+        return stmt.where(ProcurementRequest.status == status_filter) if status_filter else stmt
 
-    requests = query.all()
-    return [to_lite_out(request) for request in requests]
+    return _list_view_rows(db, apply)
 
 
 def list_my_requests(
@@ -122,132 +144,331 @@ def list_my_requests(
     """
     Return the current user's recent requests (optionally filtered by status), newest first.
     """
-    query = (
-        _base_query_with_common_joins(db)
-        .filter(ProcurementRequest.createdByUserID == user.id)
-        .order_by(ProcurementRequest.created_at.desc())
-    )
-    if status_filter:
-        query = query.filter(ProcurementRequest.status == status_filter)
+    def apply(stmt):
+        stmt = stmt.where(ProcurementRequest.createdByUserID == user.id)
+        if status_filter:
+            stmt = stmt.where(ProcurementRequest.status == status_filter)
+        return stmt.order_by(ProcurementRequest.created_at.desc()).limit(limit)
 
-    requests = query.limit(limit).all()
-    return [to_lite_out(request) for request in requests]
+    return _list_view_rows(db, apply)
+
+
+def _load_commodity_group_refs(db: Session) -> tuple[list[CommodityGroup], list[CommodityGroupRef]]:
+    """Load the commodity group catalog once, as ORM rows and as classifier refs."""
+    cg_rows: list[CommodityGroup] = db.query(CommodityGroup).order_by(CommodityGroup.id.asc()).all()
+    return cg_rows, common.commodity_group_refs(cg_rows)
+
+
+def _find_duplicate(db: Session, body: ProcurementRequestCreate, text: str, fingerprint: str):
+    """Earlier request within DUPLICATE_WINDOW_DAYS this one duplicates, or None."""
+    since = duplicates.window_start()
+    row = db.execute(duplicates.fingerprint_statement(fingerprint, since)).first()
+    found = duplicates.to_duplicate(row, "fingerprint")
+    if found is None and settings.DUPLICATE_VECTOR_MIN_SIMILARITY > 0:
+        nearest_id = common.nearest_request_id(text)
+        if nearest_id is not None:
+            row = db.execute(duplicates.candidate_statement(nearest_id, since)).first()
+            found = duplicates.to_duplicate(row, "vector", vat_id=body.vatID)
+    if found is not None:
+        common.DUPLICATES.inc(match=found.match, mode=settings.DUPLICATE_CHECK_MODE)
+    return found
+
+
+def _reject_duplicate(db: Session, duplicate: duplicates.Duplicate) -> None:
+    existing = db.execute(common.lite_list_select().where(ProcurementRequest.id == duplicate.request_id)).first()
+    db.rollback()  # drop the fingerprint lock, if taken
+    raise common.duplicate_conflict(duplicate, lite_out_from_row(existing))
 
 
 def create_request(
     db: Session,
     body: ProcurementRequestCreate,
     user: User,
+    *,
+    allow_duplicate: bool = False,
 ) -> ProcurementRequestLiteOut:
     """
     Create a new request with order lines, compute totals, and return the lite DTO.
+    In deferred classification mode the request is stored with a provisional
+    (heuristic) commodity group and classified by the background worker.
+
+    Before any classification work, an earlier request with the same content
+    (see app.services.duplicates) is looked up. Per DUPLICATE_CHECK_MODE it is
+    rejected with 409 (unless `allow_duplicate`) or stored with the earlier
+    request's classification. A reused duplicate is not added to the vector
+    store, which already holds the earlier request: an identical copy would
+    be one more agreeing neighbour in the classifier's vote. When rejecting,
+    the fingerprint is checked again under a lock in the insert transaction
+    (concurrent identical submissions).
     """
     # Build order lines & compute total in cents
-    order_line_rows: list[OrderLine] = []
-    total_price_cents: int = 0
-
-    for line in body.orderLines:
-        line_total_cents = line.unitPriceCents * line.quantity
-        total_price_cents += line_total_cents
-
-        order_line_rows.append(
-            OrderLine(
-                id=str(uuid4()),
-                description=line.description,
-                unitPriceCents=int(line.unitPriceCents),
-                quantity=line.quantity,
-                unit=line.unit,
-                totalPriceCents=int(line_total_cents),
-            )
-        )
-    
-    # Auto-classify commodity group via agent
-    try:
-        # Build agent input
-        order_lines_text = [
-            f"{ol.quantity} x {ol.description} @ {ol.unitPriceCents/100:.2f} per {ol.unit}"
-            for ol in body.orderLines
-        ]
-        # Provide all CGs as candidates
-        cg_rows: list[CommodityGroup] = db.query(CommodityGroup).order_by(CommodityGroup.id.asc()).all()
-        cg_refs = [
-            CommodityGroupRef(id=int(cg.id), label=cg.name, category=cg.category)
-            for cg in cg_rows
-        ]
-        agent_input = CommodityClassifyIn(
-            title=body.title,
-            vendor_name=body.vendorName,
-            vat_id=body.vatID,
-            order_lines_text=order_lines_text,
-            available_commodity_groups=cg_refs,
-            trace_id=str(uuid4()),
-        )
-        classifier = get_agent_registry().commodity_classifier
-        agent_result = classifier.run(agent_input)
-        chosen_cg_id = agent_result.suggested_commodity_group_id
-        chosen_conf = agent_result.confidence or 0.0
-        if chosen_cg_id is None:
-            chosen_cg_id = cg_rows[0].id if cg_rows else None
-            chosen_conf = 0.0
-        if chosen_cg_id is None:
-            raise HTTPException(status_code=500, detail="No commodity groups available for classification.")
-    except AgentError as e:
-        # Safe fall-back path: pick the first group with 0.0 confidence
-        logger.exception("Commodity classifier failed; using fallback: %s", e)
-        first_cg = db.query(CommodityGroup.id).order_by(CommodityGroup.id.asc()).first()
-        if not first_cg:
-            raise HTTPException(status_code=500, detail="No commodity groups available.")
-        chosen_cg_id = int(first_cg[0])
-        chosen_conf = 0.0
-        
-    shipping = int(body.shippingCents or 0)
-    tax = int(body.taxCents or 0)
-    discount = int(body.totalDiscountCents or 0)
-
-    total_price_cents = int(total_price_cents + shipping + tax - discount)
-    
-    # Create request row
-    new_request = ProcurementRequest(
-        id=str(uuid4()),
-        title=body.title,
-        vendorName=body.vendorName,
-        vatID=body.vatID,
-        commodityGroupID=chosen_cg_id,
-        commodityGroupConfidence=chosen_conf,
-        totalCosts=total_price_cents,
-        shippingCents=shipping,
-        taxCents=tax,
-        discountCents=discount,
-        createdByUserID=user.id,
+    order_line_rows, total_price_cents = common.build_order_lines(body)
+    total_cents = common.summary_total_cents(body, total_price_cents)
+
+    text = common.body_embedding_text(body)
+    fingerprint = duplicates.fingerprint(
+        vendor_name=body.vendorName, vat_id=body.vatID, total_cents=total_cents, lines=body.orderLines
+    )
+    duplicate = None
+    reject = settings.DUPLICATE_CHECK_MODE == "reject" and not allow_duplicate
+    if settings.DUPLICATE_CHECK_MODE != "off" and not allow_duplicate:
+        duplicate = _find_duplicate(db, body, text, fingerprint)
+        if duplicate is not None and reject:
+            _reject_duplicate(db, duplicate)
+    deferred = settings.CLASSIFICATION_MODE == "deferred"
+
+    reused = duplicate is not None and duplicate.classified and duplicate.commodity_group_id is not None
+    if reused:
+        # Same content as an already classified request: no embedding or LLM calls
+        classification = (duplicate.commodity_group_id, duplicate.confidence or 0.0, "duplicate")
+        request_embedding = None
+        deferred = False
+    elif deferred:
+        # Cheap local guess now; the LLM pipeline runs after the response
+        _, cg_refs = _load_commodity_group_refs(db)
+        classification = common.provisional_group(body, cg_refs)
+        request_embedding = None
+    else:
+        classification, request_embedding = _classify_now(db, body, text)
+
+    new_request, companions, rollup = common.build_request(
+        body, user,
         order_lines=order_line_rows,
+        total_cents=total_cents,
+        fingerprint=fingerprint,
+        classification=classification,
+        pending=deferred,
     )
+    request_id = new_request.id  # read before commit expires the instance
+    if reject:
+        # An identical submission may have been created while this one was classified
+        db.execute(duplicates.lock_statement(db.get_bind().dialect.name, fingerprint))
+        row = db.execute(duplicates.fingerprint_statement(fingerprint, duplicates.window_start())).first()
+        duplicate = duplicates.to_duplicate(row, "fingerprint")
+        if duplicate is not None:
+            common.DUPLICATES.inc(match=duplicate.match, mode=settings.DUPLICATE_CHECK_MODE)
+            _reject_duplicate(db, duplicate)
+    for row in companions:
+        db.add(row)
     db.add(new_request)
+    spend_rollups.apply(db, rollup)
     db.commit()
-    db.refresh(new_request)
-    
+    # Reload with the list-view joins: one query instead of refresh + three lazy loads
+    new_request = _base_query_with_common_joins(db).filter(ProcurementRequest.id == request_id).one()
+
+    if deferred:
+        # Indexing happens in the worker, once the final group is known
+        classification_worker.enqueue(new_request.id)
+        return to_lite_out(new_request)
+    if reused:
+        return to_lite_out(new_request)
+
     # Index into Weaviate
+    common.index_request(
+        new_request.id, new_request.commodityGroupID, text, request_embedding, new_request.commodityGroupSource
+    )
+
+    return to_lite_out(new_request)
+
+
+def _classify_now(
+    db: Session,
+    body: ProcurementRequestCreate,
+    text: str,
+) -> tuple[common.Classification, Optional[list[float]]]:
+    """
+    Synchronous classification for create_request.
+    Returns ((group id, confidence, deciding stage), request embedding or None).
+    """
+    # Embed once; the vector is shared by the classifier and the Weaviate index
     try:
-        ai_client = get_ai_client()
-        text = build_request_embedding_text(
-            title=body.title,
-            vendor_name=body.vendorName,
-            vat_id=body.vatID,
-            order_lines_text=[
-                f"{ol.quantity} x {ol.description} @ {ol.unitPriceCents/100:.2f} per {ol.unit}"
-                for ol in body.orderLines
-            ],
+        request_embedding = common.embed(text)
+    except Exception as e:
+        logger.warning("Request embedding failed; classifier will retry: %s", e)
+        request_embedding = None
+
+    # Provide all CGs as candidates
+    cg_rows, cg_refs = _load_commodity_group_refs(db)
+    return common.classify_or_fallback(body, cg_rows, cg_refs, request_embedding), request_embedding
+
+
+def complete_pending_classification(db: Session, request_id: str) -> bool:
+    """
+    Classify a request stored in deferred mode and finalize its commodity group.
+    - Does not bump `version`: the user-visible request didn't change, and an
+      open edit dialog must not run into a spurious 409.
+    - Only applies if the row is still pending, so a manager's manual
+      re-classification in the meantime always wins.
+    Publishes a `classification` event with the updated lite DTO.
+    Returns True if the row was updated.
+    """
+    procurement_request = _load_request_with_details(db, request_id)
+    if (
+        not procurement_request
+        or procurement_request.classificationStatus != ClassificationStatus.PENDING
+    ):
+        return False
+
+    lines = list(procurement_request.order_lines or [])
+    text = common.embedding_text(
+        title=procurement_request.title,
+        vendor_name=procurement_request.vendorName,
+        vat_id=procurement_request.vatID,
+        order_lines=lines,
+    )
+    try:
+        embedding = common.embed(text)
+    except Exception as e:
+        logger.warning("Request embedding failed; classifier will retry: %s", e)
+        embedding = None
+
+    _, cg_refs = _load_commodity_group_refs(db)
+    try:
+        cg_id, conf, source = common.classify(
+            title=procurement_request.title,
+            vendor_name=procurement_request.vendorName,
+            vat_id=procurement_request.vatID,
+            order_lines=lines,
+            cg_refs=cg_refs,
+            embedding=embedding,
         )
-        request_embedding = ai_client.embed(text)
-        wx.add(
-            request_id=new_request.id,
-            commodity_group=str(new_request.commodityGroupID),
-            embedded_request_context=text,
-            vector=request_embedding,
+    except AgentError as e:
+        logger.warning("Deferred classification failed for %s; keeping provisional group: %s", request_id, e)
+        cg_id = None
+    if cg_id is None:
+        cg_id = procurement_request.commodityGroupID
+        conf = procurement_request.commodityGroupConfidence or 0.0
+        source = procurement_request.commodityGroupSource
+
+    provisional_cg_id = procurement_request.commodityGroupID
+    applied = db.execute(
+        update(ProcurementRequest)
+        .where(
+            ProcurementRequest.id == request_id,
+            ProcurementRequest.classificationStatus == ClassificationStatus.PENDING,
         )
-    except Exception as e:
-        logger.exception("Weaviate index failed for request %s: %s", new_request.id, e)
+        .values(
+            commodityGroupID=cg_id,
+            commodityGroupConfidence=conf,
+            commodityGroupSource=source,
+            classificationStatus=ClassificationStatus.COMPLETED,
+        )
+        .returning(ProcurementRequest.status)  # current status, for the rollup bucket
+        .execution_options(synchronize_session=False)
+    ).first()
+    if applied is None:
+        db.commit()
+        logger.info("Request %s was re-classified manually; dropping deferred result.", request_id)
+        return False
+    if cg_id != provisional_cg_id:
+        department_id = procurement_request.created_by.departmentID if procurement_request.created_by else None
+        values = {
+            "vendorName": procurement_request.vendorName,
+            "totalCosts": procurement_request.totalCosts,
+            "created_at": procurement_request.created_at,
+            "status": applied.status,
+        }
+        rollup: spend_rollups.Deltas = {}
+        spend_rollups.add_request(rollup, {**values, "commodityGroupID": provisional_cg_id}, department_id, sign=-1)
+        spend_rollups.add_request(rollup, {**values, "commodityGroupID": cg_id}, department_id)
+        spend_rollups.apply(db, rollup)
+    db.commit()
 
-    return to_lite_out(new_request)
+    common.index_request(request_id, cg_id, text, embedding, source)
+
+    db.expire_all()
+    updated = _base_query_with_common_joins(db).filter(ProcurementRequest.id == request_id).first()
+    events.publish("classification", to_lite_out(updated).model_dump(mode="json"))
+    return True
+
+
+def create_requests_bulk(
+    db: Session,
+    items: List[Dict[str, Any]],
+    user: User,
+) -> ProcurementRequestBulkCreateOut:
+    """
+    Create many requests at once (spreadsheet imports).
+    - Validates every item up front; invalid items are reported, valid ones proceed.
+    - Loads the commodity group catalog once and embeds all requests in one batch.
+    - Classifies with bounded concurrency (BULK_CLASSIFY_CONCURRENCY).
+    - Inserts all rows in a single transaction and indexes vectors in one batch.
+    """
+    results: Dict[int, BulkCreateItemResult] = {}
+    valid = common.validate_bulk_items(items, results)
+
+    if valid:
+        bodies = [body for _, body in valid]
+        cg_rows, cg_refs = _load_commodity_group_refs(db)
+        if not cg_rows:
+            raise HTTPException(status_code=500, detail="No commodity groups available.")
+
+        # One embedding call for the whole batch
+        texts = [
+            common.embedding_text(title=b.title, vendor_name=b.vendorName, vat_id=b.vatID, order_lines=b.orderLines)
+            for b in bodies
+        ]
+        try:
+            embeddings: List[Optional[list[float]]] = list(common.get_ai_client().embed_batch(texts))
+        except Exception as e:
+            logger.exception("Bulk embedding failed; classifying without shared vectors: %s", e)
+            embeddings = [None] * len(bodies)
+
+        def classify_one(i: int) -> tuple[Optional[int], float, Optional[str]]:
+            try:
+                b = bodies[i]
+                return common.classify(
+                    title=b.title,
+                    vendor_name=b.vendorName,
+                    vat_id=b.vatID,
+                    order_lines=b.orderLines,
+                    cg_refs=cg_refs,
+                    embedding=embeddings[i],
+                )
+            except AgentError as e:
+                logger.warning("Commodity classifier failed for bulk item %d; using fallback: %s", valid[i][0], e)
+                return None, 0.0, "fallback"
+
+        with ThreadPoolExecutor(max_workers=max(1, settings.BULK_CLASSIFY_CONCURRENCY)) as pool:
+            futures = [submit_in_context(pool, classify_one, i) for i in range(len(bodies))]
+        outcomes: List[Any] = []
+        for future in futures:
+            try:
+                outcomes.append(future.result())
+            except Exception as e:
+                outcomes.append(e)
+
+        request_values, line_values, created = common.bulk_row_values(valid, outcomes, cg_rows, user, results)
+        if request_values:
+            # Single transaction, executemany-style bulk inserts
+            try:
+                db.execute(insert(ProcurementRequest), request_values)
+                if line_values:
+                    db.execute(insert(OrderLine), line_values)
+                db.execute(insert(SearchDocument), common.bulk_search_documents(valid, created))
+                db.execute(insert(RequestFingerprint), common.bulk_fingerprints(valid, created, request_values))
+                spend_rollups.apply(db, common.bulk_rollup(request_values, user))
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.exception("Bulk insert failed: %s", e)
+                raise HTTPException(status_code=500, detail="Bulk insert failed; no requests were created.")
+
+            common.bulk_index(created, request_values, texts, embeddings)
+
+            # One query to load everything the lite DTOs need
+            loaded = {
+                r.id: r
+                for r in _base_query_with_common_joins(db)
+                .filter(ProcurementRequest.id.in_([request_id for _, request_id, _ in created]))
+                .all()
+            }
+            for _, request_id, index in created:
+                results[index] = BulkCreateItemResult(
+                    index=index, ok=True, request=to_lite_out(loaded[request_id])
+                )
+
+    return common.bulk_out(results)
 
 
 def update_request(
@@ -267,19 +488,23 @@ def update_request(
     if body.status is None and body.commodityGroupID is None:
         raise HTTPException(status_code=400, detail="No changes provided")
 
+    # Lock the row until commit, so the deferred-classification worker cannot
+    # change the group between this read and the rollup move computed from it
+    lock = common.write_lock_statement(db.get_bind().dialect.name, request_id)
+    if lock is not None:
+        db.execute(lock)
     procurement_request = (
-        _base_query_with_common_joins(db).filter(ProcurementRequest.id == request_id).first()
+        _base_query_with_common_joins(db)
+        .filter(ProcurementRequest.id == request_id)
+        .with_for_update(of=ProcurementRequest)
+        .populate_existing()
+        .first()
     )
     if not procurement_request:
         raise HTTPException(status_code=404, detail="Request not found")
 
     # Optimistic concurrency
-    procurement_request.version = procurement_request.version or 1
-    if body.version != procurement_request.version:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=f"Version mismatch. Current version is {procurement_request.version}",
-        )
+    common.check_version(procurement_request, body)
 
     # Validate commodity group if provided
     if body.commodityGroupID is not None:
@@ -291,71 +516,22 @@ def update_request(
         if not cg_exists:
             raise HTTPException(status_code=404, detail="Commodity group not found")
 
-    # Compute deltas
-    previous_status = procurement_request.status
-    previous_cg_id = procurement_request.commodityGroupID
-
-    did_change = False
-
-    if body.status is not None and body.status != procurement_request.status:
-        procurement_request.status = body.status
-        did_change = True
-
-    if (
-        body.commodityGroupID is not None
-        and body.commodityGroupID != procurement_request.commodityGroupID
-    ):
-        procurement_request.commodityGroupID = body.commodityGroupID
-        procurement_request.commodityGroupConfidence = None
-        did_change = True
-
+    applied = common.apply_update(procurement_request, body, user)
     # Nothing changed => return current projection (no audit row)
-    if not did_change:
+    if applied is None:
         return to_lite_out(procurement_request)
 
-    # Append audit row with the fields that actually changed
-    audit_row = ProcurementRequestUpdate(
-        id=str(uuid4()),
-        requestID=procurement_request.id,
-        updatedByUserID=user.id,
-        oldStatus=previous_status if body.status is not None else None,
-        newStatus=procurement_request.status if body.status is not None else None,
-        oldCommodityGroupID=previous_cg_id if body.commodityGroupID is not None else None,
-        newCommodityGroupID=procurement_request.commodityGroupID
-        if body.commodityGroupID is not None
-        else None,
-    )
-    db.add(audit_row)
-
-    # Bump version & persist
-    procurement_request.version = (procurement_request.version or 1) + 1
+    db.add(applied.audit)
+    spend_rollups.apply(db, applied.rollup)
     db.add(procurement_request)
     db.commit()
     db.refresh(procurement_request)
-    
-    # --- Keep Weaviate in sync if CG changed ---
-    if (
-        body.commodityGroupID is not None
-        and body.commodityGroupID != previous_cg_id
-    ):
-        try:
-            updated = wx.update_commodity_group(
-                request_id=request_id,
-                new_commodity_group=str(body.commodityGroupID),
-            )
-            logger.info(
-                "Weaviate: updated %d objects for request_id=%s to CG=%s",
-                updated, request_id, body.commodityGroupID
-            )
-        except Exception as e:
-            # Do not fail the HTTP request if the vector update fails
-            logger.exception(
-                "Weaviate update_commodity_group failed for request_id=%s -> %s: %s",
-                request_id, body.commodityGroupID, e
-            )
 
-    return to_lite_out(procurement_request)
+    # Keep Weaviate in sync if CG changed; never fails the HTTP request
+    if applied.regrouped:
+        common.regroup_vectors(request_id, body.commodityGroupID)
 
+    return to_lite_out(procurement_request)
 
 def get_request_details(
     db: Session,
@@ -373,6 +549,99 @@ def get_request_details(
     return to_detail_out(procurement_request, audit_entries)
 
 
+def search_requests(
+    db: Session,
+    q: str,
+    status_filter: Optional[RequestStatus],
+    limit: int,
+    offset: int,
+) -> ProcurementSearchOut:
+    """
+    Ranked search over title, vendor, VAT id and order-line descriptions;
+    one query for the page (limit + 1 rows to tell whether there is more).
+    """
+    ranked = search_index.ranked_ids(
+        db.get_bind().dialect.name, q, status_filter=status_filter, limit=limit + 1, offset=offset
+    )
+    rows = []
+    if ranked is not None:
+        ranked = ranked.subquery()
+        rows = db.execute(
+            common.lite_list_select()
+            .join(ranked, ranked.c.request_id == ProcurementRequest.id)
+            .order_by(ranked.c.rank.desc(), ProcurementRequest.created_at.desc())
+        ).all()
+    return ProcurementSearchOut(
+        query=q,
+        items=[lite_out_from_row(row) for row in rows[:limit]],
+        offset=offset,
+        limit=limit,
+        hasMore=len(rows) > limit,
+    )
+
+
+def _hydrate_similar(db: Session, hits: List[tuple[str, float]]) -> List[SimilarRequestOut]:
+    if not hits:
+        return []
+    rows = db.execute(
+        common.lite_list_select().where(ProcurementRequest.id.in_([request_id for request_id, _ in hits]))
+    ).all()
+    return common.similar_out(hits, rows)
+
+
+def get_similar_requests(db: Session, request_id: str, limit: int) -> List[SimilarRequestOut]:
+    """
+    Requests most similar to an existing one, by its stored vector (re-embedded
+    from the request text if it was never indexed). One query hydrates all hits.
+    """
+    vector = common.stored_vector(request_id)
+    text = None
+    if vector is None:
+        procurement_request = (
+            db.query(ProcurementRequest)
+            .options(joinedload(ProcurementRequest.order_lines))
+            .filter(ProcurementRequest.id == request_id)
+            .first()
+        )
+        if not procurement_request:
+            raise HTTPException(status_code=404, detail="Request not found")
+        text = common.embedding_text(
+            title=procurement_request.title,
+            vendor_name=procurement_request.vendorName,
+            vat_id=procurement_request.vatID,
+            order_lines=procurement_request.order_lines,
+        )
+    return _hydrate_similar(db, common.similar_hits(text, vector, limit, exclude_id=request_id))
+
+
+def find_similar_requests(db: Session, body: ProcurementRequestCreate, limit: int) -> List[SimilarRequestOut]:
+    """
+    Requests most similar to a draft. The draft is embedded through the
+    embedding cache, so submitting it afterwards reuses the vector.
+    """
+    text = common.body_embedding_text(body)
+    return _hydrate_similar(db, common.similar_hits(text, None, limit))
+
+
+def get_spend_stats(
+    db: Session,
+    user: User,
+    *,
+    status_filter: Optional[RequestStatus] = None,
+    from_month: Optional[str] = None,
+    to_month: Optional[str] = None,
+    vendor_limit: int = 20,
+) -> SpendStatsOut:
+    """
+    Spend by commodity group, department, vendor, status and month (Managers only).
+    Answered from the spend rollups, not from the requests.
+    """
+    ensure_manager(user)
+    return spend_rollups.spend_stats(
+        db, status_filter=status_filter, from_month=from_month, to_month=to_month, vendor_limit=vendor_limit
+    )
+
+
 def create_request_draft_from_pdf(
     data: bytes,
     *,
@@ -382,7 +651,7 @@ def create_request_draft_from_pdf(
     """
     Extract a draft procurement request from the uploaded PDF.
     """
-    trace_id = str(uuid4())
+    trace_id = tracing.current_trace_id() or str(uuid4())
 
     try:
         agent = get_agent_registry().pdf_extractor
@@ -394,6 +663,11 @@ def create_request_draft_from_pdf(
         )
         agent_out = agent.run(agent_input)
 
+    except AgentTimeout as e:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=f"PDF extraction timed out: {e}",
+        )
     except AgentError as e:
         # The extractor determined it's not a procurement request or failed parsing
         raise HTTPException(
@@ -0,0 +1,600 @@
+"""
+Async variants of the procurement service (DB_ASYNC_ROUTES=true).
+
+Same behaviour and DTOs as app.services.procurement_service, on an
+AsyncSession. The difference is where time is spent holding resources:
+- Every DB block ends its transaction (`_release`) before anything else
+  happens, so a pooled connection is checked out only around DB work, never
+  across embedding / classifier / Weaviate calls.
+- Those calls are blocking (sync AI client, agents, Weaviate client) and run
+  on a dedicated thread pool (ASYNC_BLOCKING_CALL_THREADS) in the caller's
+  context, so they neither block the event loop nor occupy the AnyIO
+  threadpool that serves the remaining sync endpoints.
+
+Everything that doesn't touch a session (order lines, totals, embedding
+text, classifier call, create/update rows, bulk row building) lives in
+app.services.procurement_common and is shared with the sync service.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from fastapi import HTTPException
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from app.agents.base import AgentError
+from app.agents.commodity_classifier.contracts import CommodityGroupRef
+from app.core import metrics
+from app.core.config import settings
+from app.models.commodity_group import CommodityGroup
+from app.models.search_document import SearchDocument
+from app.models.request_fingerprint import RequestFingerprint
+from app.models.enums import RequestStatus
+from app.models.order_line import OrderLine
+from app.models.procurement_request import ProcurementRequest
+from app.models.procurement_request_update import ProcurementRequestUpdate
+from app.models.user import User
+from app.schemas.stats import SpendStatsOut
+from app.schemas.procurement import (
+    BulkCreateItemResult,
+    ProcurementRequestBulkCreateOut,
+    ProcurementRequestCreate,
+    ProcurementRequestLiteOut,
+    ProcurementRequestOut,
+    ProcurementSearchOut,
+    ProcurementRequestUpdateIn,
+    RequestDraftOut,
+    SimilarRequestOut,
+)
+from app.services import classification_worker, duplicates, search_index, spend_rollups
+from app.services import procurement_common as common
+from app.services.procurement_service import create_request_draft_from_pdf as _draft_from_pdf
+from app.services.auth import ensure_manager
+from app.services.mappers import lite_out_from_row, to_detail_out, to_lite_out
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.ASYNC_BLOCKING_CALL_THREADS),
+            thread_name_prefix="async-blocking",
+        )
+    return _executor
+
+
+metrics.track_executor("async_blocking", lambda: _executor)
+
+
+async def _run_blocking(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking call on the blocking-call pool, in a copy of the caller's context."""
+    ctx = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        _get_executor(), functools.partial(ctx.run, fn, *args, **kwargs)
+    )
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def _release(db: AsyncSession) -> None:
+    """End the current transaction so its connection goes back to the pool (loaded rows stay usable)."""
+    await db.commit()
+
+
+# =========================
+# Statements
+# =========================
+
+def _common_joins(stmt):
+    return stmt.options(
+        joinedload(ProcurementRequest.commodity_group),
+        joinedload(ProcurementRequest.created_by).joinedload(User.department),
+    )
+
+
+async def _list_view_rows(db: AsyncSession, stmt_filter: Callable[[Any], Any]) -> List[ProcurementRequestLiteOut]:
+    """Run a list-view query (per LIST_QUERY_MODE) with `stmt_filter` applied and map it to lite DTOs."""
+    if settings.LIST_QUERY_MODE == "orm":
+        rows = (await db.scalars(stmt_filter(_common_joins(select(ProcurementRequest))))).all()
+        to_out = to_lite_out
+    else:
+        rows = (await db.execute(stmt_filter(common.lite_list_select()))).all()
+        to_out = lite_out_from_row
+    await _release(db)
+    return [to_out(row) for row in rows]
+
+
+async def _apply_rollup(db: AsyncSession, deltas: spend_rollups.Deltas) -> None:
+    for stmt in spend_rollups.statements(db.get_bind().dialect.name, deltas):
+        await db.execute(stmt)
+
+
+async def _load_lite(db: AsyncSession, request_id: str) -> Optional[ProcurementRequest]:
+    return await db.scalar(_common_joins(select(ProcurementRequest)).where(ProcurementRequest.id == request_id))
+
+
+async def _load_commodity_group_refs(db: AsyncSession) -> tuple[list[CommodityGroup], list[CommodityGroupRef]]:
+    cg_rows = list((await db.scalars(select(CommodityGroup).order_by(CommodityGroup.id.asc()))).all())
+    return cg_rows, common.commodity_group_refs(cg_rows)
+
+
+# =============
+# Public Service
+# =============
+
+async def list_requests(
+    db: AsyncSession,
+    status_filter: Optional[RequestStatus],
+) -> List[ProcurementRequestLiteOut]:
+    """
+    Return a list of requests (optionally filtered by status), newest first.
+    """
+    def apply(stmt):
+        stmt = stmt.order_by(ProcurementRequest.created_at.desc())
+        return stmt.where(ProcurementRequest.status == status_filter) if status_filter else stmt
+
+    return await _list_view_rows(db, apply)
+
+
+async def list_my_requests(
+    db: AsyncSession,
+    user: User,
+    status_filter: Optional[RequestStatus],
+    limit: int,
+) -> List[ProcurementRequestLiteOut]:
+    """
+    Return the current user's recent requests (optionally filtered by status), newest first.
+    """
+    def apply(stmt):
+        stmt = stmt.where(ProcurementRequest.createdByUserID == user.id)
+        if status_filter:
+            stmt = stmt.where(ProcurementRequest.status == status_filter)
+        return stmt.order_by(ProcurementRequest.created_at.desc()).limit(limit)
+
+    return await _list_view_rows(db, apply)
+
+
+async def get_request_details(
+    db: AsyncSession,
+    request_id: str,
+    user: User,
+) -> ProcurementRequestOut:
+    """
+    Return full details (including order lines & audit trail) for a single request.
+    """
+    procurement_request = (
+        await db.scalars(
+            _common_joins(select(ProcurementRequest))
+            .options(joinedload(ProcurementRequest.order_lines))
+            .where(ProcurementRequest.id == request_id)
+        )
+    ).unique().first()
+    if not procurement_request:
+        await _release(db)
+        raise HTTPException(status_code=404, detail="Request not found")
+
+    audit_entries = list((
+        await db.scalars(
+            select(ProcurementRequestUpdate)
+            .options(
+                joinedload(ProcurementRequestUpdate.old_commodity_group),
+                joinedload(ProcurementRequestUpdate.new_commodity_group),
+                joinedload(ProcurementRequestUpdate.updated_by),
+            )
+            .where(ProcurementRequestUpdate.requestID == request_id)
+            .order_by(ProcurementRequestUpdate.updated_at.asc())
+        )
+    ).all())
+    await _release(db)
+    return to_detail_out(procurement_request, audit_entries)
+
+
+async def _classify_now(
+    body: ProcurementRequestCreate,
+    text: str,
+    cg_rows: list[CommodityGroup],
+    cg_refs: list[CommodityGroupRef],
+) -> tuple[common.Classification, Optional[list[float]]]:
+    """
+    Embedding + classifier for create_request; no DB connection is held here.
+    Returns ((group id, confidence, deciding stage), request embedding or None).
+    """
+    try:
+        request_embedding = await _run_blocking(common.embed, text)
+    except Exception as e:
+        logger.warning("Request embedding failed; classifier will retry: %s", e)
+        request_embedding = None
+
+    classification = await _run_blocking(common.classify_or_fallback, body, cg_rows, cg_refs, request_embedding)
+    return classification, request_embedding
+
+
+async def _find_duplicate(
+    db: AsyncSession,
+    body: ProcurementRequestCreate,
+    text: str,
+    fingerprint: str,
+) -> Optional[duplicates.Duplicate]:
+    """See procurement_service._find_duplicate; the vector search runs without a connection."""
+    since = duplicates.window_start()
+    row = (await db.execute(duplicates.fingerprint_statement(fingerprint, since))).first()
+    await _release(db)
+    found = duplicates.to_duplicate(row, "fingerprint")
+    if found is None and settings.DUPLICATE_VECTOR_MIN_SIMILARITY > 0:
+        nearest_id = await _run_blocking(common.nearest_request_id, text)
+        if nearest_id is not None:
+            row = (await db.execute(duplicates.candidate_statement(nearest_id, since))).first()
+            await _release(db)
+            found = duplicates.to_duplicate(row, "vector", vat_id=body.vatID)
+    if found is not None:
+        common.DUPLICATES.inc(match=found.match, mode=settings.DUPLICATE_CHECK_MODE)
+    return found
+
+
+async def _reject_duplicate(db: AsyncSession, duplicate: duplicates.Duplicate) -> None:
+    existing = (await db.execute(common.lite_list_select().where(ProcurementRequest.id == duplicate.request_id))).first()
+    await _release(db)  # also drops the fingerprint lock, if taken (nothing else was written)
+    raise common.duplicate_conflict(duplicate, lite_out_from_row(existing))
+
+
+async def create_request(
+    db: AsyncSession,
+    body: ProcurementRequestCreate,
+    user: User,
+    *,
+    allow_duplicate: bool = False,
+) -> ProcurementRequestLiteOut:
+    """
+    Create a new request with order lines, compute totals, and return the lite DTO.
+    The connection is released while the request is embedded and classified.
+    Duplicates are handled per DUPLICATE_CHECK_MODE, as in the sync service.
+    """
+    order_line_rows, total_price_cents = common.build_order_lines(body)
+    total_cents = common.summary_total_cents(body, total_price_cents)
+    text = common.body_embedding_text(body)
+    fingerprint = duplicates.fingerprint(
+        vendor_name=body.vendorName, vat_id=body.vatID, total_cents=total_cents, lines=body.orderLines
+    )
+    duplicate = None
+    reject = settings.DUPLICATE_CHECK_MODE == "reject" and not allow_duplicate
+    if settings.DUPLICATE_CHECK_MODE != "off" and not allow_duplicate:
+        duplicate = await _find_duplicate(db, body, text, fingerprint)
+        if duplicate is not None and reject:
+            await _reject_duplicate(db, duplicate)
+    deferred = settings.CLASSIFICATION_MODE == "deferred"
+
+    cg_rows, cg_refs = await _load_commodity_group_refs(db)
+    await _release(db)
+    if not cg_rows:
+        raise HTTPException(status_code=500, detail="No commodity groups available.")
+
+    reused = duplicate is not None and duplicate.classified and duplicate.commodity_group_id is not None
+    if reused:
+        classification = (duplicate.commodity_group_id, duplicate.confidence or 0.0, "duplicate")
+        request_embedding = None
+        deferred = False
+    elif deferred:
+        classification = common.provisional_group(body, cg_refs)
+        request_embedding = None
+    else:
+        classification, request_embedding = await _classify_now(body, text, cg_rows, cg_refs)
+
+    new_request, companions, rollup = common.build_request(
+        body, user,
+        order_lines=order_line_rows,
+        total_cents=total_cents,
+        fingerprint=fingerprint,
+        classification=classification,
+        pending=deferred,
+    )
+    request_id = new_request.id
+    if reject:
+        # Re-check under a lock on the fingerprint (see procurement_service.create_request)
+        await db.execute(duplicates.lock_statement(db.get_bind().dialect.name, fingerprint))
+        row = (await db.execute(duplicates.fingerprint_statement(fingerprint, duplicates.window_start()))).first()
+        duplicate = duplicates.to_duplicate(row, "fingerprint")
+        if duplicate is not None:
+            common.DUPLICATES.inc(match=duplicate.match, mode=settings.DUPLICATE_CHECK_MODE)
+            await _reject_duplicate(db, duplicate)
+    db.add_all([*companions, new_request])
+    await _apply_rollup(db, rollup)
+    await db.commit()
+    db.expunge(new_request)  # reload below with the list-view joins
+    new_request = await _load_lite(db, request_id)
+    await _release(db)
+
+    if deferred:
+        classification_worker.enqueue(request_id)
+        return to_lite_out(new_request)
+    if reused:  # not indexed, see procurement_service.create_request
+        return to_lite_out(new_request)
+
+    await _run_blocking(
+        common.index_request,
+        request_id, new_request.commodityGroupID, text, request_embedding, new_request.commodityGroupSource,
+    )
+    return to_lite_out(new_request)
+
+
+async def create_requests_bulk(
+    db: AsyncSession,
+    items: List[Dict[str, Any]],
+    user: User,
+) -> ProcurementRequestBulkCreateOut:
+    """
+    Bulk create (see procurement_service.create_requests_bulk); classification
+    runs with BULK_CLASSIFY_CONCURRENCY while no connection is held.
+    """
+    results: Dict[int, BulkCreateItemResult] = {}
+    valid = common.validate_bulk_items(items, results)
+    if not valid:
+        return common.bulk_out(results)
+
+    bodies = [body for _, body in valid]
+    cg_rows, cg_refs = await _load_commodity_group_refs(db)
+    await _release(db)
+    if not cg_rows:
+        raise HTTPException(status_code=500, detail="No commodity groups available.")
+
+    texts = [common.body_embedding_text(b) for b in bodies]
+    try:
+        embeddings: List[Optional[list[float]]] = list(
+            await _run_blocking(lambda: common.get_ai_client().embed_batch(texts))
+        )
+    except Exception as e:
+        logger.exception("Bulk embedding failed; classifying without shared vectors: %s", e)
+        embeddings = [None] * len(bodies)
+
+    gate = asyncio.Semaphore(max(1, settings.BULK_CLASSIFY_CONCURRENCY))
+
+    async def classify_one(i: int) -> tuple[Optional[int], float, Optional[str]]:
+        b = bodies[i]
+        async with gate:
+            try:
+                return await _run_blocking(
+                    common.classify,
+                    title=b.title,
+                    vendor_name=b.vendorName,
+                    vat_id=b.vatID,
+                    order_lines=b.orderLines,
+                    cg_refs=cg_refs,
+                    embedding=embeddings[i],
+                )
+            except AgentError as e:
+                logger.warning("Commodity classifier failed for bulk item %d; using fallback: %s", valid[i][0], e)
+                return None, 0.0, "fallback"
+
+    outcomes = await asyncio.gather(*(classify_one(i) for i in range(len(bodies))), return_exceptions=True)
+
+    request_values, line_values, created = common.bulk_row_values(valid, list(outcomes), cg_rows, user, results)
+    if not request_values:
+        return common.bulk_out(results)
+
+    try:
+        await db.execute(insert(ProcurementRequest), request_values)
+        if line_values:
+            await db.execute(insert(OrderLine), line_values)
+        await db.execute(insert(SearchDocument), common.bulk_search_documents(valid, created))
+        await db.execute(insert(RequestFingerprint), common.bulk_fingerprints(valid, created, request_values))
+        await _apply_rollup(db, common.bulk_rollup(request_values, user))
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        logger.exception("Bulk insert failed: %s", e)
+        raise HTTPException(status_code=500, detail="Bulk insert failed; no requests were created.")
+
+    await _run_blocking(common.bulk_index, created, request_values, texts, embeddings)
+
+    loaded = {
+        r.id: r
+        for r in (
+            await db.scalars(
+                _common_joins(select(ProcurementRequest))
+                .where(ProcurementRequest.id.in_([request_id for _, request_id, _ in created]))
+            )
+        ).all()
+    }
+    await _release(db)
+    for _, request_id, index in created:
+        results[index] = BulkCreateItemResult(index=index, ok=True, request=to_lite_out(loaded[request_id]))
+    return common.bulk_out(results)
+
+
+async def update_request(
+    db: AsyncSession,
+    request_id: str,
+    body: ProcurementRequestUpdateIn,
+    user: User,
+) -> ProcurementRequestLiteOut:
+    """
+    Update status and/or commodity group (Managers only); see
+    procurement_service.update_request. Weaviate is synced after commit.
+    """
+    ensure_manager(user)
+
+    if body.status is None and body.commodityGroupID is None:
+        raise HTTPException(status_code=400, detail="No changes provided")
+
+    # Row lock until commit (see procurement_service.update_request)
+    lock = common.write_lock_statement(db.get_bind().dialect.name, request_id)
+    if lock is not None:
+        await db.execute(lock)
+    # Read the locked row, not a copy this session loaded earlier. Not
+    # populate_existing: it would also reset the joined requestor's lazy
+    # collections (the manager's roles), which cannot lazy-load here.
+    cached = db.identity_map.get(db.identity_key(ProcurementRequest, request_id))
+    if cached is not None:
+        db.expire(cached)
+    procurement_request = await db.scalar(
+        _common_joins(select(ProcurementRequest))
+        .where(ProcurementRequest.id == request_id)
+        .with_for_update(of=ProcurementRequest)
+    )
+    if not procurement_request:
+        await _release(db)
+        raise HTTPException(status_code=404, detail="Request not found")
+
+    try:
+        common.check_version(procurement_request, body)
+    except HTTPException:
+        await _release(db)
+        raise
+
+    if body.commodityGroupID is not None:
+        cg_exists = await db.scalar(select(CommodityGroup.id).where(CommodityGroup.id == body.commodityGroupID))
+        if not cg_exists:
+            await _release(db)
+            raise HTTPException(status_code=404, detail="Commodity group not found")
+
+    applied = common.apply_update(procurement_request, body, user)
+    if applied is None:
+        await _release(db)
+        return to_lite_out(procurement_request)
+
+    db.add(applied.audit)
+    await _apply_rollup(db, applied.rollup)
+    await db.commit()
+    # The group relationship must follow the new id; reload with the list-view joins
+    db.expunge(procurement_request)
+    procurement_request = await _load_lite(db, request_id)
+    await _release(db)
+
+    if applied.regrouped:
+        await _run_blocking(common.regroup_vectors, request_id, body.commodityGroupID)
+
+    return to_lite_out(procurement_request)
+
+
+async def search_requests(
+    db: AsyncSession,
+    q: str,
+    status_filter: Optional[RequestStatus],
+    limit: int,
+    offset: int,
+) -> ProcurementSearchOut:
+    """
+    Ranked search over title, vendor, VAT id and order-line descriptions.
+    """
+    ranked = search_index.ranked_ids(
+        db.get_bind().dialect.name, q, status_filter=status_filter, limit=limit + 1, offset=offset
+    )
+    rows = []
+    if ranked is not None:
+        ranked = ranked.subquery()
+        rows = (await db.execute(
+            common.lite_list_select()
+            .join(ranked, ranked.c.request_id == ProcurementRequest.id)
+            .order_by(ranked.c.rank.desc(), ProcurementRequest.created_at.desc())
+        )).all()
+    await _release(db)
+    return ProcurementSearchOut(
+        query=q,
+        items=[lite_out_from_row(row) for row in rows[:limit]],
+        offset=offset,
+        limit=limit,
+        hasMore=len(rows) > limit,
+    )
+
+
+async def _hydrate_similar(db: AsyncSession, hits: List[tuple[str, float]]) -> List[SimilarRequestOut]:
+    if not hits:
+        return []
+    rows = (await db.execute(
+        common.lite_list_select().where(ProcurementRequest.id.in_([request_id for request_id, _ in hits]))
+    )).all()
+    await _release(db)
+    return common.similar_out(hits, rows)
+
+
+async def get_similar_requests(db: AsyncSession, request_id: str, limit: int) -> List[SimilarRequestOut]:
+    """
+    Requests most similar to an existing one, by its stored vector (re-embedded
+    from the request text if it was never indexed).
+    """
+    vector = await _run_blocking(common.stored_vector, request_id)
+    text = None
+    if vector is None:
+        procurement_request = (
+            await db.scalars(
+                select(ProcurementRequest)
+                .options(joinedload(ProcurementRequest.order_lines))
+                .where(ProcurementRequest.id == request_id)
+            )
+        ).unique().first()
+        await _release(db)
+        if not procurement_request:
+            raise HTTPException(status_code=404, detail="Request not found")
+        text = common.embedding_text(
+            title=procurement_request.title,
+            vendor_name=procurement_request.vendorName,
+            vat_id=procurement_request.vatID,
+            order_lines=procurement_request.order_lines,
+        )
+    hits = await _run_blocking(common.similar_hits, text, vector, limit, request_id)
+    return await _hydrate_similar(db, hits)
+
+
+async def find_similar_requests(
+    db: AsyncSession,
+    body: ProcurementRequestCreate,
+    limit: int,
+) -> List[SimilarRequestOut]:
+    """
+    Requests most similar to a draft, embedded through the embedding cache.
+    """
+    text = common.body_embedding_text(body)
+    return await _hydrate_similar(db, await _run_blocking(common.similar_hits, text, None, limit))
+
+
+async def get_spend_stats(
+    db: AsyncSession,
+    user: User,
+    *,
+    status_filter: Optional[RequestStatus] = None,
+    from_month: Optional[str] = None,
+    to_month: Optional[str] = None,
+    vendor_limit: int = 20,
+) -> SpendStatsOut:
+    """
+    Spend by commodity group, department, vendor, status and month (Managers only).
+    """
+    ensure_manager(user)
+    statements = spend_rollups.stats_statements(
+        status_filter=status_filter, from_month=from_month, to_month=to_month, vendor_limit=vendor_limit
+    )
+    rows = {name: (await db.execute(stmt)).all() for name, stmt in statements.items()}
+    await _release(db)
+    return spend_rollups.stats_out(rows)
+
+
+async def create_request_draft_from_pdf(
+    data: bytes,
+    *,
+    filename: str = "potential_procurement_request.pdf",
+    content_type: str = "application/pdf",
+) -> RequestDraftOut:
+    """
+    Extract a draft procurement request from the uploaded PDF (no DB access;
+    the extractor runs on the blocking-call pool).
+    """
+    return await _run_blocking(
+        _draft_from_pdf, data, filename=filename, content_type=content_type
+    )
@@ -0,0 +1,231 @@
+"""
+Request search: one text document per request (title, vendor, VAT id,
+order-line descriptions) in procurement_search_document, written in the same
+transaction as the request.
+
+- Postgres: full-text match (websearch syntax, `simple` configuration) OR
+  substring / fuzzy trigram match, served by the two GIN indexes on the
+  document. Ranked by ts_rank_cd + word_similarity.
+- SQLite: FTS5 (kept in sync by triggers), every word prefix-matched,
+  ranked by bm25.
+
+`ranked_ids` returns the requested page of (request_id, rank) so the caller
+can hydrate it with the list-view projection in the same query. Ranking is
+limited to the SEARCH_RANK_WINDOW most recently created matching requests
+(after the status filter, so a filtered search still sees older matches).
+
+    python -m app.services.search_index rebuild
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import re
+import sys
+from itertools import groupby
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import column, delete, func, insert, literal, literal_column, or_, select, table
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.enums import RequestStatus
+from app.models.order_line import OrderLine
+from app.models.procurement_request import ProcurementRequest
+from app.models.search_document import TS_CONFIG, SearchDocument
+
+logger = logging.getLogger(__name__)
+
+_INSERT_CHUNK = 2000
+_WORD = re.compile(r"\w+", re.UNICODE)
+_FTS = table("procurement_search_fts", column("rowid"))
+_FTS_TABLE = literal_column("procurement_search_fts")
+
+
+def document_text(*, title: str, vendor_name: str, vat_id: Optional[str], descriptions: Iterable[str]) -> str:
+    return "\n".join(part for part in (title, vendor_name, vat_id, *descriptions) if part)
+
+
+def document_values(request_id: str, body) -> Dict[str, Any]:
+    """Insert values for a request body (ProcurementRequestCreate)."""
+    return {
+        "requestID": request_id,
+        "document": document_text(
+            title=body.title,
+            vendor_name=body.vendorName,
+            vat_id=body.vatID,
+            descriptions=(ol.description for ol in body.orderLines),
+        ),
+    }
+
+
+# =========================
+# Query
+# =========================
+
+def _fts5_query(q: str) -> Optional[str]:
+    """User input -> FTS5 query: every word must match as a prefix (quoted, so no operator injection)."""
+    words = _WORD.findall(q)
+    return " ".join(f'"{w}"*' for w in words) if words else None
+
+
+def _like_pattern(q: str) -> str:
+    escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _newest(stmt, status_filter: Optional[RequestStatus], window: int):
+    """
+    Restrict candidates (a select over SearchDocument) to requests with
+    `status_filter`, then to the `window` most recently created ones.
+    Document ids follow insert order (rebuild writes them by request id), so
+    recency comes from the request itself.
+    """
+    stmt = stmt.join(ProcurementRequest, ProcurementRequest.id == SearchDocument.requestID)
+    if status_filter is not None:
+        stmt = stmt.where(ProcurementRequest.status == status_filter)
+    if window > 0:
+        stmt = stmt.order_by(ProcurementRequest.created_at.desc(), ProcurementRequest.id.desc()).limit(window)
+    return stmt
+
+
+def ranked_ids(
+    dialect_name: str,
+    q: str,
+    *,
+    status_filter: Optional[RequestStatus] = None,
+    limit: int,
+    offset: int = 0,
+    window: Optional[int] = None,
+):
+    """
+    Select of (request_id, rank) for one page of matches, best first;
+    None if `q` cannot match anything.
+
+    Only the `window` most recently created matches (default
+    SEARCH_RANK_WINDOW) with `status_filter` are ranked: finding matches is an index lookup, but
+    ranking reads every candidate row.
+    """
+    q = q.strip()
+    window = settings.SEARCH_RANK_WINDOW if window is None else window
+    if dialect_name == "postgresql":
+        candidates = _newest(
+            select(
+                SearchDocument.requestID.label("request_id"),
+                SearchDocument.document,
+                ProcurementRequest.created_at,
+            ).where(or_(
+                func.to_tsvector(TS_CONFIG, SearchDocument.document).op("@@")(
+                    func.websearch_to_tsquery(TS_CONFIG, q)
+                ),
+                SearchDocument.document.ilike(_like_pattern(q), escape="\\"),
+                literal(q).op("<%")(SearchDocument.document),
+            )),
+            status_filter,
+            window,
+        ).subquery("candidates")
+        rank = (
+            func.ts_rank_cd(func.to_tsvector(TS_CONFIG, candidates.c.document), func.websearch_to_tsquery(TS_CONFIG, q))
+            + func.word_similarity(q, candidates.c.document)
+        )
+        stmt = select(candidates.c.request_id, rank.label("rank"))
+    elif dialect_name == "sqlite":
+        match = _fts5_query(q)
+        if match is None:
+            return None
+        # bm25 is only available inside the MATCH query, so it is computed there for the window
+        candidates = _newest(
+            select(
+                SearchDocument.requestID.label("request_id"),
+                (-func.bm25(_FTS_TABLE)).label("rank"),
+                ProcurementRequest.created_at,
+            )
+            .select_from(_FTS)
+            .join(SearchDocument, SearchDocument.id == _FTS.c.rowid)
+            .where(_FTS_TABLE.op("MATCH")(match)),
+            status_filter,
+            window,
+        ).subquery("candidates")
+        rank = candidates.c.rank
+        stmt = select(candidates.c.request_id, rank.label("rank"))
+    else:
+        raise ValueError(f"Request search is not available for dialect '{dialect_name}'")
+
+    return (
+        stmt.order_by(rank.desc(), candidates.c.created_at.desc(), candidates.c.request_id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+
+
+# =========================
+# Rebuild
+# =========================
+
+def _insert_documents(db: Session, rows: List[Dict[str, Any]]) -> None:
+    for start in range(0, len(rows), _INSERT_CHUNK):
+        db.execute(insert(SearchDocument), rows[start:start + _INSERT_CHUNK])
+
+
+def rebuild(db: Session) -> int:
+    """Recreate every search document from requests and order lines. Returns the document count."""
+    db.execute(delete(SearchDocument))
+    # One streamed pass over requests x order lines, grouped by request
+    stream = db.execute(
+        select(
+            ProcurementRequest.id, ProcurementRequest.title, ProcurementRequest.vendorName,
+            ProcurementRequest.vatID, OrderLine.description,
+        )
+        .outerjoin(OrderLine, OrderLine.requestID == ProcurementRequest.id)
+        .order_by(ProcurementRequest.id, OrderLine.id)
+        .execution_options(yield_per=5000)
+    )
+    rows: List[Dict[str, Any]] = []
+    count = 0
+    for request_id, group in groupby(stream, key=lambda row: row[0]):
+        lines = list(group)
+        _, title, vendor, vat_id, _ = lines[0]
+        rows.append({
+            "requestID": request_id,
+            "document": document_text(
+                title=title, vendor_name=vendor, vat_id=vat_id,
+                descriptions=[line.description for line in lines if line.description],
+            ),
+        })
+        if len(rows) >= _INSERT_CHUNK:
+            _insert_documents(db, rows)
+            count += len(rows)
+            rows = []
+    _insert_documents(db, rows)
+    db.commit()
+    return count + len(rows)
+
+
+def ensure_built(db: Session) -> bool:
+    """Rebuild if there are requests but no search documents (first start, restored dump)."""
+    if db.scalar(select(SearchDocument.id).limit(1)) is not None:
+        return False
+    if db.scalar(select(ProcurementRequest.id).limit(1)) is None:
+        return False
+    logger.info("Search index empty; indexed %d requests.", rebuild(db))
+    return True
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args(argv)
+
+    import app.models  # noqa: F401  (registers tables)
+    from app.db.base import Base
+    from app.db.session import SessionLocal, engine
+
+    logging.basicConfig(level=logging.INFO)
+    Base.metadata.create_all(bind=engine, tables=[SearchDocument.__table__])
+    with SessionLocal() as db:
+        print(f"indexed {rebuild(db)} requests")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""
+Spend rollups: request count and total per (commodity group, requestor
+department, vendor, status, month), kept in procurement_spend_rollup.
+
+Writers collect the buckets a change touches into a `Deltas` map
+(`add_request` for new rows, `move_request` for status / group changes) and
+write them with `apply` (or `statements` on an AsyncSession) inside the same
+transaction as the request change. Deltas are merged per bucket and written
+as one multi-row upsert (`count = count + excluded.count`), so a request
+write costs one extra statement and concurrent writers never lose updates.
+
+The stats endpoint reads only the rollup table, whose size depends on the
+number of distinct buckets, not on request history.
+
+    python -m app.services.spend_rollups rebuild
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.commodity_group import CommodityGroup
+from app.models.department import Department
+from app.models.enums import RequestStatus
+from app.models.procurement_request import ProcurementRequest
+from app.models.spend_rollup import SpendRollup
+from app.models.user import User
+from app.schemas.stats import SpendBucketOut, SpendStatsOut
+
+logger = logging.getLogger(__name__)
+
+_UPSERT_CHUNK = 1000  # rows per statement (SQLite caps bound parameters)
+_KEY_COLUMNS = ("commodityGroupID", "departmentID", "vendorName", "status", "month")
+
+
+class Bucket(NamedTuple):
+    commodity_group_id: int
+    department_id: int
+    vendor_name: str
+    status: RequestStatus
+    month: str
+
+
+Deltas = Dict[Bucket, List[int]]  # bucket -> [request count, total cents]
+
+
+def month_of(created_at: Optional[datetime]) -> str:
+    if created_at is None:
+        created_at = datetime.now(timezone.utc)
+    elif created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return created_at.strftime("%Y-%m")  # naive values are UTC (SQLite)
+
+
+def _bucket(
+    commodity_group_id: Optional[int],
+    department_id: Optional[int],
+    vendor_name: str,
+    status: Optional[RequestStatus],
+    created_at: Optional[datetime],
+) -> Bucket:
+    return Bucket(
+        int(commodity_group_id or 0),
+        int(department_id or 0),
+        (vendor_name or "").strip(),
+        RequestStatus(status or RequestStatus.OPEN),  # column default for rows not flushed yet
+        month_of(created_at),
+    )
+
+
+def _add(deltas: Deltas, bucket: Bucket, count: int, cents: int) -> None:
+    entry = deltas.setdefault(bucket, [0, 0])
+    entry[0] += count
+    entry[1] += cents
+
+
+def add_request(deltas: Deltas, request: Any, department_id: Optional[int], *, sign: int = 1) -> None:
+    """Count `request` (a ProcurementRequest or its insert values) into its bucket; sign=-1 removes it."""
+    get = request.get if isinstance(request, dict) else lambda name: getattr(request, name)
+    bucket = _bucket(
+        get("commodityGroupID"), department_id, get("vendorName"), get("status"), get("created_at")
+    )
+    _add(deltas, bucket, sign, sign * int(get("totalCosts") or 0))
+
+
+def move_request(
+    deltas: Deltas,
+    request: ProcurementRequest,
+    department_id: Optional[int],
+    *,
+    old_status: Optional[RequestStatus],
+    old_commodity_group_id: Optional[int],
+) -> None:
+    """Move `request` (already carrying its new status / group) out of its previous bucket."""
+    cents = int(request.totalCosts or 0)
+    _add(deltas, _bucket(old_commodity_group_id, department_id, request.vendorName, old_status,
+                         request.created_at), -1, -cents)
+    _add(deltas, _bucket(request.commodityGroupID, department_id, request.vendorName, request.status,
+                         request.created_at), 1, cents)
+
+
+def statements(dialect_name: str, deltas: Deltas) -> list:
+    """Upsert statements for `deltas` (empty if nothing changes), in bucket order to avoid lock cycles."""
+    if dialect_name == "postgresql":
+        insert_fn = pg_insert
+    elif dialect_name == "sqlite":
+        insert_fn = sqlite_insert
+    else:
+        raise ValueError(f"Spend rollups need an upsert for dialect '{dialect_name}'")
+
+    rows = [
+        dict(zip(_KEY_COLUMNS, bucket), requestCount=count, totalCents=cents)
+        for bucket, (count, cents) in sorted(deltas.items())
+        if count or cents
+    ]
+    out = []
+    for start in range(0, len(rows), _UPSERT_CHUNK):
+        stmt = insert_fn(SpendRollup).values(rows[start:start + _UPSERT_CHUNK])
+        out.append(stmt.on_conflict_do_update(
+            index_elements=list(_KEY_COLUMNS),
+            set_={
+                "requestCount": SpendRollup.requestCount + stmt.excluded.requestCount,
+                "totalCents": SpendRollup.totalCents + stmt.excluded.totalCents,
+            },
+        ))
+    return out
+
+
+def apply(db: Session, deltas: Deltas) -> None:
+    for stmt in statements(db.get_bind().dialect.name, deltas):
+        db.execute(stmt)
+
+
+# =========================
+# Rebuild
+# =========================
+
+def rebuild(db: Session) -> int:
+    """Recompute all rollups from procurement_request in one transaction. Returns the bucket count."""
+    if db.get_bind().dialect.name == "postgresql":
+        # Writers upsert under ROW EXCLUSIVE: anything they committed before the lock is in the
+        # scan below, anything after it is added on top of the rebuilt rows.
+        db.execute(text("LOCK TABLE procurement_spend_rollup IN EXCLUSIVE MODE"))
+    deltas: Deltas = {}
+    rows = db.execute(
+        select(
+            ProcurementRequest.commodityGroupID,
+            User.departmentID,
+            ProcurementRequest.vendorName,
+            ProcurementRequest.status,
+            ProcurementRequest.created_at,
+            ProcurementRequest.totalCosts,
+        )
+        .outerjoin(User, ProcurementRequest.createdByUserID == User.id)
+        .execution_options(yield_per=2000)
+    )
+    for cg_id, department_id, vendor, status, created_at, total in rows:
+        _add(deltas, _bucket(cg_id, department_id, vendor, status, created_at), 1, int(total or 0))
+    db.execute(delete(SpendRollup))
+    apply(db, deltas)
+    db.commit()
+    return len(deltas)
+
+
+def ensure_built(db: Session) -> bool:
+    """Rebuild if the rollup table is empty but requests exist (first start, restored dump)."""
+    if db.scalar(select(SpendRollup.month).limit(1)) is not None:
+        return False
+    if db.scalar(select(ProcurementRequest.id).limit(1)) is None:
+        return False
+    logger.info("Spend rollups empty; rebuilt %d buckets.", rebuild(db))
+    return True
+
+
+# =========================
+# Stats
+# =========================
+
+def stats_statements(
+    *,
+    status_filter: Optional[RequestStatus] = None,
+    from_month: Optional[str] = None,
+    to_month: Optional[str] = None,
+    vendor_limit: int = 20,
+) -> Dict[str, Any]:
+    """One grouped query per dimension, all over the rollup table."""
+    count = func.sum(SpendRollup.requestCount).label("request_count")
+    cents = func.sum(SpendRollup.totalCents).label("total_cents")
+
+    def grouped(*columns):
+        stmt = select(*columns, count, cents)
+        if status_filter is not None:
+            stmt = stmt.where(SpendRollup.status == status_filter)
+        if from_month:
+            stmt = stmt.where(SpendRollup.month >= from_month)
+        if to_month:
+            stmt = stmt.where(SpendRollup.month <= to_month)
+        return stmt.group_by(*columns).having(func.sum(SpendRollup.requestCount) != 0)
+
+    return {
+        "byCommodityGroup": grouped(SpendRollup.commodityGroupID, CommodityGroup.category, CommodityGroup.name)
+        .outerjoin(CommodityGroup, CommodityGroup.id == SpendRollup.commodityGroupID)
+        .order_by(cents.desc()),
+        "byDepartment": grouped(SpendRollup.departmentID, Department.name)
+        .outerjoin(Department, Department.id == SpendRollup.departmentID)
+        .order_by(cents.desc()),
+        "byVendor": grouped(SpendRollup.vendorName).order_by(cents.desc()).limit(vendor_limit),
+        "byStatus": grouped(SpendRollup.status).order_by(SpendRollup.status),
+        "byMonth": grouped(SpendRollup.month).order_by(SpendRollup.month),
+    }
+
+
+def _bucket_out(key: Any, label: Optional[str], row) -> SpendBucketOut:
+    return SpendBucketOut(
+        key=str(key), label=label or "—", requestCount=int(row.request_count), totalCents=int(row.total_cents)
+    )
+
+
+def stats_out(rows: Dict[str, list]) -> SpendStatsOut:
+    """Map the results of `stats_statements` (same keys) to the DTO."""
+    by_status = [_bucket_out(r.status.value, r.status.value, r) for r in rows["byStatus"]]
+    return SpendStatsOut(
+        requestCount=sum(b.requestCount for b in by_status),
+        totalCents=sum(b.totalCents for b in by_status),
+        byCommodityGroup=[
+            _bucket_out(r.commodityGroupID, f"{r.category} – {r.name}" if r.name else None, r)
+            for r in rows["byCommodityGroup"]
+        ],
+        byDepartment=[_bucket_out(r.departmentID, r.name, r) for r in rows["byDepartment"]],
+        byVendor=[_bucket_out(r.vendorName, r.vendorName, r) for r in rows["byVendor"]],
+        byStatus=by_status,
+        byMonth=[_bucket_out(r.month, r.month, r) for r in rows["byMonth"]],
+    )
+
+
+def spend_stats(db: Session, **filters: Any) -> SpendStatsOut:
+    return stats_out({name: db.execute(stmt).all() for name, stmt in stats_statements(**filters).items()})
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args(argv)
+
+    import app.models  # noqa: F401  (registers tables)
+    from app.db.base import Base
+    from app.db.session import SessionLocal, engine
+
+    logging.basicConfig(level=logging.INFO)
+    Base.metadata.create_all(bind=engine, tables=[SpendRollup.__table__])
+    with SessionLocal() as db:
+        print(f"rebuilt {rebuild(db)} spend buckets")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,27 @@
+import os
+
 import pytest
 
 class DummyDB:
     """No-op SQLAlchemy-like session for unit tests."""
-    def add(self, *args, **kwargs): pass
+    def __init__(self):
+        self.added = None
+    def add(self, obj, *args, **kwargs): self.added = obj
     def commit(self): pass
     def refresh(self, *args, **kwargs): pass
+    def execute(self, *args, **kwargs):
+        return type("Result", (), {"first": lambda self: None, "all": lambda self: []})()
+    def get_bind(self):
+        return type("Bind", (), {"dialect": type("Dialect", (), {"name": "sqlite"})})
     def query(self, *args, **kwargs):
-        # Return an object that supports .order_by(...).all() and .first()
+        # Return an object that supports .order_by(...).all(), .first() and .one()
+        db = self
         class _Q:
             def order_by(self, *a, **k): return self
+            def options(self, *a, **k): return self
             def all(self): return []
             def first(self): return [1]  # used as fallback commodity group id
+            def one(self): return db.added  # reload after commit
             def filter(self, *a, **k): return self
         return _Q()
 
@@ -29,15 +40,122 @@ def fake_classifier(monkeypatch):
     class DummyRegistry:
         commodity_classifier = DummyClassifier()
     monkeypatch.setattr(
-        "app.services.procurement_service.get_agent_registry",
+        "app.services.procurement_common.get_agent_registry",
         lambda: DummyRegistry(),
     )
 
 @pytest.fixture
 def mute_weaviate(monkeypatch):
     """Prevent outbound calls to Weaviate/AI during tests."""
-    monkeypatch.setattr("app.services.procurement_service.get_ai_client", lambda: None)
-    monkeypatch.setattr("app.services.procurement_service.wx", type("WX", (), {
+    monkeypatch.setattr("app.services.procurement_common.get_ai_client", lambda: None)
+    monkeypatch.setattr("app.services.procurement_common.wx", type("WX", (), {
         "add": staticmethod(lambda **kwargs: None),
         "update_commodity_group": staticmethod(lambda **kwargs: 0),
-    }))
\ No newline at end of file
+    }))
+
+@pytest.fixture
+def assert_max_queries():
+    """`with assert_max_queries(n): ...` fails if the block runs more than n SQL statements."""
+    from app.db.query_counter import assert_max_queries as _assert_max_queries
+    return _assert_max_queries
+
+
+def _seed_sqlite(engine):
+    """Create the schema and seed a manager, a requester, three commodity groups and five requests."""
+    from datetime import datetime, timedelta, timezone
+
+    from sqlalchemy.orm import Session
+
+    import app.models  # noqa: F401  (registers tables)
+    import app.models.procurement_request_update  # noqa: F401
+    from app.db.base import Base
+    from app.models import CommodityGroup, Department, OrderLine, ProcurementRequest, Role, User, UserRole
+    from app.services import duplicates, search_index, spend_rollups
+
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        dept = Department(id=1, name="IT")
+        manager_role = Role(id=1, name="Manager")
+        manager = User(id=1, firstname="Mara", lastname="Manager", username="manager",
+                       hashedPassword="x", departmentID=1)
+        requester = User(id=2, firstname="Rene", lastname="Requester", username="requester",
+                         hashedPassword="x", departmentID=1)
+        session.add_all([dept, manager_role, manager, requester, UserRole(user_id=1, role_id=1)])
+        session.add_all([
+            CommodityGroup(id=31, category="IT", name="Software"),
+            CommodityGroup(id=32, category="IT", name="Hardware"),
+            CommodityGroup(id=33, category="Facility", name="Furniture"),
+        ])
+        for i in range(5):
+            session.add(ProcurementRequest(
+                id=f"req-{i}", title=f"Request {i}", vendorName="ACME", vatID="DE123456789",
+                commodityGroupID=31 + i % 3, totalCosts=2000, createdByUserID=2 if i % 2 else 1,
+                created_at=datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(hours=i),
+                order_lines=[
+                    OrderLine(id=f"ol-{i}-a", description="Item A", unitPriceCents=500, unit="pcs", quantity=2, totalPriceCents=1000),
+                    OrderLine(id=f"ol-{i}-b", description="Item B", unitPriceCents=1000, unit="pcs", quantity=1, totalPriceCents=1000),
+                ],
+            ))
+        session.commit()
+        spend_rollups.rebuild(session)
+        search_index.rebuild(session)
+        duplicates.rebuild(session)
+
+
+@pytest.fixture
+def sqlite_db():
+    """
+    Real SQLAlchemy session on in-memory SQLite, seeded with a manager, a
+    requester, three commodity groups and five requests (two order lines each).
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    _seed_sqlite(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def sqlite_file_url(tmp_path):
+    """URL of a file-backed SQLite database with the `sqlite_db` seed data (for async engines)."""
+    from sqlalchemy import create_engine
+
+    url = f"sqlite:///{tmp_path / 'procurement.db'}"
+    engine = create_engine(url)
+    _seed_sqlite(engine)
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def postgres_db():
+    """
+    Session on the throwaway Postgres database at TEST_POSTGRES_URL with the
+    `sqlite_db` seed data; all tables are dropped afterwards. Skipped if unset.
+    """
+    url = os.environ.get("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.db.base import Base
+
+    engine = create_engine(url)
+    _seed_sqlite(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(engine)
+        engine.dispose()
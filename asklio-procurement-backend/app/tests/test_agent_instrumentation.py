@@ -0,0 +1,49 @@
+import pytest
+
+from app.agents import instrumentation
+from app.agents.base import AgentTimeout
+from app.models.user import User
+from app.routers import ops
+
+
+@pytest.fixture(autouse=True)
+def clean():
+    instrumentation.reset()
+    yield
+    instrumentation.reset()
+
+
+def test_usage_inside_stage_is_attributed_to_trace():
+    with instrumentation.stage("commodity_classifier", "scoring", "t-1"):
+        instrumentation.record_usage(
+            "gpt-4.1-2025-04-14",
+            {"input_tokens": 1000, "output_tokens": 100, "input_tokens_details": {"cached_tokens": 400}},
+        )
+    instrumentation.record_usage("gpt-4.1-2025-04-14", {"input_tokens": 5})  # outside any stage
+
+    [record] = instrumentation.trace_records("t-1")
+    assert (record["input_tokens"], record["output_tokens"], record["cached_tokens"]) == (1000, 100, 400)
+    assert record["cost_usd"] == pytest.approx((600 * 2.0 + 400 * 0.5 + 100 * 8.0) / 1_000_000)
+    assert record["outcome"] == "ok"
+
+
+def test_summary_counts_outcomes_per_stage():
+    with instrumentation.stage("pdf_extractor_agent", "recovery", "t-2"):
+        pass
+    with pytest.raises(AgentTimeout):
+        with instrumentation.stage("pdf_extractor_agent", "recovery", "t-2"):
+            raise AgentTimeout("budget")
+
+    [row] = instrumentation.stage_summary()
+    assert row["calls"] == 2
+    assert row["outcomes"] == {"ok": 1, "timeout": 1}
+
+
+def test_trace_endpoint_returns_camel_case_stages(sqlite_db):
+    with instrumentation.stage("commodity_classifier", "scoring", "t-3"):
+        instrumentation.record_usage("gpt-4.1-2025-04-14", {"input_tokens": 10, "output_tokens": 2})
+
+    out = ops.agent_trace("t-3", sqlite_db.get(User, 1)).model_dump()
+    [stage] = out["stages"]
+    assert stage["traceId"] == "t-3" and stage["inputTokens"] == 10 and stage["outputTokens"] == 2
+    assert stage["costUsd"] == out["totalCostUsd"] and "trace_id" not in stage
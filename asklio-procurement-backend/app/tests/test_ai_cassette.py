@@ -0,0 +1,64 @@
+import pytest
+
+from app.agents import instrumentation
+from app.agents.commodity_classifier.internal_types import _LLMScoring
+from app.ai.cassette import Cassette, CassetteAIClient, CassetteMiss
+from app.ai.fake import FakeAIClient, LatencyModel
+
+_MESSAGES = [{"role": "user", "content": (
+    "Request: laptop docking station\n\nCANDIDATE COMMODITY GROUPS\n"
+    "- [31] Information Technology — Hardware laptop\n- [7] Facility Management — Cleaning\n"
+)}]
+
+
+def _fake() -> FakeAIClient:
+    return FakeAIClient(
+        embed_latency=LatencyModel(40, distribution="fixed"),
+        completion_latency=LatencyModel(40, distribution="fixed"),
+        embedding_dims=16,
+    )
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".jsonl.gz"])
+def test_replay_serves_recorded_calls_without_a_client(tmp_path, suffix):
+    path = str(tmp_path / f"cassette{suffix}")
+    recorder = CassetteAIClient(_fake(), Cassette(path, truncate=True), mode="record")
+    parsed, _ = recorder.complete_pydantic(_MESSAGES, response_model=_LLMScoring)
+    vectors = recorder.embed_batch(["laptop", "chair"])
+    recorder.cassette.close()
+
+    player = CassetteAIClient(None, Cassette(path), mode="replay")
+    # Whitespace-only prompt edits still hit the recording
+    reflowed = [{"role": "user", "content": _MESSAGES[0]["content"].replace("\n\n", "\n   \n")}]
+    replayed, meta = player.complete_pydantic(reflowed, response_model=_LLMScoring)
+    assert replayed == parsed and meta["model"] == "fake-chat"
+    for got, want in zip(player.embed_batch(["laptop", "chair"]), vectors):
+        assert got == pytest.approx(want, abs=1e-6)
+
+    with pytest.raises(CassetteMiss):
+        player.embed("something never recorded")
+
+
+def test_replay_reports_usage_and_recorded_latency(tmp_path):
+    path = str(tmp_path / "cassette.jsonl")
+    recorder = CassetteAIClient(_fake(), Cassette(path, truncate=True), mode="record")
+    recorder.complete_text(_MESSAGES)
+    recorder.cassette.close()
+
+    slept = []
+    player = CassetteAIClient(None, Cassette(path), mode="replay", replay_latency=True, sleep=slept.append)
+    with instrumentation.capture_usage() as usage:
+        player.complete_text(_MESSAGES)
+    assert usage and usage[0][0] == "fake-chat" and usage[0][1]["input_tokens"] > 0
+    assert slept and slept[0] >= 0.04
+
+    with pytest.raises(TimeoutError):
+        player.complete_text(_MESSAGES, timeout=0.001)
+
+
+def test_auto_mode_records_only_misses(tmp_path):
+    path = str(tmp_path / "cassette.jsonl")
+    client = CassetteAIClient(_fake(), Cassette(path), mode="auto")
+    client.embed("laptop")
+    client.embed("laptop")
+    assert len(Cassette(path)) == 1
@@ -0,0 +1,64 @@
+import math
+
+import pytest
+
+from app.agents.commodity_classifier.internal_types import _LLMScoring
+from app.ai.fake import FakeAIClient, LatencyModel, fake_embedding
+from app.benchmarks.load import parse_gauges, percentile
+from app.weaviate.memory_store import InMemoryVectorStore
+
+
+def _client(**kwargs) -> FakeAIClient:
+    return FakeAIClient(
+        embed_latency=LatencyModel(1, distribution="fixed"),
+        completion_latency=LatencyModel(1, distribution="fixed"),
+        sleep=lambda s: None,
+        **kwargs,
+    )
+
+
+def _cos(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+def test_embeddings_are_deterministic_unit_vectors_and_word_sensitive():
+    a = fake_embedding("laptop for the new developer", 64)
+    assert a == fake_embedding("laptop for the new developer", 64)
+    assert math.isclose(_cos(a, a), 1.0, rel_tol=1e-9)
+    assert _cos(a, fake_embedding("laptop for a developer", 64)) > _cos(a, fake_embedding("office cleaning", 64))
+
+
+def test_scoring_picks_candidates_sharing_words_with_the_request():
+    messages = [{"role": "user", "content": (
+        "Request: laptop docking station\n\nCANDIDATE COMMODITY GROUPS\n"
+        "- [31] Information Technology — Hardware laptop\n- [7] Facility Management — Cleaning\n"
+    )}]
+    parsed, _ = _client().complete_pydantic(messages, response_model=_LLMScoring)
+    assert [s.id for s in parsed.scores] == [31]
+
+
+def test_calls_outlasting_their_timeout_raise_timeout_error():
+    client = _client()
+    client.completion_latency = LatencyModel(5000, distribution="fixed")
+    with pytest.raises(TimeoutError):
+        client.complete_text([{"role": "user", "content": "hi"}], timeout=1.0)
+
+
+def test_memory_store_search_update_and_delete():
+    store = InMemoryVectorStore()
+    store.add("r1", "31", "laptop", [1.0, 0.0], label_source="scoring")
+    store.add("r2", "7", "cleaning", [0.0, 1.0])
+    hits = store.search_similar([0.9, 0.1], top_k=1)
+    assert hits[0]["requestId"] == "r1" and hits[0]["certainty"] > 0.9 and hits[0]["labelSource"] == "scoring"
+    assert store.update_commodity_group("r1", "8", label_source="manual") == 1
+    hit = store.search_similar([1.0, 0.0], commodity_group_id="8")[0]
+    assert (hit["requestId"], hit["labelSource"]) == ("r1", "manual")
+    store.delete("r1")
+    assert len(store) == 1
+
+
+def test_load_report_helpers():
+    assert percentile([1, 2, 3, 4, 5], 50) == 3
+    assert percentile([], 99) is None
+    text = '# HELP x\nthreadpool_busy_threads 4.0\ndb_pool_overflow{engine="primary"} 2.0\nother 1\n'
+    assert parse_gauges(text) == {"threadpool_busy_threads": 4.0, 'db_pool_overflow{engine="primary"}': 2.0}
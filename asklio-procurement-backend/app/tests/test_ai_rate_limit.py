@@ -0,0 +1,32 @@
+import pytest
+
+from app.ai.rate_limit import ModelLimiter, RateLimiter, RateLimitExceeded, estimate_tokens
+
+
+def test_estimate_counts_text_and_requested_output():
+    messages = [{"role": "user", "content": [{"type": "input_text", "text": "x" * 400}]}]
+
+    assert estimate_tokens(messages, max_output_tokens=100) == 101 + 4 + 100
+
+
+def test_rejects_early_when_tokens_per_minute_exhausted():
+    limiter = ModelLimiter("m", rpm=100, tpm=1000, max_queue=8)
+    limiter.acquire(900, max_wait=0)
+
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire(500, max_wait=1.0)  # needs ~24s of refill
+
+
+def test_provider_headers_override_local_view():
+    limiter = RateLimiter(default_rpm=1000, default_tpm=100_000, max_wait=0)
+    with limiter.reserve("m", 10) as slot:
+        slot.observe(
+            headers={"x-ratelimit-limit-requests": "60", "x-ratelimit-remaining-requests": "0"},
+            used_tokens=12,
+        )
+
+    headroom = limiter.for_model("m").headroom()
+    assert headroom["requests"] < 1
+    assert headroom["tokens"] == pytest.approx(100_000 - 12, abs=50)
+    with pytest.raises(RateLimitExceeded):
+        limiter.for_model("m").acquire(1, max_wait=0)
@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+
+from app.ai.rate_limit import RateLimitExceeded
+from app.ai.resilient import CircuitBreaker, CircuitOpenError, ResilientAIClient
+
+
+class FlakyAI:
+    """Fails the first `failures` embed calls with a timeout; optional per-call delays."""
+    def __init__(self, failures=0, delays=()):
+        self.failures = failures
+        self.delays = list(delays)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def embed(self, text, *, timeout=None):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        if call <= self.failures:
+            raise TimeoutError("provider timed out")
+        if call <= len(self.delays):
+            time.sleep(self.delays[call - 1])
+        return [float(call)]
+
+
+def test_transient_errors_are_retried():
+    inner = FlakyAI(failures=2)
+    client = ResilientAIClient(inner, retry_attempts=3, retry_max_wait=0.01)
+
+    assert client.embed("x") == [3.0]
+    assert inner.calls == 3
+
+
+def test_open_circuit_fails_fast_without_calling_provider():
+    inner = FlakyAI(failures=100)
+    client = ResilientAIClient(
+        inner,
+        retry_attempts=1,
+        breaker=CircuitBreaker(failure_threshold=2, reset_seconds=60),
+    )
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            client.embed("x")
+
+    with pytest.raises(CircuitOpenError):
+        client.embed("x")
+    assert inner.calls == 2
+
+
+def test_rate_limited_probe_releases_half_open_slot():
+    class RecoveringAI:
+        """Down, then the probe is rejected by the rate limiter, then the provider is back."""
+        def __init__(self):
+            self.outcomes = [TimeoutError("down"), RateLimitExceeded("no capacity")]
+
+        def embed(self, text, *, timeout=None):
+            if self.outcomes:
+                raise self.outcomes.pop(0)
+            return [1.0]
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+    client = ResilientAIClient(RecoveringAI(), retry_attempts=1, breaker=breaker)
+    with pytest.raises(TimeoutError):
+        client.embed("x")
+    assert breaker.is_open
+
+    time.sleep(0.06)  # half-open
+    with pytest.raises(RateLimitExceeded):
+        client.embed("x")
+
+    assert client.embed("x") == [1.0]
+    assert not breaker.is_open
+
+
+def test_slow_call_is_hedged_after_p95():
+    # 20 fast calls establish the p95, then a slow primary loses to its hedge
+    inner = FlakyAI(delays=[0.0] * 20 + [1.0])
+    client = ResilientAIClient(inner, hedge_ops=("embed",), hedge_min_samples=20, hedge_min_delay=0.05)
+    for _ in range(20):
+        client.embed("x")
+
+    started = time.perf_counter()
+    assert client.embed("x") == [22.0]
+    assert time.perf_counter() - started < 0.5
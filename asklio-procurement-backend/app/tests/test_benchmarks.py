@@ -0,0 +1,21 @@
+from app.benchmarks.procurement import CASES, compare, run_suite
+
+
+def test_suite_runs_every_case_on_a_small_database():
+    report = run_suite([40], repeat=1, warmup=0)
+    results = {r["case"]: r for r in report["results"]}
+    assert set(results) == set(CASES)
+    assert results["list_requests"]["queries"] == 1
+    assert results["mappers.to_lite_out[all rows]"]["queries"] == 0
+
+
+def test_compare_flags_slowdowns_and_extra_queries():
+    def report(median, queries):
+        return {"results": [{"case": "list_requests", "size": 1000, "median_ms": median, "queries": queries}]}
+
+    baseline = report(10.0, 1)
+    assert compare(report(11.5, 1), baseline, threshold=0.2) == []
+    assert len(compare(report(13.0, 1), baseline, threshold=0.2)) == 1
+    assert len(compare(report(10.0, 2), baseline, threshold=0.2)) == 1
+    # Large relative but tiny absolute changes are noise
+    assert compare(report(0.3, 1), report(0.1, 1), threshold=0.2) == []
@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from app.agents.base import AgentError
+from app.models import OrderLine, ProcurementRequest, RequestFingerprint, SearchDocument
+from app.models.user import User
+from app.routers import procurement, procurement_async
+from app.schemas.procurement import ProcurementRequestBulkCreate
+from app.services import procurement_common, procurement_service, spend_rollups
+from app.weaviate import operations
+from app.weaviate.memory_store import InMemoryVectorStore
+
+
+class _TitleClassifier:
+    """Group 32, except: 'abstain' -> AgentError (fallback), 'crash' -> unexpected error."""
+    def run(self, inp):
+        if inp.title == "abstain":
+            raise AgentError("no decision")
+        if inp.title == "crash":
+            raise RuntimeError("bug")
+        return type("Res", (), {"suggested_commodity_group_id": 32, "confidence": 0.9, "decision_path": "scoring"})
+
+
+class _BatchEmbedder:
+    def __init__(self):
+        self.batches = []
+
+    def embed_batch(self, texts, *, timeout=None):
+        self.batches.append(len(texts))
+        return [[1.0, float(i)] for i in range(len(texts))]
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    store, embedder = InMemoryVectorStore(), _BatchEmbedder()
+    monkeypatch.setattr(
+        procurement_common, "get_agent_registry", lambda: type("Reg", (), {"commodity_classifier": _TitleClassifier()})
+    )
+    monkeypatch.setattr(procurement_common, "get_ai_client", lambda: embedder)
+    monkeypatch.setattr(procurement_common, "wx", store)
+    return store, embedder
+
+
+def _item(title, **overrides):
+    item = {
+        "title": title, "vendorName": "Office AG", "vatID": "DE123456789",
+        "orderLines": [{"description": "Paper", "unitPriceCents": 500, "quantity": 2, "unit": "box"}],
+    }
+    item.update(overrides)
+    return item
+
+
+def _counts(db):
+    return [db.scalar(select(func.count()).select_from(m)) for m in (ProcurementRequest, OrderLine, SearchDocument, RequestFingerprint)]
+
+
+def test_bulk_create_reports_each_item(sqlite_db, pipeline):
+    store, embedder = pipeline
+    manager = sqlite_db.get(User, 1)
+    items = [
+        _item("ok"),
+        _item("no vendor", vendorName=None),
+        _item("abstain"),
+        _item("crash"),
+        _item("bad line", orderLines=[{"description": "x", "unitPriceCents": -1, "quantity": 1, "unit": "pcs"}]),
+    ]
+
+    out = procurement_service.create_requests_bulk(sqlite_db, items, manager)
+
+    assert (out.created, out.failed) == (2, 3)
+    assert [r.index for r in out.results] == [0, 1, 2, 3, 4]
+    ok, no_vendor, abstained, crashed, bad_line = out.results
+    assert ok.ok and ok.request.commodityGroup.id == 32
+    assert not no_vendor.ok and no_vendor.error.startswith("vendorName")
+    assert not bad_line.ok and "orderLines.0.unitPriceCents" in bad_line.error
+    # Agent failure: that item falls back to the first group; an unexpected error fails only that item
+    assert abstained.ok and abstained.request.commodityGroup.id == 31
+    assert sqlite_db.get(ProcurementRequest, abstained.request.id).commodityGroupSource == "fallback"
+    assert not crashed.ok and crashed.error == "Classification failed."
+
+    assert embedder.batches == [3]  # one embedding call for the valid items
+    assert len(store) == 2 and store.get_vector(ok.request.id) is not None
+    assert _counts(sqlite_db) == [7, 12, 7, 7]
+
+
+def test_bulk_insert_failure_creates_nothing(sqlite_db, pipeline, monkeypatch):
+    store, _ = pipeline
+    before = _counts(sqlite_db)
+    monkeypatch.setattr(spend_rollups, "apply", lambda *a, **k: (_ for _ in ()).throw(RuntimeError("disk full")))
+
+    with pytest.raises(HTTPException) as e:
+        procurement_service.create_requests_bulk(sqlite_db, [_item("a"), _item("b")], sqlite_db.get(User, 1))
+
+    assert e.value.status_code == 500
+    assert _counts(sqlite_db) == before and len(store) == 0
+
+
+def test_bulk_routes_cap_batch_size(monkeypatch):
+    monkeypatch.setattr(procurement.settings, "BULK_CREATE_MAX_ITEMS", 2)
+    body = ProcurementRequestBulkCreate(items=[_item(str(i)) for i in range(3)])
+
+    for call in (
+        lambda: procurement.create_procurement_requests_bulk(body, db=None, current_user=None),
+        lambda: asyncio.run(procurement_async.create_procurement_requests_bulk(body, db=None, current_user=None)),
+    ):
+        with pytest.raises(HTTPException) as e:
+            call()
+        assert e.value.status_code == 413
+
+
+def test_weaviate_add_many_is_one_batch_and_raises_on_errors(monkeypatch):
+    calls = []
+
+    class Data:
+        errors = {}
+
+        def insert_many(self, objects):
+            calls.append(objects)
+            return type("Res", (), {"has_errors": bool(self.errors), "errors": self.errors})
+
+    collection = type("Col", (), {"data": Data()})()
+    monkeypatch.setattr(operations, "memory_store", lambda: None)
+    monkeypatch.setattr(operations, "_collection", lambda: collection)
+    objects = [
+        {"request_id": f"r{i}", "commodity_group": "31", "embedded_request_context": "ctx", "vector": [1.0, 0.0]}
+        for i in range(3)
+    ]
+
+    assert operations.add_many([]) == 0 and calls == []
+    assert operations.add_many(objects) == 3
+    assert len(calls) == 1 and calls[0][0].vector == [1.0, 0.0]
+    assert calls[0][2].properties["requestId"] == "r2"
+
+    collection.data.errors = {1: "vector dimension mismatch"}
+    with pytest.raises(RuntimeError):
+        operations.add_many(objects)
@@ -0,0 +1,259 @@
+import threading
+import time
+
+import pytest
+
+from app.agents.base import AgentTimeout, Budget
+from app.agents.commodity_classifier import commodity_classifier as cc
+from app.agents.commodity_classifier.commodity_classifier import LLMCommodityClassifier
+from app.agents.commodity_classifier.contracts import CommodityClassifyIn, CommodityGroupRef
+from app.agents.commodity_classifier.group_index import CommodityGroupEmbeddingIndex
+from app.agents.commodity_classifier.internal_types import _FinalDecision, _LLMScoring, _ScoreItem
+
+
+class StubAI:
+    """Counts LLM calls; scoring picks group 29 (optionally close to 31), re-rank picks 31."""
+    def __init__(self, scores=((29, 0.7),)):
+        self.llm_calls = 0
+        self.prompts = []
+        self.timeouts = []
+        self.scores = scores
+
+    def embed(self, text, *, timeout=None):
+        return [0.1, 0.2, 0.3]
+
+    def embed_batch(self, texts, *, timeout=None):
+        # "Software" groups point the same way as the request embedding
+        return [[0.1, 0.2, 0.3] if "Software" in t else [0.3, -0.2, 0.0] for t in texts]
+
+    def complete_pydantic(self, messages, *, response_model, model=None, timeout=None):
+        self.llm_calls += 1
+        self.timeouts.append(timeout)
+        self.prompts.append(messages[-1]["content"])
+        if response_model is _FinalDecision:
+            return _FinalDecision(chosen_id=31, probability=0.8), {}
+        return _LLMScoring(scores=[_ScoreItem(id=i, score=sc) for i, sc in self.scores]), {}
+
+
+def _hits(*pairs, source="scoring"):
+    return [{"commodityGroup": str(gid), "distance": 1.0 - sim, "labelSource": source} for gid, sim in pairs]
+
+
+def _input():
+    return CommodityClassifyIn(
+        title="Adobe licences",
+        vendor_name="Adobe",
+        order_lines_text=["10 x Adobe All Apps license"],
+        available_commodity_groups=[
+            CommodityGroupRef(id=29, label="Hardware", category="Information Technology"),
+            CommodityGroupRef(id=31, label="Software", category="Information Technology"),
+        ],
+    )
+
+
+@pytest.fixture
+def search(monkeypatch):
+    hits = []
+    examples = [{"embeddedRequestContext": "TITLE: earlier request"}]
+    monkeypatch.setattr(
+        cc.wx,
+        "search_similar",
+        lambda **kwargs: hits if kwargs.get("commodity_group_id") is None else examples,
+    )
+    return hits
+
+
+def test_agreeing_neighbours_skip_llm(search):
+    search.extend(_hits((31, 0.97), (31, 0.95), (31, 0.94), (29, 0.80)))
+    ai = StubAI()
+
+    out = LLMCommodityClassifier(ai, knn_enabled=True).run(_input())
+
+    assert ai.llm_calls == 0
+    assert out.suggested_commodity_group_id == 31
+    assert out.decision_path == "knn"
+    assert 0.8 < out.confidence <= 0.95
+
+
+def test_only_manual_and_llm_labels_vote(search):
+    # Earlier knn / duplicate / heuristic labels and unlabelled objects would echo past guesses
+    search.extend(_hits((31, 0.99), source="knn") + _hits((31, 0.99), source="duplicate")
+                  + _hits((31, 0.98), source="heuristic") + _hits((31, 0.98), source=None)
+                  + _hits((31, 0.95), source="manual") + _hits((31, 0.94), source="rerank"))
+    ai = StubAI()
+
+    out = LLMCommodityClassifier(ai, knn_enabled=True, knn_top_k=6).run(_input())
+
+    # two voters left, three required
+    assert out.decision_path == "scoring" and ai.llm_calls == 1
+
+
+def test_split_vote_falls_through_to_scoring(search):
+    search.extend(_hits((31, 0.97), (31, 0.95), (29, 0.96), (29, 0.94)))
+    ai = StubAI()
+
+    out = LLMCommodityClassifier(ai, knn_enabled=True).run(_input())
+
+    assert ai.llm_calls == 1
+    assert out.suggested_commodity_group_id == 29
+    assert out.decision_path == "scoring"
+
+
+def test_vote_ignores_unknown_groups_and_far_neighbours(search):
+    search.extend(_hits((31, 0.97), (31, 0.60), (77, 0.99), (31, 0.95)))
+    ai = StubAI()
+
+    out = LLMCommodityClassifier(ai, knn_enabled=True, knn_min_votes=3).run(_input())
+
+    # only two close neighbours for 31 remain -> not enough votes
+    assert out.decision_path == "scoring"
+
+
+def test_pruned_mode_sends_only_closest_groups(search):
+    ai = StubAI()
+    inp = _input()
+    inp.available_commodity_groups = [
+        CommodityGroupRef(id=i, label="Software" if i in (29, 31) else f"Other {i}", category="Cat")
+        for i in range(1, 51)
+    ]
+    classifier = LLMCommodityClassifier(
+        ai,
+        group_index=CommodityGroupEmbeddingIndex(ai),
+        candidate_mode="pruned",
+        prune_top_k=2,
+    )
+
+    out = classifier.run(inp)
+
+    assert out.suggested_commodity_group_id == 29
+    assert "[29]" in ai.prompts[0] and "[31]" in ai.prompts[0]
+    assert "[1]" not in ai.prompts[0]
+
+
+def test_pruning_audit_runs_in_background_and_cold_index_uses_budget(search):
+    full_list_scored = threading.Event()
+
+    class AuditedAI(StubAI):
+        def __init__(self):
+            super().__init__(scores=((29, 0.95),))
+            self.batch_timeouts = []
+
+        def embed_batch(self, texts, *, timeout=None):
+            self.batch_timeouts.append(timeout)
+            return super().embed_batch(texts, timeout=timeout)
+
+        def complete_pydantic(self, messages, **kwargs):
+            if "[1]" in messages[-1]["content"]:  # the audit's full-list call
+                assert full_list_scored.wait(5)
+            return super().complete_pydantic(messages, **kwargs)
+
+    ai, inp = AuditedAI(), _input()
+    inp.available_commodity_groups = [
+        CommodityGroupRef(id=i, label="Software" if i in (29, 31) else f"Other {i}", category="Cat")
+        for i in range(1, 51)
+    ]
+    agreed = cc._PRUNE_AUDIT.value(agree="true")
+    classifier = LLMCommodityClassifier(
+        ai, group_index=CommodityGroupEmbeddingIndex(ai), candidate_mode="pruned", prune_top_k=2,
+        prune_audit_rate=1.0,
+    )
+
+    out = classifier.run(inp, budget=Budget(30))
+
+    # Answered while the audit's full-list call is still blocked
+    assert out.suggested_commodity_group_id == 29 and cc._PRUNE_AUDIT.value(agree="true") == agreed
+    assert len(ai.batch_timeouts) == 1 and 0 < ai.batch_timeouts[0] <= 30
+    full_list_scored.set()
+    deadline = time.monotonic() + 5
+    while cc._PRUNE_AUDIT.value(agree="true") == agreed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cc._PRUNE_AUDIT.value(agree="true") == agreed + 1
+
+
+def test_decisive_first_pass_skips_rerank(search):
+    ai = StubAI(scores=((29, 0.95), (31, 0.10)))
+
+    out = LLMCommodityClassifier(ai).run(_input())
+
+    assert ai.llm_calls == 1
+    assert out.suggested_commodity_group_id == 29
+    assert out.confidence == 0.95
+
+
+def test_close_first_pass_runs_rerank(search):
+    ai = StubAI(scores=((29, 0.55), (31, 0.50)))
+
+    out = LLMCommodityClassifier(ai).run(_input())
+
+    assert ai.llm_calls == 2
+    assert out.suggested_commodity_group_id == 31
+    assert out.decision_path == "rerank"
+
+
+def test_failed_rerank_falls_back_and_is_counted_as_failed(search):
+    class FailingRerankAI(StubAI):
+        def complete_pydantic(self, messages, *, response_model, model=None, timeout=None):
+            if response_model is _FinalDecision:
+                raise RuntimeError("provider down")
+            return super().complete_pydantic(messages, response_model=response_model, model=model, timeout=timeout)
+
+    reranked, failed = cc._RERANK.value(path="reranked"), cc._RERANK.value(path="failed")
+
+    out = LLMCommodityClassifier(FailingRerankAI(scores=((29, 0.55), (31, 0.50)))).run(_input())
+
+    assert out.suggested_commodity_group_id == 29 and out.decision_path == "scoring"
+    assert cc._RERANK.value(path="reranked") == reranked
+    assert cc._RERANK.value(path="failed") == failed + 1
+
+
+def test_stages_get_remaining_budget_as_timeout(search):
+    ai = StubAI(scores=((29, 0.55), (31, 0.50)))
+
+    LLMCommodityClassifier(ai).run(_input(), budget=Budget(30))
+
+    assert len(ai.timeouts) == 2
+    assert all(0 < t <= 30 for t in ai.timeouts)
+    assert ai.timeouts[1] <= ai.timeouts[0]
+
+
+def test_vector_searches_get_remaining_budget_as_timeout(monkeypatch):
+    timeouts = []
+
+    def search_similar(**kwargs):
+        timeouts.append(kwargs["timeout"])
+        return [{"embeddedRequestContext": "TITLE: earlier request"}]
+
+    monkeypatch.setattr(cc.wx, "search_similar", search_similar)
+    LLMCommodityClassifier(StubAI(scores=((29, 0.55), (31, 0.50))), knn_enabled=True).run(
+        _input(), budget=Budget(30)
+    )
+
+    assert len(timeouts) == 3  # neighbour vote + one retrieval per top candidate
+    assert all(0 < t <= 30 for t in timeouts)
+
+
+def test_hung_weaviate_query_does_not_outlast_the_budget(monkeypatch):
+    release = threading.Event()
+    query = type("Query", (), {"near_vector": lambda self, **kwargs: release.wait(5) and None})()
+    monkeypatch.setattr(cc.wx, "memory_store", lambda: None)
+    monkeypatch.setattr(cc.wx, "_collection", lambda: type("Col", (), {"query": query})())
+    ai = StubAI()
+
+    started = time.monotonic()
+    try:
+        with pytest.raises(AgentTimeout):
+            LLMCommodityClassifier(ai, knn_enabled=True).run(_input(), budget=Budget(0.3))
+    finally:
+        release.set()
+
+    assert time.monotonic() - started < 1.5
+    assert ai.llm_calls == 0
+
+
+def test_exhausted_budget_raises_before_llm_call(search):
+    ai = StubAI()
+
+    with pytest.raises(AgentTimeout):
+        LLMCommodityClassifier(ai).run(_input(), budget=Budget(0))
+
+    assert ai.llm_calls == 0
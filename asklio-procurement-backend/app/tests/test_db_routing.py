@@ -0,0 +1,75 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from app.core import security
+from app.core.security import create_access_token, create_events_token, get_current_user
+from app.db import routing
+from app.db.session import engine_options
+from app.models.commodity_group import CommodityGroup
+
+
+def _request(method: str, subject: str | None = None) -> Request:
+    headers = []
+    if subject is not None:
+        headers.append((b"authorization", f"Bearer {create_access_token(subject, 5)}".encode()))
+    return Request({"type": "http", "method": method, "headers": headers, "path": "/"})
+
+
+def test_reads_go_to_replica_until_the_user_writes(sqlite_db, monkeypatch):
+    monkeypatch.setattr(routing, "_recent_writes", {})
+    get = _request("GET", "2")
+    subject = routing.request_subject(get)
+    assert subject == "2"
+    assert routing.use_replica(get, subject, replica_configured=True)
+    assert not routing.use_replica(_request("POST", "2"), subject, replica_configured=True)
+    assert not routing.use_replica(get, subject, replica_configured=False)
+
+    # A read-only commit does not make the user sticky ...
+    sqlite_db.info[routing.SUBJECT_KEY] = subject
+    sqlite_db.get(CommodityGroup, 31)
+    sqlite_db.commit()
+    assert routing.use_replica(get, subject, replica_configured=True)
+
+    # ... a committed write (ORM-enabled bulk insert included) does
+    sqlite_db.execute(insert(CommodityGroup), [{"id": 40, "category": "IT", "name": "Cloud"}])
+    sqlite_db.commit()
+    assert not routing.use_replica(get, subject, replica_configured=True)
+    assert routing.use_replica(_request("GET", "1"), "1", replica_configured=True)
+
+
+
+def test_token_is_decoded_once_for_routing_and_auth(sqlite_db, monkeypatch):
+    decoded = []
+    decode = security.decode_token
+    monkeypatch.setattr(security, "decode_token", lambda token: decoded.append(token) or decode(token))
+
+    get = _request("GET", "2")
+    assert routing.request_subject(get) == "2"
+    assert get_current_user(get, None, sqlite_db).id == 2
+    assert len(decoded) == 1
+
+    # Invalid and events-only tokens route as anonymous and fail auth
+    bad = Request({"type": "http", "method": "GET", "path": "/", "headers": [
+        (b"authorization", f"Bearer {create_events_token(2)}".encode())]})
+    assert routing.request_subject(bad) is None
+    with pytest.raises(HTTPException) as e:
+        get_current_user(bad, None, sqlite_db)
+    assert e.value.status_code == 401
+
+
+def test_engine_options_apply_pool_settings(monkeypatch, tmp_path):
+    monkeypatch.setattr(routing.settings, "DB_POOL_SIZE", 3)
+    monkeypatch.setattr(routing.settings, "DB_STATEMENT_TIMEOUT_MS", 1500)
+    pg = engine_options("postgresql+psycopg://u:p@db/asklio")
+    assert pg["pool_size"] == 3 and pg["connect_args"] == {"options": "-c statement_timeout=1500"}
+    assert "pool_size" not in engine_options("sqlite://")
+
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    engine = create_engine(url, **engine_options(url))
+    with Session(engine) as db:
+        db.connection()
+        assert engine.pool.size() == 3 and engine.pool.checkedout() == 1
+    engine.dispose()
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.enums import ClassificationStatus
+from app.models.procurement_request import ProcurementRequest
+from app.models.user import User
+from app.schemas.procurement import OrderLineIn, ProcurementRequestCreate, ProcurementRequestUpdateIn
+from app.services import classification_worker, events, procurement_common, procurement_service, spend_rollups
+
+
+class _Classifier:
+    """Picks Software (31); `during_run` runs inside the classifier call, i.e. while the worker is mid-flight."""
+    def __init__(self):
+        self.calls = 0
+        self.during_run = None
+
+    def run(self, _input):
+        self.calls += 1
+        if self.during_run:
+            self.during_run()
+        return type("Res", (), {"suggested_commodity_group_id": 31, "confidence": 0.9, "decision_path": "scoring"})
+
+
+@pytest.fixture
+def deferred(monkeypatch, mute_weaviate):
+    classifier, enqueued = _Classifier(), []
+    monkeypatch.setattr(procurement_service.settings, "CLASSIFICATION_MODE", "deferred")
+    monkeypatch.setattr(
+        procurement_common, "get_agent_registry", lambda: type("Reg", (), {"commodity_classifier": classifier})
+    )
+    monkeypatch.setattr(classification_worker, "enqueue", enqueued.append)
+    return classifier, enqueued
+
+
+def _furniture() -> ProcurementRequestCreate:
+    return ProcurementRequestCreate(
+        title="Office furniture", vendorName="Office AG", vatID="DE123456789",
+        orderLines=[OrderLineIn(description="Furniture: desk chair", unitPriceCents=7_000, quantity=1, unit="pcs")],
+    )
+
+
+def _stats(db):
+    return procurement_service.get_spend_stats(db, db.get(User, 1))
+
+
+def test_deferred_create_stores_heuristic_group_and_worker_finalizes(sqlite_db, deferred, monkeypatch):
+    classifier, enqueued = deferred
+    created = procurement_service.create_request(sqlite_db, _furniture(), sqlite_db.get(User, 2))
+
+    # Provisional group from label overlap, no classifier call before the response
+    row = sqlite_db.get(ProcurementRequest, created.id)
+    assert created.commodityGroup.id == 33 and row.commodityGroupSource == "heuristic"
+    assert row.classificationStatus == ClassificationStatus.PENDING
+    assert classifier.calls == 0 and enqueued == [created.id]
+
+    # Startup picks up what a restart left pending; the worker uses its own session
+    monkeypatch.setattr(classification_worker, "SessionLocal", sessionmaker(bind=sqlite_db.get_bind()))
+    enqueued.clear()
+    assert classification_worker.resume_pending() == 1 and enqueued == [created.id]
+
+    async def finalize_and_listen():
+        stream = events.stream()
+        assert await stream.__anext__() == ": connected\n\n"
+        await asyncio.get_running_loop().run_in_executor(None, classification_worker._run, created.id)
+        message = await asyncio.wait_for(stream.__anext__(), timeout=5)
+        await stream.aclose()
+        return message
+
+    message = asyncio.run(finalize_and_listen())
+    event_line, data_line = message.strip().split("\n")
+    assert event_line == "event: classification"
+    payload = json.loads(data_line.removeprefix("data: "))
+    assert payload["id"] == created.id and payload["commodityGroup"]["id"] == 31
+
+    sqlite_db.expire_all()
+    row = sqlite_db.get(ProcurementRequest, created.id)
+    assert (row.commodityGroupID, row.commodityGroupSource) == (31, "scoring")
+    assert row.classificationStatus == ClassificationStatus.COMPLETED and row.version == 1
+    assert classification_worker.resume_pending() == 0
+    assert not procurement_service.complete_pending_classification(sqlite_db, created.id)  # already done
+
+    incremental = _stats(sqlite_db)
+    spend_rollups.rebuild(sqlite_db)
+    assert _stats(sqlite_db) == incremental
+
+
+def test_manual_reclassification_wins_over_worker(sqlite_db, deferred):
+    classifier, _ = deferred
+    manager = sqlite_db.get(User, 1)
+    created = procurement_service.create_request(sqlite_db, _furniture(), sqlite_db.get(User, 2))
+
+    # The manager picks Hardware while the worker is still waiting for the classifier
+    classifier.during_run = lambda: procurement_service.update_request(
+        sqlite_db, created.id, ProcurementRequestUpdateIn(commodityGroupID=32, version=1), manager
+    )
+    assert procurement_service.complete_pending_classification(sqlite_db, created.id) is False
+
+    sqlite_db.expire_all()
+    row = sqlite_db.get(ProcurementRequest, created.id)
+    assert row.commodityGroupID == 32 and row.classificationStatus == ClassificationStatus.COMPLETED
+    assert row.version == 2
+
+    incremental = _stats(sqlite_db)
+    spend_rollups.rebuild(sqlite_db)
+    assert _stats(sqlite_db) == incremental
+
+
+def test_worker_cannot_commit_between_manager_read_and_commit(sqlite_file_url, deferred, monkeypatch):
+    engine = create_engine(sqlite_file_url, connect_args={"check_same_thread": False})
+    manager_db, worker_db = sessionmaker(bind=engine)(), sessionmaker(bind=engine)()
+    created = procurement_service.create_request(manager_db, _furniture(), manager_db.get(User, 2))
+
+    # Once the manager has read the row, the worker tries to finalize it (Software)
+    outcome, worker_done = [], threading.Event()
+
+    def finalize():
+        outcome.append(procurement_service.complete_pending_classification(worker_db, created.id))
+        worker_done.set()
+
+    worker = threading.Thread(target=finalize)
+    apply_update, raced = procurement_common.apply_update, []
+
+    def apply_update_while_worker_runs(*args, **kwargs):
+        worker.start()
+        raced.append(worker_done.wait(timeout=1))
+        return apply_update(*args, **kwargs)
+
+    monkeypatch.setattr(procurement_common, "apply_update", apply_update_while_worker_runs)
+    try:
+        procurement_service.update_request(
+            manager_db, created.id, ProcurementRequestUpdateIn(commodityGroupID=32, version=1), manager_db.get(User, 1)
+        )
+        worker.join(timeout=10)
+
+        # The worker waited for the manager's commit, then found the row no longer pending
+        assert raced == [False] and outcome == [False]
+        manager_db.expire_all()
+        row = manager_db.get(ProcurementRequest, created.id)
+        assert (row.commodityGroupID, row.classificationStatus, row.version) == (32, ClassificationStatus.COMPLETED, 2)
+
+        incremental = _stats(manager_db)
+        spend_rollups.rebuild(manager_db)
+        assert _stats(manager_db) == incremental
+    finally:
+        manager_db.close()
+        worker_db.close()
+        engine.dispose()
@@ -0,0 +1,136 @@
+import threading
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.ai.embedding_cache import EmbeddingCache
+from app.models.request_fingerprint import RequestFingerprint
+from app.models.user import User
+from app.schemas.procurement import OrderLineIn, ProcurementRequestCreate
+from app.services import duplicates, procurement_common, procurement_service, spend_rollups
+from app.weaviate.memory_store import InMemoryVectorStore
+
+
+class _CountingClassifier:
+    calls = 0
+
+    def run(self, _input):
+        self.calls += 1
+        return type("Res", (), {"suggested_commodity_group_id": 32, "confidence": 0.9})
+
+
+class _Embedder:
+    def embed(self, text, *, timeout=None):
+        return [float(text.lower().count(word)) for word in ("laptop", "dock", "chair", "monitor")] + [1.0]
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    classifier, store = _CountingClassifier(), InMemoryVectorStore()
+    monkeypatch.setattr(
+        procurement_common, "get_agent_registry", lambda: type("Reg", (), {"commodity_classifier": classifier})
+    )
+    monkeypatch.setattr(procurement_common, "get_ai_client", lambda: _Embedder())
+    monkeypatch.setattr(procurement_common, "get_embedding_cache", lambda cache=EmbeddingCache(16): cache)
+    monkeypatch.setattr(procurement_common, "wx", store)
+    return classifier, store
+
+
+def _quote(title="Laptops", vendor="Office AG", vat="DE123456789", lines=(("Laptop", 120_000), ("Dock", 20_000))):
+    return ProcurementRequestCreate(
+        title=title, vendorName=vendor, vatID=vat,
+        orderLines=[OrderLineIn(description=d, unitPriceCents=c, quantity=1, unit="pcs") for d, c in lines],
+    )
+
+
+def test_resubmitted_quote_is_rejected_before_classification(sqlite_db, pipeline, monkeypatch):
+    classifier, _ = pipeline
+    requester = sqlite_db.get(User, 2)
+    monkeypatch.setattr(procurement_service.settings, "DUPLICATE_CHECK_MODE", "reject")
+    first = procurement_service.create_request(sqlite_db, _quote(), requester)
+    assert classifier.calls == 1
+
+    # New title, vendor / VAT spelled differently, lines reordered: same quote
+    again = _quote(title="Laptops (2nd try)", vendor="OFFICE A.G.", vat="de 123 456 789",
+                   lines=(("dock", 20_000), ("LAPTOP", 120_000)))
+    with pytest.raises(HTTPException) as e:
+        procurement_service.create_request(sqlite_db, again, requester)
+    assert e.value.status_code == 409
+    assert e.value.detail["match"] == "fingerprint" and e.value.detail["duplicateOf"]["id"] == first.id
+    assert classifier.calls == 1
+
+    # Different price, explicit override, or outside the window: created normally
+    procurement_service.create_request(sqlite_db, _quote(lines=(("Laptop", 110_000), ("Dock", 20_000))), requester)
+    procurement_service.create_request(sqlite_db, again, requester, allow_duplicate=True)
+    monkeypatch.setattr(procurement_service.settings, "DUPLICATE_WINDOW_DAYS", 0)
+    procurement_service.create_request(sqlite_db, again, requester)
+    assert classifier.calls == 4
+
+    incremental = dict(sqlite_db.execute(select(RequestFingerprint.requestID, RequestFingerprint.fingerprint)).all())
+    duplicates.rebuild(sqlite_db)
+    assert dict(sqlite_db.execute(select(RequestFingerprint.requestID, RequestFingerprint.fingerprint)).all()) == incremental
+
+
+def test_reuse_mode_and_vector_match(sqlite_db, pipeline, monkeypatch):
+    classifier, store = pipeline
+    requester = sqlite_db.get(User, 2)
+    monkeypatch.setattr(procurement_service.settings, "DUPLICATE_CHECK_MODE", "reuse")
+    first = procurement_service.create_request(sqlite_db, _quote(), requester)
+
+    reused = procurement_service.create_request(sqlite_db, _quote(title="Same quote"), requester)
+    assert reused.id != first.id and reused.commodityGroup.id == 32 and classifier.calls == 1
+    assert sqlite_db.get(procurement_service.ProcurementRequest, reused.id).commodityGroupSource == "duplicate"
+    # Not indexed again: a copy of the first request's vector would be a second neighbour
+    assert store.get_vector(reused.id) is None and len(store) == 1
+
+    # Same items, new price: only the vector check catches it, and only for the same VAT id
+    monkeypatch.setattr(procurement_service.settings, "DUPLICATE_VECTOR_MIN_SIMILARITY", 0.99)
+    repriced = (("Laptop", 99_000), ("Dock", 20_000))
+    procurement_service.create_request(sqlite_db, _quote(lines=repriced), requester)
+    assert classifier.calls == 1
+    procurement_service.create_request(sqlite_db, _quote(vat="DE999999999", lines=repriced), requester)
+    assert classifier.calls == 2
+
+
+def test_identical_submissions_at_the_same_moment_create_one_request(sqlite_file_url, pipeline, monkeypatch):
+    monkeypatch.setattr(procurement_service.settings, "DUPLICATE_CHECK_MODE", "reject")
+    engine = create_engine(sqlite_file_url, connect_args={"check_same_thread": False})
+    first_db, second_db = sessionmaker(bind=engine)(), sessionmaker(bind=engine)()
+
+    # The second click arrives while the first is being inserted; both passed the first check
+    outcome, second_done = [], threading.Event()
+
+    def second_click():
+        try:
+            outcome.append(procurement_service.create_request(second_db, _quote(), second_db.get(User, 2)))
+        except HTTPException as e:
+            outcome.append(e)
+        second_done.set()
+
+    second = threading.Thread(target=second_click)
+    apply, raced = spend_rollups.apply, []
+
+    def apply_while_second_click_runs(db, deltas):
+        if db is first_db:
+            second.start()
+            raced.append(second_done.wait(timeout=1))
+        return apply(db, deltas)
+
+    monkeypatch.setattr(spend_rollups, "apply", apply_while_second_click_runs)
+    try:
+        first = procurement_service.create_request(first_db, _quote(), first_db.get(User, 2))
+        second.join(timeout=10)
+
+        assert raced == [False]  # waited for the first insert to commit
+        assert isinstance(outcome[0], HTTPException) and outcome[0].status_code == 409
+        assert outcome[0].detail["duplicateOf"]["id"] == first.id
+        rows = first_db.scalars(select(RequestFingerprint.requestID).where(
+            RequestFingerprint.fingerprint == first_db.get(RequestFingerprint, first.id).fingerprint
+        )).all()
+        assert rows == [first.id]
+    finally:
+        first_db.close()
+        second_db.close()
+        engine.dispose()
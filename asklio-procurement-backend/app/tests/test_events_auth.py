@@ -0,0 +1,74 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.security import create_access_token
+from app.db.session import get_db
+from app.routers import procurement
+
+
+def _app(sqlite_db, monkeypatch) -> FastAPI:
+    monkeypatch.setattr(procurement.settings, "SHARED_CLIENT_API_KEY", None)
+    app = FastAPI()
+    app.include_router(procurement.events_router)
+    app.include_router(procurement.router)
+    app.dependency_overrides[get_db] = lambda: sqlite_db
+    return app
+
+
+def _open_stream(app: FastAPI, query: str):
+    """
+    GET /procurement/events the way EventSource does (no Authorization header);
+    returns the status, headers and first body chunk, then disconnects.
+    TestClient buffers whole bodies, so the endless stream is driven over ASGI.
+    """
+    async def run():
+        started, chunks, first = {}, [], asyncio.Event()
+
+        async def receive():
+            await first.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                started.update(message)
+            elif message.get("body") or not message.get("more_body", False):
+                chunks.append(message.get("body", b""))
+                first.set()
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": "/procurement/events", "raw_path": b"/procurement/events",
+            "query_string": query.encode(), "headers": [], "client": ("test", 1), "server": ("test", 80),
+        }
+        await asyncio.wait_for(app(scope, receive, send), timeout=5)
+        return started["status"], dict(started["headers"]), chunks[0]
+
+    return asyncio.run(run())
+
+
+def test_event_stream_opens_with_query_token(sqlite_db, monkeypatch):
+    app = _app(sqlite_db, monkeypatch)
+    client = TestClient(app)
+    bearer = {"Authorization": f"Bearer {create_access_token('1', 5)}"}
+
+    issued = client.post("/procurement/events/token", headers=bearer)
+    assert issued.status_code == 200
+    token = issued.json()["access_token"]
+
+    status, headers, first = _open_stream(app, f"token={token}")
+    assert status == 200 and headers[b"content-type"].startswith(b"text/event-stream")
+    assert first == b": connected\n\n"
+
+    # The stream token is not an API token
+    assert client.get("/procurement", headers={"Authorization": f"Bearer {token}"}).status_code == 401
+
+
+def test_event_stream_rejects_bad_and_access_tokens(sqlite_db, monkeypatch):
+    app = _app(sqlite_db, monkeypatch)
+
+    assert _open_stream(app, "")[0] == 422
+    assert _open_stream(app, "token=junk")[0] == 401
+    assert _open_stream(app, f"token={create_access_token('1', 5)}")[0] == 401
+    assert TestClient(app).post("/procurement/events/token").status_code == 403
@@ -0,0 +1,54 @@
+import asyncio
+import csv
+import io
+import json
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.enums import RequestStatus
+from app.models.procurement_request import ProcurementRequest
+from app.services import export
+
+
+def _export(db, fmt, status_filter=None):
+    factory = sessionmaker(bind=db.get_bind())
+    return b"".join(export.stream_export(factory, fmt, status_filter))
+
+
+def test_export_csv_and_ndjson_across_batches(sqlite_db, monkeypatch):
+    # 3 rows per batch: the lines of a request are split across batches
+    monkeypatch.setattr(export.settings, "EXPORT_BATCH_ROWS", 3)
+    sqlite_db.get(ProcurementRequest, "req-2").title = "=HYPERLINK(\"http://x\")"
+    sqlite_db.commit()
+
+    body = _export(sqlite_db, "csv").decode("utf-8")
+    assert body.startswith("\ufeff")
+    rows = list(csv.DictReader(io.StringIO(body.lstrip("\ufeff"))))
+    assert len(rows) == 10 and list(rows[0]) == list(export.CSV_HEADER)
+    assert [r["id"] for r in rows[::2]] == [f"req-{i}" for i in (4, 3, 2, 1, 0)]
+    assert rows[4]["title"].startswith("'=") and rows[0]["commodityGroupName"] == "Hardware"
+    assert {r["orderLineId"] for r in rows[:2]} == {"ol-4-a", "ol-4-b"}
+
+    objects = [json.loads(line) for line in _export(sqlite_db, "ndjson").splitlines()]
+    assert [o["id"] for o in objects] == [f"req-{i}" for i in (4, 3, 2, 1, 0)]
+    assert all(len(o["orderLines"]) == 2 for o in objects)
+    assert objects[2]["title"].startswith("=")  # only CSV cells are escaped
+    assert objects[0]["requestorName"] == "Mara Manager" and objects[0]["orderLines"][0]["unitPriceCents"] == 500
+
+    assert _export(sqlite_db, "ndjson", RequestStatus.CLOSED) == b""
+    assert _export(sqlite_db, "csv", RequestStatus.CLOSED).count(b"\r\n") == 1  # header only
+
+
+def test_async_export_matches_sync(sqlite_file_url, sqlite_db, monkeypatch):
+    monkeypatch.setattr(export.settings, "EXPORT_BATCH_ROWS", 4)
+
+    async def collect(fmt):
+        engine = create_async_engine(sqlite_file_url.replace("sqlite://", "sqlite+aiosqlite://"))
+        try:
+            return b"".join([c async for c in export.stream_export_async(async_sessionmaker(engine), fmt)])
+        finally:
+            await engine.dispose()
+
+    for fmt in ("csv", "ndjson"):
+        assert asyncio.run(collect(fmt)) == _export(sqlite_db, fmt)
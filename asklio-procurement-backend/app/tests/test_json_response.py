@@ -0,0 +1,32 @@
+import asyncio
+import json
+from typing import List
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.core import json_response as jr
+from app.schemas.procurement import ProcurementRequestLiteOut, ProcurementRequestOut
+from app.services import procurement_service as svc
+
+
+def _fastapi_json(content, response_type):
+    field = create_model_field(name="Response_test", type_=response_type, mode="serialization")
+    return asyncio.run(serialize_response(field=field, response_content=content, is_coroutine=True))
+
+
+def test_preencoded_body_matches_fastapi_serialization(sqlite_db):
+    lite = svc.list_requests(sqlite_db, None)
+    detail = svc.get_request_details(sqlite_db, "req-1", user=None)
+
+    response = jr.json_response(lite, List[ProcurementRequestLiteOut])
+    assert isinstance(response, jr.PreEncodedJSONResponse)
+    assert response.headers["content-type"] == "application/json"
+    assert json.loads(response.body) == _fastapi_json(lite, List[ProcurementRequestLiteOut])
+    assert json.loads(jr.encode(detail, ProcurementRequestOut)) == _fastapi_json(detail, ProcurementRequestOut)
+
+
+def test_fastapi_mode_returns_the_dtos(monkeypatch, sqlite_db):
+    monkeypatch.setattr(jr.settings, "RESPONSE_SERIALIZATION", "fastapi")
+    lite = svc.list_requests(sqlite_db, None)
+    assert jr.json_response(lite, List[ProcurementRequestLiteOut]) is lite
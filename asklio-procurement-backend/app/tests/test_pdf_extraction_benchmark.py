@@ -0,0 +1,34 @@
+from app.agents.pdf_extractor.text_extraction import extract_text_from_pdf
+from app.benchmarks.pdf_corpus import generate
+from app.benchmarks.pdf_extraction import amounts_in, recommend, score
+
+
+def test_amounts_in_reads_both_number_formats():
+    assert amounts_in("Total 1.234,56 EUR, net EUR 1,037.44 and 0,99") == [123456, 103744, 99]
+
+
+def test_corpus_ground_truth_matches_local_extraction():
+    docs = {d.kind: d for d in generate(per_kind=1, seed=3)}
+
+    digital = extract_text_from_pdf(docs["digital"].data)
+    assert digital.success and digital.method == "pypdfium2"
+    vat_found, hits = score(docs["digital"], digital.text)
+    assert vat_found and hits == len(docs["digital"].amounts_cents)
+
+    # No text layer: must fall through to the LLM path
+    assert not extract_text_from_pdf(docs["scanned_like"].data).success
+
+
+def test_recommendation_keeps_a_separating_threshold():
+    def engine(name, text_chars, scanned_chars, seconds):
+        docs = [{"kind": "digital", "pages": 1, "seconds": seconds, "chars": text_chars, "vat_found": True,
+                 "amount_hits": 1, "amounts": 1, "error": None},
+                {"kind": "scanned_like", "pages": 1, "seconds": seconds, "chars": scanned_chars, "vat_found": False,
+                 "amount_hits": 0, "amounts": 1, "error": None}]
+        return {"engine": name, "docs": docs}
+
+    engines = [engine("slow", 500, 0, 0.1), engine("fast", 520, 10, 0.01)]
+    assert recommend(engines, current_threshold=200) == {
+        "engine_order": ["fast", "slow"], "min_useful_chars": 200, "text_chars_min": 500, "scanned_chars_max": 10,
+    }
+    assert recommend(engines, current_threshold=600)["min_useful_chars"] == 250
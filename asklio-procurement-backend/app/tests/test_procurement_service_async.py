@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.models.enums import RequestStatus
+from app.models.user import User
+from app.models.user_role import UserRole
+from app.schemas.procurement import OrderLineIn, ProcurementRequestCreate, ProcurementRequestUpdateIn
+from app.services import procurement_common, procurement_service, procurement_service_async
+
+
+def _run(url, scenario):
+    async def main():
+        engine = create_async_engine(
+            url.replace("sqlite://", "sqlite+aiosqlite://", 1), poolclass=AsyncAdaptedQueuePool
+        )
+        try:
+            async with async_sessionmaker(engine, autoflush=False, expire_on_commit=False)() as db:
+                user = await db.scalar(
+                    select(User).options(selectinload(User.roles).selectinload(UserRole.role)).where(User.id == 1)
+                )
+                await db.commit()
+                return await scenario(engine, db, user)
+        finally:
+            await engine.dispose()
+            procurement_service_async.shutdown()
+    return asyncio.run(main())
+
+
+def test_async_reads_match_sync_service(sqlite_file_url, sqlite_db):
+    async def scenario(engine, db, user):
+        return (
+            await procurement_service_async.list_requests(db, None),
+            await procurement_service_async.list_my_requests(db, user, RequestStatus.OPEN, limit=10),
+            await procurement_service_async.get_request_details(db, "req-1", user),
+        )
+
+    listed, mine, detail = _run(sqlite_file_url, scenario)
+    manager = sqlite_db.get(User, 1)
+    assert listed == procurement_service.list_requests(sqlite_db, None)
+    assert mine == procurement_service.list_my_requests(sqlite_db, manager, RequestStatus.OPEN, limit=10)
+    assert detail == procurement_service.get_request_details(sqlite_db, "req-1", manager)
+
+
+def test_async_create_holds_no_connection_while_classifying(sqlite_file_url, monkeypatch, mute_weaviate):
+    checked_out = []
+
+    class Classifier:
+        def __init__(self, engine):
+            self.engine = engine
+
+        def run(self, _input):
+            checked_out.append(self.engine.sync_engine.pool.checkedout())
+            return type("Res", (), {"suggested_commodity_group_id": 33, "confidence": 0.9})
+
+    async def scenario(engine, db, user):
+        registry = type("Registry", (), {"commodity_classifier": Classifier(engine)})
+        monkeypatch.setattr(procurement_common, "get_agent_registry", lambda: registry)
+        body = ProcurementRequestCreate(
+            title="Chairs",
+            vendorName="Office AG",
+            vatID="DE123456789",
+            orderLines=[OrderLineIn(description="Chair", unitPriceCents=5000, quantity=4, unit="pcs")],
+        )
+        created = await procurement_service_async.create_request(db, body, user)
+        updated = await procurement_service_async.update_request(
+            db, created.id, ProcurementRequestUpdateIn(status=RequestStatus.CLOSED, commodityGroupID=32, version=1), user
+        )
+        stats = await procurement_service_async.get_spend_stats(db, user)
+        return created, updated, stats, engine.sync_engine.pool.checkedout()
+
+    created, updated, stats, left_open = _run(sqlite_file_url, scenario)
+    assert checked_out == [0]
+    assert created.commodityGroup.id == 33 and created.totalCostsCent == 20000
+    assert updated.commodityGroup.id == 32 and updated.status == RequestStatus.CLOSED
+    assert stats.requestCount == 6 and {b.key: b.requestCount for b in stats.byStatus} == {"Open": 5, "Closed": 1}
+    assert left_open == 0
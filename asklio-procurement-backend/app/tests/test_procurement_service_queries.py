@@ -0,0 +1,75 @@
+from app.db.query_counter import track_queries
+from app.models.enums import RequestStatus
+from app.models.procurement_request import ProcurementRequest
+from app.models.user import User
+from app.schemas.procurement import OrderLineIn, ProcurementRequestCreate, ProcurementRequestUpdateIn
+from app.services import procurement_service
+
+
+def test_list_requests_is_one_query(sqlite_db, assert_max_queries):
+    with assert_max_queries(1):
+        out = procurement_service.list_requests(sqlite_db, None)
+    assert len(out) == 5
+    assert {o.requestorDepartment for o in out} == {"IT"}
+
+
+def test_list_my_requests_is_one_query(sqlite_db, assert_max_queries):
+    user = sqlite_db.get(User, 2)
+    with assert_max_queries(1):
+        out = procurement_service.list_my_requests(sqlite_db, user, RequestStatus.OPEN, limit=10)
+    assert len(out) == 2
+
+
+def test_list_projection_matches_orm_mapping(sqlite_db, monkeypatch):
+    user = sqlite_db.get(User, 2)
+
+    def both():
+        return (procurement_service.list_requests(sqlite_db, None),
+                procurement_service.list_my_requests(sqlite_db, user, None, limit=10))
+
+    monkeypatch.setattr(procurement_service.settings, "LIST_QUERY_MODE", "projection")
+    projected = both()
+    monkeypatch.setattr(procurement_service.settings, "LIST_QUERY_MODE", "orm")
+    assert projected == both()
+
+
+def test_get_request_details_query_budget(sqlite_db, assert_max_queries):
+    with assert_max_queries(2):  # request + order lines, audit trail
+        out = procurement_service.get_request_details(sqlite_db, "req-1", None)
+    assert len(out.orderLines) == 2
+
+
+def test_update_request_query_budget(sqlite_db, assert_max_queries, mute_weaviate):
+    manager = sqlite_db.get(User, 1)
+    body = ProcurementRequestUpdateIn(status=RequestStatus.IN_PROGRESS, commodityGroupID=33, version=1)
+    # roles + role (manager check), write lock (SQLite), request, CG exists, update, audit insert,
+    # rollup upsert, refresh
+    with assert_max_queries(9):
+        out = procurement_service.update_request(sqlite_db, "req-1", body, manager)
+    assert out.commodityGroup.id == 33
+
+
+def test_create_request_reloads_with_joins(sqlite_db, assert_max_queries, fake_classifier, mute_weaviate):
+    user = sqlite_db.get(User, 2)
+    body = ProcurementRequestCreate(
+        title="Chairs",
+        vendorName="Office AG",
+        vatID="DE123456789",
+        orderLines=[OrderLineIn(description="Chair", unitPriceCents=5000, quantity=4, unit="pcs")],
+    )
+    # duplicate lookup, commodity groups, 4 inserts, rollup upsert, reload
+    # (no lazy loads for group / requestor / department)
+    with assert_max_queries(8):
+        out = procurement_service.create_request(sqlite_db, body, user)
+    assert out.requestorDepartment == "IT"
+
+
+def test_lazy_loop_is_reported_as_repeated(sqlite_db):
+    with track_queries() as stats:
+        rows = sqlite_db.query(ProcurementRequest).all()
+        [r.commodity_group.name for r in rows]
+        sqlite_db.expunge_all()
+        [len(r.order_lines) for r in sqlite_db.query(ProcurementRequest).all()]
+    repeated = stats.repeated(5)
+    assert len(repeated) == 1 and repeated[0][1] == 5
+    assert "order_line" in repeated[0][0]
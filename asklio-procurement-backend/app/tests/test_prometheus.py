@@ -0,0 +1,44 @@
+import json
+import os
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import metrics, prometheus
+from app.core.http_metrics import HTTPMetricsMiddleware
+
+
+def test_route_latency_is_labelled_by_template():
+    app = FastAPI()
+    app.add_middleware(HTTPMetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    def item(item_id: int):
+        return {"id": item_id}
+
+    client = TestClient(app)
+    client.get("/items/1")
+    client.get("/items/2")
+
+    text = prometheus.render()
+    assert 'http_requests_total{method="GET",route="/items/{item_id}",status="200"} 2' in text
+    assert 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}"} 2' in text
+    assert "# TYPE http_request_duration_seconds histogram" in text
+
+
+def test_multiprocess_sums_counters_and_drops_dead_gauges(tmp_path):
+    c = metrics.counter("test_multiproc_total", "test")
+    g = metrics.gauge("test_multiproc_gauge", "test")
+    c.inc(2, kind="a")
+    g.set(7)
+    prometheus.write_snapshot(str(tmp_path))
+
+    # A snapshot left behind by an exited worker
+    other = json.loads((tmp_path / f"metrics-{os.getpid()}.json").read_text())
+    other["pid"] = 2**22 + 12345
+    (tmp_path / "metrics-other.json").write_text(json.dumps(other))
+
+    text = prometheus.render(str(tmp_path))
+    assert 'test_multiproc_total{kind="a"} 4' in text
+    assert f'test_multiproc_gauge{{pid="{os.getpid()}"}} 7' in text
+    assert f'pid="{2**22 + 12345}"' not in text
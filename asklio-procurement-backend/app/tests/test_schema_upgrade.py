@@ -0,0 +1,23 @@
+from sqlalchemy import inspect, select
+
+from app.db.schema_upgrade import add_missing_columns
+from app.models.enums import ClassificationStatus
+from app.models.procurement_request import ProcurementRequest
+
+
+def test_missing_columns_are_added_to_an_existing_table(sqlite_db):
+    engine = sqlite_db.get_bind()
+    with engine.begin() as conn:  # schema as deployed before these columns existed
+        conn.exec_driver_sql('ALTER TABLE procurement_request DROP COLUMN "commodityGroupSource"')
+        conn.exec_driver_sql('ALTER TABLE procurement_request DROP COLUMN "classificationStatus"')
+
+    assert sorted(add_missing_columns(engine)) == [
+        "procurement_request.classificationStatus", "procurement_request.commodityGroupSource",
+    ]
+    assert add_missing_columns(engine) == []  # idempotent
+
+    rows = sqlite_db.execute(
+        select(ProcurementRequest.classificationStatus, ProcurementRequest.commodityGroupSource)
+    ).all()
+    assert len(rows) == 5 and set(rows) == {(ClassificationStatus.COMPLETED, None)}
+    assert "classificationStatus" in {c["name"] for c in inspect(engine).get_columns("procurement_request")}
@@ -0,0 +1,95 @@
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app.models.enums import RequestStatus
+from app.models.procurement_request import ProcurementRequest
+from app.models.user import User
+from app.schemas.procurement import OrderLineIn, ProcurementRequestCreate, ProcurementRequestUpdateIn
+from app.services import procurement_service, search_index
+
+
+def _search(db, q, status_filter=None, limit=20, offset=0):
+    return procurement_service.search_requests(db, q, status_filter, limit, offset)
+
+
+def test_search_matches_prefixes_pages_and_filters(sqlite_db):
+    page = _search(sqlite_db, "item acm", limit=3)
+    assert len(page.items) == 3 and page.hasMore
+    rest = _search(sqlite_db, "item acm", limit=3, offset=3)
+    assert len(rest.items) == 2 and not rest.hasMore
+    assert {i.id for i in page.items + rest.items} == {f"req-{i}" for i in range(5)}
+
+    assert [i.id for i in _search(sqlite_db, "request 3").items][0] == "req-3"
+    assert _search(sqlite_db, "DE1234").items  # VAT id prefix
+    assert _search(sqlite_db, "item", status_filter=RequestStatus.CLOSED).items == []
+    # Operators and quotes are plain text, not FTS5 syntax
+    assert _search(sqlite_db, 'item" OR * NEAR(').items == []
+    assert _search(sqlite_db, "%%").items == []
+
+    # Only the newest `window` matches are ranked
+    newest = sqlite_db.execute(search_index.ranked_ids("sqlite", "item", limit=10, window=2)).all()
+    assert {row.request_id for row in newest} == {"req-3", "req-4"}
+
+
+def test_created_requests_are_searchable(sqlite_db, fake_classifier, mute_weaviate):
+    manager, requester = sqlite_db.get(User, 1), sqlite_db.get(User, 2)
+    body = ProcurementRequestCreate(
+        title="Ergonomic chairs", vendorName="Bürobedarf KG", vatID="DE987654321",
+        orderLines=[OrderLineIn(description="Standing desk", unitPriceCents=50_000, quantity=2, unit="pcs")],
+    )
+    created = procurement_service.create_request(sqlite_db, body, requester)
+    procurement_service.create_requests_bulk(
+        sqlite_db, [body.model_copy(update={"title": "Bulk chairs"}).model_dump()], manager
+    )
+
+    assert [i.id for i in _search(sqlite_db, "standing desk").items][-1] == created.id
+    assert {i.title for i in _search(sqlite_db, "burobedarf").items} == {"Ergonomic chairs", "Bulk chairs"}
+
+    procurement_service.update_request(
+        sqlite_db, created.id, ProcurementRequestUpdateIn(status=RequestStatus.CLOSED, version=1), manager
+    )
+    assert [i.id for i in _search(sqlite_db, "chairs", status_filter=RequestStatus.CLOSED).items] == [created.id]
+
+
+def _assert_status_filter_before_window(db, monkeypatch):
+    # Only the oldest match is closed; the window holds just the two newest matches
+    db.get(ProcurementRequest, "req-0").status = RequestStatus.CLOSED
+    db.commit()
+    monkeypatch.setattr(search_index.settings, "SEARCH_RANK_WINDOW", 2)
+    closed = _search(db, "item", status_filter=RequestStatus.CLOSED)
+    assert [i.id for i in closed.items] == ["req-0"] and not closed.hasMore
+    assert len(_search(db, "item").items) == 2
+
+
+def _assert_window_keeps_newest_requests(db):
+    # A rebuild writes documents in request-id order; make the first of them the newest request
+    db.get(ProcurementRequest, "req-0").created_at = datetime(2025, 1, 1)
+    db.commit()
+    search_index.rebuild(db)
+    stmt = search_index.ranked_ids(db.get_bind().dialect.name, "item", limit=10, window=2)
+    assert {row.request_id for row in db.execute(stmt)} == {"req-0", "req-4"}
+
+
+def test_status_filter_applies_before_rank_window(sqlite_db, monkeypatch):
+    _assert_status_filter_before_window(sqlite_db, monkeypatch)
+
+
+def test_rank_window_follows_creation_time_not_document_order(sqlite_db):
+    _assert_window_keeps_newest_requests(sqlite_db)
+
+
+def test_postgres_search_uses_both_gin_indexes(postgres_db, monkeypatch):
+    _assert_status_filter_before_window(postgres_db, monkeypatch)
+    _assert_window_keeps_newest_requests(postgres_db)
+
+    # Five rows always scan sequentially; with plain scans disabled the plan shows
+    # whether the match predicates can be served by the two GIN indexes
+    postgres_db.execute(text("SET LOCAL enable_seqscan = off"))
+    postgres_db.execute(text("SET LOCAL enable_indexscan = off"))
+    stmt = search_index.ranked_ids("postgresql", "item", status_filter=RequestStatus.OPEN, limit=10)
+    compiled = stmt.compile(dialect=postgres_db.get_bind().dialect)
+    plan = "\n".join(postgres_db.connection().exec_driver_sql("EXPLAIN " + str(compiled), compiled.params).scalars())
+    postgres_db.rollback()
+    assert "ix_procurement_search_document_tsv" in plan
+    assert "ix_procurement_search_document_trgm" in plan
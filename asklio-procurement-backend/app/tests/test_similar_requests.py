@@ -0,0 +1,76 @@
+import re
+import zlib
+
+import pytest
+from fastapi import HTTPException
+
+from app.ai.embedding_cache import EmbeddingCache
+from app.models.user import User
+from app.schemas.procurement import OrderLineIn, ProcurementRequestCreate
+from app.services import procurement_common, procurement_service
+from app.weaviate.memory_store import InMemoryVectorStore
+
+
+class _WordEmbedder:
+    """Bag-of-words vectors, so requests sharing words are close."""
+    def __init__(self):
+        self.calls = 0
+
+    def embed(self, text, *, timeout=None):
+        self.calls += 1
+        vec = [0.0] * 64
+        for word in re.findall(r"[a-z]+", text.lower()):
+            vec[zlib.crc32(word.encode()) % 64] += 1.0
+        return vec
+
+
+@pytest.fixture
+def vector_store(monkeypatch, fake_classifier):
+    store, embedder = InMemoryVectorStore(), _WordEmbedder()
+    monkeypatch.setattr(procurement_common, "wx", store)
+    monkeypatch.setattr(procurement_common, "get_ai_client", lambda: embedder)
+    monkeypatch.setattr(procurement_common, "get_embedding_cache", lambda cache=EmbeddingCache(16): cache)
+    return store, embedder
+
+
+def _body(title: str, line: str) -> ProcurementRequestCreate:
+    return ProcurementRequestCreate(
+        title=title, vendorName="Office AG", vatID="DE123456789",
+        orderLines=[OrderLineIn(description=line, unitPriceCents=1000, quantity=1, unit="pcs")],
+    )
+
+
+def test_similar_requests_by_stored_vector_and_draft(sqlite_db, vector_store, assert_max_queries):
+    _, embedder = vector_store
+    requester = sqlite_db.get(User, 2)
+    laptops = procurement_service.create_request(sqlite_db, _body("Laptops", "ThinkPad laptop 14 inch"), requester)
+    docks = procurement_service.create_request(sqlite_db, _body("Laptop docks", "ThinkPad laptop dock"), requester)
+    procurement_service.create_request(sqlite_db, _body("Chairs", "Ergonomic office chair"), requester)
+
+    with assert_max_queries(1):  # stored vector; all hits hydrated in one query
+        similar = procurement_service.get_similar_requests(sqlite_db, laptops.id, 2)
+    assert [s.request.id for s in similar][0] == docks.id
+    assert laptops.id not in {s.request.id for s in similar} and len(similar) == 2
+    assert similar[0].similarity > similar[1].similarity
+
+    # A draft is embedded once: submitting it reuses the cached vector
+    draft = _body("Laptop bags", "ThinkPad laptop bag")
+    calls = embedder.calls
+    assert procurement_service.find_similar_requests(sqlite_db, draft, 5)[0].request.title.startswith("Laptop")
+    procurement_service.create_request(sqlite_db, draft, requester)
+    assert embedder.calls == calls + 1
+
+    # Never indexed (seed data): embedded from the request text instead
+    assert "req-0" not in {s.request.id for s in procurement_service.get_similar_requests(sqlite_db, "req-0", 5)}
+
+
+def test_similar_requests_errors(sqlite_db, vector_store, monkeypatch):
+    with pytest.raises(HTTPException) as e:
+        procurement_service.get_similar_requests(sqlite_db, "missing", 5)
+    assert e.value.status_code == 404
+
+    store, _ = vector_store
+    monkeypatch.setattr(store, "search_similar", lambda *a, **k: (_ for _ in ()).throw(RuntimeError("down")))
+    with pytest.raises(HTTPException) as e:
+        procurement_service.find_similar_requests(sqlite_db, _body("Laptops", "laptop"), 5)
+    assert e.value.status_code == 503
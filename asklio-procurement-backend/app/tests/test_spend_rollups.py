@@ -0,0 +1,54 @@
+import pytest
+from fastapi import HTTPException
+
+from app.models.enums import RequestStatus
+from app.models.user import User
+from app.schemas.procurement import OrderLineIn, ProcurementRequestCreate, ProcurementRequestUpdateIn
+from app.services import procurement_service, spend_rollups
+
+
+def _body(title: str, cents: int) -> ProcurementRequestCreate:
+    return ProcurementRequestCreate(
+        title=title,
+        vendorName="Office AG",
+        vatID="DE123456789",
+        orderLines=[OrderLineIn(description=title, unitPriceCents=cents, quantity=1, unit="pcs")],
+    )
+
+
+def test_incremental_rollups_match_a_rebuild(sqlite_db, fake_classifier, mute_weaviate, monkeypatch):
+    manager, requester = sqlite_db.get(User, 1), sqlite_db.get(User, 2)
+    stats = lambda: procurement_service.get_spend_stats(sqlite_db, manager)  # noqa: E731
+
+    procurement_service.create_request(sqlite_db, _body("Chairs", 10_000), requester)
+    procurement_service.create_requests_bulk(
+        sqlite_db, [_body("Desk", 30_000).model_dump(), _body("Lamp", 5_000).model_dump()], manager
+    )
+    procurement_service.update_request(
+        sqlite_db, "req-1",
+        ProcurementRequestUpdateIn(status=RequestStatus.CLOSED, commodityGroupID=33, version=1), manager,
+    )
+    # Deferred mode: stored under the heuristic group, moved by the worker
+    monkeypatch.setattr(procurement_service.settings, "CLASSIFICATION_MODE", "deferred")
+    monkeypatch.setattr(procurement_service.classification_worker, "enqueue", lambda request_id: None)
+    pending = procurement_service.create_request(sqlite_db, _body("Office furniture", 7_000), requester)
+    assert procurement_service.complete_pending_classification(sqlite_db, pending.id)
+
+    incremental = stats()
+    assert incremental.requestCount == 9 and incremental.totalCents == 5 * 2000 + 52_000
+    assert {b.key: b.requestCount for b in incremental.byStatus} == {"Open": 8, "Closed": 1}
+    assert incremental.byVendor[0].label == "Office AG"
+
+    spend_rollups.rebuild(sqlite_db)
+    assert stats() == incremental
+
+
+def test_stats_filters_and_requires_manager(sqlite_db):
+    manager, requester = sqlite_db.get(User, 1), sqlite_db.get(User, 2)
+    closed = procurement_service.get_spend_stats(sqlite_db, manager, status_filter=RequestStatus.CLOSED)
+    assert closed.requestCount == 0 and closed.byCommodityGroup == []
+    assert procurement_service.get_spend_stats(sqlite_db, manager, from_month="2999-01").requestCount == 0
+
+    with pytest.raises(HTTPException) as e:
+        procurement_service.get_spend_stats(sqlite_db, requester)
+    assert e.value.status_code == 403
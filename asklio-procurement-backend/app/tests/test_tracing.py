@@ -0,0 +1,66 @@
+import json
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.core import tracing
+from app.core.http_tracing import TracingMiddleware
+from app.db.query_tracing import instrument_sqlalchemy
+from app.utils.concurrency import submit_in_context
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracing.configure(exporter="file", service_name="test", file_path=str(path))
+    yield path
+    tracing.configure(exporter="none", service_name="test")
+
+
+def _spans(path):
+    tracing.shutdown()  # flush
+    spans = []
+    for line in path.read_text().splitlines():
+        for rs in json.loads(line)["resourceSpans"]:
+            for ss in rs["scopeSpans"]:
+                spans.extend(ss["spans"])
+    return {s["name"]: s for s in spans}
+
+
+def test_request_span_parents_sql_and_executor_spans(trace_file):
+    instrument_sqlalchemy()
+    engine = create_engine("sqlite://")
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware)
+
+    def work():
+        with tracing.span("background.work"):
+            pass
+
+    @app.get("/things/{thing_id}")
+    def thing(thing_id: int):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        with ThreadPoolExecutor(1) as pool:
+            submit_in_context(pool, work).result()
+        return {"trace": tracing.current_trace_id()}
+
+    parent = "00-" + "a" * 32 + "-" + "b" * 16 + "-01"
+    resp = TestClient(app).get("/things/1", headers={"traceparent": parent})
+
+    assert resp.json()["trace"] == "a" * 32
+    assert resp.headers["traceparent"].startswith("00-" + "a" * 32)
+    spans = _spans(trace_file)
+    server = spans["GET /things/{thing_id}"]
+    assert server["parentSpanId"] == "b" * 16
+    assert spans["db.select"]["parentSpanId"] == server["spanId"]
+    assert spans["background.work"]["parentSpanId"] == server["spanId"]
+
+
+def test_no_spans_recorded_when_disabled():
+    with tracing.span("x") as sp:
+        assert not sp.recording
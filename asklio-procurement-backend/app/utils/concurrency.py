@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+import contextvars
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+def submit_in_context(executor: Executor, fn: Callable[..., T], *args: Any, **kwargs: Any) -> "Future[T]":
+    """
+    executor.submit, but run `fn` in a copy of the caller's contextvars
+    (current span, agent stage), which plain thread pools don't propagate.
+    """
+    ctx = contextvars.copy_context()
+    return executor.submit(ctx.run, fn, *args, **kwargs)
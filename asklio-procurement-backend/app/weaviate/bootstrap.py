@@ -14,6 +14,7 @@ class RequestContextSchema(Enum):
     REQUEST_ID = "requestId"
     COMMODITY_GROUP = "commodityGroup"
     EMBEDDED_REQUEST_CONTEXT = "embeddedRequestContext"
+    LABEL_SOURCE = "labelSource"
 
 
 def ensure_schema() -> None:
@@ -51,6 +52,14 @@ def ensure_schema() -> None:
             data_type=DataType.TEXT,
             index_inverted=False,
         ),
+        Property(
+            name=RequestContextSchema.LABEL_SOURCE.value,
+            description="Who assigned the label: manual, or the classifier stage (knn, scoring, rerank, ...)",
+            data_type=DataType.TEXT,
+            index_filterable=True,
+            index_searchable=False,
+            tokenization=Tokenization.FIELD,
+        ),
     ]
 
     vector_index = Configure.VectorIndex.hnsw(distance_metric=VectorDistances.COSINE)
@@ -99,6 +108,14 @@ def _ensure_properties() -> None:
             data_type=DataType.TEXT,
             index_inverted=False,
         ),
+        RequestContextSchema.LABEL_SOURCE.value: Property(
+            name=RequestContextSchema.LABEL_SOURCE.value,
+            description="Who assigned the label: manual, or the classifier stage (knn, scoring, rerank, ...)",
+            data_type=DataType.TEXT,
+            index_filterable=True,
+            index_searchable=False,
+            tokenization=Tokenization.FIELD,
+        ),
     }
 
     for key, prop in desired.items():
@@ -0,0 +1,115 @@
+"""
+In-process stand-in for the Weaviate request-context collection (VECTOR_STORE=memory).
+
+Same operations and result shape as app.weaviate.operations, brute-force
+cosine search over unit-normalized vectors. Meant for load tests and local
+runs without a Weaviate container; contents are lost on restart.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import uuid
+from operator import mul
+from typing import Dict, List, Optional, Sequence
+
+
+def _unit(vec: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+    return [x / norm for x in vec]
+
+
+class InMemoryVectorStore:
+    def __init__(self) -> None:
+        self._objects: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def add(
+        self,
+        request_id: int | str,
+        commodity_group: str,
+        embedded_request_context: str,
+        vector: Optional[List[float]] = None,
+        label_source: Optional[str] = None,
+    ) -> str:
+        if vector is None:
+            raise ValueError("The in-memory vector store needs a precomputed vector.")
+        object_id = str(uuid.uuid4())
+        with self._lock:
+            self._objects[object_id] = {
+                "requestId": str(request_id),
+                "commodityGroup": commodity_group,
+                "embeddedRequestContext": embedded_request_context,
+                "labelSource": label_source,
+                "vector": _unit(vector),
+            }
+        return object_id
+
+    def add_many(self, objects: List[Dict]) -> int:
+        for o in objects:
+            self.add(
+                o["request_id"], o["commodity_group"], o["embedded_request_context"],
+                o.get("vector"), o.get("label_source"),
+            )
+        return len(objects)
+
+    def delete(self, request_id: int | str) -> None:
+        with self._lock:
+            for object_id in [k for k, o in self._objects.items() if o["requestId"] == str(request_id)]:
+                del self._objects[object_id]
+
+    def update_commodity_group(
+        self, request_id: int | str, new_commodity_group: str, label_source: Optional[str] = None
+    ) -> int:
+        updated = 0
+        with self._lock:
+            for o in self._objects.values():
+                if o["requestId"] == str(request_id):
+                    o["commodityGroup"] = new_commodity_group
+                    if label_source is not None:
+                        o["labelSource"] = label_source
+                    updated += 1
+        return updated
+
+    def get_vector(self, request_id: int | str) -> Optional[List[float]]:
+        with self._lock:
+            for o in self._objects.values():
+                if o["requestId"] == str(request_id):
+                    return list(o["vector"])
+        return None
+
+    def search_similar(
+        self,
+        vector: List[float],
+        top_k: int = 10,
+        commodity_group_id: Optional[str] = None,
+    ) -> List[Dict]:
+        q = _unit(vector)
+        with self._lock:
+            candidates = [
+                (object_id, o) for object_id, o in self._objects.items()
+                if commodity_group_id is None or o["commodityGroup"] == commodity_group_id
+            ]
+        scored = sorted(
+            ((sum(map(mul, q, o["vector"])), object_id, o) for object_id, o in candidates),
+            key=lambda t: t[0],
+            reverse=True,
+        )[:top_k]
+        return [
+            {
+                "uuid": object_id,
+                "requestId": o["requestId"],
+                "commodityGroup": o["commodityGroup"],
+                "embeddedRequestContext": o["embeddedRequestContext"],
+                "labelSource": o["labelSource"],
+                # Weaviate cosine semantics: distance = 1 - cos, certainty = (1 + cos) / 2
+                "certainty": (1 + cos) / 2,
+                "score": None,
+                "distance": 1 - cos,
+            }
+            for cos, object_id, o in scored
+        ]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._objects)
@@ -1,10 +1,73 @@
-from typing import Optional, List, Dict
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Optional, List, Dict, TypeVar
 from weaviate.collections import Collection
 from weaviate.collections.classes.filters import Filter
 import weaviate.classes as wvc
 
 from app.weaviate.client import get_client
 from app.weaviate.bootstrap import RequestContextSchema, ensure_schema
+from app.weaviate.memory_store import InMemoryVectorStore
+from app.core import metrics, tracing
+from app.core.config import settings
+from app.utils.concurrency import submit_in_context
+
+_CALL_SECONDS = metrics.histogram("weaviate_call_seconds", "Weaviate operation latency by operation")
+_ERRORS = metrics.counter("weaviate_errors_total", "Failed Weaviate operations by operation")
+
+F = TypeVar("F", bound=Callable)
+T = TypeVar("T")
+
+
+def _instrumented(fn: F) -> F:
+    """Record latency, failures and a client span for a Weaviate operation."""
+    op = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            with tracing.span(f"weaviate.{op}", kind=tracing.SPAN_KIND_CLIENT):
+                return fn(*args, **kwargs)
+        except Exception:
+            _ERRORS.inc(op=op)
+            raise
+        finally:
+            _CALL_SECONDS.observe(time.perf_counter() - started, op=op)
+
+    return wrapper  # type: ignore[return-value]
+
+
+@lru_cache(maxsize=1)
+def _query_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="weaviate-query")
+
+
+metrics.track_executor("weaviate_query", lambda: _query_pool() if _query_pool.cache_info().currsize else None)
+
+
+def _within(timeout: Optional[float], fn: Callable[[], T]) -> T:
+    """
+    Run `fn` with a wall-clock limit. The v4 client has no per-query timeout,
+    so the query runs on a small pool and the caller stops waiting after
+    `timeout` seconds (the abandoned query finishes on its pool thread).
+    """
+    if timeout is None:
+        return fn()
+    future = submit_in_context(_query_pool(), fn)
+    try:
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        future.cancel()
+        raise TimeoutError(f"Weaviate query exceeded {timeout:.2f}s") from None
+
+
+@lru_cache(maxsize=1)
+def memory_store() -> Optional[InMemoryVectorStore]:
+    """The in-process store when VECTOR_STORE=memory, else None (use Weaviate)."""
+    return InMemoryVectorStore() if settings.VECTOR_STORE == "memory" else None
 
 
 def _collection() -> Collection:
@@ -12,42 +75,96 @@ def _collection() -> Collection:
     return get_client().collections.get(RequestContextSchema.COLLECTION_NAME.value)
 
 
+def _properties(
+    request_id: int | str, commodity_group: str, embedded_request_context: str, label_source: Optional[str]
+) -> Dict:
+    props = {
+        RequestContextSchema.REQUEST_ID.value: str(request_id),
+        RequestContextSchema.COMMODITY_GROUP.value: commodity_group,
+        RequestContextSchema.EMBEDDED_REQUEST_CONTEXT.value: embedded_request_context,
+    }
+    if label_source is not None:
+        props[RequestContextSchema.LABEL_SOURCE.value] = label_source
+    return props
+
+
+@_instrumented
 def add(
     request_id: int | str,
     commodity_group: str,
     embedded_request_context: str,
     vector: Optional[List[float]] = None,
+    label_source: Optional[str] = None,
 ) -> str:
     """
     Insert one object. If you already computed an embedding, pass it as 'vector'.
-    Returns the inserted UUID.
+    `label_source` records who assigned the commodity group (see
+    RequestContextSchema.LABEL_SOURCE). Returns the inserted UUID.
     """
+    store = memory_store()
+    if store is not None:
+        return store.add(request_id, commodity_group, embedded_request_context, vector, label_source)
     col = _collection()
-    props = {
-        RequestContextSchema.REQUEST_ID.value: str(request_id),
-        RequestContextSchema.COMMODITY_GROUP.value: commodity_group,
-        RequestContextSchema.EMBEDDED_REQUEST_CONTEXT.value: embedded_request_context,
-    }
+    props = _properties(request_id, commodity_group, embedded_request_context, label_source)
     if vector is not None:
         return col.data.insert(properties=props, vector=vector)
     return col.data.insert(properties=props)
 
 
+@_instrumented
+def add_many(objects: List[Dict]) -> int:
+    """
+    Insert many objects in one batch request.
+    Each dict takes the same keys as `add` (request_id, commodity_group,
+    embedded_request_context, optional vector and label_source). Returns the
+    number inserted.
+    """
+    if not objects:
+        return 0
+    store = memory_store()
+    if store is not None:
+        return store.add_many(objects)
+    col = _collection()
+    data = [
+        wvc.data.DataObject(
+            properties=_properties(
+                o["request_id"], o["commodity_group"], o["embedded_request_context"], o.get("label_source")
+            ),
+            vector=o.get("vector"),
+        )
+        for o in objects
+    ]
+    res = col.data.insert_many(data)
+    if res.has_errors:
+        raise RuntimeError(f"Weaviate batch insert failed for {len(res.errors)} objects: {res.errors}")
+    return len(data)
+
+
+@_instrumented
 def delete(request_id: int | str) -> None:
     """
     Delete all objects for a given request id.
     """
+    store = memory_store()
+    if store is not None:
+        return store.delete(request_id)
     col = _collection()
     col.data.delete_many(
         where=Filter.by_property(RequestContextSchema.REQUEST_ID.value).equal(str(request_id))
     )
 
 
-def update_commodity_group(request_id: int | str, new_commodity_group: str) -> int:
+@_instrumented
+def update_commodity_group(
+    request_id: int | str, new_commodity_group: str, label_source: Optional[str] = None
+) -> int:
     """
-    Update the commodityGroup for all objects matching the given request id.
-    Returns the number of updated objects.
+    Update the commodityGroup (and labelSource) for all objects matching the
+    given request id. Returns the number of updated objects.
     """
+    store = memory_store()
+    if store is not None:
+        return store.update_commodity_group(request_id, new_commodity_group, label_source)
     col = _collection()
     results = col.query.fetch_objects(
         filters=Filter.by_property(RequestContextSchema.REQUEST_ID.value).equal(str(request_id))
@@ -55,37 +172,66 @@ def update_commodity_group(request_id: int | str, new_commodity_group: str) -> i
     if not results.objects:
         return 0
 
+    props = {RequestContextSchema.COMMODITY_GROUP.value: new_commodity_group}
+    if label_source is not None:
+        props[RequestContextSchema.LABEL_SOURCE.value] = label_source
     updated = 0
     for obj in results.objects:
-        col.data.update(
-            uuid=obj.uuid,
-            properties={RequestContextSchema.COMMODITY_GROUP.value: new_commodity_group},
-        )
+        col.data.update(uuid=obj.uuid, properties=props)
         updated += 1
     return updated
 
+@_instrumented
+def get_vector(request_id: int | str) -> Optional[List[float]]:
+    """
+    The stored embedding of a request (its first object), or None if the
+    request is not indexed.
+    """
+    store = memory_store()
+    if store is not None:
+        return store.get_vector(request_id)
+    col = _collection()
+    res = col.query.fetch_objects(
+        filters=Filter.by_property(RequestContextSchema.REQUEST_ID.value).equal(str(request_id)),
+        limit=1,
+        include_vector=True,
+    )
+    if not res.objects:
+        return None
+    vector = res.objects[0].vector
+    if isinstance(vector, dict):  # named-vector shape; the collection has only the default vector
+        vector = vector.get("default") or next(iter(vector.values()), None)
+    return list(vector) if vector else None
+
+
+@_instrumented
 def search_similar(
     vector: List[float],
     top_k: int = 10,
     commodity_group_id: Optional[str] = None,
+    timeout: Optional[float] = None,
 ) -> List[Dict]:
     """
     Vector similarity search over ProcurementRequestContext.
-    Optionally filter by `commodity_group_id`.
+    Optionally filter by `commodity_group_id`; `timeout` (seconds) bounds the
+    wait for Weaviate and raises TimeoutError when exceeded.
     Returns a list of dicts with properties + metadata (certainty/score/distance/uuid).
     """
+    store = memory_store()
+    if store is not None:
+        return store.search_similar(vector, top_k, commodity_group_id)
     col = _collection()
 
     filters = None
     if commodity_group_id:
         filters = Filter.by_property(RequestContextSchema.COMMODITY_GROUP.value).equal(commodity_group_id)
 
-    res = col.query.near_vector(
+    res = _within(timeout, lambda: col.query.near_vector(
         near_vector=vector,
         limit=top_k,
         filters=filters,
         return_metadata=wvc.query.MetadataQuery(certainty=True, score=True, distance=True),
-    )
+    ))
 
     out: List[Dict] = []
     for obj in res.objects:
@@ -95,6 +241,7 @@ def search_similar(
             "requestId": props.get(RequestContextSchema.REQUEST_ID.value),
             "commodityGroup": props.get(RequestContextSchema.COMMODITY_GROUP.value),
             "embeddedRequestContext": props.get(RequestContextSchema.EMBEDDED_REQUEST_CONTEXT.value),
+            "labelSource": props.get(RequestContextSchema.LABEL_SOURCE.value),
             "certainty": getattr(obj.metadata, "certainty", None),
             "score": getattr(obj.metadata, "score", None),
             "distance": getattr(obj.metadata, "distance", None),